@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class Change:
+    """
+    データセット・ドキュメント・Knowledge の変更1件（変更フィードの要素）
+
+    ドキュメント・データセットの削除では、配下の Knowledge・ドキュメントの削除も同じトランザクションで
+    1件ずつ記録する（配下の Knowledge、ドキュメント、削除したものの順）。
+
+    Attributes:
+        seq: 連番（この値より後の変更を since で取得する）
+        entity: 変更されたもの（dataset / document / knowledge）
+        entity_id: 変更されたもののID
+        operation: 変更の種類（create / update / delete）
+        document_id: Knowledge の所属ドキュメントID（Knowledge 以外は None）
+        dataset_id: ドキュメントの所属データセットID（ドキュメント以外は None）
+        origin: 書き込んだプロセスのID
+        created_at: 記録日時
+    """
+
+    seq: int
+    entity: str
+    entity_id: str
+    operation: str
+    document_id: Optional[str]
+    dataset_id: Optional[str]
+    origin: str
+    created_at: datetime
@@ -1,7 +1,11 @@
+import uuid
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, Dict, Optional
 
+# 自動生成データセットのID採番に使う名前空間（同じ名前からは常に同じIDになる）
+AUTO_DATASET_NAMESPACE = uuid.UUID("d72597f5-420e-4c5b-9fd3-bfdc16b24f45")
+
 
 @dataclass
 class Dataset:
@@ -50,3 +54,26 @@ class Dataset:
             created_at=datetime.now(),
             updated_at=datetime.now(),
         )
+
+    @classmethod
+    def create_auto(cls, name: str) -> "Dataset":
+        """
+        ドキュメント作成時に自動生成するデータセットを作成
+
+        ID は name から決定的に採番するため、同じ名前で並行に自動生成しても同一IDとなり、
+        リポジトリの get_or_create で重複作成を防げる。
+
+        Args:
+            name: データセット名（ドキュメントのタイトル）
+
+        Returns:
+            Dataset: 自動生成用のデータセットエンティティ
+        """
+        dataset = cls.create(
+            name=name,
+            description="Auto-created from document creation",
+            meta_data={},
+            is_active=True,
+        )
+        dataset.id = str(uuid.uuid5(AUTO_DATASET_NAMESPACE, name))
+        return dataset
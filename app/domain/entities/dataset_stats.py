@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class DatasetStats:
+    """
+    データセット単位の集計値のドメインエンティティ
+
+    Attributes:
+        dataset_id: データセットID
+        document_count: ドキュメント数
+        knowledge_count: Knowledge 数
+        document_characters: ドキュメント本文の合計文字数
+        knowledge_characters: Knowledge 本文の合計文字数
+        updated_at: 集計値の更新日時
+    """
+
+    dataset_id: str
+    document_count: int = 0
+    knowledge_count: int = 0
+    document_characters: int = 0
+    knowledge_characters: int = 0
+    updated_at: Optional[datetime] = None
+
+
+@dataclass
+class DocumentStats:
+    """
+    ドキュメント単位の集計値のドメインエンティティ
+
+    Attributes:
+        document_id: ドキュメントID
+        dataset_id: 所属データセットID
+        knowledge_count: Knowledge 数
+        knowledge_characters: Knowledge 本文の合計文字数
+        updated_at: 集計値の更新日時
+    """
+
+    document_id: str
+    dataset_id: str
+    knowledge_count: int = 0
+    knowledge_characters: int = 0
+    updated_at: Optional[datetime] = None
@@ -62,3 +62,21 @@ class Knowledge:
             created_at=datetime.now(),
             updated_at=datetime.now(),
         )
+
+    def matches_meta(self, meta: Dict[str, str]) -> bool:
+        """
+        meta_data の文字列の値が指定したキーと値にすべて一致するかを判定する
+
+        数値・真偽値などの文字列でない値は、文字列にすると一致しても一致としない
+        （DB での絞り込み（meta_filter.meta_clause）と同じ規則）。
+
+        Args:
+            meta (Dict[str, str]): meta_data のキー → 値
+
+        Returns:
+            bool: すべて一致する場合（meta が空の場合を含む）は True
+        """
+        meta_data = self.meta_data or {}
+        return all(
+            isinstance(meta_data.get(key), str) and meta_data[key] == value for key, value in meta.items()
+        )
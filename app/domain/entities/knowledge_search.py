@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+
+from app.domain.entities.knowledge import Knowledge
+
+
+@dataclass
+class KnowledgeSearchHit:
+    """
+    全文検索で一致したKnowledgeのIDとスコア
+
+    Attributes:
+        knowledge_id: Knowledge ID
+        score: 一致の度合い（大きいほど上位）
+    """
+
+    knowledge_id: str
+    score: float
+
+
+@dataclass
+class KnowledgeSearchResult:
+    """
+    全文検索の結果1件（Knowledge本体とスコア）
+
+    Attributes:
+        knowledge: 一致したKnowledgeエンティティ
+        score: 一致の度合い（大きいほど上位）
+    """
+
+    knowledge: Knowledge
+    score: float
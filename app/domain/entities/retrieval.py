@@ -0,0 +1,38 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.domain.entities.knowledge import Knowledge
+
+
+@dataclass
+class RetrievedKnowledge:
+    """
+    ハイブリッド検索の結果1件
+
+    Attributes:
+        knowledge: Knowledgeエンティティ
+        document_title: 所属ドキュメントのタイトル（取得前に削除された場合は None）
+        score: 融合後のスコア（大きいほど上位）
+        lexical_score: 全文検索（BM25）のスコア（全文検索の候補に無い場合は None）
+        vector_score: ベクトル検索のコサイン類似度（ベクトル検索の候補に無い場合は None）
+    """
+
+    knowledge: Knowledge
+    document_title: Optional[str]
+    score: float
+    lexical_score: Optional[float] = None
+    vector_score: Optional[float] = None
+
+
+@dataclass
+class RetrievalResult:
+    """
+    ハイブリッド検索の結果
+
+    Attributes:
+        items: 融合後のスコアの降順の結果
+        timings: 段階ごとの所要時間（ミリ秒。lexical / vector / fusion / hydrate / total）
+    """
+
+    items: List[RetrievedKnowledge]
+    timings: Dict[str, float] = field(default_factory=dict)
@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from app.domain.entities.change import Change
+
+
+class ChangeRepository(ABC):
+    """変更履歴（変更フィード）の読み取りのインターフェース
+
+    変更はリポジトリの書き込みと同じトランザクションで記録される。
+    """
+
+    @abstractmethod
+    def list_changes(self, since: int = 0, limit: int = 100) -> List[Change]:
+        """
+        指定した連番より後の変更を連番の昇順に取得する
+
+        Args:
+            since (int): この連番より後の変更を返す（0 の場合は保持している最初から）
+            limit (int): 返す件数の上限
+
+        Returns:
+            List[Change]: 変更のリスト
+        """
+        pass
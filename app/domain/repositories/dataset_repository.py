@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from app.domain.entities.dataset import Dataset
 
@@ -18,7 +19,14 @@ class DatasetRepository(ABC):
         pass
 
     @abstractmethod
-    def list_datasets(self, skip: int = 0, limit: int = 100, is_active: Optional[bool] = None) -> List[Dataset]:
+    def list_datasets(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        is_active: Optional[bool] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> List[Dataset]:
         """
         データセット一覧を取得
 
@@ -26,12 +34,52 @@ class DatasetRepository(ABC):
             skip (int): スキップ件数
             limit (int): 最大取得件数
             is_active (Optional[bool]): 有効フラグでのフィルタ（Noneの場合は全件）
+            after (Optional[Tuple[datetime, str]]): 直前ページ最終行の (created_at, id)。指定時は skip を無視する
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値。指定時はすべて一致するものに絞り込む
 
         Returns:
             List[Dataset]: データセットのリスト
         """
         pass
 
+    @abstractmethod
+    def get_or_create(self, dataset: Dataset) -> Dataset:
+        """
+        dataset.id のデータセットがあればそれを返し、なければ作成する
+
+        同じIDで並行に呼び出された場合も作成されるのは1件のみ
+
+        Args:
+            dataset (Dataset): 作成するデータセット（ID 必須）
+
+        Returns:
+            Dataset: 既存または作成されたデータセット
+        """
+        pass
+
+    @abstractmethod
+    def count_datasets(self, meta: Optional[Dict[str, str]] = None) -> int:
+        """
+        データセットの総件数を取得
+
+        Args:
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値。指定時はすべて一致するものに絞り込む
+
+        Returns:
+            int: データセットの件数
+        """
+        pass
+
+    @abstractmethod
+    def summarize_datasets(self) -> Tuple[int, Optional[datetime]]:
+        """
+        データセットの件数と最終更新日時を取得（一覧の変更検知用）
+
+        Returns:
+            Tuple[int, Optional[datetime]]: (件数, updated_at の最大値)
+        """
+        pass
+
     @abstractmethod
     def update(self, dataset: Dataset) -> Dataset:
         """データセットを更新"""
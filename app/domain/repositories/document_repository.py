@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from app.domain.entities.document import Document
 
@@ -35,9 +36,26 @@ class DocumentRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_many(self, document_ids: List[str]) -> List[Document]:
+        """指定された複数IDのドキュメントをまとめて取得する
+
+        Args:
+            document_ids (List[str]): 取得対象のドキュメントIDのリスト
+
+        Returns:
+            List[Document]: 存在したドキュメントエンティティのリスト（入力と同じ順序。存在しないIDは含まない）
+        """
+        pass
+
     @abstractmethod
     def list_documents(
-        self, dataset_id: str, skip: int = 0, limit: int = 100
+        self,
+        dataset_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
     ) -> List[Document]:
         """指定されたデータセットに属するドキュメント一覧を取得する
 
@@ -45,12 +63,39 @@ class DocumentRepository(ABC):
             dataset_id (str): ドキュメントが所属するデータセットのID
             skip (int, optional): スキップするレコード数
             limit (int, optional): 取得するレコード数の上限
+            after (Optional[Tuple[datetime, str]]): 直前ページ最終行の (created_at, id)。指定時は skip を無視する
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値。指定時はすべて一致するものに絞り込む
 
         Returns:
             List[Document]: ドキュメントエンティティのリスト
         """
         pass
 
+    @abstractmethod
+    def count_documents(self, dataset_id: str, meta: Optional[Dict[str, str]] = None) -> int:
+        """指定されたデータセットに属するドキュメントの件数を取得する
+
+        Args:
+            dataset_id (str): ドキュメントが所属するデータセットのID
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値。指定時はすべて一致するものに絞り込む
+
+        Returns:
+            int: ドキュメントの件数
+        """
+        pass
+
+    @abstractmethod
+    def summarize_documents(self, dataset_id: str) -> Tuple[int, Optional[datetime]]:
+        """指定されたデータセットに属するドキュメントの件数と最終更新日時を取得する（一覧の変更検知用）
+
+        Args:
+            dataset_id (str): ドキュメントが所属するデータセットのID
+
+        Returns:
+            Tuple[int, Optional[datetime]]: (件数, updated_at の最大値)
+        """
+        pass
+
     @abstractmethod
     def update(self, document: Document) -> Document:
         """ドキュメントを更新する
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from app.domain.entities.knowledge import Knowledge
 
@@ -23,6 +24,18 @@ class KnowledgeRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def create_many(self, knowledges: List[Knowledge]) -> List[str]:
+        """複数のKnowledgeを1トランザクションで一括作成する
+
+        Args:
+            knowledges (List[Knowledge]): 作成するKnowledgeエンティティのリスト
+
+        Returns:
+            List[str]: 作成されたKnowledge IDのリスト（入力と同じ順序）
+        """
+        pass
+
     @abstractmethod
     def get_by_id(self, knowledge_id: str) -> Optional[Knowledge]:
         """指定されたIDのKnowledgeを取得する
@@ -35,9 +48,26 @@ class KnowledgeRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_many(self, knowledge_ids: List[str]) -> List[Knowledge]:
+        """指定された複数IDのKnowledgeをまとめて取得する
+
+        Args:
+            knowledge_ids (List[str]): 取得対象のKnowledge IDのリスト
+
+        Returns:
+            List[Knowledge]: 存在したKnowledgeエンティティのリスト（入力と同じ順序。存在しないIDは含まない）
+        """
+        pass
+
     @abstractmethod
     def list_knowledges(
-        self, document_id: str, skip: int = 0, limit: int = 100
+        self,
+        document_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[int, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
     ) -> List[Knowledge]:
         """指定されたドキュメントに属するKnowledge一覧を取得する
 
@@ -45,12 +75,39 @@ class KnowledgeRepository(ABC):
             document_id (str): Knowledgeが所属するドキュメントのID
             skip (int, optional): スキップするレコード数
             limit (int, optional): 取得するレコード数の上限
+            after (Optional[Tuple[int, str]]): 直前ページ最終行の (sequence, id)。指定時は skip を無視する
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値。指定時はすべて一致するものに絞り込む
 
         Returns:
             List[Knowledge]: Knowledgeエンティティのリスト
         """
         pass
 
+    @abstractmethod
+    def count_knowledges(self, document_id: str, meta: Optional[Dict[str, str]] = None) -> int:
+        """指定されたドキュメントに属するKnowledgeの件数を取得する
+
+        Args:
+            document_id (str): Knowledgeが所属するドキュメントのID
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値。指定時はすべて一致するものに絞り込む
+
+        Returns:
+            int: Knowledgeの件数
+        """
+        pass
+
+    @abstractmethod
+    def summarize_knowledges(self, document_id: str) -> Tuple[int, Optional[datetime]]:
+        """指定されたドキュメントに属するKnowledgeの件数と最終更新日時を取得する（一覧の変更検知用）
+
+        Args:
+            document_id (str): Knowledgeが所属するドキュメントのID
+
+        Returns:
+            Tuple[int, Optional[datetime]]: (件数, updated_at の最大値)
+        """
+        pass
+
     @abstractmethod
     def update(self, knowledge: Knowledge) -> Knowledge:
         """Knowledgeを更新する
@@ -0,0 +1,41 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from app.domain.entities.knowledge_search import KnowledgeSearchHit
+
+
+class SearchUnavailableError(Exception):
+    """検索索引が使えない（無効化されている・構築中である）ことを表す例外"""
+
+
+class KnowledgeSearchRepository(ABC):
+    """Knowledge本文の全文検索のインターフェース
+
+    検索は索引に対して行い、IDとスコアだけを返す。Knowledge本体は KnowledgeRepository から取得する。
+    """
+
+    @abstractmethod
+    def search(
+        self,
+        query: str,
+        dataset_id: Optional[str] = None,
+        limit: int = 10,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> Tuple[List[KnowledgeSearchHit], int]:
+        """
+        Knowledge本文を検索する
+
+        Args:
+            query (str): 検索語
+            dataset_id (Optional[str]): 指定した場合はそのデータセットのKnowledgeに絞り込む
+            limit (int): 返す件数の上限
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値（文字列の値がすべて一致するものに絞り込む。
+                総件数も絞り込んだ後の件数）
+
+        Returns:
+            Tuple[List[KnowledgeSearchHit], int]: (スコアの降順のヒット, 一致した総件数)
+
+        Raises:
+            SearchUnavailableError: 索引が使えない場合
+        """
+        pass
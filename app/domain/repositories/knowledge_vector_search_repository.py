@@ -0,0 +1,29 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from app.domain.entities.knowledge_search import KnowledgeSearchHit
+
+
+class KnowledgeVectorSearchRepository(ABC):
+    """Knowledge本文の埋め込みによるベクトル検索のインターフェース
+
+    検索は埋め込みの索引に対して行い、IDと類似度だけを返す。Knowledge本体は KnowledgeRepository から取得する。
+    """
+
+    @abstractmethod
+    def search(self, query: str, dataset_id: str, limit: int = 10) -> List[KnowledgeSearchHit]:
+        """
+        検索語に意味の近いKnowledgeを探す
+
+        Args:
+            query (str): 検索語
+            dataset_id (str): 検索対象のデータセットID
+            limit (int): 返す件数の上限
+
+        Returns:
+            List[KnowledgeSearchHit]: 類似度の降順のヒット
+
+        Raises:
+            SearchUnavailableError: 索引が使えない場合
+        """
+        pass
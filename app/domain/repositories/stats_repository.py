@@ -0,0 +1,34 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from app.domain.entities.dataset_stats import DatasetStats, DocumentStats
+
+
+class StatsRepository(ABC):
+    """データセット・ドキュメントの集計値リポジトリのインターフェース
+
+    集計値は各リポジトリの作成・更新・削除で差分更新される。このリポジトリは参照と再集計のみを行う。
+    """
+
+    @abstractmethod
+    def get_dataset_stats(self, dataset_id: str) -> Optional[DatasetStats]:
+        """データセットの集計値を取得"""
+        pass
+
+    @abstractmethod
+    def get_document_stats(self, document_id: str) -> Optional[DocumentStats]:
+        """ドキュメントの集計値を取得"""
+        pass
+
+    @abstractmethod
+    def recompute(self, dataset_id: Optional[str] = None) -> int:
+        """
+        集計値を元のテーブルから数え直す
+
+        Args:
+            dataset_id (Optional[str]): 対象のデータセットID（None の場合は全データセット）
+
+        Returns:
+            int: 再集計したデータセット数
+        """
+        pass
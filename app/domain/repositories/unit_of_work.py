@@ -0,0 +1,40 @@
+from abc import ABC, abstractmethod
+
+from app.domain.repositories.dataset_repository import DatasetRepository
+from app.domain.repositories.document_repository import DocumentRepository
+from app.domain.repositories.knowledge_repository import KnowledgeRepository
+
+
+class UnitOfWork(ABC):
+    """複数リポジトリの操作を1トランザクションにまとめる Unit of Work の抽象クラス
+
+    with ブロック内で datasets / documents / knowledges の各リポジトリを操作し、
+    commit() を呼ぶと全ての変更がまとめて確定します。commit() せずにブロックを抜けた場合や
+    例外が発生した場合はロールバックされます。
+
+    Attributes:
+        datasets (DatasetRepository): データセットリポジトリ（個別にはコミットしない）
+        documents (DocumentRepository): ドキュメントリポジトリ（個別にはコミットしない）
+        knowledges (KnowledgeRepository): Knowledgeリポジトリ（個別にはコミットしない）
+    """
+
+    datasets: DatasetRepository
+    documents: DocumentRepository
+    knowledges: KnowledgeRepository
+
+    def __enter__(self) -> "UnitOfWork":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # commit 済みであればロールバックは何もしない
+        self.rollback()
+
+    @abstractmethod
+    def commit(self) -> None:
+        """トランザクションを確定する"""
+        pass
+
+    @abstractmethod
+    def rollback(self) -> None:
+        """トランザクションを取り消す"""
+        pass
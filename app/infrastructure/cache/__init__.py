@@ -0,0 +1,8 @@
+"""
+キャッシュ層
+
+- lru: TTL・件数上限・バイト数上限を持つプロセス内 LRU キャッシュ
+- entity_cache: エンティティ種別ごとのキャッシュと設定（環境変数）
+- cached_repositories: リポジトリ抽象クラスを実装し、get_by_id を読み取りキャッシュする
+  デコレーター（update / delete で同一プロセス内のキャッシュを無効化）
+"""
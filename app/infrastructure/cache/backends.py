@@ -0,0 +1,188 @@
+"""
+共有キャッシュ（L2）バックエンドの抽象クラスとインメモリ実装
+
+L2 は複数ワーカー・複数インスタンスで共有するキャッシュ。値はバイト列で保持し、
+タグ（例: "document:<id>"）単位・キー接頭辞単位の削除と、キャッシュ無効化メッセージの
+publish / subscribe を提供する。
+
+InMemoryCacheBackend は同一プロセス内でのみ共有される実装で、単一ワーカー構成やテストで使う。
+"""
+
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[bytes], None]
+
+
+class CacheBackendError(Exception):
+    """L2 キャッシュとの通信に失敗した場合の例外"""
+
+
+class CacheBackend(ABC):
+    """共有キャッシュ（L2）バックエンドの抽象クラス"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        値を取得する
+
+        Args:
+            key (str): キー
+
+        Returns:
+            Optional[bytes]: 値。未登録または期限切れの場合は None
+        """
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        """
+        値を有効期限付きで登録する
+
+        Args:
+            key (str): キー
+            value (bytes): 値
+            ttl_seconds (float): 有効期間（秒）
+            tags (Iterable[str]): delete_tag でまとめて削除するためのタグ
+        """
+        pass
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """
+        整数カウンターを1増やして新しい値を返す（未登録の場合は 0 から。有効期限なし）
+
+        Args:
+            key (str): キー
+
+        Returns:
+            int: 増加後の値
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        値を削除する
+
+        Args:
+            key (str): キー
+        """
+        pass
+
+    @abstractmethod
+    def delete_tag(self, tag: str) -> None:
+        """
+        指定タグが付いた値を全て削除する
+
+        Args:
+            tag (str): タグ
+        """
+        pass
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        """
+        キーが指定の接頭辞で始まる値を全て削除する（件数に比例して重いため稀な操作に限る）
+
+        Args:
+            prefix (str): キーの接頭辞
+        """
+        pass
+
+    @abstractmethod
+    def publish(self, channel: str, message: bytes) -> None:
+        """
+        チャネルにメッセージを送信する
+
+        Args:
+            channel (str): チャネル名
+            message (bytes): メッセージ
+        """
+        pass
+
+    @abstractmethod
+    def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        """
+        チャネルを購読し、受信したメッセージごとに handler を呼び出す（バックグラウンドで受信）
+
+        Args:
+            channel (str): チャネル名
+            handler (MessageHandler): メッセージを受け取るコールバック
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """接続や購読を終了する"""
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """プロセス内の辞書で動作する CacheBackend 実装"""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[bytes, float]] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl_seconds)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._values.get(key)
+            value = int(entry[0]) + 1 if entry is not None else 1
+            self._values[key] = (str(value).encode("ascii"), float("inf"))
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def delete_tag(self, tag: str) -> None:
+        with self._lock:
+            for key in self._tags.pop(tag, ()):
+                self._values.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._values if key.startswith(prefix)]:
+                del self._values[key]
+
+    def publish(self, channel: str, message: bytes) -> None:
+        with self._lock:
+            handlers = list(self._handlers.get(channel, ()))
+        for handler in handlers:
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error("Error: Cache invalidation handler failed. Error: %s", str(e))
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(handler)
+
+    def close(self) -> None:
+        with self._lock:
+            self._handlers.clear()
@@ -0,0 +1,391 @@
+"""
+キャッシュ付きリポジトリ（デコレーター）
+
+各リポジトリ抽象クラスを実装し、内側のリポジトリへ処理を委譲する。
+get_by_id は読み取りキャッシュ（read-through）し、update / delete の後に
+キャッシュを無効化する。ドキュメント・Knowledge の一覧・件数・集計（とデータセット全体の件数・集計）は
+親のバージョンをキーに含むページキャッシュ（page_cache）から返す。作成はそのまま委譲する。
+
+キャッシュは EntityCache（L1: プロセス内 / L2: 共有）で、無効化は他ノードにも伝播する。
+キャッシュに無い場合の読み取りは single-flight で同時実行をまとめる（プライマリとレプリカの読み取りは別々にまとめる）。
+読み込み中に無効化された行は書き戻さない（読み込み前に取得した無効化の世代が変わった場合は登録しない）。
+存在しないと分かっているID（ネガティブキャッシュ・ID フィルター）は DB に問い合わせずに None を返す。
+内側のリポジトリがリードレプリカのセッションで読む場合は、キャッシュ（一覧のページキャッシュを含む）を参照するが
+読み取り結果は登録しない（見つからなかったIDもネガティブキャッシュに登録しない）
+（遅延したレプリカの古い行が、プライマリに固定されたクライアントにキャッシュ経由で返らないようにするため）。
+
+他ノードの書き込みは無効化メッセージ（L2 の pub/sub）で反映し、届かなかった場合は変更履歴の追従スレッドが
+apply_changes で自プロセスの L1・ID キャッシュを破棄する（L2 が無い場合は一覧のバージョンも進める）。
+
+内側のリポジトリは auto_commit=True（メソッド内でコミット）を前提とする。
+UnitOfWork のようにコミット前にロールバックされうる書き込みはラップしないこと。
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.domain.entities.change import Change
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.domain.repositories.dataset_repository import DatasetRepository
+from app.domain.repositories.document_repository import DocumentRepository
+from app.domain.repositories.knowledge_repository import KnowledgeRepository
+from app.infrastructure.cache.entity_cache import (
+    dataset_cache,
+    document_cache,
+    knowledge_cache,
+)
+from app.infrastructure.cache.existence import dataset_ids, document_ids, knowledge_ids
+from app.infrastructure.cache.page_cache import DATASETS_SCOPE, GLOBAL_SCOPE, get_or_load_page, versions
+from app.infrastructure.cache.single_flight import flights
+from app.infrastructure.database.change_feed import change_handlers
+from app.infrastructure.database.connection import session_bind_name
+from app.infrastructure.database.meta_filter import meta_key
+
+
+def _read_bind(inner) -> str:
+    """内側のリポジトリの読み取り先（primary / replica。セッションを持たない場合は primary とみなす）"""
+    session = getattr(inner, "session", None)
+    return "primary" if session is None else session_bind_name(session)
+
+
+class CachedDatasetRepository(DatasetRepository):
+    """get_by_id をキャッシュする DatasetRepository"""
+
+    def __init__(self, inner: DatasetRepository):
+        self.inner = inner
+        self.read_bind = _read_bind(inner)
+        self.fills_cache = self.read_bind == "primary"
+
+    def create(self, dataset: Dataset) -> Dataset:
+        return self.inner.create(dataset)
+
+    def get_by_id(self, dataset_id: str) -> Optional[Dataset]:
+        cached = dataset_cache.get(dataset_id)
+        if cached is not None:
+            return cached
+        if dataset_ids.is_missing(dataset_id):
+            return None
+        # 読み込み中の無効化を検知するため、読み込み前の世代を取得する（世代ごとに別の読み込みとしてまとめる）
+        generation = dataset_cache.generation(dataset_id)
+        dataset = flights.do(
+            ("dataset", dataset_id), ("get", self.read_bind, generation), lambda: self.inner.get_by_id(dataset_id)
+        )
+        # レプリカから読んだ結果は、見つからなかったことも含めて登録しない（遅延で未反映の作成がありうる）
+        if not self.fills_cache:
+            return dataset
+        if dataset is None:
+            dataset_ids.mark_missing(dataset_id)
+        else:
+            dataset_cache.fill(dataset_id, dataset, generation)
+        return dataset
+
+    def list_datasets(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        is_active: Optional[bool] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> List[Dataset]:
+        return self.inner.list_datasets(skip=skip, limit=limit, is_active=is_active, after=after, meta=meta)
+
+    def get_or_create(self, dataset: Dataset) -> Dataset:
+        return self.inner.get_or_create(dataset)
+
+    def count_datasets(self, meta: Optional[Dict[str, str]] = None) -> int:
+        return get_or_load_page(
+            *DATASETS_SCOPE,
+            ("count", meta_key(meta)),
+            lambda: self.inner.count_datasets(meta=meta),
+            fill=self.fills_cache,
+        )
+
+    def summarize_datasets(self) -> Tuple[int, Optional[datetime]]:
+        return get_or_load_page(
+            *DATASETS_SCOPE,
+            ("summary",),
+            lambda: self.inner.summarize_datasets(),
+            fill=self.fills_cache,
+        )
+
+    def update(self, dataset: Dataset) -> Dataset:
+        try:
+            return self.inner.update(dataset)
+        finally:
+            dataset_cache.invalidate(dataset.id)
+            flights.forget(("dataset", dataset.id))
+
+    def delete(self, dataset_id: str) -> bool:
+        try:
+            deleted = self.inner.delete(dataset_id)
+            if deleted:
+                dataset_ids.mark_missing(dataset_id)
+            return deleted
+        finally:
+            # 配下のドキュメント・Knowledge も削除されるため合わせて破棄する
+            # （Knowledge はデータセットとの対応を持たないため全件破棄）
+            dataset_cache.invalidate(dataset_id)
+            flights.forget(("dataset", dataset_id))
+            document_cache.invalidate_tag(f"dataset:{dataset_id}")
+            knowledge_cache.clear()
+
+
+class CachedDocumentRepository(DocumentRepository):
+    """get_by_id をキャッシュする DocumentRepository"""
+
+    def __init__(self, inner: DocumentRepository):
+        self.inner = inner
+        self.read_bind = _read_bind(inner)
+        self.fills_cache = self.read_bind == "primary"
+
+    def create(self, document: Document) -> Document:
+        return self.inner.create(document)
+
+    def get_by_id(self, document_id: str) -> Optional[Document]:
+        cached = document_cache.get(document_id)
+        if cached is not None:
+            return cached
+        if document_ids.is_missing(document_id):
+            return None
+        # 読み込み中の無効化を検知するため、読み込み前の世代を取得する（世代ごとに別の読み込みとしてまとめる）
+        generation = document_cache.generation(document_id)
+        document = flights.do(
+            ("document", document_id),
+            ("get", self.read_bind, generation),
+            lambda: self.inner.get_by_id(document_id),
+        )
+        # レプリカから読んだ結果は、見つからなかったことも含めて登録しない（遅延で未反映の作成がありうる）
+        if not self.fills_cache:
+            return document
+        if document is None:
+            document_ids.mark_missing(document_id)
+        else:
+            document_cache.fill(document_id, document, generation, tags=[f"dataset:{document.dataset_id}"])
+        return document
+
+    def get_many(self, ids: List[str]) -> List[Document]:
+        found = {}
+        missing = []
+        for document_id in ids:
+            cached = document_cache.get(document_id)
+            if cached is not None:
+                found[document_id] = cached
+            elif not document_ids.is_missing(document_id):
+                missing.append(document_id)
+        # キャッシュに無いものだけを1クエリで読み、プライマリから読んだ場合は読み込み前の世代のままのものを登録する
+        generations = {}
+        if self.fills_cache:
+            generations = {document_id: document_cache.generation(document_id) for document_id in missing}
+        for document in self.inner.get_many(missing):
+            if self.fills_cache:
+                document_cache.fill(document.id, document, generations[document.id], tags=[f"dataset:{document.dataset_id}"])
+            found[document.id] = document
+        return [found[document_id] for document_id in ids if document_id in found]
+
+    def list_documents(
+        self,
+        dataset_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> List[Document]:
+        return get_or_load_page(
+            "documents",
+            dataset_id,
+            ("list", skip, limit, after, meta_key(meta)),
+            lambda: self.inner.list_documents(dataset_id, skip=skip, limit=limit, after=after, meta=meta),
+            fill=self.fills_cache,
+        )
+
+    def count_documents(self, dataset_id: str, meta: Optional[Dict[str, str]] = None) -> int:
+        return get_or_load_page(
+            "documents",
+            dataset_id,
+            ("count", meta_key(meta)),
+            lambda: self.inner.count_documents(dataset_id, meta=meta),
+            fill=self.fills_cache,
+        )
+
+    def summarize_documents(self, dataset_id: str) -> Tuple[int, Optional[datetime]]:
+        return get_or_load_page(
+            "documents",
+            dataset_id,
+            ("summary",),
+            lambda: self.inner.summarize_documents(dataset_id),
+            fill=self.fills_cache,
+        )
+
+    def update(self, document: Document) -> Document:
+        try:
+            return self.inner.update(document)
+        finally:
+            document_cache.invalidate(document.id)
+            flights.forget(("document", document.id))
+
+    def delete(self, document_id: str) -> bool:
+        try:
+            deleted = self.inner.delete(document_id)
+            if deleted:
+                document_ids.mark_missing(document_id)
+            return deleted
+        finally:
+            document_cache.invalidate(document_id)
+            flights.forget(("document", document_id))
+            knowledge_cache.invalidate_tag(f"document:{document_id}")
+
+
+class CachedKnowledgeRepository(KnowledgeRepository):
+    """get_by_id をキャッシュする KnowledgeRepository"""
+
+    def __init__(self, inner: KnowledgeRepository):
+        self.inner = inner
+        self.read_bind = _read_bind(inner)
+        self.fills_cache = self.read_bind == "primary"
+
+    def create(self, knowledge: Knowledge) -> Knowledge:
+        return self.inner.create(knowledge)
+
+    def create_many(self, knowledges: List[Knowledge]) -> List[str]:
+        return self.inner.create_many(knowledges)
+
+    def get_by_id(self, knowledge_id: str) -> Optional[Knowledge]:
+        cached = knowledge_cache.get(knowledge_id)
+        if cached is not None:
+            return cached
+        if knowledge_ids.is_missing(knowledge_id):
+            return None
+        # 読み込み中の無効化を検知するため、読み込み前の世代を取得する（世代ごとに別の読み込みとしてまとめる）
+        generation = knowledge_cache.generation(knowledge_id)
+        knowledge = flights.do(
+            ("knowledge", knowledge_id),
+            ("get", self.read_bind, generation),
+            lambda: self.inner.get_by_id(knowledge_id),
+        )
+        # レプリカから読んだ結果は、見つからなかったことも含めて登録しない（遅延で未反映の作成がありうる）
+        if not self.fills_cache:
+            return knowledge
+        if knowledge is None:
+            knowledge_ids.mark_missing(knowledge_id)
+        else:
+            knowledge_cache.fill(knowledge_id, knowledge, generation, tags=[f"document:{knowledge.document_id}"])
+        return knowledge
+
+    def get_many(self, ids: List[str]) -> List[Knowledge]:
+        found = {}
+        missing = []
+        for knowledge_id in ids:
+            cached = knowledge_cache.get(knowledge_id)
+            if cached is not None:
+                found[knowledge_id] = cached
+            elif not knowledge_ids.is_missing(knowledge_id):
+                missing.append(knowledge_id)
+        # キャッシュに無いものだけを1クエリで読み、プライマリから読んだ場合は読み込み前の世代のままのものを登録する
+        generations = {}
+        if self.fills_cache:
+            generations = {knowledge_id: knowledge_cache.generation(knowledge_id) for knowledge_id in missing}
+        for knowledge in self.inner.get_many(missing):
+            if self.fills_cache:
+                knowledge_cache.fill(knowledge.id, knowledge, generations[knowledge.id], tags=[f"document:{knowledge.document_id}"])
+            found[knowledge.id] = knowledge
+        return [found[knowledge_id] for knowledge_id in ids if knowledge_id in found]
+
+    def list_knowledges(
+        self,
+        document_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[int, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> List[Knowledge]:
+        return get_or_load_page(
+            "knowledges",
+            document_id,
+            ("list", skip, limit, after, meta_key(meta)),
+            lambda: self.inner.list_knowledges(document_id, skip=skip, limit=limit, after=after, meta=meta),
+            fill=self.fills_cache,
+        )
+
+    def count_knowledges(self, document_id: str, meta: Optional[Dict[str, str]] = None) -> int:
+        return get_or_load_page(
+            "knowledges",
+            document_id,
+            ("count", meta_key(meta)),
+            lambda: self.inner.count_knowledges(document_id, meta=meta),
+            fill=self.fills_cache,
+        )
+
+    def summarize_knowledges(self, document_id: str) -> Tuple[int, Optional[datetime]]:
+        return get_or_load_page(
+            "knowledges",
+            document_id,
+            ("summary",),
+            lambda: self.inner.summarize_knowledges(document_id),
+            fill=self.fills_cache,
+        )
+
+    def update(self, knowledge: Knowledge) -> Knowledge:
+        try:
+            return self.inner.update(knowledge)
+        finally:
+            knowledge_cache.invalidate(knowledge.id)
+            flights.forget(("knowledge", knowledge.id))
+
+    def delete(self, knowledge_id: str) -> bool:
+        try:
+            deleted = self.inner.delete(knowledge_id)
+            if deleted:
+                knowledge_ids.mark_missing(knowledge_id)
+            return deleted
+        finally:
+            knowledge_cache.invalidate(knowledge_id)
+            flights.forget(("knowledge", knowledge_id))
+
+
+def apply_changes(session: Session, changes: List[Change]) -> None:
+    """
+    他ノードの変更で古くなった自プロセスのキャッシュを破棄する（変更履歴の追従スレッドから呼ばれる）
+
+    一覧のバージョンは L2 があれば書き込んだノードが共有カウンターを進めているため、L2 が無い場合のみ進める。
+
+    Args:
+        session (Session): 変更履歴を読んだセッション（使わない）
+        changes (List[Change]): 連番順の変更
+    """
+    scopes = set()
+    for change in changes:
+        if change.entity == "dataset":
+            dataset_cache.apply_message("key", change.entity_id)
+            scopes.add(DATASETS_SCOPE)
+            if change.operation == "create":
+                dataset_ids.add([change.entity_id])
+            elif change.operation == "delete":
+                document_cache.apply_message("tag", f"dataset:{change.entity_id}")
+                scopes.add(GLOBAL_SCOPE)
+        elif change.entity == "document":
+            document_cache.apply_message("key", change.entity_id)
+            if change.operation == "create":
+                document_ids.add([change.entity_id])
+            elif change.operation == "delete":
+                knowledge_cache.apply_message("tag", f"document:{change.entity_id}")
+                scopes.add(("knowledges", change.entity_id))
+            if change.dataset_id is not None:
+                scopes.add(("documents", change.dataset_id))
+        elif change.entity == "knowledge":
+            knowledge_cache.apply_message("key", change.entity_id)
+            if change.operation == "create":
+                knowledge_ids.add([change.entity_id])
+            if change.document_id is not None:
+                scopes.add(("knowledges", change.document_id))
+        flights.forget((change.entity, change.entity_id))
+    if versions.backend is None:
+        for scope in scopes:
+            versions.bump(scope)
+            flights.forget(scope)
+
+
+change_handlers["cache:entities"] = apply_changes
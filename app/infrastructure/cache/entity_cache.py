@@ -0,0 +1,398 @@
+"""
+エンティティキャッシュ（L1: プロセス内 LRU / L2: 共有キャッシュ）と設定
+
+datasets / documents / knowledges ごとに EntityCache を1つずつ持つ（プロセス内で共有）。
+読み取りは L1 → L2 → DB の順に行い、L2 で見つかった値は L1 にも登録する。
+書き込み時の無効化は L1・L2 の両方から削除した上で無効化メッセージを publish し、
+他のワーカー・インスタンスは購読スレッドでメッセージを受け取って自身の L1 から削除する。
+
+DB から読んだ値の登録（fill）は、読み込み前に取得した無効化の世代が変わっていない場合に限る。
+無効化は世代を進めてから削除するため、読み込み中に更新・無効化された古い行が書き戻されることはない。
+世代はキーのハッシュで GENERATION_STRIPES 個に分けて数え（L2 があれば共有、無ければプロセス内）、
+タグ単位・全体の無効化はキャッシュ全体の世代を進める。
+
+設定は環境変数で行う:
+
+- ENTITY_CACHE_ENABLED: false でキャッシュを無効化（デコレーターは素通しになる）
+- ENTITY_CACHE_TTL_SECONDS: L1 エントリの有効期間（秒）
+- ENTITY_CACHE_MAX_ENTRIES: L1 キャッシュごとのエントリ数上限
+- ENTITY_CACHE_MAX_BYTES: L1 キャッシュごとの合計サイズ上限（本文・knowledge_text・メタデータの概算）
+- CACHE_BACKEND_URL: L2 の接続先（未指定: L2 なし / memory:// / redis:// / rediss://）
+- CACHE_BACKEND_TIMEOUT_SECONDS: L2 コマンドのタイムアウト（秒）
+- CACHE_BACKEND_MAX_CONNECTIONS: L2（Redis）のコネクションプールの接続数の上限
+- CACHE_L2_TTL_SECONDS: L2 エントリの有効期間（秒）
+- CACHE_KEY_PREFIX: L2 のキー・チャネル名の接頭辞
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import uuid
+import zlib
+from dataclasses import asdict, fields
+from datetime import datetime
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Tuple, Type, TypeVar
+
+from opentelemetry import metrics
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.infrastructure.cache.backends import (
+    CacheBackend,
+    CacheBackendError,
+    InMemoryCacheBackend,
+)
+from app.infrastructure.cache.lru import LRUCache
+from app.infrastructure.cache.redis_backend import RedisCacheBackend
+
+logger = logging.getLogger(__name__)
+
+ENTITY_CACHE_ENABLED = os.getenv("ENTITY_CACHE_ENABLED", "true").lower() == "true"
+ENTITY_CACHE_TTL_SECONDS = float(os.getenv("ENTITY_CACHE_TTL_SECONDS", "60"))
+ENTITY_CACHE_MAX_ENTRIES = int(os.getenv("ENTITY_CACHE_MAX_ENTRIES", "10000"))
+ENTITY_CACHE_MAX_BYTES = int(os.getenv("ENTITY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_BACKEND_URL = os.getenv("CACHE_BACKEND_URL", "")
+CACHE_BACKEND_TIMEOUT_SECONDS = float(os.getenv("CACHE_BACKEND_TIMEOUT_SECONDS", "0.5"))
+CACHE_BACKEND_MAX_CONNECTIONS = int(os.getenv("CACHE_BACKEND_MAX_CONNECTIONS", "50"))
+CACHE_L2_TTL_SECONDS = float(os.getenv("CACHE_L2_TTL_SECONDS", "300"))
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "knowledge-api")
+
+# エンティティ1件あたりの固定オーバーヘッド（オブジェクト本体・日時・ID 等の概算）
+ENTRY_OVERHEAD_BYTES = 256
+# JSON 化の際に ISO 8601 文字列として扱うフィールド
+DATETIME_FIELDS = ("created_at", "updated_at")
+# 無効化の世代を数えるキーの分割数（共有カウンターの数の上限。別のキーと重なっても登録を見送るだけ）
+GENERATION_STRIPES = 4096
+# 自プロセスが publish したメッセージを識別するID
+NODE_ID = uuid.uuid4().hex
+
+meter = metrics.get_meter(__name__)
+_l2_errors = meter.create_counter(
+    "cache.l2.errors", description="Shared cache operations that failed and were skipped"
+)
+
+T = TypeVar("T")
+
+
+def create_backend(url: str, timeout: float = CACHE_BACKEND_TIMEOUT_SECONDS) -> Optional[CacheBackend]:
+    """
+    接続文字列から L2 バックエンドを生成する
+
+    Args:
+        url (str): 接続文字列（空文字 / memory:// / redis:// / rediss://）
+        timeout (float): コマンドのタイムアウト（秒）
+
+    Returns:
+        Optional[CacheBackend]: バックエンド。url が空の場合は None
+    """
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryCacheBackend()
+    return RedisCacheBackend(url, timeout=timeout, max_connections=CACHE_BACKEND_MAX_CONNECTIONS)
+
+
+def estimate_size(entity: Any) -> int:
+    """
+    エンティティのおおよそのメモリ使用量を見積もる
+
+    文字列フィールドは UTF-8 のバイト数、dict フィールドは JSON 化したバイト数で数える。
+
+    Args:
+        entity (Any): dataclass のエンティティ
+
+    Returns:
+        int: 見積もりサイズ（バイト）
+    """
+    size = ENTRY_OVERHEAD_BYTES
+    for f in fields(entity):
+        value = getattr(entity, f.name)
+        if isinstance(value, str):
+            size += len(value.encode("utf-8"))
+        elif isinstance(value, dict):
+            size += len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    return size
+
+
+class EntityCache(Generic[T]):
+    """L1（プロセス内 LRU）と L2（共有キャッシュ）を重ねたエンティティキャッシュ"""
+
+    def __init__(
+        self,
+        name: str,
+        entity_type: Type[T],
+        l1: LRUCache,
+        l2: Optional[CacheBackend] = None,
+        l2_ttl_seconds: float = CACHE_L2_TTL_SECONDS,
+        key_prefix: str = CACHE_KEY_PREFIX,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            name (str): キャッシュ名（無効化メッセージの宛先）
+            entity_type (Type[T]): エンティティの dataclass
+            l1 (LRUCache): プロセス内キャッシュ
+            l2 (Optional[CacheBackend]): 共有キャッシュ。None の場合は L1 のみ
+            l2_ttl_seconds (float): L2 エントリの有効期間（秒）
+            key_prefix (str): L2 のキー・チャネル名の接頭辞
+        """
+        self.name = name
+        self.entity_type = entity_type
+        self.l1 = l1
+        self.l2 = l2
+        self.l2_ttl_seconds = l2_ttl_seconds
+        self.key_prefix = f"{key_prefix}:{name}:"
+        self.channel = f"{key_prefix}:invalidate"
+        # clear（接頭辞での一括削除）で世代が巻き戻らないよう、エンティティとは別の接頭辞にする
+        self.generation_prefix = f"{key_prefix}:generation:{name}:"
+        self._generations: List[int] = [0] * (GENERATION_STRIPES + 1)
+        self._generation_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[T]:
+        """
+        エンティティを取得する（L1 → L2 の順。戻り値は呼び出し側で変更してよいコピー）
+
+        Args:
+            key (str): エンティティID
+
+        Returns:
+            Optional[T]: エンティティ。どちらにも無い場合は None
+        """
+        entity = self.l1.get(key)
+        if entity is not None:
+            return copy.deepcopy(entity)
+        if self.l2 is None:
+            return None
+        try:
+            payload = self.l2.get(self.key_prefix + key)
+        except CacheBackendError as e:
+            self._record_l2_error("get", e)
+            return None
+        if payload is None:
+            return None
+        entity, tags = self._deserialize(payload)
+        self.l1.put(key, entity, estimate_size(entity), tags=tags)
+        return copy.deepcopy(entity)
+
+    def put(self, key: str, entity: T, tags: Iterable[str] = ()) -> None:
+        """
+        エンティティを L1・L2 に登録する
+
+        Args:
+            key (str): エンティティID
+            entity (T): エンティティ（コピーして保持する）
+            tags (Iterable[str]): invalidate_tag でまとめて破棄するためのタグ（例: "document:<id>"）
+        """
+        tags = list(tags)
+        self.l1.put(key, copy.deepcopy(entity), estimate_size(entity), tags=tags)
+        if self.l2 is None:
+            return
+        try:
+            self.l2.set(
+                self.key_prefix + key,
+                self._serialize(entity, tags),
+                self.l2_ttl_seconds,
+                tags=[self.key_prefix + tag for tag in tags],
+            )
+        except CacheBackendError as e:
+            self._record_l2_error("set", e)
+
+    def generation(self, key: str) -> Optional[Tuple[int, int]]:
+        """
+        キーの無効化の世代を取得する（DB から読み込む前に取得し、fill に渡す）
+
+        Args:
+            key (str): エンティティID
+
+        Returns:
+            Optional[Tuple[int, int]]: (キャッシュ全体の世代, キーの世代)。L2 と通信できない場合は None
+        """
+        stripe = self._stripe(key)
+        if self.l2 is None:
+            with self._generation_lock:
+                return self._generations[GENERATION_STRIPES], self._generations[stripe]
+        try:
+            values = [self.l2.get(f"{self.generation_prefix}{slot}") for slot in ("all", stripe)]
+        except CacheBackendError as e:
+            self._record_l2_error("generation", e)
+            return None
+        return tuple(int(value) if value is not None else 0 for value in values)
+
+    def fill(self, key: str, entity: T, generation: Optional[Tuple[int, int]], tags: Iterable[str] = ()) -> None:
+        """
+        DB から読み込んだエンティティを、読み込み前から無効化されていない場合に限り登録する
+
+        登録後にもう一度世代を確かめ、その間に無効化されていれば登録したものを破棄する
+        （無効化は世代を進めてから削除するため、どちらの順序でも古い行は残らない）。
+
+        Args:
+            key (str): エンティティID
+            entity (T): エンティティ
+            generation (Optional[Tuple[int, int]]): 読み込み前に generation で取得した世代
+            tags (Iterable[str]): invalidate_tag でまとめて破棄するためのタグ
+        """
+        if generation is None:
+            return
+        self.put(key, entity, tags)
+        if self.generation(key) != generation:
+            self.l1.invalidate(key)
+            self._invalidate_shared("key", key, lambda l2: l2.delete(self.key_prefix + key))
+
+    def invalidate(self, key: str) -> None:
+        """
+        エンティティを全ノードのキャッシュから破棄する
+
+        Args:
+            key (str): エンティティID
+        """
+        self._bump(key)
+        self.l1.invalidate(key)
+        self._invalidate_shared("key", key, lambda l2: l2.delete(self.key_prefix + key))
+
+    def invalidate_tag(self, tag: str) -> None:
+        """
+        指定タグが付いたエンティティを全ノードのキャッシュから破棄する
+
+        Args:
+            tag (str): タグ
+        """
+        self._bump(None)
+        self.l1.invalidate_tag(tag)
+        self._invalidate_shared("tag", tag, lambda l2: l2.delete_tag(self.key_prefix + tag))
+
+    def clear(self) -> None:
+        """全ノードのキャッシュから全エンティティを破棄する"""
+        self._bump(None)
+        self.l1.clear()
+        self._invalidate_shared("clear", None, lambda l2: l2.delete_prefix(self.key_prefix))
+
+    def apply_message(self, op: str, value: Optional[str]) -> None:
+        """
+        他ノードからの無効化メッセージを L1 に反映する（L2 が無い場合はプロセス内の世代も進める）
+
+        Args:
+            op (str): key / tag / clear
+            value (Optional[str]): エンティティIDまたはタグ
+        """
+        if self.l2 is None:
+            self._bump(value if op == "key" else None)
+        if op == "key":
+            self.l1.invalidate(value)
+        elif op == "tag":
+            self.l1.invalidate_tag(value)
+        elif op == "clear":
+            self.l1.clear()
+
+    def _bump(self, key: Optional[str]) -> None:
+        """キーの世代（None の場合はキャッシュ全体の世代）を1増やす"""
+        stripe = GENERATION_STRIPES if key is None else self._stripe(key)
+        if self.l2 is None:
+            with self._generation_lock:
+                self._generations[stripe] += 1
+            return
+        slot = "all" if key is None else stripe
+        try:
+            self.l2.incr(f"{self.generation_prefix}{slot}")
+        except CacheBackendError as e:
+            self._record_l2_error("bump", e)
+
+    @staticmethod
+    def _stripe(key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % GENERATION_STRIPES
+
+    def _invalidate_shared(self, op: str, value: Optional[str], delete) -> None:
+        """L2 から削除してから無効化メッセージを publish する"""
+        if self.l2 is None:
+            return
+        message = json.dumps({"origin": NODE_ID, "cache": self.name, "op": op, "value": value})
+        try:
+            delete(self.l2)
+            self.l2.publish(self.channel, message.encode("utf-8"))
+        except CacheBackendError as e:
+            self._record_l2_error("invalidate", e)
+
+    def _serialize(self, entity: T, tags: list) -> bytes:
+        data = asdict(entity)
+        for name in DATETIME_FIELDS:
+            if isinstance(data.get(name), datetime):
+                data[name] = data[name].isoformat()
+        return json.dumps({"entity": data, "tags": tags}, ensure_ascii=False).encode("utf-8")
+
+    def _deserialize(self, payload: bytes) -> tuple:
+        data = json.loads(payload)
+        entity = data["entity"]
+        for name in DATETIME_FIELDS:
+            if entity.get(name):
+                entity[name] = datetime.fromisoformat(entity[name])
+        return self.entity_type(**entity), data.get("tags", [])
+
+    def _record_l2_error(self, operation: str, error: Exception) -> None:
+        logger.warning("Error: Shared cache %s failed for %s. Error: %s", operation, self.name, str(error))
+        _l2_errors.add(1, {"cache.name": self.name, "cache.operation": operation})
+
+
+def _new_cache(name: str, entity_type: type) -> EntityCache:
+    l1 = LRUCache(
+        name,
+        max_entries=ENTITY_CACHE_MAX_ENTRIES if ENTITY_CACHE_ENABLED else 0,
+        max_bytes=ENTITY_CACHE_MAX_BYTES,
+        ttl_seconds=ENTITY_CACHE_TTL_SECONDS,
+    )
+    return EntityCache(name, entity_type, l1, l2_backend)
+
+
+l2_backend = create_backend(CACHE_BACKEND_URL) if ENTITY_CACHE_ENABLED else None
+
+dataset_cache = _new_cache("datasets", Dataset)
+document_cache = _new_cache("documents", Document)
+knowledge_cache = _new_cache("knowledges", Knowledge)
+
+entity_caches: Dict[str, EntityCache] = {
+    cache.name: cache for cache in (dataset_cache, document_cache, knowledge_cache)
+}
+
+# EntityCache 以外で無効化チャネルのメッセージを受け取るもの（cache 名 → apply_message 相当の関数）
+message_handlers: Dict[str, Callable[[str, Any], None]] = {}
+
+
+def handle_invalidation_message(message: bytes) -> None:
+    """
+    無効化メッセージを受け取り、該当するキャッシュの L1 から破棄する（自ノード発のものは無視）
+
+    Args:
+        message (bytes): EntityCache が publish した JSON メッセージ
+    """
+    data = json.loads(message)
+    if data.get("origin") == NODE_ID:
+        return
+    cache = entity_caches.get(data.get("cache"))
+    if cache is not None:
+        cache.apply_message(data.get("op"), data.get("value"))
+        return
+    handler = message_handlers.get(data.get("cache"))
+    if handler is not None:
+        handler(data.get("op"), data.get("value"))
+
+
+def start_invalidation_listener() -> None:
+    """L2 の無効化チャネルの購読を開始する（アプリケーション起動時に呼び出す）"""
+    if l2_backend is None:
+        return
+    l2_backend.subscribe(f"{CACHE_KEY_PREFIX}:invalidate", handle_invalidation_message)
+    logger.info("Success: Listening for cache invalidation on %s", CACHE_BACKEND_URL.split("@")[-1])
+
+
+def stop_invalidation_listener() -> None:
+    """L2 の購読と接続を終了する（アプリケーション終了時に呼び出す）"""
+    if l2_backend is not None:
+        l2_backend.close()
+
+
+def clear_entity_caches() -> None:
+    """このプロセスの L1 キャッシュを全て破棄する（テストや一括更新後に使用）"""
+    for cache in entity_caches.values():
+        cache.l1.clear()
@@ -0,0 +1,359 @@
+"""
+存在しないIDの取得を DB に問い合わせずに返すための仕組み（ネガティブキャッシュと ID フィルター）
+
+古いIDで GET /{id} を繰り返すクライアントがいても、DB への問い合わせを抑える。
+
+- ネガティブキャッシュ: プライマリで見つからなかったID・削除したIDを短い TTL で覚えておく
+  （リードレプリカは作成が未反映のことがあるため、レプリカで見つからなかったIDは覚えない）
+- ID フィルター（任意）: テーブルごとに存在するIDの Bloom フィルターを持ち、
+  フィルターに無いIDは「確実に存在しない」として扱う（偽陽性は DB に問い合わせるだけ）
+
+Bloom フィルターは削除できないため、削除したIDはネガティブキャッシュで扱い、フィルターは
+起動時の再構築で縮める。作成したIDは INSERT 時とコミット後の両方でフィルターに追加し
+（mark_created で予約し、Session の after_commit で反映）、コミット後に他ノードへ
+作成メッセージを publish してネガティブキャッシュを破棄させる。
+
+設定は環境変数で行う:
+
+- NEGATIVE_CACHE_ENABLED: false でネガティブキャッシュを無効化（ENTITY_CACHE_ENABLED=false でも無効）
+- NEGATIVE_CACHE_TTL_SECONDS: 見つからなかったIDを覚えておく時間（秒）
+- NEGATIVE_CACHE_MAX_ENTRIES: テーブルごとに覚えておくIDの上限
+- ID_FILTER_ENABLED: true で ID フィルターを有効化（起動時にバックグラウンドで構築する）
+- ID_FILTER_ERROR_RATE: フィルターの偽陽性率
+- ID_FILTER_MIN_CAPACITY: フィルターの最小容量（件数）。構築時は行数の2倍を確保する
+
+ID フィルターは他ノードでの作成を pub/sub で受け取って追加するため、複数ワーカー構成では
+CACHE_BACKEND_URL（L2）を設定すること。L2 が無い複数ワーカー構成では有効化しないこと。
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from opentelemetry import metrics
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.infrastructure.cache.backends import CacheBackend, CacheBackendError
+from app.infrastructure.cache.entity_cache import (
+    CACHE_KEY_PREFIX,
+    ENTITY_CACHE_ENABLED,
+    NODE_ID,
+    l2_backend,
+    message_handlers,
+)
+from app.infrastructure.cache.lru import LRUCache
+from app.infrastructure.database.models import DatasetModel, DocumentModel, KnowledgeModel
+
+logger = logging.getLogger(__name__)
+
+NEGATIVE_CACHE_ENABLED = (
+    ENTITY_CACHE_ENABLED and os.getenv("NEGATIVE_CACHE_ENABLED", "true").lower() == "true"
+)
+NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", "10"))
+NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "100000"))
+ID_FILTER_ENABLED = ENTITY_CACHE_ENABLED and os.getenv("ID_FILTER_ENABLED", "false").lower() == "true"
+ID_FILTER_ERROR_RATE = float(os.getenv("ID_FILTER_ERROR_RATE", "0.01"))
+ID_FILTER_MIN_CAPACITY = int(os.getenv("ID_FILTER_MIN_CAPACITY", "100000"))
+
+# Session.info に作成したIDを溜めておくキー
+PENDING_KEY = "existence_pending"
+# 作成メッセージ1件あたりのID数（一括作成時に分割する）
+MESSAGE_BATCH_SIZE = 1000
+# ネガティブキャッシュの1エントリあたりのサイズ（概算）
+NEGATIVE_ENTRY_BYTES = 64
+
+meter = metrics.get_meter(__name__)
+_short_circuits = meter.create_counter(
+    "cache.negative.hits", description="Lookups answered as not found without querying the database"
+)
+
+
+class BloomFilter:
+    """文字列IDの Bloom フィルター（偽陰性なし・偽陽性あり）"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        コンストラクタ
+
+        Args:
+            capacity (int): 想定する件数（超えると偽陽性率が上がる）
+            error_rate (float): capacity 件のときの偽陽性率
+        """
+        capacity = max(capacity, 1)
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, key: str) -> None:
+        """
+        キーを追加する
+
+        Args:
+            key (str): ID
+        """
+        positions = self._positions(key)
+        # バイト単位の読み書きが競合してビットを失わないよう、追加は排他する
+        with self._lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def _positions(self, key: str) -> List[int]:
+        # 2つのハッシュ値の線形結合で num_hashes 個の位置を求める（Kirsch–Mitzenmacher 法）
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+
+class ExistenceCache:
+    """テーブル1つ分のネガティブキャッシュと ID フィルター"""
+
+    def __init__(
+        self,
+        name: str,
+        negative: LRUCache,
+        l2: Optional[CacheBackend] = None,
+        key_prefix: str = CACHE_KEY_PREFIX,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            name (str): テーブルに対応するキャッシュ名（datasets / documents / knowledges）
+            negative (LRUCache): 見つからなかったIDを覚えておくキャッシュ
+            l2 (Optional[CacheBackend]): 作成メッセージの publish 先。None の場合は自プロセスのみ
+            key_prefix (str): チャネル名の接頭辞
+        """
+        self.name = name
+        self.negative = negative
+        self.l2 = l2
+        self.channel = f"{key_prefix}:invalidate"
+        self.message_name = f"ids:{name}"
+        self.filter: Optional[BloomFilter] = None
+        self._building: Optional[BloomFilter] = None
+
+    def is_missing(self, entity_id: str) -> bool:
+        """
+        DB に問い合わせずに「存在しない」と判断できるか
+
+        Args:
+            entity_id (str): ID
+
+        Returns:
+            bool: ネガティブキャッシュにある、またはフィルターに無い場合は True
+        """
+        if self.negative.get(entity_id) is not None:
+            _short_circuits.add(1, {"cache.name": self.name, "cache.source": "negative"})
+            return True
+        id_filter = self.filter
+        if id_filter is not None and entity_id not in id_filter:
+            _short_circuits.add(1, {"cache.name": self.name, "cache.source": "filter"})
+            return True
+        return False
+
+    def mark_missing(self, entity_id: str) -> None:
+        """
+        見つからなかった・削除したIDを覚えておく
+
+        Args:
+            entity_id (str): ID
+        """
+        self.negative.put(entity_id, True, NEGATIVE_ENTRY_BYTES)
+
+    def add(self, ids: Iterable[str]) -> None:
+        """
+        作成したIDをフィルターに追加し、ネガティブキャッシュから外す（自プロセスのみ）
+
+        Args:
+            ids (Iterable[str]): 作成したID
+        """
+        # 構築中のフィルターを先に読む（入れ替えと行き違っても新しいフィルターに追加される）
+        building = self._building
+        targets = [id_filter for id_filter in (building, self.filter) if id_filter is not None]
+        for entity_id in ids:
+            for id_filter in targets:
+                id_filter.add(entity_id)
+            self.negative.invalidate(entity_id)
+
+    def publish_created(self, ids: List[str]) -> None:
+        """
+        作成したIDを他ノードに通知する
+
+        Args:
+            ids (List[str]): 作成したID
+        """
+        if self.l2 is None:
+            return
+        try:
+            for start in range(0, len(ids), MESSAGE_BATCH_SIZE):
+                message = json.dumps(
+                    {
+                        "origin": NODE_ID,
+                        "cache": self.message_name,
+                        "op": "created",
+                        "value": ids[start : start + MESSAGE_BATCH_SIZE],
+                    }
+                )
+                self.l2.publish(self.channel, message.encode("utf-8"))
+        except CacheBackendError as e:
+            logger.warning("Error: Failed to publish created ids for %s. Error: %s", self.name, str(e))
+
+    def apply_message(self, op: str, value) -> None:
+        """
+        他ノードからの作成メッセージを反映する
+
+        Args:
+            op (str): created
+            value: 作成されたIDのリスト
+        """
+        if op == "created":
+            self.add(value)
+
+    def rebuild(self, load_ids: Callable[[], Iterable[str]], count: int) -> None:
+        """
+        フィルターを作り直す（構築中の作成も新しいフィルターに追加される）
+
+        Args:
+            load_ids (Callable[[], Iterable[str]]): 存在する全IDを読む関数。読み取り開始前に
+                コミットされた作成は結果に含まれ、開始後のものは add で構築中のフィルターに入る
+            count (int): 件数の見込み（容量の算出に使う）
+        """
+        building = BloomFilter(max(count * 2, ID_FILTER_MIN_CAPACITY), ID_FILTER_ERROR_RATE)
+        self._building = building
+        try:
+            for entity_id in load_ids():
+                building.add(entity_id)
+            self.filter = building
+        finally:
+            self._building = None
+
+    def clear(self) -> None:
+        """ネガティブキャッシュとフィルターを破棄する（フィルターは再構築まで使わない）"""
+        self.negative.clear()
+        self.filter = None
+
+
+def _new_existence_cache(name: str) -> ExistenceCache:
+    negative = LRUCache(
+        f"{name}.missing",
+        max_entries=NEGATIVE_CACHE_MAX_ENTRIES if NEGATIVE_CACHE_ENABLED else 0,
+        max_bytes=NEGATIVE_CACHE_MAX_ENTRIES * NEGATIVE_ENTRY_BYTES,
+        ttl_seconds=NEGATIVE_CACHE_TTL_SECONDS,
+    )
+    return ExistenceCache(name, negative, l2_backend)
+
+
+dataset_ids = _new_existence_cache("datasets")
+document_ids = _new_existence_cache("documents")
+knowledge_ids = _new_existence_cache("knowledges")
+
+existence_caches: Dict[str, ExistenceCache] = {
+    cache.name: cache for cache in (dataset_ids, document_ids, knowledge_ids)
+}
+for _cache in existence_caches.values():
+    message_handlers[_cache.message_name] = _cache.apply_message
+
+# テーブルごとの ID 列（フィルターの構築に使う）
+ID_COLUMNS = {
+    "datasets": DatasetModel.id,
+    "documents": DocumentModel.id,
+    "knowledges": KnowledgeModel.id,
+}
+
+
+def mark_created(session: Session, name: str, ids: Iterable[str]) -> None:
+    """
+    行を作成したことを記録する（フィルターに追加し、コミット後に他ノードへ通知する）
+
+    Args:
+        session (Session): 書き込みを行ったセッション
+        name (str): datasets / documents / knowledges
+        ids (Iterable[str]): 作成したID
+    """
+    if not (NEGATIVE_CACHE_ENABLED or ID_FILTER_ENABLED):
+        return
+    ids = list(ids)
+    # コミット前に追加しておく（ロールバックされた場合の偽陽性は DB に問い合わせるだけ）
+    existence_caches[name].add(ids)
+    session.info.setdefault(PENDING_KEY, {}).setdefault(name, []).extend(ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session) -> None:
+    # SAVEPOINT の解放でも呼ばれるため、最も外側のトランザクションのコミットでのみ反映する
+    if session.in_nested_transaction():
+        return
+    for name, ids in session.info.pop(PENDING_KEY, {}).items():
+        cache = existence_caches[name]
+        # コミット前の追加と構築中のフィルターの読み取りが行き違った場合に備えて再度追加する
+        cache.add(ids)
+        cache.publish_created(ids)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_rollback(session: Session, transaction) -> None:
+    # ロールバックされた作成の通知は破棄する（コミット時は after_commit で処理済み）
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+def rebuild_id_filters(session_factory: Callable[[], Session]) -> None:
+    """
+    全テーブルの ID フィルターを DB から作り直す
+
+    Args:
+        session_factory (Callable[[], Session]): プライマリに接続するセッションを返す関数
+            （レプリカの遅延で直前に作成された行を取りこぼさないため）
+    """
+    if not ID_FILTER_ENABLED:
+        return
+    for name, column in ID_COLUMNS.items():
+        logger.info("Start: Building id filter for %s", name)
+        try:
+            with session_factory() as session:
+                count = session.execute(select(func.count()).select_from(column.table)).scalar_one()
+                existence_caches[name].rebuild(
+                    lambda: session.execute(select(column).execution_options(yield_per=10000)).scalars(),
+                    count,
+                )
+            logger.info("Success: Built id filter for %s with %d ids", name, count)
+        except Exception as e:
+            logger.error("Error: Failed to build id filter for %s. Error: %s", name, str(e))
+
+
+def start_id_filter_rebuild(session_factory: Callable[[], Session]) -> Optional[threading.Thread]:
+    """
+    ID フィルターの構築をバックグラウンドで開始する（アプリケーション起動時に呼び出す）
+
+    構築が終わるまではフィルターを使わず、従来どおり DB に問い合わせる。
+
+    Args:
+        session_factory (Callable[[], Session]): プライマリに接続するセッションを返す関数
+
+    Returns:
+        Optional[threading.Thread]: 構築スレッド。ID フィルターが無効の場合は None
+    """
+    if not ID_FILTER_ENABLED:
+        return None
+    thread = threading.Thread(
+        target=rebuild_id_filters, args=(session_factory,), name="id-filter-rebuild", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def clear_existence_caches() -> None:
+    """このプロセスのネガティブキャッシュと ID フィルターを全て破棄する（テストで使用）"""
+    for cache in existence_caches.values():
+        cache.clear()
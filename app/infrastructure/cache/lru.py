@@ -0,0 +1,198 @@
+"""
+TTL・件数上限・バイト数上限を持つスレッドセーフな LRU キャッシュ
+
+値のサイズは呼び出し側が見積もって渡す（本文など大きなフィールドを持つエンティティを
+件数だけでなく合計バイト数でも制限するため）。エントリにはタグ（例: ("document", id)）を
+付けられ、タグ単位でまとめて無効化できる。
+
+ヒット・ミス・破棄の回数は OpenTelemetry のカウンター（cache.hits / cache.misses /
+cache.evictions）として cache.name 属性付きで記録する。
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+
+_hits = meter.create_counter("cache.hits", description="Cache lookups served from the cache")
+_misses = meter.create_counter("cache.misses", description="Cache lookups that fell through to the source")
+_evictions = meter.create_counter(
+    "cache.evictions", description="Entries removed because of capacity or expiry"
+)
+
+# 生成済みのキャッシュ（名前 → LRUCache）。Observable Gauge の公開に使う
+caches: Dict[str, "LRUCache"] = {}
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+    tags: tuple = field(default_factory=tuple)
+
+
+class LRUCache:
+    """TTL・件数上限・バイト数上限を持つ LRU キャッシュ"""
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int, ttl_seconds: float):
+        """
+        コンストラクタ
+
+        Args:
+            name (str): キャッシュ名（メトリクスの cache.name 属性）
+            max_entries (int): 保持するエントリ数の上限
+            max_bytes (int): 保持する値の合計サイズ（バイト）の上限
+            ttl_seconds (float): エントリの有効期間（秒）
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self._attributes = {"cache.name": name}
+        caches[name] = self
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        キャッシュ値を取得する（取得したエントリは最近使用したものとして扱う）
+
+        Args:
+            key (Hashable): キャッシュキー
+
+        Returns:
+            Optional[Any]: キャッシュ値。未登録または期限切れの場合は None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._record_eviction("expired")
+                entry = None
+            if entry is None:
+                self._misses += 1
+                _misses.add(1, self._attributes)
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        _hits.add(1, self._attributes)
+        return entry.value
+
+    def put(self, key: Hashable, value: Any, size: int, tags: Iterable[Hashable] = ()) -> None:
+        """
+        値を登録する。上限を超えた場合は最も古く使われたエントリから破棄する
+
+        Args:
+            key (Hashable): キャッシュキー
+            value (Any): 値
+            size (int): 値の見積もりサイズ（バイト）。max_bytes を超える値は登録しない
+            tags (Iterable[Hashable]): まとめて無効化するためのタグ
+        """
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            tags = tuple(tags)
+            self._entries[key] = _Entry(value, size, time.monotonic() + self.ttl_seconds, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._record_eviction("capacity")
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        指定キーのエントリを破棄する
+
+        Args:
+            key (Hashable): キャッシュキー
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        """
+        指定タグが付いたエントリを全て破棄する
+
+        Args:
+            tag (Hashable): タグ
+        """
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        """全てのエントリを破棄する"""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        現在の利用状況を返す
+
+        Returns:
+            Dict[str, Any]: entries, bytes, hits, misses, evictions
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        """エントリとタグ索引を削除する（ロック取得済みで呼ぶこと）"""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _record_eviction(self, reason: str) -> None:
+        """破棄回数を記録する（ロック取得済みで呼ぶこと）"""
+        self._evictions += 1
+        _evictions.add(1, {**self._attributes, "cache.eviction_reason": reason})
+
+
+def _observe(key: str):
+    """stats() の値を Observable Gauge として公開するコールバックを生成する"""
+
+    def callback(options: CallbackOptions):
+        for cache in list(caches.values()):
+            yield Observation(cache.stats()[key], {"cache.name": cache.name})
+
+    return callback
+
+
+meter.create_observable_gauge(
+    "cache.entries", callbacks=[_observe("entries")], description="Entries currently cached"
+)
+meter.create_observable_gauge(
+    "cache.size", callbacks=[_observe("bytes")], unit="By", description="Estimated size of cached values"
+)
@@ -0,0 +1,211 @@
+"""
+一覧ページのキャッシュ（親ごとの変更カウンターでバージョン管理）
+
+list_documents / list_knowledges の結果（と一覧の件数・最終更新日時、データセット全体の件数・最終更新日時）を
+(種別, 親ID, 親のバージョン, 全体の世代, skip / after / limit 等の条件) をキーに保持する。
+親のバージョンはその親に属する行を書き込むたびに増やすため、書き込み後は新しいキーで
+引かれることになり、古いページは参照されないまま LRU・TTL で追い出される（TTL は保険）。
+
+- DATASETS_SCOPE（("datasets", "")）: データセットの作成・更新で増やす（削除は全体の世代で反映）
+- ("documents", dataset_id): データセット配下のドキュメントの作成・更新・削除で増やす
+- ("knowledges", document_id): ドキュメント配下の Knowledge の作成・更新・削除、ドキュメント削除で増やす
+- 全体の世代: データセット削除（配下の全ドキュメントに波及）で増やす
+
+バージョンはトランザクションのコミット後に増やす（mark_changed で予約し、Session の after_commit で反映）。
+コミット前に増やすと、その間に読まれたコミット前のデータが新しいバージョンで登録されてしまうため。
+読み取り側は一覧を DB から読む前にバージョンを取得するので、並行して書き込まれた場合も
+古い結果は古いバージョンのキーに登録されるだけで、新しいバージョンでは返らない。
+ただしリードレプリカは遅延しうるため、新しいバージョンを読んだ後でも古い行を返すことがある。
+レプリカから読んだ結果はキャッシュを参照するのみで登録しない（fill=False）。
+
+カウンターは L2（CACHE_BACKEND_URL）があればそこで共有し（全ノードで一貫）、無ければプロセス内に持つ。
+プロセス内カウンターは複数ワーカー間で共有されないため、複数ワーカー構成では L2 を設定すること。
+L2 と通信できない場合はキャッシュを使わずに DB から読む。
+"""
+
+import copy
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from opentelemetry import metrics
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.infrastructure.cache.backends import CacheBackend, CacheBackendError
+from app.infrastructure.cache.entity_cache import (
+    CACHE_KEY_PREFIX,
+    ENTITY_CACHE_ENABLED,
+    estimate_size,
+    l2_backend,
+)
+from app.infrastructure.cache.lru import LRUCache
+from app.infrastructure.cache.single_flight import flights
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_ENABLED = ENTITY_CACHE_ENABLED and os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_TTL_SECONDS = float(os.getenv("PAGE_CACHE_TTL_SECONDS", "300"))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "10000"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# 全体の世代を表すカウンターのキー
+GLOBAL_SCOPE = ("all", "")
+# データセット全体（一覧の件数・最終更新日時）のカウンターのキー
+DATASETS_SCOPE = ("datasets", "")
+# Session.info に書き込み済みの親を溜めておくキー
+PENDING_KEY = "page_cache_pending"
+
+meter = metrics.get_meter(__name__)
+_version_errors = meter.create_counter(
+    "cache.version.errors", description="Page version reads or bumps that failed on the shared cache"
+)
+
+
+class VersionCounters:
+    """親ごとの変更カウンター（L2 があれば共有、無ければプロセス内）"""
+
+    def __init__(self, backend: Optional[CacheBackend] = None, key_prefix: str = CACHE_KEY_PREFIX):
+        """
+        コンストラクタ
+
+        Args:
+            backend (Optional[CacheBackend]): 共有キャッシュ。None の場合はプロセス内で数える
+            key_prefix (str): L2 のキー接頭辞
+        """
+        self.backend = backend
+        self.key_prefix = f"{key_prefix}:version:"
+        self._local: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: Tuple[str, str]) -> Optional[int]:
+        """
+        現在のバージョンを取得する
+
+        Args:
+            scope (Tuple[str, str]): (種別, 親ID)
+
+        Returns:
+            Optional[int]: バージョン。L2 と通信できない場合は None
+        """
+        if self.backend is None:
+            with self._lock:
+                return self._local.get(scope, 0)
+        try:
+            value = self.backend.get(self._key(scope))
+        except CacheBackendError as e:
+            self._record_error("get", e)
+            return None
+        return int(value) if value is not None else 0
+
+    def bump(self, scope: Tuple[str, str]) -> None:
+        """
+        バージョンを1増やす
+
+        Args:
+            scope (Tuple[str, str]): (種別, 親ID)
+        """
+        if self.backend is None:
+            with self._lock:
+                self._local[scope] = self._local.get(scope, 0) + 1
+            return
+        try:
+            self.backend.incr(self._key(scope))
+        except CacheBackendError as e:
+            # 共有カウンターを増やせなかった場合、少なくとも自プロセスの古いページは破棄する
+            self._record_error("bump", e)
+            page_cache.clear()
+
+    def _key(self, scope: Tuple[str, str]) -> str:
+        kind, parent_id = scope
+        return f"{self.key_prefix}{kind}:{parent_id}"
+
+    def _record_error(self, operation: str, error: Exception) -> None:
+        logger.warning("Error: Page version %s failed. Error: %s", operation, str(error))
+        _version_errors.add(1, {"cache.operation": operation})
+
+
+versions = VersionCounters(l2_backend)
+page_cache = LRUCache(
+    "pages",
+    max_entries=PAGE_CACHE_MAX_ENTRIES if PAGE_CACHE_ENABLED else 0,
+    max_bytes=PAGE_CACHE_MAX_BYTES,
+    ttl_seconds=PAGE_CACHE_TTL_SECONDS,
+)
+
+
+def _value_size(value: Any) -> int:
+    """一覧（エンティティのリスト）またはスカラー値のおおよそのサイズ"""
+    if isinstance(value, list):
+        return sum(estimate_size(item) for item in value) + 64
+    return 64
+
+
+def get_or_load_page(
+    kind: str, parent_id: str, params: Hashable, load: Callable[[], Any], fill: bool = True
+) -> Any:
+    """
+    一覧ページをキャッシュから取得し、無ければ load() の結果を登録して返す
+
+    Args:
+        kind (str): datasets / documents / knowledges
+        parent_id (str): 親（データセット / ドキュメント）のID（datasets の場合は空文字）
+        params (Hashable): 結果を変える条件（メソッド名・skip・limit・after 等）
+        load (Callable[[], Any]): キャッシュに無い場合に DB から読む関数
+        fill (bool): False の場合は load() の結果を登録しない（リードレプリカから読む場合）
+
+    Returns:
+        Any: 一覧（エンティティのリスト）または集計値。呼び出し側で変更してよいコピー
+
+    Note:
+        キャッシュに無い場合の読み取りは single-flight で同時実行をまとめる。
+        fill の異なる（プライマリとレプリカの）読み取りはまとめない。
+    """
+    scope = (kind, parent_id)
+    if not PAGE_CACHE_ENABLED:
+        return flights.do(scope, (fill, params), load)
+    # DB から読む前にバージョンを確定させる（読み取り中の書き込みは新しいバージョンに反映される）
+    version = versions.get(scope)
+    generation = versions.get(GLOBAL_SCOPE)
+    if version is None or generation is None:
+        return flights.do(scope, (fill, params), load)
+    key = (kind, parent_id, version, generation, params)
+    cached = page_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+    value = flights.do(scope, (version, generation, fill, params), load)
+    if fill:
+        page_cache.put(key, copy.deepcopy(value), _value_size(value))
+    return value
+
+
+def mark_changed(session: Session, kind: str, parent_id: str) -> None:
+    """
+    親に属する行を書き込んだことを記録する（コミット後にバージョンを増やす）
+
+    Args:
+        session (Session): 書き込みを行ったセッション
+        kind (str): datasets / documents / knowledges / all（全体の世代）
+        parent_id (str): 親のID（datasets・all の場合は空文字）
+    """
+    if not PAGE_CACHE_ENABLED:
+        return
+    session.info.setdefault(PENDING_KEY, set()).add((kind, parent_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session: Session) -> None:
+    # SAVEPOINT の解放でも呼ばれるため、最も外側のトランザクションのコミットでのみ反映する
+    if session.in_nested_transaction():
+        return
+    for scope in session.info.pop(PENDING_KEY, ()):
+        versions.bump(scope)
+        flights.forget(scope)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_rollback(session: Session, transaction) -> None:
+    # ロールバックされた書き込みの予約は破棄する（コミット時は after_commit で処理済み）
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
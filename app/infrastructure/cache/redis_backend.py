@@ -0,0 +1,215 @@
+"""
+Redis（redis-py）を使う CacheBackend 実装
+
+Azure Cache for Redis などの Redis 互換サーバーを L2 キャッシュとして使う。
+コマンドはコネクションプール（BlockingConnectionPool）から借りた接続で実行するため、
+複数のワーカースレッドから同時に呼び出しても1本の接続を取り合わない。
+
+非同期ルートの AsyncSession.run_sync 内（イベントループのスレッド上の greenlet）から呼ばれた場合は、
+ループを止めないようコマンドをスレッド（asyncio.to_thread）で実行し、greenlet を中断して完了を待つ。
+
+接続文字列の形式:
+    redis://[[username]:password@]host[:port][/db]
+    rediss://...（TLS 接続）
+
+キャッシュは高速に失敗することを優先し（再試行なし・プールの空き待ちも timeout まで）、
+通信エラーは CacheBackendError として呼び出し側に返す（呼び出し側はキャッシュミスとして扱う）。
+"""
+
+import logging
+import threading
+from typing import Callable, Iterable, List, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import redis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+from app.infrastructure.cache.backends import (
+    CacheBackend,
+    CacheBackendError,
+    MessageHandler,
+)
+from app.infrastructure.database.offload import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# タグに属するキーの集合を保持するキーの接頭辞
+TAG_KEY_PREFIX = "tag:"
+# delete_prefix で1回の SCAN が返す件数の目安
+SCAN_COUNT = 500
+# 購読接続が切れた場合の再接続待ち時間（秒）の上限
+MAX_RECONNECT_DELAY_SECONDS = 5.0
+# 購読スレッドが停止要求を確認する間隔（秒）
+SUBSCRIBER_POLL_SECONDS = 0.5
+
+T = TypeVar("T")
+
+
+def _escape_glob(value: str) -> str:
+    """SCAN MATCH のパターンとして扱われる文字をエスケープする"""
+    for char in ("\\", "*", "?", "[", "]"):
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis 互換サーバーを使う CacheBackend 実装"""
+
+    def __init__(self, url: str, timeout: float = 0.5, max_connections: int = 50):
+        """
+        コンストラクタ（接続は最初のコマンド実行時に行う）
+
+        Args:
+            url (str): 接続文字列（redis:// または rediss://）
+            timeout (float): コマンド・接続・プールの空き待ちのタイムアウト（秒）
+            max_connections (int): コネクションプールの接続数の上限
+        """
+        scheme = urlsplit(url).scheme
+        if scheme not in ("redis", "rediss"):
+            raise ValueError(f"Unsupported cache backend URL scheme: {scheme}")
+        self.timeout = timeout
+        self._pool = redis.BlockingConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            timeout=timeout,
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout,
+            retry=Retry(NoBackoff(), 0),
+            # HELLO（RESP3）に対応しない Redis 互換サーバーでも使えるよう RESP2 で通信する
+            protocol=2,
+        )
+        self._client = redis.Redis(connection_pool=self._pool)
+        self._subscribers: List["_Subscriber"] = []
+
+    def _run(self, command: Callable[[redis.Redis], T]) -> T:
+        """
+        コマンドを実行する。通信エラーは CacheBackendError に変換する
+
+        AsyncSession.run_sync 内から呼ばれた場合はスレッドで実行し、イベントループを止めない。
+        """
+        return run_blocking(self._execute, command)
+
+    def _execute(self, command: Callable[[redis.Redis], T]) -> T:
+        try:
+            return command(self._client)
+        except (redis.RedisError, OSError) as e:
+            raise CacheBackendError(str(e)) from e
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._run(lambda client: client.get(key))
+
+    def set(self, key: str, value: bytes, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        ttl_ms = max(int(ttl_seconds * 1000), 1)
+        tags = list(tags)
+
+        def command(client: redis.Redis) -> None:
+            pipe = client.pipeline(transaction=False)
+            pipe.set(key, value, px=ttl_ms)
+            for tag in tags:
+                pipe.sadd(TAG_KEY_PREFIX + tag, key)
+                pipe.pexpire(TAG_KEY_PREFIX + tag, ttl_ms)
+            pipe.execute()
+
+        self._run(command)
+
+    def incr(self, key: str) -> int:
+        return self._run(lambda client: client.incr(key))
+
+    def delete(self, key: str) -> None:
+        self._run(lambda client: client.delete(key))
+
+    def delete_tag(self, tag: str) -> None:
+        tag_key = TAG_KEY_PREFIX + tag
+
+        def command(client: redis.Redis) -> None:
+            members = client.smembers(tag_key) or ()
+            client.delete(tag_key, *members)
+
+        self._run(command)
+
+    def delete_prefix(self, prefix: str) -> None:
+        pattern = _escape_glob(prefix) + "*"
+
+        def command(client: redis.Redis) -> None:
+            cursor = 0
+            while True:
+                cursor, keys = client.scan(cursor, match=pattern, count=SCAN_COUNT)
+                if keys:
+                    client.delete(*keys)
+                if not cursor:
+                    return
+
+        self._run(command)
+
+    def publish(self, channel: str, message: bytes) -> None:
+        self._run(lambda client: client.publish(channel, message))
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        subscriber = _Subscriber(self._client, channel, handler)
+        self._subscribers.append(subscriber)
+        subscriber.start()
+
+    def close(self) -> None:
+        for subscriber in self._subscribers:
+            subscriber.stop()
+        self._subscribers.clear()
+        self._pool.disconnect()
+
+
+class _Subscriber:
+    """専用接続でチャネルを購読し続けるバックグラウンドスレッド（切断時は再接続する）"""
+
+    def __init__(self, client: redis.Redis, channel: str, handler: MessageHandler):
+        self.channel = channel
+        self.handler = handler
+        self._client = client
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"cache-subscriber-{channel}", daemon=True
+        )
+        # 購読開始（SUBSCRIBE の応答受信）を待つためのイベント
+        self.ready = threading.Event()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join(timeout=1)
+
+    def _run(self) -> None:
+        delay = 0.1
+        while not self._stopped.is_set():
+            pubsub = self._client.pubsub()
+            try:
+                pubsub.subscribe(self.channel)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=SUBSCRIBER_POLL_SECONDS)
+                    if message is None:
+                        continue
+                    if message["type"] == "subscribe":
+                        logger.info("Success: Subscribed to cache channel %s", self.channel)
+                        self.ready.set()
+                        delay = 0.1
+                    elif message["type"] == "message":
+                        self._dispatch(message["data"])
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                logger.warning(
+                    "Error: Cache subscription to %s lost, retrying in %.1fs. Error: %s",
+                    self.channel,
+                    delay,
+                    str(e),
+                )
+            finally:
+                pubsub.close()
+            self._stopped.wait(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+
+    def _dispatch(self, message: bytes) -> None:
+        try:
+            self.handler(message)
+        except Exception as e:
+            logger.error("Error: Cache invalidation handler failed. Error: %s", str(e))
@@ -0,0 +1,161 @@
+"""
+同一の読み取りの同時実行をまとめる（single-flight）
+
+同じキーの読み取りが実行中の場合、後から来た呼び出しは新たに DB へ問い合わせず、
+先行する呼び出し（リーダー）の結果（またはその例外）を受け取る。結果はリーダー以外には
+コピーして渡す。まとめた回数は OpenTelemetry のカウンター cache.coalesced に記録する。
+
+- do: 同期版。ワーカースレッド上の同期ルート（リポジトリのデコレーター）から使う
+- do_async: 非同期版。非同期ルートが AsyncSession.run_sync を呼ぶ箇所で使う
+
+AsyncSession.run_sync 内の同期処理はイベントループのスレッドで動くため、そこで
+スレッドを待たせるとループ全体が止まる。do はイベントループのスレッドでは
+まとめずにそのまま実行し、非同期ルートは do_async でまとめる。
+
+キーは (スコープ, 操作) の組。スコープ（例: ("knowledges", document_id)）に書き込みがあった場合は
+forget でそのスコープの実行中エントリを外し、書き込み後に開始した読み取りが
+書き込み前に開始した読み取りの結果を受け取らないようにする。
+"""
+
+import asyncio
+import copy
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from opentelemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+_coalesced = meter.create_counter(
+    "cache.coalesced", description="Reads that waited for an identical in-flight read instead of querying"
+)
+
+T = TypeVar("T")
+Scope = Tuple[str, str]
+
+
+class _Call:
+    """実行中の同期呼び出し"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """キーごとに実行中の読み取りを1つにまとめる"""
+
+    def __init__(self):
+        self._calls: Dict[Tuple[Scope, Hashable], _Call] = {}
+        self._futures: Dict[Tuple[int, Scope, Hashable], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, scope: Scope, op: Hashable, fn: Callable[[], T]) -> T:
+        """
+        同じキーの呼び出しが実行中であればその結果を待って返し、無ければ fn を実行する
+
+        Args:
+            scope (Scope): 書き込みで無効化される単位（例: ("knowledges", document_id)）
+            op (Hashable): スコープ内の操作と条件（例: ("list", skip, limit, after)）
+            fn (Callable[[], T]): DB から読み取る関数
+
+        Returns:
+            T: fn の結果（リーダー以外にはコピー）
+        """
+        if _in_event_loop_thread():
+            return fn()
+        key = (scope, op)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            _coalesced.add(1, {"cache.name": scope[0]})
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, scope: Scope, op: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        do の非同期版（同じイベントループ上の同一キーの呼び出しをまとめる）
+
+        Args:
+            scope (Scope): 書き込みで無効化される単位
+            op (Hashable): スコープ内の操作と条件
+            fn (Callable[[], Awaitable[T]]): DB から読み取るコルーチンを返す関数
+
+        Returns:
+            T: fn の結果（リーダー以外にはコピー）
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop), scope, op)
+        while True:
+            future = self._futures.get(key)
+            if future is None:
+                break
+            _coalesced.add(1, {"cache.name": scope[0]})
+            try:
+                return copy.deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                # リーダーが取り消された場合は自身で読み直す（自身の取り消しはそのまま伝える）
+                if not future.cancelled():
+                    raise
+        future = loop.create_future()
+        self._futures[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 待機者がいない場合に「取得されなかった例外」の警告を出さない
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+
+    def forget(self, scope: Scope) -> None:
+        """
+        スコープの実行中エントリを外す（以降の呼び出しは新たに読み取る）
+
+        Args:
+            scope (Scope): 書き込みのあったスコープ
+        """
+        with self._lock:
+            for key in [key for key in self._calls if key[0] == scope]:
+                del self._calls[key]
+        for key in [key for key in list(self._futures) if key[1] == scope]:
+            self._futures.pop(key, None)
+
+
+def _in_event_loop_thread() -> bool:
+    """現在のスレッドでイベントループが動いているか（AsyncSession.run_sync の内側など）"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+flights = SingleFlight()
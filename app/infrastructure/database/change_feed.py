@@ -0,0 +1,228 @@
+"""
+変更履歴（changes）の追従による派生データの更新
+
+プロセス内に持つ派生データ（全文検索索引・ベクトル索引・キャッシュ）は、自プロセスの書き込みを
+Session の after_commit で、他ノードの書き込みを pub/sub（CACHE_BACKEND_URL）で反映している。
+pub/sub は届かないことがある（L2 が無い・接続が切れていた・購読前だった）ため、このモジュールの
+追従スレッドが changes を連番順に読み、他ノード（origin が自プロセス以外）の変更を登録済みの
+ハンドラー（change_handlers）に渡して反映し直す。
+
+ハンドラーは変更の内容ではなく DB の現在の状態を読み直して反映するため、同じ変更を
+pub/sub と追従の両方で受け取っても、ハンドラーが失敗して読み直しても結果は変わらない（少なくとも1回の配送）。
+ハンドラーが失敗した場合は読み取り位置を進めず、次のポーリングで同じ変更から読み直す。
+
+追従は起動時点の最新の連番から始める（それ以前の変更は各索引の構築・読み直しで反映済み）。
+ドキュメント・データセットの削除に伴う配下の行の削除（CASCADE）も、配下の1件ずつの削除として記録されている
+（record_cascaded_deletes）ため、ハンドラーは親の削除から配下を辿らなくてよい。
+
+連番は INSERT 順に振られるため、コミットの遅れた変更より大きい連番が先に読めることがある。
+読み取り位置を越えて読み飛ばした連番は覚えておき、CHANGE_FEED_GAP_TIMEOUT_SECONDS の間は
+ポーリングのたびに読み直す（ロールバックされた書き込みの連番は欠番のままなので、時間が経ったら諦める）。
+
+設定は環境変数で行う:
+
+- CHANGE_FEED_CONSUMER_ENABLED: false で追従スレッドを起動しない（GET /api/v1/changes は使える）
+- CHANGE_FEED_POLL_INTERVAL_SECONDS: 新しい変更が無いときのポーリング間隔（秒）
+- CHANGE_FEED_BATCH_SIZE: 1回に読む変更の件数
+- CHANGE_FEED_GAP_TIMEOUT_SECONDS: 読み飛ばした連番を読み直し続ける時間（秒）
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.domain.entities.change import Change
+from app.infrastructure.cache.entity_cache import NODE_ID
+from app.infrastructure.database.models.change import ChangeModel
+from app.infrastructure.repositories.change_repository_impl import (
+    ChangeRepositorySQLAlchemy,
+    load_changes,
+    prune_changes,
+)
+
+logger = logging.getLogger(__name__)
+
+CHANGE_FEED_CONSUMER_ENABLED = os.getenv("CHANGE_FEED_CONSUMER_ENABLED", "true").lower() == "true"
+CHANGE_FEED_POLL_INTERVAL_SECONDS = float(os.getenv("CHANGE_FEED_POLL_INTERVAL_SECONDS", "1"))
+CHANGE_FEED_BATCH_SIZE = int(os.getenv("CHANGE_FEED_BATCH_SIZE", "500"))
+CHANGE_FEED_GAP_TIMEOUT_SECONDS = float(os.getenv("CHANGE_FEED_GAP_TIMEOUT_SECONDS", "60"))
+
+# 保持期間を過ぎた変更を削除する間隔（秒）
+PRUNE_INTERVAL_SECONDS = 3600.0
+
+# 変更を反映するハンドラー（名前 → 関数）。派生データを持つモジュールが登録する
+ChangeHandler = Callable[[Session, List[Change]], None]
+change_handlers: Dict[str, ChangeHandler] = {}
+
+
+class ChangeFeedConsumer:
+    """changes を連番順に読み、他ノードの変更をハンドラーに渡すスレッド"""
+
+    def __init__(
+        self,
+        handlers: Dict[str, ChangeHandler] = change_handlers,
+        batch_size: int = CHANGE_FEED_BATCH_SIZE,
+        poll_interval: float = CHANGE_FEED_POLL_INTERVAL_SECONDS,
+        delay_seconds: Optional[float] = None,
+        gap_timeout: float = CHANGE_FEED_GAP_TIMEOUT_SECONDS,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            handlers (Dict[str, ChangeHandler]): 変更を反映するハンドラー
+            batch_size (int): 1回に読む変更の件数
+            poll_interval (float): 新しい変更が無いときのポーリング間隔（秒）
+            delay_seconds (Optional[float]): 記録からこの時間が経った変更だけを読む（秒。既定は CHANGE_FEED_DELAY_SECONDS）
+            gap_timeout (float): 読み飛ばした連番を読み直し続ける時間（秒）
+        """
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.delay_seconds = delay_seconds
+        self.gap_timeout = gap_timeout
+        # 反映済みの最後の連番（None は未初期化）
+        self.cursor: Optional[int] = None
+        # 読み取り位置より前で、まだ読めていない連番 → 最初に読み飛ばした時刻（time.monotonic）
+        self.gaps: Dict[int, float] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def seek_latest(self, session: Session) -> int:
+        """
+        読み取り位置を、読める範囲（記録から delay_seconds が経ったもの）の最新の連番に合わせる
+
+        Args:
+            session (Session): 読み取りに使うセッション
+
+        Returns:
+            int: 読み取り位置
+        """
+        repository = ChangeRepositorySQLAlchemy(session, self.delay_seconds)
+        self.cursor = session.execute(
+            select(func.max(ChangeModel.id)).where(repository.settled_clause())
+        ).scalar() or 0
+        self.gaps.clear()
+        return self.cursor
+
+    def poll(self, session: Session) -> int:
+        """
+        読み取り位置より後の変更を1バッチ読み、読み飛ばした連番のうちコミットされたものと合わせて
+        他ノードの変更をハンドラーに渡す
+
+        Args:
+            session (Session): 読み取り・ハンドラーに使うセッション
+
+        Returns:
+            int: 読んだ変更の件数（ハンドラーが失敗した場合は 0）
+        """
+        if self.cursor is None:
+            self.seek_latest(session)
+        changes = ChangeRepositorySQLAlchemy(session, self.delay_seconds).list_changes(
+            self.cursor, self.batch_size
+        )
+        late = load_changes(session, sorted(self.gaps)) if self.gaps else []
+        now = time.monotonic()
+        if not changes and not late:
+            self._expire_gaps(now)
+            return 0
+        remote = [change for change in late + changes if change.origin != NODE_ID]
+        if remote:
+            for name, handler in list(self.handlers.items()):
+                try:
+                    handler(session, remote)
+                except Exception as e:
+                    # 読み取り位置を進めず、次のポーリングで読み直す
+                    session.rollback()
+                    logger.error("Error: Change handler %s failed. Error: %s", name, str(e))
+                    return 0
+        for change in late:
+            self.gaps.pop(change.seq, None)
+        expected = self.cursor + 1
+        for change in changes:
+            for seq in range(expected, change.seq):
+                self.gaps.setdefault(seq, now)
+            expected = change.seq + 1
+        if changes:
+            self.cursor = changes[-1].seq
+        self._expire_gaps(now)
+        return len(late) + len(changes)
+
+    def _expire_gaps(self, now: float) -> None:
+        """gap_timeout を過ぎても読めない連番（ロールバックされた書き込みなど）を読み直しの対象から外す"""
+        expired = [seq for seq, skipped_at in self.gaps.items() if now - skipped_at >= self.gap_timeout]
+        for seq in expired:
+            del self.gaps[seq]
+        if expired:
+            logger.info("Success: Stopped waiting for %d skipped change seqs", len(expired))
+
+    def start(self, session_factory: Callable[[], Session]) -> threading.Thread:
+        """
+        追従スレッドを開始する
+
+        Args:
+            session_factory (Callable[[], Session]): プライマリに接続するセッションを返す関数
+
+        Returns:
+            threading.Thread: 開始したスレッド
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(session_factory,), name="change-feed", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        """追従スレッドを止める"""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self, session_factory: Callable[[], Session]) -> None:
+        last_prune: Optional[float] = None
+        while True:
+            read = 0
+            try:
+                with session_factory() as session:
+                    read = self.poll(session)
+                    now = time.monotonic()
+                    if last_prune is None or now - last_prune >= PRUNE_INTERVAL_SECONDS:
+                        prune_changes(session)
+                        last_prune = now
+            except Exception as e:
+                logger.error("Error: Failed to poll change feed. Error: %s", str(e))
+            # バッチいっぱいに読めた場合は続けて読む
+            if self._stop.wait(0 if read >= self.batch_size else self.poll_interval):
+                return
+
+
+change_feed = ChangeFeedConsumer()
+
+
+def start_change_feed(session_factory: Callable[[], Session]) -> Optional[threading.Thread]:
+    """
+    変更履歴の追従スレッドを開始する（アプリケーション起動時に呼び出す）
+
+    Args:
+        session_factory (Callable[[], Session]): プライマリに接続するセッションを返す関数
+            （レプリカの遅延で変更を読み飛ばさないため）
+
+    Returns:
+        Optional[threading.Thread]: 追従スレッド。無効の場合は None
+    """
+    if not CHANGE_FEED_CONSUMER_ENABLED:
+        return None
+    logger.info("Start: Following change feed with %d handlers", len(change_handlers))
+    return change_feed.start(session_factory)
+
+
+def stop_change_feed() -> None:
+    """変更履歴の追従スレッドを止める（アプリケーション終了時に呼び出す）"""
+    change_feed.stop()
@@ -0,0 +1,98 @@
+"""
+一覧APIの件数キャッシュ
+
+?count=estimated の場合に使う、プロセス内の TTL 付き件数キャッシュ。
+キーは ("documents", dataset_id) のように一覧の種類と親IDの組で、
+期限内であれば COUNT クエリを発行せずにキャッシュ値を返す。
+件数は最大 COUNT_CACHE_TTL_SECONDS 秒古い可能性がある（推定値）。
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COUNT_CACHE_TTL_SECONDS = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "60"))
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "10000"))
+
+
+class CountCache:
+    """TTL と最大件数を持つスレッドセーフな件数キャッシュ"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        """
+        コンストラクタ
+
+        Args:
+            ttl_seconds (float): キャッシュの有効期間（秒）
+            max_entries (int): 保持するキーの最大数（超過時は古いものから破棄）
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[int]:
+        """
+        期限内のキャッシュ値を取得する
+
+        Args:
+            key (Hashable): キャッシュキー
+
+        Returns:
+            Optional[int]: 件数。未登録または期限切れの場合は None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, count = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return count
+
+    def set(self, key: Hashable, count: int) -> None:
+        """
+        件数を登録する
+
+        Args:
+            key (Hashable): キャッシュキー
+            count (int): 件数
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, count)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], int]) -> int:
+        """
+        キャッシュ値を返し、なければ compute で求めて登録する
+
+        Args:
+            key (Hashable): キャッシュキー
+            compute (Callable[[], int]): 件数を求める関数（COUNT クエリ）
+
+        Returns:
+            int: 件数
+        """
+        count = self.get(key)
+        if count is not None:
+            logger.debug("Count cache hit: key=%s", key)
+            return count
+        count = compute()
+        self.set(key, count)
+        return count
+
+    def clear(self) -> None:
+        """キャッシュを全て破棄する"""
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache(COUNT_CACHE_TTL_SECONDS, COUNT_CACHE_MAX_ENTRIES)
@@ -0,0 +1,34 @@
+"""
+キーセット（シーク）ページネーション用のSQL条件
+
+(ソート列, id) の複合キーで「直前ページの最終行より後ろ」を表す条件を組み立てる。
+行値比較 (a, b) > (x, y) は MSSQL が未対応のため、OR/AND に展開して表現する。
+"""
+
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def after_clause(
+    sort_column: Any, id_column: Any, after: Optional[Tuple[Any, str]]
+) -> Optional[ColumnElement]:
+    """
+    (sort_column, id_column) が after より後ろの行に一致する条件を返す
+
+    Args:
+        sort_column: 第1ソートキーの列
+        id_column: 第2ソートキー（一意）の列
+        after (Optional[Tuple[Any, str]]): 直前ページ最終行の (ソート値, id)。None の場合は条件なし
+
+    Returns:
+        Optional[ColumnElement]: WHERE 句に渡す条件。after が None の場合は None
+    """
+    if after is None:
+        return None
+    sort_value, last_id = after
+    return or_(
+        sort_column > sort_value,
+        and_(sort_column == sort_value, id_column > last_id),
+    )
@@ -0,0 +1,208 @@
+"""
+meta_data（JSON 列）のキーと値による絞り込み
+
+一覧・検索 API の ?meta.<key>=<value> を WHERE 句に変換する。値は JSON の文字列の値とだけ完全一致で比較する
+（数値・真偽値などの値は、文字列にすると一致しても一致としない）。方言によらず同じ規則にするため、値の式に加えて
+値の型が文字列であることを条件にする（プロセス内で絞り込む Knowledge.matches_meta と同じ規則）。
+
+よく絞り込むキー（ホットキー）は scripts/generate_meta_index_migration.py で索引を作るマイグレーションを
+生成できる。索引の式と WHERE 句の式は meta_expression_sql で同じ文字列にしているため、DB が式を照合して
+索引を使う（SQLite・PostgreSQL は式インデックス、SQL Server は計算列のインデックス）。
+キーは SQL にリテラルとして埋め込むため、META_KEY_PATTERN に一致するものに限る。
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import String, and_, literal_column
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+# 絞り込みに使えるキー（識別子・インデックス名に埋め込むため英数字とアンダースコアのみ）
+META_KEY_PATTERN = re.compile(r"[A-Za-z0-9_]{1,40}")
+
+# SQL Server の計算列の長さ（インデックスのキーの上限 1700 バイトに収める）
+MSSQL_META_VALUE_LENGTH = 450
+
+# 索引を作れるテーブルと、索引の先頭に置く親の列（一覧は親で絞り込んでから meta_data で絞り込むため）
+META_INDEX_SCOPES: Dict[str, Optional[str]] = {
+    "datasets": None,
+    "documents": "dataset_id",
+    "knowledges": "document_id",
+}
+
+MetaFilter = Dict[str, str]
+
+
+def is_valid_meta_key(key: str) -> bool:
+    """
+    絞り込みに使えるキーかを判定する
+
+    Args:
+        key (str): meta_data のキー
+
+    Returns:
+        bool: META_KEY_PATTERN に一致する場合は True
+    """
+    return META_KEY_PATTERN.fullmatch(key) is not None
+
+
+def meta_expression_sql(key: str, dialect: str, column: str = "meta_data") -> Optional[str]:
+    """
+    meta_data のキーの値を文字列として取り出す SQL 式を返す（索引の定義と WHERE 句で共通）
+
+    Args:
+        key (str): meta_data のキー（META_KEY_PATTERN に一致すること）
+        dialect (str): 方言名（sqlite / postgresql / mssql）
+        column (str): JSON 列の名前（テーブル名で修飾してもよい）
+
+    Returns:
+        Optional[str]: SQL 式。索引を作れない方言の場合は None
+
+    Raises:
+        ValueError: キーが META_KEY_PATTERN に一致しない場合
+    """
+    if not is_valid_meta_key(key):
+        raise ValueError(f"Invalid meta key: {key}")
+    if dialect == "sqlite":
+        return f"json_extract({column}, '$.\"{key}\"')"
+    if dialect == "postgresql":
+        return f"({column} ->> '{key}')"
+    if dialect == "mssql":
+        return f"CAST(JSON_VALUE({column}, '$.\"{key}\"') AS NVARCHAR({MSSQL_META_VALUE_LENGTH}))"
+    return None
+
+
+def meta_string_type_sql(key: str, dialect: str, column: str = "meta_data") -> Optional[str]:
+    """
+    meta_data のキーの値が JSON の文字列であることの SQL 条件を返す
+
+    索引は値の式（meta_expression_sql）だけで作り、この条件は索引で絞り込んだ行に対して評価される。
+
+    Args:
+        key (str): meta_data のキー（META_KEY_PATTERN に一致すること）
+        dialect (str): 方言名（sqlite / postgresql / mssql）
+        column (str): JSON 列の名前（テーブル名で修飾してもよい）
+
+    Returns:
+        Optional[str]: SQL 条件。対応しない方言の場合は None
+
+    Raises:
+        ValueError: キーが META_KEY_PATTERN に一致しない場合
+    """
+    if not is_valid_meta_key(key):
+        raise ValueError(f"Invalid meta key: {key}")
+    if dialect == "sqlite":
+        return f"json_type({column}, '$.\"{key}\"') = 'text'"
+    if dialect == "postgresql":
+        return f"json_typeof({column} -> '{key}') = 'string'"
+    if dialect == "mssql":
+        # OPENJSON の type 列は 1 が文字列
+        return f"EXISTS (SELECT 1 FROM OPENJSON({column}) WHERE [key] = N'{key}' AND [type] = 1)"
+    return None
+
+
+def meta_clause(session: Session, model: Any, meta: Optional[MetaFilter]) -> Optional[ColumnElement]:
+    """
+    meta_data のキーと値（JSON の文字列の値）がすべて一致する行の条件を返す
+
+    Args:
+        session (Session): クエリを実行するセッション（方言の判定に使う）
+        model (Any): meta_data 列を持つモデル
+        meta (Optional[MetaFilter]): キー → 値。None または空の場合は条件なし
+
+    Returns:
+        Optional[ColumnElement]: WHERE 句に渡す条件。meta が空の場合は None
+    """
+    return dialect_meta_clause(session.get_bind().dialect.name, model, meta)
+
+
+def dialect_meta_clause(dialect: str, model: Any, meta: Optional[MetaFilter]) -> Optional[ColumnElement]:
+    """
+    meta_clause の方言名を指定する版（セッションを持たない文の組み立てで使う）
+
+    Args:
+        dialect (str): 方言名（sqlite / postgresql / mssql）
+        model (Any): meta_data 列を持つモデル
+        meta (Optional[MetaFilter]): キー → 値。None または空の場合は条件なし
+
+    Returns:
+        Optional[ColumnElement]: WHERE 句に渡す条件。meta が空の場合は None
+    """
+    if not meta:
+        return None
+    column = f"{model.__tablename__}.meta_data"
+    conditions = []
+    for key, value in sorted(meta.items()):
+        expression = meta_expression_sql(key, dialect, column)
+        if expression is None:
+            conditions.append(model.meta_data[key].as_string() == value)
+        else:
+            conditions.append(literal_column(expression, String) == value)
+            conditions.append(literal_column(meta_string_type_sql(key, dialect, column)))
+    return and_(*conditions)
+
+
+def meta_key(meta: Optional[MetaFilter]) -> Tuple[Tuple[str, str], ...]:
+    """
+    絞り込み条件をキャッシュキー・ETag に使える形にする
+
+    Args:
+        meta (Optional[MetaFilter]): キー → 値
+
+    Returns:
+        Tuple[Tuple[str, str], ...]: キーの昇順の (キー, 値) のタプル。条件なしの場合は空
+    """
+    return tuple(sorted((meta or {}).items()))
+
+
+def meta_index_statements(table: str, key: str) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """
+    ホットキーの索引を作る・消す DDL を方言ごとに返す（マイグレーションの生成に使う）
+
+    索引は (親の列, 値の式) の複合インデックスにする。SQLite・PostgreSQL は式インデックス、
+    SQL Server は値の式の計算列を追加して、その列のインデックスを作る。
+    PostgreSQL はテーブルをロックしないよう CONCURRENTLY で作る（トランザクション外で実行すること）。
+
+    Args:
+        table (str): META_INDEX_SCOPES のテーブル名
+        key (str): meta_data のキー（META_KEY_PATTERN に一致すること）
+
+    Returns:
+        Tuple[Dict[str, List[str]], Dict[str, List[str]]]: (作成の DDL, 削除の DDL)。いずれも方言名 → 文のリスト
+
+    Raises:
+        ValueError: テーブル名またはキーが不正な場合
+    """
+    if table not in META_INDEX_SCOPES:
+        raise ValueError(f"Invalid table for meta index: {table}")
+    if not is_valid_meta_key(key):
+        raise ValueError(f"Invalid meta key: {key}")
+    scope = META_INDEX_SCOPES[table]
+    index = f"ix_{table}_meta_{key}"
+    computed = f"meta_{key}"
+
+    def columns(expression: str) -> str:
+        return expression if scope is None else f"{scope}, {expression}"
+
+    create = {
+        "sqlite": [f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({columns(meta_expression_sql(key, 'sqlite'))})"],
+        "postgresql": [
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON {table} "
+            f"({columns(meta_expression_sql(key, 'postgresql'))})"
+        ],
+        "mssql": [
+            f"ALTER TABLE {table} ADD {computed} AS {meta_expression_sql(key, 'mssql')}",
+            f"CREATE INDEX {index} ON {table} ({columns(computed)})",
+        ],
+    }
+    drop = {
+        "sqlite": [f"DROP INDEX IF EXISTS {index}"],
+        "postgresql": [f"DROP INDEX CONCURRENTLY IF EXISTS {index}"],
+        "mssql": [
+            f"DROP INDEX IF EXISTS {index} ON {table}",
+            f"ALTER TABLE {table} DROP COLUMN IF EXISTS {computed}",
+        ],
+    }
+    return create, drop
+
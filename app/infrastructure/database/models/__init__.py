@@ -1,3 +1,6 @@
 from .dataset import DatasetModel
 from .document import DocumentModel
 from .knowledge import KnowledgeModel
+from .stats import DatasetStatsModel, DocumentStatsModel
+from .embedding import KnowledgeEmbeddingModel
+from .change import ChangeModel
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String
+
+from app.infrastructure.database.connection import Base
+
+
+class ChangeModel(Base):
+    """
+    データセット・ドキュメント・Knowledge の変更履歴（トランザクショナル・アウトボックス）のデータベースモデル
+
+    リポジトリ実装の作成・更新・削除が、本体の書き込みと同じトランザクションのコミット直前に書き込む。
+    変更フィード（GET /api/v1/changes）と、各ノードの索引・キャッシュの追従に使う。
+
+    Attributes:
+        id: 連番（変更フィードの位置）
+        entity: 変更されたもの（dataset / document / knowledge）
+        entity_id: 変更されたもののID
+        operation: 変更の種類（create / update / delete）
+        document_id: Knowledge の所属ドキュメントID
+        dataset_id: ドキュメントの所属データセットID
+        origin: 書き込んだプロセスのID（自プロセスの書き込みはコミット後に反映済みのため追従時に除く）
+        created_at: 記録日時
+    """
+
+    __tablename__ = "changes"
+    __table_args__ = (
+        # 保持期間を過ぎた変更の削除・停止中の変更の読み直し（WHERE created_at）用
+        Index("ix_changes_created_at", "created_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(String(36), nullable=False)
+    operation = Column(String(10), nullable=False)
+    document_id = Column(String(36), nullable=True)
+    dataset_id = Column(String(36), nullable=True)
+    origin = Column(String(32), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.now)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import JSON, Column, DateTime, String, Text, Boolean, Unicode, UnicodeText
+from sqlalchemy import JSON, Column, DateTime, Index, String, Text, Boolean, Unicode, UnicodeText
 
 from app.infrastructure.database.connection import Base
 
@@ -22,6 +22,10 @@ class DatasetModel(Base):
     """
 
     __tablename__ = "datasets"
+    __table_args__ = (
+        # 一覧取得（ORDER BY created_at, id）用
+        Index("ix_datasets_created_at_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(Unicode(255), nullable=False)
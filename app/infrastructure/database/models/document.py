@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import JSON, Column, DateTime, ForeignKey, String, Text, Boolean, Unicode, UnicodeText
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Index, String, Text, Boolean, Unicode, UnicodeText
 
 from app.infrastructure.database.connection import Base
 
@@ -26,6 +26,11 @@ class DocumentModel(Base):
     """
 
     __tablename__ = "documents"
+    __table_args__ = (
+        # データセット単位の一覧取得（WHERE dataset_id ORDER BY created_at, id）用。
+        # SQL Server は外部キー列に自動でインデックスを作らないため、FK の結合・削除にも使われる
+        Index("ix_documents_dataset_id_created_at_id", "dataset_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     dataset_id = Column(
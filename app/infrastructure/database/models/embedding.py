@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, LargeBinary, String
+
+from app.infrastructure.database.connection import Base
+
+
+class KnowledgeEmbeddingModel(Base):
+    """
+    Knowledge 本文の埋め込み（ベクトル）のデータベースモデル
+
+    Knowledge の作成・更新のたびにリポジトリ実装が同じトランザクションで書き込む。
+    ベクトル検索はデータセット単位で読み込むため、document_id / dataset_id を非正規化して持つ。
+
+    Attributes:
+        knowledge_id: Knowledge ID
+        document_id: 所属ドキュメントID
+        dataset_id: 所属データセットID
+        model: 埋め込みの種類（Embedder.name。異なるものは検索対象にしない）
+        dimension: 次元数
+        vector: ベクトル（float32 のリトルエンディアンのバイト列）
+        updated_at: 更新日時
+    """
+
+    __tablename__ = "knowledge_embeddings"
+    __table_args__ = (
+        # データセット単位の読み込み・削除（WHERE dataset_id）用
+        Index("ix_knowledge_embeddings_dataset_id", "dataset_id"),
+        # ドキュメント削除時の WHERE document_id 用
+        Index("ix_knowledge_embeddings_document_id", "document_id"),
+    )
+
+    knowledge_id = Column(
+        String(36), ForeignKey("knowledges.id", ondelete="CASCADE"), primary_key=True
+    )
+    document_id = Column(String(36), nullable=False)
+    dataset_id = Column(String(36), nullable=False)
+    model = Column(String(100), nullable=False)
+    dimension = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=datetime.now, onupdate=datetime.now)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String, Text, Boolean, UnicodeText
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Index, Integer, String, Text, Boolean, UnicodeText
 
 from app.infrastructure.database.connection import Base
 
@@ -26,6 +26,11 @@ class KnowledgeModel(Base):
     """
 
     __tablename__ = "knowledges"
+    __table_args__ = (
+        # ドキュメント単位の一覧取得（WHERE document_id ORDER BY sequence, id）用。
+        # sequence は更新APIで並べ替えられるため一意制約にはしない
+        Index("ix_knowledges_document_id_sequence_id", "document_id", "sequence", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     document_id = Column(
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String
+
+from app.infrastructure.database.connection import Base
+
+
+class DatasetStatsModel(Base):
+    """
+    データセット単位の集計値のデータベースモデル
+
+    ドキュメント・Knowledge の作成・更新・削除のたびにリポジトリ実装が差分で更新する。
+    ずれた場合はバッチ（scripts/recompute_stats.py）で再集計する。
+
+    Attributes:
+        dataset_id: データセットID
+        document_count: ドキュメント数
+        knowledge_count: Knowledge 数
+        document_characters: ドキュメント本文の合計文字数
+        knowledge_characters: Knowledge 本文の合計文字数
+        updated_at: 集計値の更新日時
+    """
+
+    __tablename__ = "dataset_stats"
+
+    dataset_id = Column(
+        String(36), ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True
+    )
+    document_count = Column(Integer, nullable=False, default=0)
+    knowledge_count = Column(BigInteger, nullable=False, default=0)
+    document_characters = Column(BigInteger, nullable=False, default=0)
+    knowledge_characters = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=datetime.now, onupdate=datetime.now)
+
+
+class DocumentStatsModel(Base):
+    """
+    ドキュメント単位の集計値のデータベースモデル
+
+    dataset_id は Knowledge の作成・削除時にデータセットの集計値を更新する先を引くために持つ。
+
+    Attributes:
+        document_id: ドキュメントID
+        dataset_id: 所属データセットID
+        knowledge_count: Knowledge 数
+        knowledge_characters: Knowledge 本文の合計文字数
+        updated_at: 集計値の更新日時
+    """
+
+    __tablename__ = "document_stats"
+    __table_args__ = (
+        # データセット削除・再集計時の WHERE dataset_id 用
+        Index("ix_document_stats_dataset_id", "dataset_id"),
+    )
+
+    document_id = Column(
+        String(36), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True
+    )
+    dataset_id = Column(String(36), nullable=False)
+    knowledge_count = Column(Integer, nullable=False, default=0)
+    knowledge_characters = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=datetime.now, onupdate=datetime.now)
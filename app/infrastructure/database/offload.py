@@ -0,0 +1,32 @@
+"""
+AsyncSession.run_sync 内から呼ばれる重い処理をイベントループの外で実行する
+
+非同期ルートは共通の処理本体を AsyncSession.run_sync で呼ぶため、リポジトリ内の処理はイベントループの
+スレッド上の greenlet で動く（非同期のコミットから呼ばれる after_commit フックも同じ）。
+埋め込みの計算・行列や HNSW グラフへの反映・データセットの遅延読み込みのような CPU・I/O の重い処理を
+そのまま実行するとループが止まるため、greenlet から呼ばれた場合はスレッド（asyncio.to_thread）で実行し、
+greenlet を中断して完了を待つ。同期ルート（スレッドプール）から呼ばれた場合はその場で実行する。
+"""
+
+import asyncio
+from typing import Callable, TypeVar
+
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+T = TypeVar("T")
+
+
+def run_blocking(func: Callable[..., T], *args) -> T:
+    """
+    関数を実行する（run_sync 内から呼ばれた場合はスレッドで実行し、イベントループを止めない）
+
+    Args:
+        func (Callable[..., T]): 実行する関数
+        *args: 関数に渡す引数
+
+    Returns:
+        T: 関数の戻り値
+    """
+    if in_greenlet():
+        return await_only(asyncio.to_thread(func, *args))
+    return func(*args)
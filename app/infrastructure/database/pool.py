@@ -0,0 +1,219 @@
+"""
+コネクションプール設定・監視モジュール
+
+プールサイズ等は環境変数で指定する（いずれも任意）。
+
+- DB_POOL_SIZE: 常時保持する接続数（デフォルト: 5）
+- DB_MAX_OVERFLOW: プールサイズを超えて一時的に作成できる接続数（デフォルト: 10）
+- DB_POOL_TIMEOUT: 接続取得の待機上限秒数（デフォルト: 30）
+- DB_POOL_RECYCLE: 接続を再作成するまでの秒数。Azure SQL のアイドル切断対策（デフォルト: 1800）
+- DB_POOL_PRE_PING: 取得時に接続の生存確認を行うか（デフォルト: true）
+
+プールの利用状況は PoolMonitor が保持し、/admin/db/pool と OpenTelemetry メトリクスで公開する。
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Type
+
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import Pool
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """真偽値の環境変数を読み取る"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def pool_options(url: str) -> Dict[str, Any]:
+    """
+    環境変数からエンジン生成時のプール関連オプションを組み立てる
+
+    SQLite はプール方式が異なる（SingletonThreadPool 等）ため、サイズ系の指定は行わない。
+
+    Args:
+        url (str): SQLAlchemy の接続文字列
+
+    Returns:
+        Dict[str, Any]: create_engine / create_async_engine に渡すキーワード引数
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        )
+    return options
+
+
+class PoolMonitor:
+    """
+    コネクションプールの利用状況を集計するクラス
+
+    checked-out / idle / overflow はエンジンが現在保持しているプールから都度取得し、
+    接続取得の待ち時間は monitored_pool_class で生成したプールから記録される。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def bind(self, engine: Engine) -> None:
+        """
+        監視対象のエンジンを登録する
+
+        Args:
+            engine (Engine): 同期エンジン（AsyncEngine の場合は sync_engine を渡す）
+        """
+        self.engine = engine
+        monitors[self.name] = self
+
+    def record_wait(self, seconds: float) -> None:
+        """接続取得にかかった時間を記録する"""
+        with self._lock:
+            self._wait_count += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+        _wait_time_histogram.record(seconds * 1000, {"db.pool.name": self.name})
+
+    def status(self) -> Dict[str, Any]:
+        """
+        現在のプール状態を返す
+
+        Returns:
+            Dict[str, Any]: プール種別・サイズ・使用中/待機中/オーバーフロー接続数・待ち時間統計
+        """
+        with self._lock:
+            wait = {
+                "count": self._wait_count,
+                "avg_ms": (self._wait_total / self._wait_count * 1000) if self._wait_count else 0.0,
+                "max_ms": self._wait_max * 1000,
+            }
+        if self.engine is None:
+            return {"pool_class": None, "wait": wait}
+        pool = self.engine.pool
+        return {
+            "pool_class": type(pool).__name__,
+            "size": _call(pool, "size"),
+            "checked_out": _call(pool, "checkedout"),
+            "idle": _call(pool, "checkedin"),
+            "overflow": _call(pool, "overflow"),
+            "timeout": _call(pool, "timeout"),
+            "wait": wait,
+        }
+
+
+def _call(pool: Pool, method: str) -> Optional[Any]:
+    """プール種別によって存在しない統計メソッドは None として扱う"""
+    fn = getattr(pool, method, None)
+    return fn() if callable(fn) else None
+
+
+def monitored_pool_class(base: Type[Pool], monitor: PoolMonitor) -> Type[Pool]:
+    """
+    接続取得の待ち時間を monitor に記録するプールクラスを生成する
+
+    engine.dispose() 時の pool.recreate() でも同じクラスが使われるため、
+    記録先はエンジンの生存期間を通して引き継がれる。
+
+    Args:
+        base (Type[Pool]): 元となるプールクラス（QueuePool など）
+        monitor (PoolMonitor): 記録先
+
+    Returns:
+        Type[Pool]: 監視機能付きのプールクラス
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return base.connect(self)
+        finally:
+            monitor.record_wait(time.perf_counter() - started)
+
+    return type(f"Monitored{base.__name__}", (base,), {"connect": connect})
+
+
+def engine_options(url: str, monitor: PoolMonitor) -> Dict[str, Any]:
+    """
+    プール設定と監視用プールクラスを含むエンジン生成オプションを返す
+
+    プールクラスは接続文字列のダイアレクトが既定で使うもの（QueuePool / AsyncAdaptedQueuePool /
+    SingletonThreadPool など）を元に生成する。
+
+    Args:
+        url (str): SQLAlchemy の接続文字列（同期・非同期どちらでも可）
+        monitor (PoolMonitor): 待ち時間の記録先
+
+    Returns:
+        Dict[str, Any]: create_engine / create_async_engine に渡すキーワード引数
+    """
+    sa_url = make_url(url)
+    base = sa_url.get_dialect().get_pool_class(sa_url)
+    options = pool_options(url)
+    options["poolclass"] = monitored_pool_class(base, monitor)
+    return options
+
+
+# 監視中のプール（名前 → PoolMonitor）
+monitors: Dict[str, PoolMonitor] = {}
+
+_wait_time_histogram = meter.create_histogram(
+    "db.pool.wait_time", unit="ms", description="Time spent acquiring a connection from the pool"
+)
+
+
+def _observe(key: str):
+    """status() の値を Observable Gauge として公開するコールバックを生成する"""
+
+    def callback(options: CallbackOptions):
+        for monitor in list(monitors.values()):
+            value = monitor.status().get(key)
+            if value is not None:
+                yield Observation(value, {"db.pool.name": monitor.name})
+
+    return callback
+
+
+meter.create_observable_gauge(
+    "db.pool.checked_out", callbacks=[_observe("checked_out")], description="Connections currently checked out"
+)
+meter.create_observable_gauge(
+    "db.pool.idle", callbacks=[_observe("idle")], description="Idle connections in the pool"
+)
+meter.create_observable_gauge(
+    "db.pool.overflow", callbacks=[_observe("overflow")], description="Overflow connections beyond pool_size"
+)
+meter.create_observable_gauge(
+    "db.pool.size", callbacks=[_observe("size")], description="Configured pool size"
+)
+
+
+def _observe_wait_max(options: CallbackOptions):
+    """接続取得待ち時間の最大値（ミリ秒）を公開する"""
+    for monitor in list(monitors.values()):
+        yield Observation(monitor.status()["wait"]["max_ms"], {"db.pool.name": monitor.name})
+
+
+meter.create_observable_gauge(
+    "db.pool.wait_time.max", callbacks=[_observe_wait_max], unit="ms", description="Longest connection wait observed"
+)
@@ -0,0 +1,126 @@
+"""
+リクエスト単位のSQLクエリ計測モジュール
+
+SQLAlchemy の before/after_cursor_execute イベントで各ステートメントの実行時間を計測し、
+ContextVar に保持された QueryStats に集計する。集計の開始・終了は HTTP ミドルウェア
+（app.interfaces.middleware.query_tracking）が行う。
+
+同一ステートメントが閾値以上繰り返された場合は N+1 パターンの疑いとして扱う。
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """
+    1リクエスト分のクエリ集計結果
+
+    Attributes:
+        count: 実行したステートメント数（executemany は1回として数える）
+        total_time: DB処理時間の合計（秒）
+        slowest_statement: 最も遅かったステートメント
+        slowest_time: 最も遅かったステートメントの実行時間（秒）
+        statement_counts: ステートメント文字列ごとの実行回数
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.slowest_time = 0.0
+        self.statement_counts: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        """ステートメント1件分の実行結果を記録する"""
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.statement_counts[statement] += 1
+            if elapsed >= self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_statement = statement
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        閾値以上繰り返し実行されたステートメント（N+1 パターンの疑い）を返す
+
+        Args:
+            threshold (int): 繰り返し回数の閾値
+
+        Returns:
+            List[Tuple[str, int]]: (ステートメント, 実行回数) のリスト（回数の多い順）
+        """
+        with self._lock:
+            return [
+                (statement, n)
+                for statement, n in self.statement_counts.most_common()
+                if n >= threshold
+            ]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def start_tracking() -> Tuple[QueryStats, Token]:
+    """
+    現在のコンテキストでクエリ集計を開始する
+
+    Returns:
+        Tuple[QueryStats, Token]: 集計オブジェクトと、stop_tracking に渡すトークン
+    """
+    stats = QueryStats()
+    return stats, _current_stats.set(stats)
+
+
+def stop_tracking(token: Token) -> None:
+    """start_tracking で開始した集計を終了する"""
+    _current_stats.reset(token)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """現在のコンテキストで集計中の QueryStats を返す（集計中でなければ None）"""
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # 失敗したステートメントは after_cursor_execute が呼ばれないため開始時刻を破棄する
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def install(engine: Engine) -> None:
+    """
+    エンジンにクエリ計測用のイベントリスナーを登録する
+
+    Args:
+        engine (Engine): 同期エンジン（AsyncEngine の場合は sync_engine を渡す）
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
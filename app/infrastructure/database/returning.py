@@ -0,0 +1,23 @@
+"""
+書き込み結果をサーバーから受け取るためのヘルパー
+
+INSERT/UPDATE ... RETURNING（SQL Server では OUTPUT INSERTED.*）に対応した方言では、
+書き込みと結果の取得を1文で行う。非対応の方言では呼び出し側でフォールバックする。
+"""
+
+from sqlalchemy.orm import Session
+
+
+def supports_returning(session: Session, statement: str) -> bool:
+    """
+    接続先の方言が指定した文の RETURNING に対応しているかを返す
+
+    Args:
+        session (Session): DB セッション
+        statement (str): "insert" / "update" / "delete"
+
+    Returns:
+        bool: 対応している場合は True
+    """
+    dialect = session.get_bind().dialect
+    return bool(getattr(dialect, f"{statement}_returning", False))
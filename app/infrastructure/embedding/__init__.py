@@ -0,0 +1,6 @@
+"""
+埋め込み（ベクトル化）層
+
+- embedder: 埋め込みのインターフェース（Embedder）と、環境変数で選んだ実装の取得
+- hashing_embedder: 特徴ハッシングによる決定的な埋め込み（外部サービス・モデル不要）
+"""
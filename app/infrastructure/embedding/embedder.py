@@ -0,0 +1,99 @@
+"""
+埋め込みのインターフェースと実装の選択
+
+実装は環境変数 EMBEDDER で選ぶ:
+
+- hashing（既定）: HashingEmbedder（オフラインで動き、同じ本文からは常に同じベクトルを返す）
+- "パッケージ.モジュール:クラス名": Embedder を継承した任意のクラス（引数なしで生成する）
+
+EMBEDDING_DIMENSION はハッシング実装の次元数。実装や次元を変えた場合、保存済みの埋め込みは
+検索対象から外れるため scripts/backfill_embeddings.py で計算し直すこと。
+"""
+
+import importlib
+import os
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import numpy as np
+
+EMBEDDER = os.getenv("EMBEDDER", "hashing")
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "256"))
+
+
+class Embedder(ABC):
+    """テキストを固定長のベクトルに変換するインターフェース"""
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """
+        埋め込みの種類を表す名前（保存済みの埋め込みと検索時の埋め込みの互換性の判定に使う）
+
+        実装・パラメータ（次元数など）が異なれば異なる名前を返すこと。
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """ベクトルの次元数"""
+        pass
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        テキストをまとめてベクトルに変換する
+
+        Args:
+            texts (List[str]): テキストのリスト
+
+        Returns:
+            np.ndarray: (len(texts), dimension) の float32 の配列（各行は L2 ノルム 1、空のテキストは 0 ベクトル）
+        """
+        pass
+
+
+_embedder: Optional[Embedder] = None
+
+
+def get_embedder() -> Embedder:
+    """
+    環境変数 EMBEDDER で選んだ埋め込みの実装を返す（プロセス内で1つを共有する）
+
+    Returns:
+        Embedder: 埋め込みの実装
+
+    Raises:
+        ValueError: EMBEDDER の値が不正な場合
+    """
+    global _embedder
+    if _embedder is None:
+        _embedder = create_embedder(EMBEDDER)
+    return _embedder
+
+
+def create_embedder(spec: str) -> Embedder:
+    """
+    名前またはクラスのパスから埋め込みの実装を生成する
+
+    Args:
+        spec (str): hashing または "パッケージ.モジュール:クラス名"
+
+    Returns:
+        Embedder: 埋め込みの実装
+
+    Raises:
+        ValueError: spec が不正な場合
+    """
+    if spec == "hashing":
+        from app.infrastructure.embedding.hashing_embedder import HashingEmbedder
+
+        return HashingEmbedder(EMBEDDING_DIMENSION)
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Unsupported EMBEDDER: {spec}")
+    embedder = getattr(importlib.import_module(module_name), class_name)()
+    if not isinstance(embedder, Embedder):
+        raise ValueError(f"EMBEDDER is not an Embedder: {spec}")
+    return embedder
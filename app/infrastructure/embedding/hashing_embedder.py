@@ -0,0 +1,53 @@
+"""
+特徴ハッシングによる埋め込み
+
+本文を全文検索と同じ語（tokenizer.tokenize の文字 bigram）に分割し、語ごとのハッシュ値で
+次元と符号を決めて足し合わせる（ランダム射影の一種）。語の重みは 1 + log(出現回数)。
+ハッシュには blake2b を使うため、プロセス・マシンが変わっても同じ本文からは同じベクトルになる。
+
+意味的な近さではなく語の重なりを表すため、評価・ベンチマーク用の基準実装として使う。
+"""
+
+import hashlib
+import math
+from collections import Counter
+from typing import List
+
+import numpy as np
+
+from app.infrastructure.embedding.embedder import Embedder
+from app.infrastructure.search.tokenizer import tokenize
+
+
+class HashingEmbedder(Embedder):
+    """特徴ハッシングによる決定的な埋め込み"""
+
+    def __init__(self, dimension: int = 256):
+        """
+        コンストラクタ
+
+        Args:
+            dimension (int): ベクトルの次元数
+        """
+        if dimension <= 0:
+            raise ValueError("dimension must be positive")
+        self._dimension = dimension
+
+    @property
+    def name(self) -> str:
+        return f"hashing-{self._dimension}"
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self._dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term, count in Counter(tokenize(text)).items():
+                digest = int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self._dimension] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
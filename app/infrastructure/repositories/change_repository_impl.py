@@ -0,0 +1,269 @@
+"""
+変更履歴（changes）の記録と読み取り（トランザクショナル・アウトボックス）
+
+作成・更新・削除を行うリポジトリ実装は、本体の書き込みと同じトランザクションで record_change を呼ぶ。
+ドキュメント・データセットの削除では、CASCADE で消える配下の Knowledge・ドキュメントの削除も
+record_cascaded_deletes で1件ずつ記録する（変更フィードの利用者が配下を辿らなくてよいように）。
+記録した変更は Session.info に溜めておき、最も外側のトランザクションのコミット直前（before_commit）に
+まとめて INSERT する。ロールバックされた書き込みの変更は after_transaction_end で破棄する。
+
+連番はコミット順ではなく INSERT 順に振られるため、読み取りは CHANGE_FEED_DELAY_SECONDS より前に
+記録された変更に限る（コミット直前に INSERT するので、その間に小さい連番の変更がコミットされて
+読み飛ばされることが無いようにする）。記録日時と比較する現在時刻はどちらも DB サーバーの時計で求める
+（書き込んだノードの時計のずれに左右されない）。コミットがこの時間より遅れた変更は、変更フィードの
+追従スレッドが読み飛ばした連番として覚えておき、後から読み直す（load_changes）。
+
+設定は環境変数で行う:
+
+- CHANGE_FEED_DELAY_SECONDS: 記録からこの時間が経った変更だけを読む（秒）
+- CHANGE_RETENTION_DAYS: 変更履歴を保持する日数（それより古いものは変更フィードの追従スレッドが削除する）
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import DateTime, delete, event, insert, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.domain.entities.change import Change
+from app.domain.repositories.change_repository import ChangeRepository
+from app.infrastructure.cache.entity_cache import NODE_ID
+from app.infrastructure.database.models.change import ChangeModel
+from app.infrastructure.database.models.document import DocumentModel
+from app.infrastructure.database.models.knowledge import KnowledgeModel
+
+# モジュール固有のロガー（ログは英語で出力）
+logger = logging.getLogger(__name__)
+
+CHANGE_FEED_DELAY_SECONDS = float(os.getenv("CHANGE_FEED_DELAY_SECONDS", "2"))
+CHANGE_RETENTION_DAYS = float(os.getenv("CHANGE_RETENTION_DAYS", "7"))
+
+# Session.info に変更を溜めておくキー
+PENDING_KEY = "change_log_pending"
+# load_changes で1クエリに含める連番の数
+LOAD_CHANGES_CHUNK_SIZE = 500
+
+
+def database_now(session: Session, seconds_ago: float = 0.0):
+    """
+    DB サーバーの現在時刻（から seconds_ago 秒前）を表す式
+
+    SQLite は Python の datetime.now() と同じくローカル時刻で、PostgreSQL はトランザクション開始時刻ではなく
+    評価した時点の時刻（clock_timestamp）で求める。
+
+    Args:
+        session (Session): 接続先の方言を判定するセッション
+        seconds_ago (float): 現在時刻から遡る秒数
+
+    Returns:
+        ColumnElement: 日時の式
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        sql = f"strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime', '{-seconds_ago} seconds')"
+    elif dialect == "postgresql":
+        sql = f"(clock_timestamp() - interval '{seconds_ago} seconds')"
+    elif dialect == "mssql":
+        # DATEADD の加算値は int のため、秒とミリ秒に分けて遡る
+        seconds = int(seconds_ago)
+        milliseconds = round((seconds_ago - seconds) * 1000)
+        sql = f"DATEADD(millisecond, {-milliseconds}, DATEADD(second, {-seconds}, SYSDATETIME()))"
+    else:
+        sql = "CURRENT_TIMESTAMP"
+    return literal_column(sql, DateTime())
+
+
+class ChangeRepositorySQLAlchemy(ChangeRepository):
+    """
+    SQLAlchemy を利用した ChangeRepository の実装
+    """
+
+    def __init__(self, session: Session, delay_seconds: Optional[float] = None):
+        """
+        コンストラクタ
+
+        Args:
+            session (Session): 同期的な DB セッション
+            delay_seconds (Optional[float]): 記録からこの時間が経った変更だけを読む（秒。既定は CHANGE_FEED_DELAY_SECONDS）
+        """
+        self.session = session
+        self.delay_seconds = CHANGE_FEED_DELAY_SECONDS if delay_seconds is None else delay_seconds
+
+    def settled_clause(self):
+        """記録から delay_seconds が経った（連番より前の変更がすべてコミット済みとみなせる）変更の条件"""
+        return ChangeModel.created_at <= database_now(self.session, self.delay_seconds)
+
+    def list_changes(self, since: int = 0, limit: int = 100) -> List[Change]:
+        """
+        指定した連番より後の変更を連番の昇順に取得する
+
+        Args:
+            since (int): この連番より後の変更を返す（0 の場合は保持している最初から）
+            limit (int): 返す件数の上限
+
+        Returns:
+            List[Change]: 変更のリスト
+        """
+        logger.info("Start: Listing changes since=%d, limit=%d", since, limit)
+        stmt = (
+            select(*ChangeModel.__table__.c)
+            .where(ChangeModel.id > since, self.settled_clause())
+            .order_by(ChangeModel.id)
+            .limit(limit)
+        )
+        changes = [_to_entity(row) for row in self.session.execute(stmt).mappings()]
+        logger.info("Success: Listed %d changes", len(changes))
+        return changes
+
+
+def _to_entity(row) -> Change:
+    return Change(
+        seq=row["id"],
+        entity=row["entity"],
+        entity_id=row["entity_id"],
+        operation=row["operation"],
+        document_id=row["document_id"],
+        dataset_id=row["dataset_id"],
+        origin=row["origin"],
+        created_at=row["created_at"],
+    )
+
+
+def record_change(
+    session: Session,
+    entity: str,
+    entity_id: str,
+    operation: str,
+    document_id: Optional[str] = None,
+    dataset_id: Optional[str] = None,
+) -> None:
+    """
+    書き込みに伴う変更を記録する（コミット直前に changes へ INSERT する）
+
+    Args:
+        session (Session): 書き込みを行ったセッション
+        entity (str): dataset / document / knowledge
+        entity_id (str): 変更したもののID
+        operation (str): create / update / delete
+        document_id (Optional[str]): Knowledge の所属ドキュメントID
+        dataset_id (Optional[str]): ドキュメントの所属データセットID
+    """
+    session.info.setdefault(PENDING_KEY, []).append(
+        {
+            "entity": entity,
+            "entity_id": entity_id,
+            "operation": operation,
+            "document_id": document_id,
+            "dataset_id": dataset_id,
+        }
+    )
+
+
+def record_cascaded_deletes(
+    session: Session, document_id: Optional[str] = None, dataset_id: Optional[str] = None
+) -> None:
+    """
+    ドキュメント・データセットの削除で CASCADE により消える配下の削除を記録する
+
+    配下の行を読むため、親の DELETE より先に呼ぶこと（親が存在しなければ何も記録しない）。
+    配下の Knowledge を先に、次にドキュメントを記録する（親の削除はその後に record_change で記録する）。
+
+    Args:
+        session (Session): 削除を行うセッション
+        document_id (Optional[str]): 削除するドキュメントのID（配下の Knowledge を記録する）
+        dataset_id (Optional[str]): 削除するデータセットのID（配下のドキュメントと Knowledge を記録する）
+    """
+    knowledges = select(KnowledgeModel.id, KnowledgeModel.document_id).order_by(KnowledgeModel.id)
+    if document_id is not None:
+        knowledges = knowledges.where(KnowledgeModel.document_id == document_id)
+        documents = []
+    else:
+        knowledges = knowledges.join(DocumentModel, DocumentModel.id == KnowledgeModel.document_id).where(
+            DocumentModel.dataset_id == dataset_id
+        )
+        documents = session.scalars(
+            select(DocumentModel.id).where(DocumentModel.dataset_id == dataset_id).order_by(DocumentModel.id)
+        ).all()
+    for knowledge_id, parent_id in session.execute(knowledges).all():
+        record_change(session, "knowledge", knowledge_id, "delete", document_id=parent_id)
+    for child_id in documents:
+        record_change(session, "document", child_id, "delete", dataset_id=dataset_id)
+
+
+@event.listens_for(Session, "before_commit")
+def _insert_before_commit(session: Session) -> None:
+    # SAVEPOINT の解放でも呼ばれるため、最も外側のトランザクションのコミットでのみ書き込む
+    if session.in_nested_transaction():
+        return
+    changes = session.info.pop(PENDING_KEY, None)
+    if changes:
+        # 記録日時は DB サーバーの時計で付ける（読み取り側の settled_clause と同じ時計で比べる）
+        session.execute(
+            insert(ChangeModel).values(created_at=database_now(session)),
+            [{**change, "origin": NODE_ID} for change in changes],
+        )
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_rollback(session: Session, transaction) -> None:
+    # ロールバックされた書き込みの変更は破棄する（コミット時は before_commit で書き込み済み）
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+def load_changes(session: Session, seqs: List[int]) -> List[Change]:
+    """
+    指定した連番の変更を連番の昇順に読む（読み飛ばした連番の読み直しに使う。記録からの経過時間は問わない）
+
+    Args:
+        session (Session): 読み取りに使うセッション
+        seqs (List[int]): 連番のリスト
+
+    Returns:
+        List[Change]: 見つかった変更のリスト
+    """
+    changes: List[Change] = []
+    for start in range(0, len(seqs), LOAD_CHANGES_CHUNK_SIZE):
+        stmt = (
+            select(*ChangeModel.__table__.c)
+            .where(ChangeModel.id.in_(seqs[start : start + LOAD_CHANGES_CHUNK_SIZE]))
+            .order_by(ChangeModel.id)
+        )
+        changes.extend(_to_entity(row) for row in session.execute(stmt).mappings())
+    return changes
+
+
+def load_changes_since(session: Session, since: datetime) -> List[Change]:
+    """
+    指定日時以降に記録された変更を連番の昇順に読む（停止中の変更の読み直しに使う）
+
+    Args:
+        session (Session): 読み取りに使うセッション
+        since (datetime): この日時以降に記録された変更を返す
+
+    Returns:
+        List[Change]: 変更のリスト
+    """
+    stmt = select(*ChangeModel.__table__.c).where(ChangeModel.created_at >= since).order_by(ChangeModel.id)
+    return [_to_entity(row) for row in session.execute(stmt).mappings()]
+
+
+def prune_changes(session: Session, retention_days: float = CHANGE_RETENTION_DAYS) -> int:
+    """
+    保持期間を過ぎた変更を削除する
+
+    Args:
+        session (Session): 書き込みに使うセッション
+        retention_days (float): 保持する日数
+
+    Returns:
+        int: 削除した件数
+    """
+    before = database_now(session, timedelta(days=retention_days).total_seconds())
+    count = session.execute(delete(ChangeModel).where(ChangeModel.created_at < before)).rowcount
+    session.commit()
+    if count:
+        logger.info("Success: Pruned %d changes older than %s days", count, retention_days)
+    return count
@@ -1,14 +1,24 @@
 import logging
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.domain.entities.dataset import Dataset
 from app.domain.repositories.dataset_repository import DatasetRepository
+from app.infrastructure.cache.existence import mark_created
+from app.infrastructure.cache.page_cache import DATASETS_SCOPE, GLOBAL_SCOPE, mark_changed
+from app.infrastructure.database.keyset import after_clause
+from app.infrastructure.database.meta_filter import meta_clause
 from app.infrastructure.database.models.dataset import DatasetModel
+from app.infrastructure.database.returning import supports_returning
+from app.infrastructure.repositories import change_repository_impl as changes
+from app.infrastructure.repositories import embedding_repository_impl as embeddings
+from app.infrastructure.repositories import stats_repository_impl as stats
+from app.infrastructure.search.knowledge_index import record_index_changes
 
 # モジュール固有のロガーを定義（ログは英語で出力されます）
 logger = logging.getLogger(__name__)
@@ -17,14 +27,27 @@ logger = logging.getLogger(__name__)
 class DatasetRepositorySQLAlchemy(DatasetRepository):
     """SQLAlchemyを用いたデータセットリポジトリの実装"""
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, auto_commit: bool = True):
         """
         コンストラクタ
 
         引数:
             session (Session): 同期的なDBセッション
+            auto_commit (bool): 書き込みごとにコミットするか。False の場合はコミット・ロールバックを
+                呼び出し側（UnitOfWork）に委ねる
         """
         self.session = session
+        self.auto_commit = auto_commit
+
+    def _commit(self) -> None:
+        """auto_commit の場合のみコミットする"""
+        if self.auto_commit:
+            self.session.commit()
+
+    def _rollback(self) -> None:
+        """auto_commit の場合のみロールバックする"""
+        if self.auto_commit:
+            self.session.rollback()
 
     def create(self, dataset: Dataset) -> Dataset:
         """
@@ -37,35 +60,65 @@ class DatasetRepositorySQLAlchemy(DatasetRepository):
             Dataset: 作成されたデータセットエンティティ
 
         ※ ログは英語で出力されます。
+        ※ INSERT ... RETURNING の1文で保存し、保存後の再取得（refresh）は行いません。
         """
         logger.info("Start: Creating dataset with name=%s", dataset.name)
-        # エンティティをDBモデルに変換
-        db_dataset = DatasetModel(
+        created = self._insert(dataset)
+        self._commit()
+        logger.info("Success: Created dataset with id=%s", created.id)
+        return created
+
+    def get_or_create(self, dataset: Dataset) -> Dataset:
+        """
+        dataset.id のデータセットがあればそれを返し、なければ作成する
+
+        INSERT をセーブポイント内で試み、主キー重複（同時に同じIDで作成された場合を含む）
+        であれば既存の行を取得して返す。そのため並行実行されても作成されるのは1件のみ。
+
+        引数:
+            dataset (Dataset): 作成するデータセットのエンティティ（ID 必須）
+
+        戻り値:
+            Dataset: 既存または作成されたデータセットエンティティ
+        """
+        logger.info("Start: Getting or creating dataset with id=%s", dataset.id)
+        try:
+            with self.session.begin_nested():
+                created = self._insert(dataset)
+        except IntegrityError:
+            existing = self.get_by_id(dataset.id)
+            if existing is None:
+                raise
+            logger.info("Success: Dataset already exists with id=%s", dataset.id)
+            return existing
+        self._commit()
+        logger.info("Success: Created dataset with id=%s", created.id)
+        return created
+
+    def _insert(self, dataset: Dataset) -> Dataset:
+        """INSERT ... RETURNING を発行し、作成されたエンティティを返す（コミットしない）"""
+        now = datetime.now()
+        values = dict(
             id=str(uuid.uuid4()) if not dataset.id else dataset.id,
             name=dataset.name,
             description=dataset.description,
             meta_data=dataset.meta_data,
             is_active=dataset.is_active,
-            created_at=dataset.created_at,
-            updated_at=dataset.updated_at,
-        )
-
-        # DBに保存
-        self.session.add(db_dataset)
-        self.session.commit()
-        self.session.refresh(db_dataset)
-        logger.info("Success: Created dataset with id=%s", db_dataset.id)
-
-        # DBモデルをエンティティに変換して返却
-        return Dataset(
-            id=db_dataset.id,
-            name=db_dataset.name,
-            description=db_dataset.description,
-            meta_data=db_dataset.meta_data,
-            is_active=db_dataset.is_active,
-            created_at=db_dataset.created_at,
-            updated_at=db_dataset.updated_at,
+            created_at=dataset.created_at or now,
+            updated_at=dataset.updated_at or now,
         )
+        stmt = insert(DatasetModel).values(**values)
+        if supports_returning(self.session, "insert"):
+            row = self.session.execute(stmt.returning(*DatasetModel.__table__.c)).one()
+            created = Dataset(**row._mapping)
+        else:
+            self.session.execute(stmt)
+            created = Dataset(**values)
+        stats.dataset_created(self.session, created.id)
+        mark_created(self.session, "datasets", [created.id])
+        mark_changed(self.session, *DATASETS_SCOPE)
+        changes.record_change(self.session, "dataset", created.id, "create")
+        return created
 
     def get_by_id(self, dataset_id: str) -> Optional[Dataset]:
         """
@@ -96,13 +149,24 @@ class DatasetRepositorySQLAlchemy(DatasetRepository):
             updated_at=db_dataset.updated_at,
         )
 
-    def list_datasets(self, skip: int = 0, limit: int = 100) -> List[Dataset]:
+    def list_datasets(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> List[Dataset]:
         """
         データセット一覧を取得する
 
+        (created_at, id) の順に並べる。after を指定した場合は OFFSET を使わず、
+        その行より後ろから読み出す（キーセットページネーション）。
+
         引数:
-            skip (int): スキップするレコード数
+            skip (int): スキップするレコード数（after 指定時は無視）
             limit (int): 取得するレコード数の上限
+            after (Optional[Tuple[datetime, str]]): 直前ページ最終行の (created_at, id)
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値（すべて一致するものに絞り込む）
 
         戻り値:
             List[Dataset]: データセットエンティティのリスト
@@ -111,12 +175,14 @@ class DatasetRepositorySQLAlchemy(DatasetRepository):
             MSSQLではOFFSETやLIMIT句を使用する場合、ORDER BY句が必須です。
         """
         logger.info("Start: Listing datasets with skip=%d, limit=%d", skip, limit)
-        stmt = (
-            select(DatasetModel)
-            .order_by(DatasetModel.created_at)
-            .offset(skip)
-            .limit(limit)
-        )
+        stmt = select(DatasetModel).order_by(DatasetModel.created_at, DatasetModel.id)
+        if meta:
+            stmt = stmt.where(meta_clause(self.session, DatasetModel, meta))
+        if after is not None:
+            stmt = stmt.where(after_clause(DatasetModel.created_at, DatasetModel.id, after))
+        else:
+            stmt = stmt.offset(skip)
+        stmt = stmt.limit(limit)
         result = self.session.execute(stmt)
         db_datasets = result.scalars().all()
         logger.info("Success: Retrieved %d datasets", len(db_datasets))
@@ -134,6 +200,37 @@ class DatasetRepositorySQLAlchemy(DatasetRepository):
             for db_dataset in db_datasets
         ]
 
+    def count_datasets(self, meta: Optional[Dict[str, str]] = None) -> int:
+        """
+        データセットの総件数を取得する
+
+        引数:
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値（すべて一致するものに絞り込む）
+
+        戻り値:
+            int: データセットの件数
+        """
+        logger.info("Start: Counting datasets")
+        stmt = select(func.count()).select_from(DatasetModel)
+        if meta:
+            stmt = stmt.where(meta_clause(self.session, DatasetModel, meta))
+        count = self.session.execute(stmt).scalar_one()
+        logger.info("Success: Counted %d datasets", count)
+        return count
+
+    def summarize_datasets(self) -> Tuple[int, Optional[datetime]]:
+        """
+        データセットの件数と updated_at の最大値を1クエリで取得する（一覧の ETag 用）
+
+        戻り値:
+            Tuple[int, Optional[datetime]]: (件数, 最終更新日時)。0件の場合の日時は None
+        """
+        logger.info("Start: Summarizing datasets")
+        stmt = select(func.count(), func.max(DatasetModel.updated_at)).select_from(DatasetModel)
+        count, last_updated_at = self.session.execute(stmt).one()
+        logger.info("Success: Summarized %d datasets", count)
+        return count, last_updated_at
+
     def update(self, dataset: Dataset) -> Dataset:
         """
         データセットを更新する
@@ -148,36 +245,38 @@ class DatasetRepositorySQLAlchemy(DatasetRepository):
             ValueError: 指定したIDのデータセットが存在しない場合
         """
         logger.info("Start: Updating dataset with id=%s", dataset.id)
-        stmt = select(DatasetModel).where(DatasetModel.id == dataset.id)
-        db_dataset = self.session.execute(stmt).scalar_one_or_none()
-
-        if not db_dataset:
+        # 事前の SELECT は行わず、UPDATE ... WHERE id の結果（RETURNING / rowcount）で存在を判定する
+        stmt = (
+            update(DatasetModel)
+            .where(DatasetModel.id == dataset.id)
+            .values(
+                name=dataset.name,
+                description=dataset.description,
+                meta_data=dataset.meta_data,
+                is_active=dataset.is_active,
+                # 入力が None なら現在時刻を設定
+                updated_at=dataset.updated_at if dataset.updated_at else datetime.now(),
+            )
+        )
+        if supports_returning(self.session, "update"):
+            row = self.session.execute(
+                stmt.returning(*DatasetModel.__table__.c)
+            ).one_or_none()
+            updated = Dataset(**row._mapping) if row else None
+        else:
+            result = self.session.execute(stmt)
+            updated = self.get_by_id(dataset.id) if result.rowcount else None
+
+        if updated is None:
+            self._rollback()
             logger.error("Error: Dataset not found for update with id=%s", dataset.id)
             raise ValueError(f"Dataset with id {dataset.id} not found")
 
-        # データ更新処理
-        db_dataset.name = dataset.name
-        db_dataset.description = dataset.description
-        db_dataset.meta_data = dataset.meta_data
-        db_dataset.is_active = dataset.is_active
-        # 入力が None なら現在時刻を設定
-        db_dataset.updated_at = (
-            dataset.updated_at if dataset.updated_at else datetime.now()
-        )
-
-        self.session.commit()
-        self.session.refresh(db_dataset)
+        mark_changed(self.session, *DATASETS_SCOPE)
+        changes.record_change(self.session, "dataset", updated.id, "update")
+        self._commit()
         logger.info("Success: Updated dataset with id=%s", dataset.id)
-
-        return Dataset(
-            id=db_dataset.id,
-            name=db_dataset.name,
-            description=db_dataset.description,
-            meta_data=db_dataset.meta_data,
-            is_active=db_dataset.is_active,
-            created_at=db_dataset.created_at,
-            updated_at=db_dataset.updated_at,
-        )
+        return updated
 
     def delete(self, dataset_id: str) -> bool:
         """
@@ -190,14 +289,22 @@ class DatasetRepositorySQLAlchemy(DatasetRepository):
             bool: 削除が成功した場合は True、存在しない場合は False
         """
         logger.info("Start: Deleting dataset with id=%s", dataset_id)
-        stmt = select(DatasetModel).where(DatasetModel.id == dataset_id)
-        db_dataset = self.session.execute(stmt).scalar_one_or_none()
+        # 配下のドキュメント・Knowledge の削除も記録する（CASCADE で消える前に読む）
+        changes.record_cascaded_deletes(self.session, dataset_id=dataset_id)
+        stmt = delete(DatasetModel).where(DatasetModel.id == dataset_id)
+        result = self.session.execute(stmt)
 
-        if not db_dataset:
+        if not result.rowcount:
+            self._rollback()
             logger.error("Error: Dataset not found for deletion with id=%s", dataset_id)
             return False
 
-        self.session.delete(db_dataset)
-        self.session.commit()
+        stats.dataset_deleted(self.session, dataset_id)
+        # 配下のドキュメント・Knowledge も CASCADE で削除されるため、一覧キャッシュ全体の世代を進める
+        mark_changed(self.session, *GLOBAL_SCOPE)
+        record_index_changes(self.session, ["remove_dataset", dataset_id])
+        embeddings.dataset_embeddings_deleted(self.session, dataset_id)
+        changes.record_change(self.session, "dataset", dataset_id, "delete")
+        self._commit()
         logger.info("Success: Deleted dataset with id=%s", dataset_id)
         return True
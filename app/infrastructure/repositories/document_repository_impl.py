@@ -1,14 +1,23 @@
 import logging
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.orm import Session
 
 from app.domain.entities.document import Document
 from app.domain.repositories.document_repository import DocumentRepository
+from app.infrastructure.cache.existence import mark_created
+from app.infrastructure.cache.page_cache import mark_changed
+from app.infrastructure.database.keyset import after_clause
+from app.infrastructure.database.meta_filter import meta_clause
 from app.infrastructure.database.models.document import DocumentModel
+from app.infrastructure.database.returning import supports_returning
+from app.infrastructure.repositories import change_repository_impl as changes
+from app.infrastructure.repositories import embedding_repository_impl as embeddings
+from app.infrastructure.repositories import stats_repository_impl as stats
+from app.infrastructure.search.knowledge_index import record_index_changes
 
 # モジュール固有のロガー（ログは英語で出力）
 logger = logging.getLogger(__name__)
@@ -19,14 +28,27 @@ class DocumentRepositorySQLAlchemy(DocumentRepository):
     SQLAlchemy を利用した DocumentRepository の実装
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, auto_commit: bool = True):
         """
         コンストラクタ
 
         Args:
             session (Session): 同期的な DB セッション
+            auto_commit (bool): 書き込みごとにコミットするか。False の場合はコミット・ロールバックを
+                呼び出し側（UnitOfWork）に委ねる
         """
         self.session = session
+        self.auto_commit = auto_commit
+
+    def _commit(self) -> None:
+        """auto_commit の場合のみコミットする"""
+        if self.auto_commit:
+            self.session.commit()
+
+    def _rollback(self) -> None:
+        """auto_commit の場合のみロールバックする"""
+        if self.auto_commit:
+            self.session.rollback()
 
     def create(self, document: Document) -> Document:
         """
@@ -37,33 +59,37 @@ class DocumentRepositorySQLAlchemy(DocumentRepository):
 
         Returns:
             Document: 作成されたドキュメントエンティティ
+
+        Note:
+            INSERT ... RETURNING の1文で保存し、保存後の再取得（refresh）は行わない。
         """
         logger.info("Start: Creating document with title=%s", document.title)
-        # エンティティを DB モデルに変換
-        db_document = DocumentModel(
+        now = datetime.now()
+        values = dict(
             id=str(uuid.uuid4()) if not document.id else document.id,
             dataset_id=document.dataset_id,
             title=document.title,
             content=document.content,
             meta_data=document.meta_data,
             is_active=document.is_active,
-            created_at=document.created_at,
-            updated_at=document.updated_at,
-        )
-        self.session.add(db_document)
-        self.session.commit()
-        self.session.refresh(db_document)
-        logger.info("Success: Document created with id=%s", db_document.id)
-        return Document(
-            id=db_document.id,
-            dataset_id=db_document.dataset_id,
-            title=db_document.title,
-            content=db_document.content,
-            meta_data=db_document.meta_data,
-            is_active=db_document.is_active,
-            created_at=db_document.created_at,
-            updated_at=db_document.updated_at,
+            created_at=document.created_at or now,
+            updated_at=document.updated_at or now,
         )
+        stmt = insert(DocumentModel).values(**values)
+        if supports_returning(self.session, "insert"):
+            row = self.session.execute(stmt.returning(*DocumentModel.__table__.c)).one()
+            created = Document(**row._mapping)
+        else:
+            self.session.execute(stmt)
+            created = Document(**values)
+        stats.document_created(self.session, created.id, created.dataset_id, stats.characters(created.content))
+        mark_changed(self.session, "documents", created.dataset_id)
+        mark_created(self.session, "documents", [created.id])
+        record_index_changes(self.session, ["document", created.id, created.dataset_id])
+        changes.record_change(self.session, "document", created.id, "create", dataset_id=created.dataset_id)
+        self._commit()
+        logger.info("Success: Document created with id=%s", created.id)
+        return created
 
     def get_by_id(self, document_id: str) -> Optional[Document]:
         """
@@ -93,16 +119,56 @@ class DocumentRepositorySQLAlchemy(DocumentRepository):
             updated_at=db_document.updated_at,
         )
 
+    def get_many(self, document_ids: List[str]) -> List[Document]:
+        """
+        指定された複数IDのドキュメントを1クエリで取得する
+
+        Args:
+            document_ids (List[str]): 取得対象のドキュメントIDのリスト
+
+        Returns:
+            List[Document]: 存在したドキュメントエンティティのリスト（入力と同じ順序。存在しないIDは含まない）
+        """
+        if not document_ids:
+            return []
+        logger.info("Start: Retrieving %d documents by id", len(document_ids))
+        stmt = select(DocumentModel).where(DocumentModel.id.in_(document_ids))
+        found = {
+            db_document.id: Document(
+                id=db_document.id,
+                dataset_id=db_document.dataset_id,
+                title=db_document.title,
+                content=db_document.content,
+                meta_data=db_document.meta_data,
+                is_active=db_document.is_active,
+                created_at=db_document.created_at,
+                updated_at=db_document.updated_at,
+            )
+            for db_document in self.session.execute(stmt).scalars()
+        }
+        logger.info("Success: Retrieved %d documents by id", len(found))
+        return [found[document_id] for document_id in document_ids if document_id in found]
+
     def list_documents(
-        self, dataset_id: str, skip: int = 0, limit: int = 100
+        self,
+        dataset_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
     ) -> List[Document]:
         """
         指定されたデータセットに属するドキュメント一覧を取得する
 
+        (created_at, id) の順に並べる。after を指定した場合は OFFSET を使わず、
+        その行より後ろから読み出す（キーセットページネーション）。
+
         Args:
             dataset_id (str): ドキュメントが属するデータセットのID
-            skip (int): スキップするレコード数
+            skip (int): スキップするレコード数（after 指定時は無視）
             limit (int): 取得するレコード数の上限
+            after (Optional[Tuple[datetime, str]]): 直前ページ最終行の (created_at, id)
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値（すべて一致するものに絞り込む）
 
         Returns:
             List[Document]: 取得したドキュメントエンティティのリスト
@@ -116,10 +182,15 @@ class DocumentRepositorySQLAlchemy(DocumentRepository):
         stmt = (
             select(DocumentModel)
             .where(DocumentModel.dataset_id == dataset_id)
-            .order_by(DocumentModel.created_at)
-            .offset(skip)
-            .limit(limit)
+            .order_by(DocumentModel.created_at, DocumentModel.id)
         )
+        if meta:
+            stmt = stmt.where(meta_clause(self.session, DocumentModel, meta))
+        if after is not None:
+            stmt = stmt.where(after_clause(DocumentModel.created_at, DocumentModel.id, after))
+        else:
+            stmt = stmt.offset(skip)
+        stmt = stmt.limit(limit)
         result = self.session.execute(stmt)
         db_documents = result.scalars().all()
         logger.info("Success: Retrieved %d documents", len(db_documents))
@@ -137,6 +208,49 @@ class DocumentRepositorySQLAlchemy(DocumentRepository):
             for db_doc in db_documents
         ]
 
+    def count_documents(self, dataset_id: str, meta: Optional[Dict[str, str]] = None) -> int:
+        """
+        指定されたデータセットに属するドキュメントの件数を取得する
+
+        Args:
+            dataset_id (str): ドキュメントが属するデータセットのID
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値（すべて一致するものに絞り込む）
+
+        Returns:
+            int: ドキュメントの件数
+        """
+        logger.info("Start: Counting documents for dataset_id=%s", dataset_id)
+        stmt = (
+            select(func.count())
+            .select_from(DocumentModel)
+            .where(DocumentModel.dataset_id == dataset_id)
+        )
+        if meta:
+            stmt = stmt.where(meta_clause(self.session, DocumentModel, meta))
+        count = self.session.execute(stmt).scalar_one()
+        logger.info("Success: Counted %d documents", count)
+        return count
+
+    def summarize_documents(self, dataset_id: str) -> Tuple[int, Optional[datetime]]:
+        """
+        指定されたデータセットに属するドキュメントの件数と updated_at の最大値を1クエリで取得する（一覧の ETag 用）
+
+        Args:
+            dataset_id (str): ドキュメントが属するデータセットのID
+
+        Returns:
+            Tuple[int, Optional[datetime]]: (件数, 最終更新日時)。0件の場合の日時は None
+        """
+        logger.info("Start: Summarizing documents for dataset_id=%s", dataset_id)
+        stmt = (
+            select(func.count(), func.max(DocumentModel.updated_at))
+            .select_from(DocumentModel)
+            .where(DocumentModel.dataset_id == dataset_id)
+        )
+        count, last_updated_at = self.session.execute(stmt).one()
+        logger.info("Success: Summarized %d documents", count)
+        return count, last_updated_at
+
     def update(self, document: Document) -> Document:
         """
         ドキュメントを更新する
@@ -151,32 +265,40 @@ class DocumentRepositorySQLAlchemy(DocumentRepository):
             ValueError: 指定されたドキュメントが存在しない場合
         """
         logger.info("Start: Updating document with id=%s", document.id)
-        stmt = select(DocumentModel).where(DocumentModel.id == document.id)
-        db_document = self.session.execute(stmt).scalar_one_or_none()
-        if not db_document:
+        # 本文の文字数の差分を集計値に反映する（更新前の行を参照するため UPDATE より先に行う）
+        stats.document_updating(self.session, document.id, stats.characters(document.content))
+        # 事前の SELECT は行わず、UPDATE ... WHERE id の結果（RETURNING / rowcount）で存在を判定する
+        stmt = (
+            update(DocumentModel)
+            .where(DocumentModel.id == document.id)
+            .values(
+                title=document.title,
+                content=document.content,
+                meta_data=document.meta_data,
+                is_active=document.is_active,
+                # updated_at が None の場合、現在時刻で補完
+                updated_at=(
+                    document.updated_at if document.updated_at is not None else datetime.now()
+                ),
+            )
+        )
+        if supports_returning(self.session, "update"):
+            row = self.session.execute(
+                stmt.returning(*DocumentModel.__table__.c)
+            ).one_or_none()
+            updated = Document(**row._mapping) if row else None
+        else:
+            result = self.session.execute(stmt)
+            updated = self.get_by_id(document.id) if result.rowcount else None
+        if updated is None:
+            self._rollback()
             logger.error("Error: Document not found for update with id=%s", document.id)
             raise ValueError(f"Document with id {document.id} not found")
-        db_document.title = document.title
-        db_document.content = document.content
-        db_document.meta_data = document.meta_data
-        db_document.is_active = document.is_active
-        # updated_at が None の場合、現在時刻で補完
-        db_document.updated_at = (
-            document.updated_at if document.updated_at is not None else datetime.now()
-        )
-        self.session.commit()
-        self.session.refresh(db_document)
+        mark_changed(self.session, "documents", updated.dataset_id)
+        changes.record_change(self.session, "document", updated.id, "update", dataset_id=updated.dataset_id)
+        self._commit()
         logger.info("Success: Updated document with id=%s", document.id)
-        return Document(
-            id=db_document.id,
-            dataset_id=db_document.dataset_id,
-            title=db_document.title,
-            content=db_document.content,
-            meta_data=db_document.meta_data,
-            is_active=db_document.is_active,
-            created_at=db_document.created_at,
-            updated_at=db_document.updated_at,
-        )
+        return updated
 
     def delete(self, document_id: str) -> bool:
         """
@@ -189,14 +311,34 @@ class DocumentRepositorySQLAlchemy(DocumentRepository):
             bool: 削除に成功した場合は True、存在しなければ False
         """
         logger.info("Start: Deleting document with id=%s", document_id)
-        stmt = select(DocumentModel).where(DocumentModel.id == document_id)
-        db_document = self.session.execute(stmt).scalar_one_or_none()
-        if not db_document:
+        # 集計値から引く（削除前の行を参照するため DELETE より先に行う）
+        stats.document_deleting(self.session, document_id)
+        # 配下の Knowledge の削除も記録する（CASCADE で消える前に読む）
+        changes.record_cascaded_deletes(self.session, document_id=document_id)
+        stmt = delete(DocumentModel).where(DocumentModel.id == document_id)
+        # 一覧キャッシュを無効化するため、削除した行の dataset_id を受け取る
+        if supports_returning(self.session, "delete"):
+            dataset_id = self.session.execute(
+                stmt.returning(DocumentModel.dataset_id)
+            ).scalar_one_or_none()
+        else:
+            dataset_id = self.session.execute(
+                select(DocumentModel.dataset_id).where(DocumentModel.id == document_id)
+            ).scalar_one_or_none()
+            if dataset_id is not None and not self.session.execute(stmt).rowcount:
+                dataset_id = None
+        if dataset_id is None:
+            self._rollback()
             logger.error(
                 "Error: Document not found for deletion with id=%s", document_id
             )
             return False
-        self.session.delete(db_document)
-        self.session.commit()
+        # 配下の Knowledge も CASCADE で削除される
+        mark_changed(self.session, "documents", dataset_id)
+        mark_changed(self.session, "knowledges", document_id)
+        record_index_changes(self.session, ["remove_document", document_id])
+        embeddings.document_embeddings_deleted(self.session, document_id)
+        changes.record_change(self.session, "document", document_id, "delete", dataset_id=dataset_id)
+        self._commit()
         logger.info("Success: Deleted document with id=%s", document_id)
         return True
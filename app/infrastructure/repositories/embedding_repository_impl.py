@@ -0,0 +1,368 @@
+"""
+Knowledge 本文の埋め込み（knowledge_embeddings）
+
+埋め込みは Knowledge のリポジトリ実装の作成・更新・削除が、本体の書き込みと同じトランザクションで
+このモジュールの関数を呼んで書き込む。ドキュメント・データセットの削除時も同じく明示的に消す
+（外部キーの CASCADE が無い DB でも残さない）。コミット後の行列への反映は vector_index が行う。
+他ノードの書き込みのうち pub/sub で届かなかったものは、変更履歴の追従スレッドから apply_changes で反映する。
+
+埋め込みの導入前に作成された Knowledge や、埋め込みの実装（EMBEDDER）を変えた後の Knowledge は
+backfill_embeddings（scripts/backfill_embeddings.py）で計算する。
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.domain.entities.change import Change
+from app.infrastructure.database.change_feed import change_handlers
+from app.infrastructure.database.models.document import DocumentModel
+from app.infrastructure.database.models.embedding import KnowledgeEmbeddingModel
+from app.infrastructure.database.models.knowledge import KnowledgeModel
+from app.infrastructure.database.offload import run_blocking
+from app.infrastructure.database.returning import supports_returning
+from app.infrastructure.embedding.embedder import Embedder, get_embedder
+from app.infrastructure.search.vector_index import (
+    VECTOR_SEARCH_ENABLED,
+    EmbeddingRow,
+    Operation,
+    decode_vector,
+    encode_vector,
+    record_vector_changes,
+    vector_index,
+    vector_operation,
+)
+
+# モジュール固有のロガー（ログは英語で出力）
+logger = logging.getLogger(__name__)
+
+# 1回の executemany で送る行数・バックフィルで1回に読む行数
+BATCH_SIZE = 1000
+
+# knowledges_embedded に渡す Knowledge: (Knowledge ID, ドキュメントID, 本文, 有効フラグ)
+EmbeddingSource = Tuple[str, str, str, bool]
+
+
+def knowledges_embedded(
+    session: Session, knowledges: Sequence[EmbeddingSource], embedder: Optional[Embedder] = None
+) -> None:
+    """
+    Knowledge の埋め込みを計算して保存する（有効なものはコミット後に行列へ反映する）
+
+    dataset_id は INSERT 内の副問い合わせで埋め、RETURNING で受け取る（対応しない DB では先に SELECT する）。
+
+    Args:
+        session (Session): Knowledge を作成・更新したセッション
+        knowledges (Sequence[EmbeddingSource]): 埋め込みを保存する Knowledge
+        embedder (Optional[Embedder]): 埋め込みの実装（既定は get_embedder()）
+    """
+    if not VECTOR_SEARCH_ENABLED or not knowledges:
+        return
+    embedder = embedder or get_embedder()
+    returning = supports_returning(session, "insert")
+    datasets: Dict[str, str] = {}
+    if not returning:
+        document_ids = sorted({document_id for _, document_id, _, _ in knowledges})
+        datasets = dict(
+            session.execute(
+                select(DocumentModel.id, DocumentModel.dataset_id).where(DocumentModel.id.in_(document_ids))
+            ).all()
+        )
+    stmt = insert(KnowledgeEmbeddingModel).values(
+        knowledge_id=bindparam("source_knowledge_id"),
+        document_id=bindparam("source_document_id"),
+        dataset_id=select(DocumentModel.dataset_id)
+        .where(DocumentModel.id == bindparam("source_document_id"))
+        .scalar_subquery(),
+        model=embedder.name,
+        dimension=embedder.dimension,
+        vector=bindparam("source_vector"),
+        updated_at=bindparam("source_updated_at"),
+    )
+    now = datetime.now()
+    for start in range(0, len(knowledges), BATCH_SIZE):
+        batch = knowledges[start : start + BATCH_SIZE]
+        vectors = run_blocking(embedder.embed, [text or "" for _, _, text, _ in batch])
+        rows = [
+            {
+                "source_knowledge_id": knowledge_id,
+                "source_document_id": document_id,
+                "source_vector": encode_vector(vector),
+                "source_updated_at": now,
+            }
+            for (knowledge_id, document_id, _, _), vector in zip(batch, vectors)
+        ]
+        if returning:
+            dataset_of = dict(
+                session.execute(
+                    stmt.returning(KnowledgeEmbeddingModel.knowledge_id, KnowledgeEmbeddingModel.dataset_id), rows
+                ).all()
+            )
+        else:
+            session.execute(stmt, rows)
+            dataset_of = {knowledge_id: datasets.get(document_id) for knowledge_id, document_id, _, _ in batch}
+        _record(session, batch, vectors, dataset_of)
+
+
+def knowledge_embedding_replaced(
+    session: Session, knowledge: EmbeddingSource, embedder: Optional[Embedder] = None
+) -> None:
+    """
+    更新後の Knowledge の埋め込みを計算し直して置き換える
+
+    既存の行を UPDATE し、行が無い場合（埋め込みの導入前に作成された Knowledge）のみ INSERT する。
+
+    Args:
+        session (Session): Knowledge を更新したセッション
+        knowledge (EmbeddingSource): 更新後の Knowledge
+        embedder (Optional[Embedder]): 埋め込みの実装（既定は get_embedder()）
+    """
+    if not VECTOR_SEARCH_ENABLED:
+        return
+    embedder = embedder or get_embedder()
+    knowledge_id, document_id, text, _ = knowledge
+    vectors = run_blocking(embedder.embed, [text or ""])
+    stmt = (
+        update(KnowledgeEmbeddingModel)
+        .where(KnowledgeEmbeddingModel.knowledge_id == knowledge_id)
+        .values(
+            model=embedder.name,
+            dimension=embedder.dimension,
+            vector=encode_vector(vectors[0]),
+            updated_at=datetime.now(),
+        )
+    )
+    if supports_returning(session, "update"):
+        dataset_id = session.execute(stmt.returning(KnowledgeEmbeddingModel.dataset_id)).scalar_one_or_none()
+    elif session.execute(stmt).rowcount:
+        dataset_id = session.execute(
+            select(KnowledgeEmbeddingModel.dataset_id).where(KnowledgeEmbeddingModel.knowledge_id == knowledge_id)
+        ).scalar_one_or_none()
+    else:
+        dataset_id = None
+    if dataset_id is None:
+        knowledges_embedded(session, [knowledge], embedder)
+        return
+    _record(session, [knowledge], vectors, {knowledge_id: dataset_id})
+
+
+def _record(
+    session: Session, batch: Sequence[EmbeddingSource], vectors: np.ndarray, dataset_of: Dict[str, Optional[str]]
+) -> None:
+    # 有効な Knowledge は行列に加え、無効な Knowledge は行列から外す
+    record_vector_changes(
+        session,
+        *(
+            vector_operation(knowledge_id, document_id, dataset_of[knowledge_id], vector)
+            if is_active
+            else ["remove", knowledge_id]
+            for (knowledge_id, document_id, _, is_active), vector in zip(batch, vectors)
+            if dataset_of.get(knowledge_id) is not None
+        ),
+    )
+
+
+def knowledge_embedding_deleted(session: Session, knowledge_id: str) -> None:
+    """
+    Knowledge の埋め込みを削除する
+
+    Args:
+        session (Session): Knowledge を削除したセッション
+        knowledge_id (str): Knowledge ID
+    """
+    if not VECTOR_SEARCH_ENABLED:
+        return
+    session.execute(delete(KnowledgeEmbeddingModel).where(KnowledgeEmbeddingModel.knowledge_id == knowledge_id))
+    record_vector_changes(session, ["remove", knowledge_id])
+
+
+def document_embeddings_deleted(session: Session, document_id: str) -> None:
+    """
+    ドキュメント配下の Knowledge の埋め込みを削除する
+
+    Args:
+        session (Session): ドキュメントを削除したセッション
+        document_id (str): ドキュメントID
+    """
+    if not VECTOR_SEARCH_ENABLED:
+        return
+    session.execute(delete(KnowledgeEmbeddingModel).where(KnowledgeEmbeddingModel.document_id == document_id))
+    record_vector_changes(session, ["remove_document", document_id])
+
+
+def dataset_embeddings_deleted(session: Session, dataset_id: str) -> None:
+    """
+    データセット配下の Knowledge の埋め込みを削除する
+
+    Args:
+        session (Session): データセットを削除したセッション
+        dataset_id (str): データセットID
+    """
+    if not VECTOR_SEARCH_ENABLED:
+        return
+    session.execute(delete(KnowledgeEmbeddingModel).where(KnowledgeEmbeddingModel.dataset_id == dataset_id))
+    record_vector_changes(session, ["remove_dataset", dataset_id])
+
+
+def apply_changes(session: Session, changes: List[Change], embedder: Optional[Embedder] = None) -> None:
+    """
+    他ノードの変更をベクトル索引に反映する（変更履歴の追従スレッドから呼ばれる）
+
+    Knowledge の作成・更新は現在の埋め込みを読み直して反映する（削除・無効化済み、または埋め込みの種類が
+    異なるものは索引から外す）。読み込み済みでないデータセットへの反映は索引側で無視される。
+
+    Args:
+        session (Session): 読み取りに使うセッション
+        changes (List[Change]): 連番順の変更
+        embedder (Optional[Embedder]): 埋め込みの実装（既定は get_embedder()）
+    """
+    if not VECTOR_SEARCH_ENABLED:
+        return
+    knowledge_ids = [
+        change.entity_id for change in changes if change.entity == "knowledge" and change.operation != "delete"
+    ]
+    current = {}
+    if knowledge_ids:
+        current = {
+            row.knowledge_id: row
+            for row in session.execute(
+                select(
+                    KnowledgeEmbeddingModel.knowledge_id,
+                    KnowledgeEmbeddingModel.document_id,
+                    KnowledgeEmbeddingModel.dataset_id,
+                    KnowledgeEmbeddingModel.vector,
+                )
+                .join(KnowledgeModel, KnowledgeModel.id == KnowledgeEmbeddingModel.knowledge_id)
+                .where(
+                    KnowledgeEmbeddingModel.knowledge_id.in_(knowledge_ids),
+                    KnowledgeEmbeddingModel.model == (embedder or get_embedder()).name,
+                    KnowledgeModel.is_active,
+                )
+            )
+        }
+    operations: List[Operation] = []
+    for change in changes:
+        if change.entity == "knowledge":
+            row = current.get(change.entity_id) if change.operation != "delete" else None
+            operations.append(
+                vector_operation(row.knowledge_id, row.document_id, row.dataset_id, decode_vector(row.vector))
+                if row is not None
+                else ["remove", change.entity_id]
+            )
+        elif change.operation == "delete" and change.entity in ("document", "dataset"):
+            operations.append([f"remove_{change.entity}", change.entity_id])
+    vector_index.apply(operations)
+
+
+change_handlers["vector:knowledges"] = apply_changes
+
+
+def load_dataset_embeddings(
+    session: Session, dataset_id: str, model: str, since: Optional[datetime] = None
+) -> Iterator[EmbeddingRow]:
+    """
+    データセットの有効な Knowledge の埋め込みを読む（索引の読み込みに使う）
+
+    Args:
+        session (Session): 読み取りに使うセッション
+        dataset_id (str): データセットID
+        model (str): 埋め込みの種類（これと異なる埋め込みは読まない）
+        since (Optional[datetime]): 指定した場合はこれ以降に更新された埋め込みのみ
+
+    Returns:
+        Iterator[EmbeddingRow]: (Knowledge ID, ドキュメントID, ベクトルのバイト列)
+    """
+    stmt = (
+        select(
+            KnowledgeEmbeddingModel.knowledge_id,
+            KnowledgeEmbeddingModel.document_id,
+            KnowledgeEmbeddingModel.vector,
+        )
+        .join(KnowledgeModel, KnowledgeModel.id == KnowledgeEmbeddingModel.knowledge_id)
+        .where(
+            KnowledgeEmbeddingModel.dataset_id == dataset_id,
+            KnowledgeEmbeddingModel.model == model,
+            KnowledgeModel.is_active,
+        )
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    if since is not None:
+        stmt = stmt.where(KnowledgeEmbeddingModel.updated_at >= since)
+    return iter(session.execute(stmt).tuples())
+
+
+def load_dataset_embedding_ids(session: Session, dataset_id: str, model: str) -> Iterator[str]:
+    """
+    データセットの有効な Knowledge のうち、埋め込みがあるものの ID を読む
+    （保存した索引から削除・無効化された Knowledge を外すのに使う）
+
+    Args:
+        session (Session): 読み取りに使うセッション
+        dataset_id (str): データセットID
+        model (str): 埋め込みの種類
+
+    Returns:
+        Iterator[str]: Knowledge ID
+    """
+    stmt = (
+        select(KnowledgeEmbeddingModel.knowledge_id)
+        .join(KnowledgeModel, KnowledgeModel.id == KnowledgeEmbeddingModel.knowledge_id)
+        .where(
+            KnowledgeEmbeddingModel.dataset_id == dataset_id,
+            KnowledgeEmbeddingModel.model == model,
+            KnowledgeModel.is_active,
+        )
+        .execution_options(yield_per=BATCH_SIZE * 10)
+    )
+    return iter(session.execute(stmt).scalars())
+
+
+def backfill_embeddings(
+    session: Session, dataset_id: Optional[str] = None, embedder: Optional[Embedder] = None
+) -> int:
+    """
+    埋め込みが無い、または現在の埋め込みの種類と異なる Knowledge の埋め込みを計算する
+
+    BATCH_SIZE 件ごとにコミットする。
+
+    Args:
+        session (Session): 書き込みに使うセッション
+        dataset_id (Optional[str]): 指定した場合はそのデータセットの Knowledge のみ
+        embedder (Optional[Embedder]): 埋め込みの実装（既定は get_embedder()）
+
+    Returns:
+        int: 埋め込みを計算した Knowledge の件数
+    """
+    embedder = embedder or get_embedder()
+    logger.info("Start: Backfilling embeddings with model=%s, dataset_id=%s", embedder.name, dataset_id)
+    current = select(KnowledgeEmbeddingModel.knowledge_id).where(KnowledgeEmbeddingModel.model == embedder.name)
+    stmt = (
+        select(KnowledgeModel.id, KnowledgeModel.document_id, KnowledgeModel.knowledge_text, KnowledgeModel.is_active)
+        .where(KnowledgeModel.id.not_in(current))
+        .order_by(KnowledgeModel.id)
+        .limit(BATCH_SIZE)
+    )
+    if dataset_id is not None:
+        stmt = stmt.join(DocumentModel, DocumentModel.id == KnowledgeModel.document_id).where(
+            DocumentModel.dataset_id == dataset_id
+        )
+    count = 0
+    last_id = ""
+    while True:
+        knowledges: List[EmbeddingSource] = list(
+            session.execute(stmt.where(KnowledgeModel.id > last_id)).tuples()
+        )
+        if not knowledges:
+            break
+        ids = [knowledge_id for knowledge_id, _, _, _ in knowledges]
+        session.execute(delete(KnowledgeEmbeddingModel).where(KnowledgeEmbeddingModel.knowledge_id.in_(ids)))
+        knowledges_embedded(session, knowledges, embedder)
+        session.commit()
+        count += len(knowledges)
+        last_id = ids[-1]
+    logger.info("Success: Backfilled %d embeddings", count)
+    return count
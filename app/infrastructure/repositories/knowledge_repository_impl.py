@@ -1,32 +1,57 @@
 import logging
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.orm import Session
 
 from app.domain.entities.knowledge import Knowledge
 from app.domain.repositories.knowledge_repository import KnowledgeRepository
+from app.infrastructure.cache.existence import mark_created
+from app.infrastructure.cache.page_cache import mark_changed
+from app.infrastructure.database.keyset import after_clause
+from app.infrastructure.database.meta_filter import meta_clause
 from app.infrastructure.database.models.knowledge import KnowledgeModel
+from app.infrastructure.database.returning import supports_returning
+from app.infrastructure.repositories import change_repository_impl as changes
+from app.infrastructure.repositories import embedding_repository_impl as embeddings
+from app.infrastructure.repositories import stats_repository_impl as stats
+from app.infrastructure.search.knowledge_index import record_index_changes
 
 # モジュール固有のロガー（ログは英語で出力）
 logger = logging.getLogger(__name__)
 
+# 一括作成時に1回の executemany で送る行数
+BULK_INSERT_BATCH_SIZE = 1000
+
 
 class KnowledgeRepositorySQLAlchemy(KnowledgeRepository):
     """
     SQLAlchemy を利用した KnowledgeRepository の実装
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, auto_commit: bool = True):
         """
         コンストラクタ
 
         Args:
             session (Session): 同期的な DB セッション
+            auto_commit (bool): 書き込みごとにコミットするか。False の場合はコミット・ロールバックを
+                呼び出し側（UnitOfWork）に委ねる
         """
         self.session = session
+        self.auto_commit = auto_commit
+
+    def _commit(self) -> None:
+        """auto_commit の場合のみコミットする"""
+        if self.auto_commit:
+            self.session.commit()
+
+    def _rollback(self) -> None:
+        """auto_commit の場合のみロールバックする"""
+        if self.auto_commit:
+            self.session.rollback()
 
     def create(self, knowledge: Knowledge) -> Knowledge:
         """
@@ -37,32 +62,111 @@ class KnowledgeRepositorySQLAlchemy(KnowledgeRepository):
 
         Returns:
             Knowledge: 作成されたKnowledgeエンティティ
+
+        Note:
+            INSERT ... RETURNING の1文で保存し、保存後の再取得（refresh）は行わない。
         """
         logger.info("Start: Creating knowledge for document_id=%s, sequence=%d", knowledge.document_id, knowledge.sequence)
-        db_knowledge = KnowledgeModel(
+        now = datetime.now()
+        values = dict(
             id=str(uuid.uuid4()) if not knowledge.id else knowledge.id,
             document_id=knowledge.document_id,
             sequence=knowledge.sequence,
             knowledge_text=knowledge.knowledge_text,
             meta_data=knowledge.meta_data,
             is_active=knowledge.is_active,
-            created_at=knowledge.created_at,
-            updated_at=knowledge.updated_at,
+            created_at=knowledge.created_at or now,
+            updated_at=knowledge.updated_at or now,
         )
-        self.session.add(db_knowledge)
-        self.session.commit()
-        self.session.refresh(db_knowledge)
-        logger.info("Success: Knowledge created with id=%s", db_knowledge.id)
-        return Knowledge(
-            id=db_knowledge.id,
-            document_id=db_knowledge.document_id,
-            sequence=db_knowledge.sequence,
-            knowledge_text=db_knowledge.knowledge_text,
-            meta_data=db_knowledge.meta_data,
-            is_active=db_knowledge.is_active,
-            created_at=db_knowledge.created_at,
-            updated_at=db_knowledge.updated_at,
+        stmt = insert(KnowledgeModel).values(**values)
+        if supports_returning(self.session, "insert"):
+            row = self.session.execute(stmt.returning(*KnowledgeModel.__table__.c)).one()
+            created = Knowledge(**row._mapping)
+        else:
+            self.session.execute(stmt)
+            created = Knowledge(**values)
+        stats.knowledges_added(
+            self.session, {created.document_id: (1, stats.characters(created.knowledge_text))}
+        )
+        mark_changed(self.session, "knowledges", created.document_id)
+        mark_created(self.session, "knowledges", [created.id])
+        if created.is_active:
+            record_index_changes(
+                self.session, ["knowledge", created.id, created.document_id, created.knowledge_text]
+            )
+        embeddings.knowledges_embedded(
+            self.session, [(created.id, created.document_id, created.knowledge_text, created.is_active)]
+        )
+        changes.record_change(
+            self.session, "knowledge", created.id, "create", document_id=created.document_id
         )
+        self._commit()
+        logger.info("Success: Knowledge created with id=%s", created.id)
+        return created
+
+    def create_many(self, knowledges: List[Knowledge]) -> List[str]:
+        """
+        複数のKnowledgeを1トランザクションで一括作成する
+
+        ID は事前に採番し、BULK_INSERT_BATCH_SIZE 行ごとに INSERT を executemany で発行する。
+        行ごとの refresh は行わない。
+
+        Args:
+            knowledges (List[Knowledge]): 作成するKnowledgeエンティティのリスト
+
+        Returns:
+            List[str]: 作成されたKnowledge IDのリスト（入力と同じ順序）
+        """
+        logger.info("Start: Bulk creating %d knowledges", len(knowledges))
+        now = datetime.now()
+        rows = [
+            {
+                "id": knowledge.id or str(uuid.uuid4()),
+                "document_id": knowledge.document_id,
+                "sequence": knowledge.sequence,
+                "knowledge_text": knowledge.knowledge_text,
+                "meta_data": knowledge.meta_data,
+                "is_active": knowledge.is_active,
+                "created_at": knowledge.created_at or now,
+                "updated_at": knowledge.updated_at or now,
+            }
+            for knowledge in knowledges
+        ]
+        try:
+            for start in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+                self.session.execute(
+                    insert(KnowledgeModel), rows[start : start + BULK_INSERT_BATCH_SIZE]
+                )
+            counts = {}
+            for row in rows:
+                count, characters = counts.get(row["document_id"], (0, 0))
+                counts[row["document_id"]] = (count + 1, characters + stats.characters(row["knowledge_text"]))
+            stats.knowledges_added(self.session, counts)
+            for document_id in counts:
+                mark_changed(self.session, "knowledges", document_id)
+            mark_created(self.session, "knowledges", [row["id"] for row in rows])
+            record_index_changes(
+                self.session,
+                *(
+                    ["knowledge", row["id"], row["document_id"], row["knowledge_text"]]
+                    for row in rows
+                    if row["is_active"]
+                ),
+            )
+            embeddings.knowledges_embedded(
+                self.session,
+                [(row["id"], row["document_id"], row["knowledge_text"], row["is_active"]) for row in rows],
+            )
+            for row in rows:
+                changes.record_change(
+                    self.session, "knowledge", row["id"], "create", document_id=row["document_id"]
+                )
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        logger.info("Success: Bulk created %d knowledges", len(rows))
+        return [row["id"] for row in rows]
 
     def get_by_id(self, knowledge_id: str) -> Optional[Knowledge]:
         """
@@ -92,16 +196,56 @@ class KnowledgeRepositorySQLAlchemy(KnowledgeRepository):
             updated_at=db_knowledge.updated_at,
         )
 
+    def get_many(self, knowledge_ids: List[str]) -> List[Knowledge]:
+        """
+        指定された複数IDのKnowledgeを1クエリで取得する
+
+        Args:
+            knowledge_ids (List[str]): 取得対象のKnowledge IDのリスト
+
+        Returns:
+            List[Knowledge]: 存在したKnowledgeエンティティのリスト（入力と同じ順序。存在しないIDは含まない）
+        """
+        if not knowledge_ids:
+            return []
+        logger.info("Start: Retrieving %d knowledges by id", len(knowledge_ids))
+        stmt = select(KnowledgeModel).where(KnowledgeModel.id.in_(knowledge_ids))
+        found = {
+            db_knowledge.id: Knowledge(
+                id=db_knowledge.id,
+                document_id=db_knowledge.document_id,
+                sequence=db_knowledge.sequence,
+                knowledge_text=db_knowledge.knowledge_text,
+                meta_data=db_knowledge.meta_data,
+                is_active=db_knowledge.is_active,
+                created_at=db_knowledge.created_at,
+                updated_at=db_knowledge.updated_at,
+            )
+            for db_knowledge in self.session.execute(stmt).scalars()
+        }
+        logger.info("Success: Retrieved %d knowledges by id", len(found))
+        return [found[knowledge_id] for knowledge_id in knowledge_ids if knowledge_id in found]
+
     def list_knowledges(
-        self, document_id: str, skip: int = 0, limit: int = 100
+        self,
+        document_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[int, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
     ) -> List[Knowledge]:
         """
         指定されたドキュメントに属するKnowledge一覧を取得する
 
+        (sequence, id) の順に並べる。after を指定した場合は OFFSET を使わず、
+        その行より後ろから読み出す（キーセットページネーション）。
+
         Args:
             document_id (str): Knowledgeが属するドキュメントのID
-            skip (int): スキップするレコード数
+            skip (int): スキップするレコード数（after 指定時は無視）
             limit (int): 取得するレコード数の上限
+            after (Optional[Tuple[int, str]]): 直前ページ最終行の (sequence, id)
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値（すべて一致するものに絞り込む）
 
         Returns:
             List[Knowledge]: 取得したKnowledgeエンティティのリスト
@@ -115,10 +259,15 @@ class KnowledgeRepositorySQLAlchemy(KnowledgeRepository):
         stmt = (
             select(KnowledgeModel)
             .where(KnowledgeModel.document_id == document_id)
-            .order_by(KnowledgeModel.sequence)
-            .offset(skip)
-            .limit(limit)
+            .order_by(KnowledgeModel.sequence, KnowledgeModel.id)
         )
+        if meta:
+            stmt = stmt.where(meta_clause(self.session, KnowledgeModel, meta))
+        if after is not None:
+            stmt = stmt.where(after_clause(KnowledgeModel.sequence, KnowledgeModel.id, after))
+        else:
+            stmt = stmt.offset(skip)
+        stmt = stmt.limit(limit)
         result = self.session.execute(stmt)
         db_knowledges = result.scalars().all()
         logger.info("Success: Retrieved %d knowledges", len(db_knowledges))
@@ -136,6 +285,49 @@ class KnowledgeRepositorySQLAlchemy(KnowledgeRepository):
             for db_knowledge in db_knowledges
         ]
 
+    def count_knowledges(self, document_id: str, meta: Optional[Dict[str, str]] = None) -> int:
+        """
+        指定されたドキュメントに属するKnowledgeの件数を取得する
+
+        Args:
+            document_id (str): Knowledgeが属するドキュメントのID
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値（すべて一致するものに絞り込む）
+
+        Returns:
+            int: Knowledgeの件数
+        """
+        logger.info("Start: Counting knowledges for document_id=%s", document_id)
+        stmt = (
+            select(func.count())
+            .select_from(KnowledgeModel)
+            .where(KnowledgeModel.document_id == document_id)
+        )
+        if meta:
+            stmt = stmt.where(meta_clause(self.session, KnowledgeModel, meta))
+        count = self.session.execute(stmt).scalar_one()
+        logger.info("Success: Counted %d knowledges", count)
+        return count
+
+    def summarize_knowledges(self, document_id: str) -> Tuple[int, Optional[datetime]]:
+        """
+        指定されたドキュメントに属するKnowledgeの件数と updated_at の最大値を1クエリで取得する（一覧の ETag 用）
+
+        Args:
+            document_id (str): Knowledgeが属するドキュメントのID
+
+        Returns:
+            Tuple[int, Optional[datetime]]: (件数, 最終更新日時)。0件の場合の日時は None
+        """
+        logger.info("Start: Summarizing knowledges for document_id=%s", document_id)
+        stmt = (
+            select(func.count(), func.max(KnowledgeModel.updated_at))
+            .select_from(KnowledgeModel)
+            .where(KnowledgeModel.document_id == document_id)
+        )
+        count, last_updated_at = self.session.execute(stmt).one()
+        logger.info("Success: Summarized %d knowledges", count)
+        return count, last_updated_at
+
     def update(self, knowledge: Knowledge) -> Knowledge:
         """
         Knowledgeを更新する
@@ -150,31 +342,51 @@ class KnowledgeRepositorySQLAlchemy(KnowledgeRepository):
             ValueError: 指定されたKnowledgeが存在しない場合
         """
         logger.info("Start: Updating knowledge with id=%s", knowledge.id)
-        stmt = select(KnowledgeModel).where(KnowledgeModel.id == knowledge.id)
-        db_knowledge = self.session.execute(stmt).scalar_one_or_none()
-        if not db_knowledge:
+        # 本文の文字数の差分を集計値に反映する（更新前の行を参照するため UPDATE より先に行う）
+        stats.knowledge_updating(self.session, knowledge.id, stats.characters(knowledge.knowledge_text))
+        # 事前の SELECT は行わず、UPDATE ... WHERE id の結果（RETURNING / rowcount）で存在を判定する
+        stmt = (
+            update(KnowledgeModel)
+            .where(KnowledgeModel.id == knowledge.id)
+            .values(
+                sequence=knowledge.sequence,
+                knowledge_text=knowledge.knowledge_text,
+                meta_data=knowledge.meta_data,
+                is_active=knowledge.is_active,
+                updated_at=(
+                    knowledge.updated_at if knowledge.updated_at is not None else datetime.now()
+                ),
+            )
+        )
+        if supports_returning(self.session, "update"):
+            row = self.session.execute(
+                stmt.returning(*KnowledgeModel.__table__.c)
+            ).one_or_none()
+            updated = Knowledge(**row._mapping) if row else None
+        else:
+            result = self.session.execute(stmt)
+            updated = self.get_by_id(knowledge.id) if result.rowcount else None
+        if updated is None:
+            self._rollback()
             logger.error("Error: Knowledge not found for update with id=%s", knowledge.id)
             raise ValueError(f"Knowledge with id {knowledge.id} not found")
-        db_knowledge.sequence = knowledge.sequence
-        db_knowledge.knowledge_text = knowledge.knowledge_text
-        db_knowledge.meta_data = knowledge.meta_data
-        db_knowledge.is_active = knowledge.is_active
-        db_knowledge.updated_at = (
-            knowledge.updated_at if knowledge.updated_at is not None else datetime.now()
+        mark_changed(self.session, "knowledges", updated.document_id)
+        # 無効化された Knowledge は検索対象から外す
+        record_index_changes(
+            self.session,
+            ["knowledge", updated.id, updated.document_id, updated.knowledge_text]
+            if updated.is_active
+            else ["remove", updated.id],
         )
-        self.session.commit()
-        self.session.refresh(db_knowledge)
-        logger.info("Success: Updated knowledge with id=%s", knowledge.id)
-        return Knowledge(
-            id=db_knowledge.id,
-            document_id=db_knowledge.document_id,
-            sequence=db_knowledge.sequence,
-            knowledge_text=db_knowledge.knowledge_text,
-            meta_data=db_knowledge.meta_data,
-            is_active=db_knowledge.is_active,
-            created_at=db_knowledge.created_at,
-            updated_at=db_knowledge.updated_at,
+        embeddings.knowledge_embedding_replaced(
+            self.session, (updated.id, updated.document_id, updated.knowledge_text, updated.is_active)
         )
+        changes.record_change(
+            self.session, "knowledge", updated.id, "update", document_id=updated.document_id
+        )
+        self._commit()
+        logger.info("Success: Updated knowledge with id=%s", knowledge.id)
+        return updated
 
     def delete(self, knowledge_id: str) -> bool:
         """
@@ -187,14 +399,30 @@ class KnowledgeRepositorySQLAlchemy(KnowledgeRepository):
             bool: 削除に成功した場合は True、存在しなければ False
         """
         logger.info("Start: Deleting knowledge with id=%s", knowledge_id)
-        stmt = select(KnowledgeModel).where(KnowledgeModel.id == knowledge_id)
-        db_knowledge = self.session.execute(stmt).scalar_one_or_none()
-        if not db_knowledge:
+        # 集計値から引く（削除前の行を参照するため DELETE より先に行う）
+        stats.knowledge_deleting(self.session, knowledge_id)
+        stmt = delete(KnowledgeModel).where(KnowledgeModel.id == knowledge_id)
+        # 一覧キャッシュを無効化するため、削除した行の document_id を受け取る
+        if supports_returning(self.session, "delete"):
+            document_id = self.session.execute(
+                stmt.returning(KnowledgeModel.document_id)
+            ).scalar_one_or_none()
+        else:
+            document_id = self.session.execute(
+                select(KnowledgeModel.document_id).where(KnowledgeModel.id == knowledge_id)
+            ).scalar_one_or_none()
+            if document_id is not None and not self.session.execute(stmt).rowcount:
+                document_id = None
+        if document_id is None:
+            self._rollback()
             logger.error(
                 "Error: Knowledge not found for deletion with id=%s", knowledge_id
             )
             return False
-        self.session.delete(db_knowledge)
-        self.session.commit()
+        mark_changed(self.session, "knowledges", document_id)
+        record_index_changes(self.session, ["remove", knowledge_id])
+        embeddings.knowledge_embedding_deleted(self.session, knowledge_id)
+        changes.record_change(self.session, "knowledge", knowledge_id, "delete", document_id=document_id)
+        self._commit()
         logger.info("Success: Deleted knowledge with id=%s", knowledge_id)
         return True
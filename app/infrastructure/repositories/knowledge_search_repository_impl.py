@@ -0,0 +1,147 @@
+import logging
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.domain.entities.knowledge_search import KnowledgeSearchHit
+from app.domain.repositories.knowledge_search_repository import KnowledgeSearchRepository
+from app.infrastructure.database.meta_filter import meta_clause
+from app.infrastructure.database.models import KnowledgeModel
+from app.infrastructure.search.full_text import full_text_search
+from app.infrastructure.search.knowledge_index import SEARCH_BACKEND, KnowledgeIndex, knowledge_index
+
+# モジュール固有のロガー（ログは英語で出力）
+logger = logging.getLogger(__name__)
+
+# meta で絞り込む場合に、索引のヒットを1クエリで照合する件数
+META_FILTER_BATCH_SIZE = 500
+
+
+class KnowledgeSearchRepositoryInvertedIndex(KnowledgeSearchRepository):
+    """
+    BM25 の全文検索索引（knowledge_index）を利用した KnowledgeSearchRepository の実装
+
+    索引は meta_data を持たないため、meta を指定した場合は索引のヒットをスコア順に
+    META_FILTER_BATCH_SIZE 件ずつ DB の meta_data と照合する（総件数を求めるため全てのヒットを照合する）。
+    """
+
+    def __init__(self, index: KnowledgeIndex = knowledge_index, session: Optional[Session] = None):
+        """
+        コンストラクタ
+
+        Args:
+            index (KnowledgeIndex): 検索に使う索引（既定はプロセス共有の索引）
+            session (Optional[Session]): meta の照合に使う DB セッション（meta を指定する場合は必須）
+        """
+        self.index = index
+        self.session = session
+
+    def search(
+        self,
+        query: str,
+        dataset_id: Optional[str] = None,
+        limit: int = 10,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> Tuple[List[KnowledgeSearchHit], int]:
+        """
+        Knowledge本文を検索する
+
+        Args:
+            query (str): 検索語
+            dataset_id (Optional[str]): 指定した場合はそのデータセットのKnowledgeに絞り込む
+            limit (int): 返す件数の上限
+            meta (Optional[Dict[str, str]]): meta_data の絞り込み条件
+
+        Returns:
+            Tuple[List[KnowledgeSearchHit], int]: (スコアの降順のヒット, 一致した総件数)
+        """
+        logger.info("Start: Searching knowledges with dataset_id=%s, limit=%d", dataset_id, limit)
+        if meta:
+            ranked, total = self._search_with_meta(query, dataset_id, limit, meta)
+        else:
+            ranked, total = self.index.search(query, dataset_id=dataset_id, limit=limit)
+        logger.info("Success: Found %d knowledges", total)
+        return [KnowledgeSearchHit(knowledge_id=knowledge_id, score=score) for knowledge_id, score in ranked], total
+
+
+    def _search_with_meta(
+        self, query: str, dataset_id: Optional[str], limit: int, meta: Dict[str, str]
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        """索引の全てのヒットをスコア順に meta_data と照合し、一致した上位 limit 件と件数を返す"""
+        if self.session is None:
+            raise ValueError("A session is required to filter search results by meta")
+        ranked, _ = self.index.search(query, dataset_id=dataset_id, limit=sys.maxsize)
+        condition = meta_clause(self.session, KnowledgeModel, meta)
+        matched: List[Tuple[str, float]] = []
+        total = 0
+        for start in range(0, len(ranked), META_FILTER_BATCH_SIZE):
+            batch = ranked[start : start + META_FILTER_BATCH_SIZE]
+            matching_ids = set(
+                self.session.scalars(
+                    select(KnowledgeModel.id).where(
+                        KnowledgeModel.id.in_([knowledge_id for knowledge_id, _ in batch]), condition
+                    )
+                )
+            )
+            for knowledge_id, score in batch:
+                if knowledge_id in matching_ids:
+                    total += 1
+                    if len(matched) < limit:
+                        matched.append((knowledge_id, score))
+        return matched, total
+
+
+class KnowledgeSearchRepositoryDatabase(KnowledgeSearchRepository):
+    """
+    DB の全文検索（full_text）を利用した KnowledgeSearchRepository の実装（SEARCH_BACKEND=database）
+    """
+
+    def __init__(self, session: Session):
+        """
+        コンストラクタ
+
+        Args:
+            session (Session): 検索に使う DB セッション（方言で全文検索の文を選ぶ）
+        """
+        self.session = session
+
+    def search(
+        self,
+        query: str,
+        dataset_id: Optional[str] = None,
+        limit: int = 10,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> Tuple[List[KnowledgeSearchHit], int]:
+        """
+        Knowledge本文を検索する
+
+        Args:
+            query (str): 検索語
+            dataset_id (Optional[str]): 指定した場合はそのデータセットのKnowledgeに絞り込む
+            limit (int): 返す件数の上限
+            meta (Optional[Dict[str, str]]): meta_data の絞り込み条件（検索の SQL の条件に加える）
+
+        Returns:
+            Tuple[List[KnowledgeSearchHit], int]: (スコアの降順のヒット, 一致した総件数)
+        """
+        logger.info("Start: Searching knowledges in database with dataset_id=%s, limit=%d", dataset_id, limit)
+        ranked, total = full_text_search(self.session, query, dataset_id=dataset_id, limit=limit, meta=meta)
+        logger.info("Success: Found %d knowledges", total)
+        return [KnowledgeSearchHit(knowledge_id=knowledge_id, score=score) for knowledge_id, score in ranked], total
+
+
+def get_knowledge_search_repository(session: Session) -> KnowledgeSearchRepository:
+    """
+    SEARCH_BACKEND に応じた KnowledgeSearchRepository を返す
+
+    Args:
+        session (Session): DB の全文検索で使う DB セッション
+
+    Returns:
+        KnowledgeSearchRepository: database の場合は DB の全文検索、それ以外はプロセス内の索引を使う実装
+    """
+    if SEARCH_BACKEND == "database":
+        return KnowledgeSearchRepositoryDatabase(session)
+    return KnowledgeSearchRepositoryInvertedIndex(session=session)
@@ -0,0 +1,81 @@
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.domain.entities.knowledge_search import KnowledgeSearchHit
+from app.domain.repositories.knowledge_search_repository import SearchUnavailableError
+from app.domain.repositories.knowledge_vector_search_repository import KnowledgeVectorSearchRepository
+from app.infrastructure.database.connection import SessionLocal
+from app.infrastructure.database.offload import run_blocking
+from app.infrastructure.embedding.embedder import Embedder, get_embedder
+from app.infrastructure.repositories.embedding_repository_impl import (
+    load_dataset_embedding_ids,
+    load_dataset_embeddings,
+)
+from app.infrastructure.search.vector_index import VECTOR_SEARCH_ENABLED, VectorIndex, vector_index
+
+# モジュール固有のロガー（ログは英語で出力）
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeVectorSearchRepositoryNumpy(KnowledgeVectorSearchRepository):
+    """
+    データセットごとの埋め込みの索引（vector_index。総当たりの行列または HNSW）で検索する
+    KnowledgeVectorSearchRepository の実装
+    """
+
+    def __init__(
+        self,
+        index: VectorIndex = vector_index,
+        embedder: Optional[Embedder] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            index (VectorIndex): 検索に使う索引（既定はプロセス共有の索引）
+            embedder (Optional[Embedder]): 検索語の埋め込みの実装（既定は get_embedder()）
+            session_factory (Callable[[], Session]): 未読み込みのデータセットの埋め込みを読むセッションを返す関数
+                （レプリカの遅延で直前の書き込みを取りこぼさないよう、既定はプライマリ）
+        """
+        self.index = index
+        self.embedder = embedder or get_embedder()
+        self.session_factory = session_factory
+
+    def search(self, query: str, dataset_id: str, limit: int = 10) -> List[KnowledgeSearchHit]:
+        """
+        検索語に意味の近いKnowledgeを探す
+
+        Args:
+            query (str): 検索語
+            dataset_id (str): 検索対象のデータセットID
+            limit (int): 返す件数の上限
+
+        Returns:
+            List[KnowledgeSearchHit]: 類似度の降順のヒット
+
+        Raises:
+            SearchUnavailableError: ベクトル検索が無効化されている場合
+        """
+        if not VECTOR_SEARCH_ENABLED:
+            raise SearchUnavailableError("Vector search is disabled")
+        logger.info("Start: Vector searching knowledges with dataset_id=%s, limit=%d", dataset_id, limit)
+
+        def load(since: Optional[datetime]):
+            with self.session_factory() as session:
+                yield from load_dataset_embeddings(session, dataset_id, self.embedder.name, since)
+
+        def load_ids():
+            with self.session_factory() as session:
+                return list(load_dataset_embedding_ids(session, dataset_id, self.embedder.name))
+
+        def search():
+            return self.index.search(dataset_id, self.embedder.embed([query])[0], limit, load, load_ids)
+
+        # 埋め込みの計算・未読み込みのデータセットの読み込み・探索はイベントループの外で行う
+        ranked = run_blocking(search)
+        logger.info("Success: Found %d knowledges", len(ranked))
+        return [KnowledgeSearchHit(knowledge_id=knowledge_id, score=score) for knowledge_id, score in ranked]
@@ -0,0 +1,384 @@
+"""
+データセット・ドキュメントの集計値（dataset_stats / document_stats）
+
+集計値は各リポジトリ実装の作成・更新・削除が、本体の書き込みと同じトランザクションで
+このモジュールの関数を呼んで差分更新する（count = count + 1 のような UPDATE のため並行実行でも加算は失われない）。
+文字数の差分は更新・削除前の行から SQL 側で求めるため、事前の SELECT は行わない。
+文字数は Unicode のコードポイント数で数える（Python 側は characters、SQL 側は char_length で、
+作成時に加える値と更新・削除・再集計で SQL から求める値が全ての DB で一致するようにする）。
+
+同じ行への並行更新の読み取りの行き違いや、集計値の導入前に作成された行などで値がずれた場合は
+StatsRepositorySQLAlchemy.recompute（scripts/recompute_stats.py）で数え直す。
+再集計中のデータセットへの書き込みの差分は失われうるため、書き込みの少ない時間帯に実行すること。
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Integer, delete, func, insert, literal, select, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.domain.entities.dataset_stats import DatasetStats, DocumentStats
+from app.domain.repositories.stats_repository import StatsRepository
+from app.infrastructure.database.models.dataset import DatasetModel
+from app.infrastructure.database.models.document import DocumentModel
+from app.infrastructure.database.models.knowledge import KnowledgeModel
+from app.infrastructure.database.models.stats import DatasetStatsModel, DocumentStatsModel
+
+# モジュール固有のロガー（ログは英語で出力）
+logger = logging.getLogger(__name__)
+
+
+# SQL Server で補助文字（サロゲートペア）を1文字として数えるための照合順序
+MSSQL_CHARACTER_COLLATION = "Latin1_General_100_CI_AS_SC"
+
+
+class char_length(FunctionElement):
+    """
+    文字列のコードポイント数（Python の len と同じ数え方。NULL は NULL）
+
+    SQLite・PostgreSQL の LENGTH はコードポイント数を返す。SQL Server の LEN は末尾の空白を除き、
+    補助文字を2文字と数えるため、補助文字対応の照合順序で末尾に1文字足して数えてから1を引く。
+    """
+
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(char_length)
+def _compile_char_length(element, compiler, **kw):
+    return "LENGTH(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(char_length, "mssql")
+def _compile_char_length_mssql(element, compiler, **kw):
+    return "(LEN((%s COLLATE %s) + N'.') - 1)" % (
+        compiler.process(element.clauses, **kw),
+        MSSQL_CHARACTER_COLLATION,
+    )
+
+
+def characters(text: Optional[str]) -> int:
+    """
+    作成時に集計値へ加える文字数（SQL 側の char_length と同じくコードポイント数）
+
+    Args:
+        text (Optional[str]): 本文
+
+    Returns:
+        int: 文字数（None の場合は 0）
+    """
+    return len(text or "")
+
+
+def _length(column):
+    """列の文字数（NULL は 0）"""
+    return func.coalesce(char_length(column), 0)
+
+
+def _dataset_of_document(document_id: str):
+    return select(DocumentModel.dataset_id).where(DocumentModel.id == document_id).scalar_subquery()
+
+
+def dataset_created(session: Session, dataset_id: str) -> None:
+    """
+    データセットの集計値の行を作成する
+
+    Args:
+        session (Session): データセットを作成したセッション
+        dataset_id (str): データセットID
+    """
+    session.execute(insert(DatasetStatsModel).values(dataset_id=dataset_id, updated_at=datetime.now()))
+
+
+def dataset_deleted(session: Session, dataset_id: str) -> None:
+    """
+    データセットと配下のドキュメントの集計値を削除する（外部キーの CASCADE が無い DB でも残さない）
+
+    Args:
+        session (Session): データセットを削除するセッション
+        dataset_id (str): データセットID
+    """
+    session.execute(delete(DocumentStatsModel).where(DocumentStatsModel.dataset_id == dataset_id))
+    session.execute(delete(DatasetStatsModel).where(DatasetStatsModel.dataset_id == dataset_id))
+
+
+def document_created(session: Session, document_id: str, dataset_id: str, characters: int) -> None:
+    """
+    ドキュメントの集計値の行を作成し、データセットの集計値に加える
+
+    Args:
+        session (Session): ドキュメントを作成したセッション
+        document_id (str): ドキュメントID
+        dataset_id (str): 所属データセットID
+        characters (int): 本文の文字数
+    """
+    now = datetime.now()
+    session.execute(
+        insert(DocumentStatsModel).values(document_id=document_id, dataset_id=dataset_id, updated_at=now)
+    )
+    session.execute(
+        update(DatasetStatsModel)
+        .where(DatasetStatsModel.dataset_id == dataset_id)
+        .values(
+            document_count=DatasetStatsModel.document_count + 1,
+            document_characters=DatasetStatsModel.document_characters + characters,
+            updated_at=now,
+        )
+    )
+
+
+def document_updating(session: Session, document_id: str, characters: int) -> None:
+    """
+    ドキュメント本文の更新前に、文字数の差分をデータセットの集計値に反映する
+
+    Args:
+        session (Session): ドキュメントを更新するセッション
+        document_id (str): ドキュメントID
+        characters (int): 更新後の本文の文字数
+    """
+    old_characters = (
+        select(_length(DocumentModel.content)).where(DocumentModel.id == document_id).scalar_subquery()
+    )
+    session.execute(
+        update(DatasetStatsModel)
+        .where(DatasetStatsModel.dataset_id == _dataset_of_document(document_id))
+        .values(
+            document_characters=DatasetStatsModel.document_characters + characters - old_characters,
+            updated_at=datetime.now(),
+        )
+    )
+
+
+def document_deleting(session: Session, document_id: str) -> None:
+    """
+    ドキュメントの削除前に、ドキュメントと配下の Knowledge の分をデータセットの集計値から引く
+
+    Args:
+        session (Session): ドキュメントを削除するセッション
+        document_id (str): ドキュメントID
+    """
+
+    def document_value(column):
+        return func.coalesce(
+            select(column).where(DocumentStatsModel.document_id == document_id).scalar_subquery(), 0
+        )
+
+    content_characters = func.coalesce(
+        select(_length(DocumentModel.content)).where(DocumentModel.id == document_id).scalar_subquery(), 0
+    )
+    session.execute(
+        update(DatasetStatsModel)
+        .where(DatasetStatsModel.dataset_id == _dataset_of_document(document_id))
+        .values(
+            document_count=DatasetStatsModel.document_count - 1,
+            document_characters=DatasetStatsModel.document_characters - content_characters,
+            knowledge_count=DatasetStatsModel.knowledge_count - document_value(DocumentStatsModel.knowledge_count),
+            knowledge_characters=DatasetStatsModel.knowledge_characters
+            - document_value(DocumentStatsModel.knowledge_characters),
+            updated_at=datetime.now(),
+        )
+    )
+    session.execute(delete(DocumentStatsModel).where(DocumentStatsModel.document_id == document_id))
+
+
+def knowledges_added(session: Session, counts: Dict[str, Tuple[int, int]]) -> None:
+    """
+    作成した Knowledge をドキュメント・データセットの集計値に加える
+
+    Args:
+        session (Session): Knowledge を作成したセッション
+        counts (Dict[str, Tuple[int, int]]): ドキュメントID → (件数, 本文の合計文字数)
+    """
+    now = datetime.now()
+    for document_id, (count, characters) in counts.items():
+        _add_knowledges(session, document_id, count, characters, now)
+
+
+def knowledge_updating(session: Session, knowledge_id: str, characters: int) -> None:
+    """
+    Knowledge 本文の更新前に、文字数の差分をドキュメント・データセットの集計値に反映する
+
+    Args:
+        session (Session): Knowledge を更新するセッション
+        knowledge_id (str): Knowledge ID
+        characters (int): 更新後の本文の文字数
+    """
+    old_characters = (
+        select(_length(KnowledgeModel.knowledge_text)).where(KnowledgeModel.id == knowledge_id).scalar_subquery()
+    )
+    document_id = select(KnowledgeModel.document_id).where(KnowledgeModel.id == knowledge_id).scalar_subquery()
+    _add_knowledges(session, document_id, 0, characters - old_characters, datetime.now())
+
+
+def knowledge_deleting(session: Session, knowledge_id: str) -> None:
+    """
+    Knowledge の削除前に、その分をドキュメント・データセットの集計値から引く
+
+    Args:
+        session (Session): Knowledge を削除するセッション
+        knowledge_id (str): Knowledge ID
+    """
+    characters = (
+        select(_length(KnowledgeModel.knowledge_text)).where(KnowledgeModel.id == knowledge_id).scalar_subquery()
+    )
+    document_id = select(KnowledgeModel.document_id).where(KnowledgeModel.id == knowledge_id).scalar_subquery()
+    _add_knowledges(session, document_id, -1, -characters, datetime.now())
+
+
+def _add_knowledges(session: Session, document_id, count: int, characters, now: datetime) -> None:
+    """ドキュメントとその所属データセットの Knowledge 件数・文字数に加算する（document_id は値またはサブクエリ）"""
+    session.execute(
+        update(DocumentStatsModel)
+        .where(DocumentStatsModel.document_id == document_id)
+        .values(
+            knowledge_count=DocumentStatsModel.knowledge_count + count,
+            knowledge_characters=DocumentStatsModel.knowledge_characters + characters,
+            updated_at=now,
+        )
+    )
+    dataset_id = (
+        select(DocumentStatsModel.dataset_id).where(DocumentStatsModel.document_id == document_id).scalar_subquery()
+    )
+    session.execute(
+        update(DatasetStatsModel)
+        .where(DatasetStatsModel.dataset_id == dataset_id)
+        .values(
+            knowledge_count=DatasetStatsModel.knowledge_count + count,
+            knowledge_characters=DatasetStatsModel.knowledge_characters + characters,
+            updated_at=now,
+        )
+    )
+
+
+class StatsRepositorySQLAlchemy(StatsRepository):
+    """SQLAlchemy を用いた StatsRepository の実装"""
+
+    def __init__(self, session: Session):
+        """
+        コンストラクタ
+
+        Args:
+            session (Session): 同期的な DB セッション
+        """
+        self.session = session
+
+    def get_dataset_stats(self, dataset_id: str) -> Optional[DatasetStats]:
+        """
+        データセットの集計値を取得する
+
+        Args:
+            dataset_id (str): データセットID
+
+        Returns:
+            Optional[DatasetStats]: 集計値。行が無い場合は None
+        """
+        logger.info("Start: Retrieving stats for dataset_id=%s", dataset_id)
+        row = self.session.execute(
+            select(*DatasetStatsModel.__table__.c).where(DatasetStatsModel.dataset_id == dataset_id)
+        ).one_or_none()
+        if row is None:
+            logger.info("Success: No stats for dataset_id=%s", dataset_id)
+            return None
+        logger.info("Success: Retrieved stats for dataset_id=%s", dataset_id)
+        return DatasetStats(**row._mapping)
+
+    def get_document_stats(self, document_id: str) -> Optional[DocumentStats]:
+        """
+        ドキュメントの集計値を取得する
+
+        Args:
+            document_id (str): ドキュメントID
+
+        Returns:
+            Optional[DocumentStats]: 集計値。行が無い場合は None
+        """
+        logger.info("Start: Retrieving stats for document_id=%s", document_id)
+        row = self.session.execute(
+            select(*DocumentStatsModel.__table__.c).where(DocumentStatsModel.document_id == document_id)
+        ).one_or_none()
+        if row is None:
+            logger.info("Success: No stats for document_id=%s", document_id)
+            return None
+        logger.info("Success: Retrieved stats for document_id=%s", document_id)
+        return DocumentStats(**row._mapping)
+
+    def recompute(self, dataset_id: Optional[str] = None) -> int:
+        """
+        集計値を元のテーブルから数え直す（データセットごとに1トランザクションでコミットする）
+
+        Args:
+            dataset_id (Optional[str]): 対象のデータセットID（None の場合は全データセット）
+
+        Returns:
+            int: 再集計したデータセット数
+        """
+        logger.info("Start: Recomputing stats for dataset_id=%s", dataset_id or "all")
+        if dataset_id is not None:
+            dataset_ids: Iterable[str] = [dataset_id]
+        else:
+            dataset_ids = self.session.execute(select(DatasetModel.id).order_by(DatasetModel.id)).scalars().all()
+        recomputed = 0
+        for target in dataset_ids:
+            try:
+                if self._recompute_dataset(target):
+                    recomputed += 1
+                self.session.commit()
+            except Exception as e:
+                self.session.rollback()
+                logger.error("Error: Failed to recompute stats for dataset_id=%s. Error: %s", target, str(e))
+                raise
+        logger.info("Success: Recomputed stats for %d datasets", recomputed)
+        return recomputed
+
+    def _recompute_dataset(self, dataset_id: str) -> bool:
+        """1データセット分の document_stats / dataset_stats を作り直す（コミットしない）"""
+        exists = self.session.execute(select(DatasetModel.id).where(DatasetModel.id == dataset_id)).first()
+        dataset_deleted(self.session, dataset_id)
+        if exists is None:
+            return False
+        now = datetime.now()
+        knowledge_totals = (
+            select(
+                DocumentModel.id.label("document_id"),
+                DocumentModel.dataset_id,
+                func.count(KnowledgeModel.id).label("knowledge_count"),
+                func.coalesce(func.sum(_length(KnowledgeModel.knowledge_text)), 0).label("knowledge_characters"),
+                literal(now).label("updated_at"),
+            )
+            .select_from(DocumentModel)
+            .outerjoin(KnowledgeModel, KnowledgeModel.document_id == DocumentModel.id)
+            .where(DocumentModel.dataset_id == dataset_id)
+            .group_by(DocumentModel.id, DocumentModel.dataset_id)
+        )
+        self.session.execute(
+            insert(DocumentStatsModel).from_select(
+                ["document_id", "dataset_id", "knowledge_count", "knowledge_characters", "updated_at"],
+                knowledge_totals,
+            )
+        )
+        document_count, document_characters = self.session.execute(
+            select(func.count(), func.coalesce(func.sum(_length(DocumentModel.content)), 0)).where(
+                DocumentModel.dataset_id == dataset_id
+            )
+        ).one()
+        knowledge_count, knowledge_characters = self.session.execute(
+            select(
+                func.coalesce(func.sum(DocumentStatsModel.knowledge_count), 0),
+                func.coalesce(func.sum(DocumentStatsModel.knowledge_characters), 0),
+            ).where(DocumentStatsModel.dataset_id == dataset_id)
+        ).one()
+        self.session.execute(
+            insert(DatasetStatsModel).values(
+                dataset_id=dataset_id,
+                document_count=document_count,
+                knowledge_count=knowledge_count,
+                document_characters=document_characters,
+                knowledge_characters=knowledge_characters,
+                updated_at=now,
+            )
+        )
+        return True
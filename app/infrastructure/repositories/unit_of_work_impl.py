@@ -0,0 +1,46 @@
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.domain.repositories.unit_of_work import UnitOfWork
+from app.infrastructure.repositories.dataset_repository_impl import (
+    DatasetRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.document_repository_impl import (
+    DocumentRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.knowledge_repository_impl import (
+    KnowledgeRepositorySQLAlchemy,
+)
+
+# モジュール固有のロガー（ログは英語で出力）
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWorkSQLAlchemy(UnitOfWork):
+    """
+    SQLAlchemy の Session を利用した UnitOfWork の実装
+
+    各リポジトリは auto_commit=False で生成され、同じ Session（同じトランザクション）を共有する。
+    """
+
+    def __init__(self, session: Session):
+        """
+        コンストラクタ
+
+        Args:
+            session (Session): 同期的な DB セッション
+        """
+        self.session = session
+        self.datasets = DatasetRepositorySQLAlchemy(session, auto_commit=False)
+        self.documents = DocumentRepositorySQLAlchemy(session, auto_commit=False)
+        self.knowledges = KnowledgeRepositorySQLAlchemy(session, auto_commit=False)
+
+    def commit(self) -> None:
+        """トランザクションを確定する"""
+        self.session.commit()
+        logger.info("Success: Unit of work committed")
+
+    def rollback(self) -> None:
+        """トランザクションを取り消す"""
+        self.session.rollback()
@@ -0,0 +1,12 @@
+"""
+全文検索・ベクトル検索層
+
+- tokenizer: NFKC 正規化と文字 bigram への分割（日本語のように単語区切りの無い文にも対応する）
+- bm25: BM25 によるスコア計算
+- segment: ディスク上の不変なセグメント（語辞書・圧縮したポスティング・文書長）の書き出しと mmap での読み取り
+- inverted_index: セグメントに書き出す前の書き込みを保持するメモリ上の転置インデックス
+- knowledge_index: Knowledge 用の索引の構築・書き出し・併合（リーダー）と書き込みへの追従（コミット後・他ノード）
+- full_text: DB の全文検索（SQLite FTS5・PostgreSQL の tsvector・SQL Server の全文インデックス）による検索
+- hnsw: HNSW グラフによる近似最近傍探索と .npz への保存
+- vector_index: データセットごとの埋め込みの索引（総当たりの行列・HNSW）の読み込み・更新・保存
+"""
@@ -0,0 +1,60 @@
+"""
+BM25 によるスコア計算
+
+score(D, Q) = Σ idf(t) · tf(t, D) · (k1 + 1) / (tf(t, D) + k1 · (1 - b + b · |D| / avgdl))
+idf(t) = ln(1 + (N - df(t) + 0.5) / (df(t) + 0.5))
+
+N・df・avgdl は検索対象の文書だけで求める（セグメントとメモリ上の層の合計から、削除・更新で隠した
+セグメント側の文書を除く。マージ前の削除済みの文書や更新前の版は数えない）。
+
+設定は環境変数で行う:
+
+- SEARCH_BM25_K1: 出現回数の飽和の度合い
+- SEARCH_BM25_B: 文書長による正規化の度合い（0: 正規化しない 〜 1: 完全に正規化する）
+"""
+
+import math
+import os
+
+SEARCH_BM25_K1 = float(os.getenv("SEARCH_BM25_K1", "1.2"))
+SEARCH_BM25_B = float(os.getenv("SEARCH_BM25_B", "0.75"))
+
+
+def idf(doc_count: int, doc_freq: int) -> float:
+    """
+    語の逆文書頻度を求める
+
+    Args:
+        doc_count (int): 文書の総数（N）
+        doc_freq (int): 語を含む文書数（df）
+
+    Returns:
+        float: 逆文書頻度（常に正）
+    """
+    return math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+def term_score(
+    term_idf: float,
+    term_frequency: int,
+    length: int,
+    average_length: float,
+    k1: float = SEARCH_BM25_K1,
+    b: float = SEARCH_BM25_B,
+) -> float:
+    """
+    1文書・1語のスコアを求める
+
+    Args:
+        term_idf (float): 語の逆文書頻度
+        term_frequency (int): 文書中の語の出現回数
+        length (int): 文書長（語数）
+        average_length (float): 平均文書長
+        k1 (float): 出現回数の飽和の度合い
+        b (float): 文書長による正規化の度合い
+
+    Returns:
+        float: スコア
+    """
+    norm = k1 * (1 - b + b * length / average_length) if average_length else k1
+    return term_idf * term_frequency * (k1 + 1) / (term_frequency + norm)
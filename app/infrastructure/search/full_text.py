@@ -0,0 +1,256 @@
+"""
+DB の全文検索による Knowledge 本文の検索（SEARCH_BACKEND=database）
+
+プロセス内の索引（knowledge_index）を持てない構成向けに、検索を DB の全文検索に任せる。
+使う機能は接続先（DATABASE_URL）の方言で決まる:
+
+- sqlite: FTS5 の仮想テーブル knowledges_fts（trigram トークナイザ）。トリガーで knowledges に追従させる
+- postgresql: to_tsvector('simple', knowledge_text) の式に対する GIN インデックス
+- mssql: 全文カタログ knowledge_catalog と knowledges.knowledge_text の全文インデックス（日本語のワードブレーカー）
+
+いずれも検索語を空白で区切った全ての語を含む有効な Knowledge を、DB のスコア（FTS5 の bm25・
+ts_rank_cd・CONTAINSTABLE の RANK）の降順（同点は ID 順）に返す。スコアの尺度は方言ごとに異なり、
+プロセス内の索引の BM25 とも一致しない。方言ごとの違い:
+
+- sqlite: trigram は3文字未満の語を索引で引けないため、その語は LIKE で照合する（全件走査になる）
+- postgresql: 'simple' 構成は空白・記号で区切るため、区切りの無い日本語の文は文全体が1語になる
+- mssql: 全文インデックスは非同期に更新されるため、書き込みが検索に反映されるまで遅れがある
+
+全文検索の DDL（CREATE_STATEMENTS）は SEARCH_BACKEND の値によらず Alembic のマイグレーション（b7d3e5f1a2c4）で
+作成するため、後から SEARCH_BACKEND=database に切り替えてもそのまま使える。init_db（create_all）でテーブルを作る
+開発環境では、起動時に create_full_text_index が同じ DDL を適用する。
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, String, column, func, literal, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.domain.repositories.knowledge_search_repository import SearchUnavailableError
+from app.infrastructure.database.meta_filter import MetaFilter, dialect_meta_clause
+from app.infrastructure.database.models import DocumentModel, KnowledgeModel
+
+# モジュール固有のロガー（ログは英語で出力）
+logger = logging.getLogger(__name__)
+
+# FTS5 の trigram トークナイザが索引で引ける語の最小の文字数
+TRIGRAM_MIN_LENGTH = 3
+# PostgreSQL の全文検索の構成（GIN インデックスの式と一致させる）
+TEXT_SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+# 方言ごとの全文検索の DDL（マイグレーション b7d3e5f1a2c4 と create_full_text_index で共通）
+CREATE_STATEMENTS: Dict[str, List[str]] = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE knowledges_fts USING fts5(knowledge_id UNINDEXED, knowledge_text, tokenize='trigram')",
+        """
+        CREATE TRIGGER knowledges_fts_insert AFTER INSERT ON knowledges BEGIN
+            INSERT INTO knowledges_fts (knowledge_id, knowledge_text) VALUES (new.id, new.knowledge_text);
+        END
+        """,
+        """
+        CREATE TRIGGER knowledges_fts_update AFTER UPDATE OF knowledge_text ON knowledges BEGIN
+            DELETE FROM knowledges_fts WHERE knowledge_id = old.id;
+            INSERT INTO knowledges_fts (knowledge_id, knowledge_text) VALUES (new.id, new.knowledge_text);
+        END
+        """,
+        """
+        CREATE TRIGGER knowledges_fts_delete AFTER DELETE ON knowledges BEGIN
+            DELETE FROM knowledges_fts WHERE knowledge_id = old.id;
+        END
+        """,
+        "INSERT INTO knowledges_fts (knowledge_id, knowledge_text) SELECT id, knowledge_text FROM knowledges",
+    ],
+    "postgresql": [
+        "CREATE INDEX ix_knowledges_knowledge_text_fts ON knowledges "
+        "USING gin (to_tsvector('simple'::regconfig, COALESCE(knowledge_text, '')))",
+    ],
+    "mssql": [
+        "CREATE UNIQUE INDEX ux_knowledges_fulltext_key ON knowledges (id)",
+        "CREATE FULLTEXT CATALOG knowledge_catalog",
+        "CREATE FULLTEXT INDEX ON knowledges (knowledge_text LANGUAGE 1041) "
+        "KEY INDEX ux_knowledges_fulltext_key ON knowledge_catalog WITH CHANGE_TRACKING AUTO",
+    ],
+}
+# 方言ごとの全文検索の DDL を取り消す文（マイグレーション b7d3e5f1a2c4 の downgrade で使う）
+DROP_STATEMENTS: Dict[str, List[str]] = {
+    "sqlite": [
+        "DROP TRIGGER IF EXISTS knowledges_fts_delete",
+        "DROP TRIGGER IF EXISTS knowledges_fts_update",
+        "DROP TRIGGER IF EXISTS knowledges_fts_insert",
+        "DROP TABLE IF EXISTS knowledges_fts",
+    ],
+    "postgresql": [
+        "DROP INDEX IF EXISTS ix_knowledges_knowledge_text_fts",
+    ],
+    "mssql": [
+        "IF EXISTS (SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('knowledges')) "
+        "DROP FULLTEXT INDEX ON knowledges",
+        "IF EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = 'knowledge_catalog') "
+        "DROP FULLTEXT CATALOG knowledge_catalog",
+        "DROP INDEX IF EXISTS ux_knowledges_fulltext_key ON knowledges",
+    ],
+}
+# 全文検索の DDL が適用済みかを調べる文
+EXISTS_STATEMENTS: Dict[str, str] = {
+    "sqlite": "SELECT 1 FROM sqlite_master WHERE name = 'knowledges_fts'",
+    "postgresql": "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_knowledges_knowledge_text_fts'",
+    "mssql": "SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('knowledges')",
+}
+
+
+def _sqlite_statement(terms: List[str]) -> Select:
+    # 3文字以上の語は FTS5 の MATCH（各語をフレーズとして AND）で、それ未満の語は LIKE で照合する。
+    # bm25() は仮想テーブルを直接読む文でしか使えないため、副問い合わせで先にスコアを求める
+    fts = table("knowledges_fts", column("knowledge_id", String), column("knowledge_text", String))
+    indexed = [term for term in terms if len(term) >= TRIGRAM_MIN_LENGTH]
+    score = -func.bm25(literal_column("knowledges_fts")) if indexed else literal(0.0, Float)
+    matched = select(fts.c.knowledge_id, score.label("score"))
+    if indexed:
+        matched = matched.where(
+            literal_column("knowledges_fts").op("MATCH")(" ".join(_quoted(term) for term in indexed))
+        )
+    for term in terms:
+        if len(term) < TRIGRAM_MIN_LENGTH:
+            matched = matched.where(fts.c.knowledge_text.like(f"%{_escape_like(term)}%", escape="\\"))
+    matched = matched.subquery("matched")
+    return select(KnowledgeModel.id, matched.c.score).join(matched, matched.c.knowledge_id == KnowledgeModel.id)
+
+
+def _postgresql_statement(terms: List[str]) -> Select:
+    # GIN インデックスを使えるよう、式はインデックスの定義と同じ形にする（構成はリテラルで書く）
+    vector = func.to_tsvector(TEXT_SEARCH_CONFIG, func.coalesce(KnowledgeModel.knowledge_text, literal_column("''")))
+    query = func.plainto_tsquery(TEXT_SEARCH_CONFIG, " ".join(terms))
+    return select(KnowledgeModel.id, func.ts_rank_cd(vector, query)).where(vector.op("@@")(query))
+
+
+def _mssql_statement(terms: List[str]) -> Select:
+    matches = (
+        func.containstable(
+            literal_column("knowledges"),
+            literal_column("knowledge_text"),
+            " AND ".join(_quoted(term) for term in terms),
+        )
+        .table_valued(column("KEY", String), column("RANK", Integer))
+        .alias("ft")
+    )
+    return (
+        select(KnowledgeModel.id, matches.c.RANK)
+        .select_from(matches)
+        .join(KnowledgeModel, KnowledgeModel.id == matches.c.KEY)
+    )
+
+
+STATEMENT_BUILDERS: Dict[str, Callable[[List[str]], Select]] = {
+    "sqlite": _sqlite_statement,
+    "postgresql": _postgresql_statement,
+    "mssql": _mssql_statement,
+}
+
+
+def search_statement(
+    dialect: str, query: str, dataset_id: Optional[str], limit: int, meta: Optional[MetaFilter] = None
+) -> Optional[Select]:
+    """
+    方言に応じた全文検索の SELECT 文を組み立てる
+
+    Args:
+        dialect (str): 接続先の方言名（sqlite / postgresql / mssql）
+        query (str): 検索語（空白で区切った全ての語を含むものに一致する）
+        dataset_id (Optional[str]): 指定した場合はそのデータセットの Knowledge に絞り込む
+        limit (int): 返す件数の上限
+        meta (Optional[MetaFilter]): meta_data の絞り込み条件（総件数も絞り込んだ後の件数になる）
+
+    Returns:
+        Optional[Select]: (Knowledge ID, スコア, 一致した総件数) を返す文。検索語が空の場合は None
+
+    Raises:
+        SearchUnavailableError: 方言が全文検索に対応していない場合
+    """
+    builder = STATEMENT_BUILDERS.get(dialect)
+    if builder is None:
+        raise SearchUnavailableError(f"Full-text search is not supported on '{dialect}'")
+    terms = list(dict.fromkeys(query.split()))
+    if not terms:
+        return None
+    stmt = builder(terms)
+    score = stmt.selected_columns[1]
+    stmt = stmt.where(KnowledgeModel.is_active)
+    condition = dialect_meta_clause(dialect, KnowledgeModel, meta)
+    if condition is not None:
+        stmt = stmt.where(condition)
+    if dataset_id is not None:
+        stmt = stmt.join(DocumentModel, DocumentModel.id == KnowledgeModel.document_id).where(
+            DocumentModel.dataset_id == dataset_id
+        )
+    return stmt.add_columns(func.count().over()).order_by(score.desc(), KnowledgeModel.id).limit(limit)
+
+
+def full_text_search(
+    session: Session,
+    query: str,
+    dataset_id: Optional[str] = None,
+    limit: int = 10,
+    meta: Optional[MetaFilter] = None,
+) -> Tuple[List[Tuple[str, float]], int]:
+    """
+    DB の全文検索で Knowledge 本文を検索する
+
+    Args:
+        session (Session): 読み取りに使うセッション
+        query (str): 検索語
+        dataset_id (Optional[str]): 指定した場合はそのデータセットの Knowledge に絞り込む
+        limit (int): 返す件数の上限
+        meta (Optional[MetaFilter]): meta_data の絞り込み条件
+
+    Returns:
+        Tuple[List[Tuple[str, float]], int]: ([(Knowledge ID, スコア)], 一致した総件数)
+
+    Raises:
+        SearchUnavailableError: 方言が全文検索に対応していない場合
+    """
+    stmt = search_statement(session.get_bind().dialect.name, query, dataset_id, limit, meta)
+    if stmt is None:
+        return [], 0
+    rows = session.execute(stmt).all()
+    total = rows[0][2] if rows else 0
+    return [(knowledge_id, float(score or 0.0)) for knowledge_id, score, _ in rows], total
+
+
+def create_full_text_index(engine: Engine) -> bool:
+    """
+    全文検索の DDL を適用する（適用済みの場合は何もしない）
+
+    SQL Server の全文カタログ・インデックスはトランザクション内で作れないため、自動コミットで実行する。
+
+    Args:
+        engine (Engine): 対象の DB のエンジン
+
+    Returns:
+        bool: 新たに作成した場合は True
+
+    Raises:
+        SearchUnavailableError: 方言が全文検索に対応していない場合
+    """
+    dialect = engine.dialect.name
+    if dialect not in CREATE_STATEMENTS:
+        raise SearchUnavailableError(f"Full-text search is not supported on '{dialect}'")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if connection.execute(text(EXISTS_STATEMENTS[dialect])).first() is not None:
+            return False
+        logger.info("Start: Creating full-text index on %s", dialect)
+        for statement in CREATE_STATEMENTS[dialect]:
+            connection.execute(text(statement))
+    logger.info("Success: Created full-text index on %s", dialect)
+    return True
+
+
+def _quoted(term: str) -> str:
+    # FTS5・CONTAINS のフレーズとして二重引用符で囲む（内側の二重引用符は重ねる）
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,380 @@
+"""
+HNSW（Hierarchical Navigable Small World）による近似最近傍探索
+
+Malkov & Yashunin の HNSW を、L2 正規化済みのベクトルのコサイン距離（1 - 内積）で実装する。
+
+- 追加は1件ずつグラフに挿入する（層はノードごとに確率的に決め、近傍は多様性を保つヒューリスティックで選ぶ）
+- 削除は行を無効（tombstone）にするだけで、グラフの経路としては残す。検索結果には含めず、
+  無効な行が半数を超えたら作り直す（VectorIndex.compact）
+- save / load で .npz ファイルに書き出し・読み込みする（watermark 以降の変更は呼び出し側で DB から読み直す）
+
+設定は環境変数で行う（既定値。HNSWIndex の引数で個別に指定できる）:
+
+- HNSW_M: 各ノードの近傍数（最下層はその2倍）。大きいほど再現率が上がり、メモリと挿入時間が増える
+- HNSW_EF_CONSTRUCTION: 挿入時に探索する候補数。大きいほどグラフの質が上がり、挿入が遅くなる
+- HNSW_EF_SEARCH: 検索時に探索する候補数（上位 k 件より小さい場合は k）。再現率とレイテンシの調整に使う
+"""
+
+import heapq
+import json
+import math
+import os
+import random
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+# ノード数の初期の上限（超えたら倍にする）
+INITIAL_CAPACITY = 64
+# 保存形式の版（形式を変えたら上げ、古いファイルは読まずに作り直す）
+FORMAT_VERSION = 1
+
+# 距離とノード番号の組
+Candidate = Tuple[float, int]
+
+
+class HNSWIndex:
+    """1データセット分の HNSW グラフ（追加・削除・検索は lock で直列化する）"""
+
+    def __init__(
+        self,
+        dimension: int,
+        m: int = HNSW_M,
+        ef_construction: int = HNSW_EF_CONSTRUCTION,
+        ef_search: int = HNSW_EF_SEARCH,
+        seed: Optional[int] = None,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            dimension (int): ベクトルの次元数
+            m (int): 各ノードの近傍数（最下層は 2 * m）
+            ef_construction (int): 挿入時に探索する候補数
+            ef_search (int): 検索時に探索する候補数
+            seed (Optional[int]): 層を決める乱数のシード（テスト・ベンチマークの再現用）
+        """
+        if m < 2:
+            raise ValueError("m must be at least 2")
+        self.dimension = dimension
+        self.m = m
+        self.ef_construction = max(ef_construction, m)
+        self.ef_search = ef_search
+        self.lock = threading.RLock()
+        # 最後に DB と突き合わせた時刻（time.time()。保存したファイルを開いた後の読み直しの起点）
+        self.watermark: Optional[float] = None
+        # 最後に保存してからの変更数
+        self.changes = 0
+        self.vectors = np.zeros((INITIAL_CAPACITY, dimension), dtype=np.float32)
+        self.deleted = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        # links[ノード][層] = 近傍のノード番号
+        self.links: List[List[List[int]]] = []
+        self.labels: List[str] = []
+        self.documents: List[str] = []
+        self.nodes: Dict[str, int] = {}
+        self.knowledges_of_document: Dict[str, Set[str]] = {}
+        self.entry_point = -1
+        self.max_level = -1
+        self.dead = 0
+        self._level_multiplier = 1 / math.log(m)
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def needs_compaction(self) -> bool:
+        """無効な行が半数を超えているか"""
+        return self.dead > len(self.labels) // 2
+
+    def add_many(self, knowledge_ids: List[str], document_ids: List[str], vectors: np.ndarray) -> None:
+        """
+        ベクトルを挿入する（既にある Knowledge は古い行を無効にしてから挿入する）
+
+        Args:
+            knowledge_ids (List[str]): Knowledge ID
+            document_ids (List[str]): ドキュメントID
+            vectors (np.ndarray): ベクトル（件数 × 次元数。正規化して保持する）
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        with self.lock:
+            for knowledge_id, document_id, vector in zip(knowledge_ids, document_ids, vectors):
+                self.remove(knowledge_id)
+                self._insert(knowledge_id, document_id, vector)
+
+    def remove(self, knowledge_id: str) -> None:
+        """Knowledge の行を無効にする（グラフの経路としては残す）"""
+        with self.lock:
+            node = self.nodes.pop(knowledge_id, None)
+            if node is None:
+                return
+            self.deleted[node] = True
+            self.dead += 1
+            self.changes += 1
+            siblings = self.knowledges_of_document.get(self.documents[node])
+            if siblings is not None:
+                siblings.discard(knowledge_id)
+                if not siblings:
+                    del self.knowledges_of_document[self.documents[node]]
+
+    def remove_document(self, document_id: str) -> None:
+        """ドキュメント配下の Knowledge の行を無効にする"""
+        with self.lock:
+            for knowledge_id in list(self.knowledges_of_document.get(document_id, ())):
+                self.remove(knowledge_id)
+
+    def live_rows(self) -> Tuple[List[str], List[str], np.ndarray]:
+        """
+        有効な行をすべて返す（作り直しに使う）
+
+        Returns:
+            Tuple[List[str], List[str], np.ndarray]: (Knowledge ID, ドキュメントID, ベクトル（コピー）)
+        """
+        with self.lock:
+            keep = np.flatnonzero(~self.deleted[: len(self.labels)])
+            return (
+                [self.labels[node] for node in keep],
+                [self.documents[node] for node in keep],
+                self.vectors[keep].copy(),
+            )
+
+    def search_batch(self, queries: np.ndarray, limit: int) -> List[List[Tuple[str, float]]]:
+        """
+        検索語ごとに、コサイン類似度の降順に上位 limit 件（近似）を返す
+
+        Args:
+            queries (np.ndarray): 正規化済みの検索語の埋め込み（検索語数 × 次元数）
+            limit (int): 返す件数の上限
+
+        Returns:
+            List[List[Tuple[str, float]]]: 検索語ごとの [(Knowledge ID, 類似度)]
+        """
+        results: List[List[Tuple[str, float]]] = []
+        with self.lock:
+            for query in queries:
+                if self.entry_point < 0:
+                    results.append([])
+                    continue
+                current = self.entry_point
+                distance = self._distance(query, current)
+                for level in range(self.max_level, 0, -1):
+                    current, distance = self._greedy(query, current, distance, level)
+                found = self._search_layer(
+                    query, [(distance, current)], max(self.ef_search, limit), 0, self._is_alive
+                )
+                results.append([(self.labels[node], 1.0 - distance) for distance, node in found[:limit]])
+        return results
+
+    def save(self, path: str) -> None:
+        """
+        グラフを .npz ファイルに書き出す（一時ファイルに書いてから置き換える）
+
+        Args:
+            path (str): 書き出し先のパス
+        """
+        with self.lock:
+            size = len(self.labels)
+            levels = np.array([len(layers) - 1 for layers in self.links], dtype=np.int32)
+            counts = np.array([len(neighbors) for layers in self.links for neighbors in layers], dtype=np.int64)
+            neighbors = np.fromiter(
+                (node for layers in self.links for neighbors in layers for node in neighbors),
+                dtype=np.int64,
+                count=int(counts.sum()),
+            )
+            arrays = {
+                "vectors": self.vectors[:size].copy(),
+                "deleted": self.deleted[:size].copy(),
+                "levels": levels,
+                "counts": counts,
+                "neighbors": neighbors,
+                "labels": np.array(self.labels, dtype=np.str_),
+                "documents": np.array(self.documents, dtype=np.str_),
+            }
+            meta = {
+                "version": FORMAT_VERSION,
+                "dimension": self.dimension,
+                "m": self.m,
+                "ef_construction": self.ef_construction,
+                "entry_point": self.entry_point,
+                "max_level": self.max_level,
+                "watermark": self.watermark,
+            }
+            saved_changes = self.changes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        with self.lock:
+            self.changes -= saved_changes
+
+    @classmethod
+    def load(cls, path: str, dimension: int, ef_search: int = HNSW_EF_SEARCH) -> Optional["HNSWIndex"]:
+        """
+        save で書き出したグラフを読み込む
+
+        M・ef_construction は保存時の値を引き継ぐ（変えた場合は作り直すまで反映されない）。
+
+        Args:
+            path (str): 読み込むパス
+            dimension (int): 期待する次元数
+            ef_search (int): 検索時に探索する候補数
+
+        Returns:
+            Optional[HNSWIndex]: グラフ。ファイルが無い・形式や次元数が異なる場合は None
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["version"] != FORMAT_VERSION or meta["dimension"] != dimension:
+                return None
+            index = cls(dimension, meta["m"], meta["ef_construction"], ef_search)
+            vectors, deleted = data["vectors"], data["deleted"]
+            levels, counts, neighbors = data["levels"], data["counts"], data["neighbors"].tolist()
+            labels, documents = data["labels"].tolist(), data["documents"].tolist()
+        size = len(labels)
+        index._reserve(size)
+        index.vectors[:size] = vectors
+        index.deleted[:size] = deleted
+        offsets = np.concatenate([[0], np.cumsum(counts)]).tolist()
+        layer = 0
+        for level in levels.tolist():
+            index.links.append([neighbors[offsets[layer + i] : offsets[layer + i + 1]] for i in range(level + 1)])
+            layer += level + 1
+        index.labels, index.documents = labels, documents
+        for node, (knowledge_id, document_id) in enumerate(zip(labels, documents)):
+            if deleted[node]:
+                index.dead += 1
+                continue
+            index.nodes[knowledge_id] = node
+            index.knowledges_of_document.setdefault(document_id, set()).add(knowledge_id)
+        index.entry_point, index.max_level = meta["entry_point"], meta["max_level"]
+        index.watermark = meta["watermark"]
+        return index
+
+    def _insert(self, knowledge_id: str, document_id: str, vector: np.ndarray) -> None:
+        node = len(self.labels)
+        self._reserve(node + 1)
+        self.vectors[node] = vector
+        self.deleted[node] = False
+        level = int(-math.log(1.0 - self._random.random()) * self._level_multiplier)
+        self.links.append([[] for _ in range(level + 1)])
+        self.labels.append(knowledge_id)
+        self.documents.append(document_id)
+        self.nodes[knowledge_id] = node
+        self.knowledges_of_document.setdefault(document_id, set()).add(knowledge_id)
+        self.changes += 1
+        if self.entry_point < 0:
+            self.entry_point, self.max_level = node, level
+            return
+        current = self.entry_point
+        distance = self._distance(vector, current)
+        for layer in range(self.max_level, level, -1):
+            current, distance = self._greedy(vector, current, distance, layer)
+        entries = [(distance, current)]
+        for layer in range(min(level, self.max_level), -1, -1):
+            # 無効な行も経路として使うため、候補から除かない
+            candidates = self._search_layer(vector, entries, self.ef_construction, layer)
+            neighbors = self._select(candidates, self.m)
+            self.links[node][layer] = neighbors
+            limit = self._max_links(layer)
+            for neighbor in neighbors:
+                links = self.links[neighbor][layer]
+                links.append(node)
+                if len(links) > limit:
+                    distances = 1.0 - self.vectors[links] @ self.vectors[neighbor]
+                    self.links[neighbor][layer] = self._select(sorted(zip(distances.tolist(), links)), limit)
+            entries = candidates
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+
+    def _greedy(self, query: np.ndarray, current: int, distance: float, level: int) -> Candidate:
+        # 上の層は最も近い近傍へ移れなくなるまで進む（候補数 1 の探索）
+        while True:
+            neighbors = self.links[current][level]
+            if not neighbors:
+                return current, distance
+            distances = 1.0 - self.vectors[neighbors] @ query
+            best = int(np.argmin(distances))
+            if distances[best] >= distance:
+                return current, distance
+            current, distance = neighbors[best], float(distances[best])
+
+    def _search_layer(
+        self,
+        query: np.ndarray,
+        entries: List[Candidate],
+        ef: int,
+        level: int,
+        keep: Optional[Callable[[int], bool]] = None,
+    ) -> List[Candidate]:
+        # 近い順に ef 件を返す。keep を指定した場合、keep が偽のノードは経路としてのみ使い結果に含めない
+        visited = {node for _, node in entries}
+        candidates = list(entries)
+        heapq.heapify(candidates)
+        results = [(-distance, node) for distance, node in entries if keep is None or keep(node)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if len(results) >= ef and distance > -results[0][0]:
+                break
+            neighbors = [neighbor for neighbor in self.links[node][level] if neighbor not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            distances = (1.0 - self.vectors[neighbors] @ query).tolist()
+            for neighbor, neighbor_distance in zip(neighbors, distances):
+                if len(results) < ef or neighbor_distance < -results[0][0]:
+                    heapq.heappush(candidates, (neighbor_distance, neighbor))
+                    if keep is None or keep(neighbor):
+                        heapq.heappush(results, (-neighbor_distance, neighbor))
+                        if len(results) > ef:
+                            heapq.heappop(results)
+        return sorted((-distance, node) for distance, node in results)
+
+    def _select(self, candidates: List[Candidate], limit: int) -> List[int]:
+        # 近い順に、既に選んだ近傍のどれよりも自身に近い候補だけを選ぶ（近傍の方向を分散させる）
+        if len(candidates) <= limit:
+            return [node for _, node in candidates]
+        nodes = [node for _, node in candidates]
+        # 候補どうしの類似度はまとめて1回で計算する
+        similarities = self.vectors[nodes] @ self.vectors[nodes].T
+        selected: List[int] = []
+        for position, (distance, _) in enumerate(candidates):
+            if len(selected) >= limit:
+                break
+            if selected and 1.0 - float(similarities[position, selected].max()) < distance:
+                continue
+            selected.append(position)
+        return [nodes[position] for position in selected]
+
+    def _max_links(self, level: int) -> int:
+        return self.m * 2 if level == 0 else self.m
+
+    def _distance(self, query: np.ndarray, node: int) -> float:
+        return 1.0 - float(self.vectors[node] @ query)
+
+    def _is_alive(self, node: int) -> bool:
+        return not self.deleted[node]
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= len(self.vectors):
+            return
+        new_capacity = max(capacity, len(self.vectors) * 2)
+        vectors = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        vectors[: len(self.labels)] = self.vectors[: len(self.labels)]
+        deleted = np.zeros(new_capacity, dtype=bool)
+        deleted[: len(self.labels)] = self.deleted[: len(self.labels)]
+        self.vectors, self.deleted = vectors, deleted
@@ -0,0 +1,138 @@
+"""
+プロセス内の転置インデックス（直近の書き込みを保持するメモリ上の層）
+
+語（tokenizer.tokenize の bigram）ごとに「Knowledge ID → 出現回数」のポスティングリストを持つ。
+ディスク上のセグメント（segment.Segment）に書き出すまでの書き込みを保持し、
+検索時はセグメントと同じように参照される（knowledge_index を参照）。
+"""
+
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.infrastructure.search.tokenizer import tokenize
+
+
+class InvertedIndex:
+    """Knowledge 本文の転置インデックス（スレッドセーフ）"""
+
+    def __init__(self):
+        """コンストラクタ"""
+        self._lock = threading.RLock()
+        # 語 → {Knowledge ID: 出現回数}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # 文字 → その文字を含む bigram（1文字の検索語の展開に使う）
+        self._terms_by_char: Dict[str, Set[str]] = {}
+        # Knowledge ID → 索引した語（削除・更新時にポスティングから外すため）
+        self._terms_of: Dict[str, Tuple[str, ...]] = {}
+        self._length_of: Dict[str, int] = {}
+        self._document_of: Dict[str, str] = {}
+        self._knowledges_of_document: Dict[str, Set[str]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._terms_of)
+
+    def __contains__(self, knowledge_id: str) -> bool:
+        return knowledge_id in self._terms_of
+
+    def add(self, knowledge_id: str, document_id: str, text: str) -> None:
+        """
+        Knowledge を索引する（既に索引済みの場合は置き換える）
+
+        Args:
+            knowledge_id (str): Knowledge ID
+            document_id (str): 所属ドキュメントID
+            text (str): 本文
+        """
+        terms = tokenize(text)
+        counts = Counter(terms)
+        with self._lock:
+            self._remove(knowledge_id)
+            for term, count in counts.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = {}
+                    for char in set(term) if len(term) > 1 else ():
+                        self._terms_by_char.setdefault(char, set()).add(term)
+                posting[knowledge_id] = count
+            self._terms_of[knowledge_id] = tuple(counts)
+            self._length_of[knowledge_id] = len(terms)
+            self.total_length += len(terms)
+            self._document_of[knowledge_id] = document_id
+            self._knowledges_of_document.setdefault(document_id, set()).add(knowledge_id)
+
+    def remove(self, knowledge_id: str) -> None:
+        """
+        Knowledge を索引から外す（索引されていない場合は何もしない）
+
+        Args:
+            knowledge_id (str): Knowledge ID
+        """
+        with self._lock:
+            self._remove(knowledge_id)
+
+    def remove_document(self, document_id: str) -> None:
+        """
+        ドキュメント配下の Knowledge を索引から外す
+
+        Args:
+            document_id (str): ドキュメントID
+        """
+        with self._lock:
+            for knowledge_id in list(self._knowledges_of_document.get(document_id, ())):
+                self._remove(knowledge_id)
+            self._knowledges_of_document.pop(document_id, None)
+
+    def document_of(self, knowledge_id: str) -> Optional[str]:
+        """Knowledge の所属ドキュメントIDを返す（索引されていない場合は None）"""
+        return self._document_of.get(knowledge_id)
+
+    def length(self, knowledge_id: str) -> int:
+        """Knowledge の文書長（語数）を返す"""
+        return self._length_of.get(knowledge_id, 0)
+
+    def terms_with_char(self, char: str) -> List[str]:
+        """1文字を含む語を返す（1文字の検索語の展開に使う）"""
+        with self._lock:
+            return list(self._terms_by_char.get(char, ()))
+
+    def snapshot(self) -> List[Tuple[str, str, Dict[str, int]]]:
+        """
+        索引済みの Knowledge を書き出し用に複製する
+
+        Returns:
+            List[Tuple[str, str, Dict[str, int]]]: [(Knowledge ID, ドキュメントID, {語: 出現回数})]
+        """
+        with self._lock:
+            return [
+                (
+                    knowledge_id,
+                    self._document_of[knowledge_id],
+                    {term: self.postings[term][knowledge_id] for term in terms},
+                )
+                for knowledge_id, terms in self._terms_of.items()
+            ]
+
+    def _remove(self, knowledge_id: str) -> None:
+        terms = self._terms_of.pop(knowledge_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(knowledge_id, None)
+            if not posting:
+                del self.postings[term]
+                for char in set(term) if len(term) > 1 else ():
+                    chars = self._terms_by_char.get(char)
+                    if chars is not None:
+                        chars.discard(term)
+                        if not chars:
+                            del self._terms_by_char[char]
+        self.total_length -= self._length_of.pop(knowledge_id)
+        document_id = self._document_of.pop(knowledge_id)
+        siblings = self._knowledges_of_document.get(document_id)
+        if siblings is not None:
+            siblings.discard(knowledge_id)
@@ -0,0 +1,951 @@
+"""
+Knowledge 本文の全文検索索引（BM25）の管理
+
+索引はディスク上の不変なセグメント（segment.Segment）と、その後の書き込みを保持する
+メモリ上の層（inverted_index.InvertedIndex）からなる。セグメントの一覧はディレクトリ内の
+manifest.json で管理し、各ワーカーはセグメントを mmap して読み取り専用で共有する。
+そのため起動時の読み込み時間とワーカーごとのメモリ使用量はコーパスの大きさに比例しない。
+
+書き込みは次の順で反映する:
+
+1. リポジトリが書き込みと同じセッションに変更（索引操作）を記録する（record_index_changes）
+2. Session の after_commit で自プロセスのメモリ上の層に反映し、他ノードへ publish する
+3. 他ノードは購読スレッドでメッセージを受け取り、自身のメモリ上の層に反映する
+
+メモリ上の層で変更された Knowledge・削除されたドキュメントは、セグメント側の古い内容を隠す。
+ロールバックされた書き込みは after_transaction_end で破棄する。
+
+セグメントの書き出しは、索引ディレクトリのファイルロック（write.lock）を取得した1プロセス
+（リーダー）だけが行う。リーダーはバックグラウンドで次を行う:
+
+- 索引が無ければ DB から全件を読んでセグメントを作る（構築が終わるまで検索は 503）
+- メモリ上の層の変更が一定件数・一定時間を超えたら新しいセグメントとして書き出し（flush）、
+  削除された Knowledge を .del ファイルに記録して、manifest の watermark を進める
+- セグメント数が上限を超えたら小さいものから併合（merge）し、削除済みの文書を取り除く
+
+リーダー以外は manifest の更新を監視してセグメントを開き直し、watermark より前
+（他ノードからの通知の遅れを見込んで SEARCH_SYNC_GRACE_SECONDS だけ手前）の変更を
+メモリ上の層から捨てる。
+
+起動時に既存の索引を開いた場合は、watermark 以降に更新された Knowledge を DB から読み直し、
+変更履歴（changes）から同じ期間の削除を反映する。pub/sub で届かなかった他ノードの書き込みは、
+変更履歴の追従スレッド（change_feed）から apply_changes で反映する。
+
+設定は環境変数で行う:
+
+- SEARCH_BACKEND: index（既定）でこの索引を使う。database の場合は DB の全文検索（full_text）を使い、
+  この索引は構築も更新もしない
+- SEARCH_INDEX_ENABLED: false で索引を無効化（検索は 503 を返す）
+- SEARCH_INDEX_DIR: セグメントを置くディレクトリ（同じホストのワーカーで共有する）
+- SEARCH_FLUSH_DOCS: メモリ上の層をセグメントに書き出す変更件数
+- SEARCH_FLUSH_INTERVAL_SECONDS: 変更があればセグメントに書き出す間隔（秒）
+- SEARCH_SEGMENT_MAX_DOCS: DB からの構築時に1セグメントに入れる件数
+- SEARCH_MAX_SEGMENTS: これを超えたらセグメントを併合する
+- SEARCH_MERGE_FACTOR: 1回の併合でまとめるセグメント数
+- SEARCH_SYNC_GRACE_SECONDS: 他ノードからの通知の遅れの見込み（秒）
+
+他ノードでの書き込みは pub/sub（CACHE_BACKEND_URL）で即座に受け取る。L2 が無い・メッセージが届かなかった場合も、
+変更履歴の追従（change_feed）が数秒遅れ（CHANGE_FEED_DELAY_SECONDS + ポーリング間隔）で反映する。
+"""
+
+import fcntl
+import heapq
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.domain.entities.change import Change
+from app.domain.repositories.knowledge_search_repository import SearchUnavailableError
+from app.infrastructure.cache.backends import CacheBackend, CacheBackendError
+from app.infrastructure.cache.entity_cache import (
+    CACHE_KEY_PREFIX,
+    NODE_ID,
+    l2_backend,
+    message_handlers,
+)
+from app.infrastructure.database.change_feed import change_handlers
+from app.infrastructure.database.models import DocumentModel, KnowledgeModel
+from app.infrastructure.repositories.change_repository_impl import load_changes_since
+from app.infrastructure.search.bm25 import idf, term_score
+from app.infrastructure.search.inverted_index import InvertedIndex
+from app.infrastructure.search.segment import (
+    Segment,
+    merge_segments,
+    read_deletes,
+    write_deletes,
+    write_segment,
+)
+from app.infrastructure.search.tokenizer import tokenize
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "index").lower()
+SEARCH_INDEX_ENABLED = SEARCH_BACKEND == "index" and os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+SEARCH_INDEX_DIR = os.getenv(
+    "SEARCH_INDEX_DIR", os.path.join(tempfile.gettempdir(), "knowledge-api-search")
+)
+SEARCH_FLUSH_DOCS = int(os.getenv("SEARCH_FLUSH_DOCS", "10000"))
+SEARCH_FLUSH_INTERVAL_SECONDS = float(os.getenv("SEARCH_FLUSH_INTERVAL_SECONDS", "30"))
+SEARCH_SEGMENT_MAX_DOCS = int(os.getenv("SEARCH_SEGMENT_MAX_DOCS", "100000"))
+SEARCH_MAX_SEGMENTS = int(os.getenv("SEARCH_MAX_SEGMENTS", "8"))
+SEARCH_MERGE_FACTOR = int(os.getenv("SEARCH_MERGE_FACTOR", "4"))
+SEARCH_SYNC_GRACE_SECONDS = float(os.getenv("SEARCH_SYNC_GRACE_SECONDS", "30"))
+
+# Session.info に索引操作を溜めておくキー
+PENDING_KEY = "search_index_pending"
+# メッセージ1件あたりの索引操作数（一括作成時に分割する）
+MESSAGE_BATCH_SIZE = 100
+# 構築時に1回の読み取りで受け取る行数
+BUILD_BATCH_SIZE = 10000
+# manifest の監視・リーダーの処理の間隔（秒）
+MAINTENANCE_INTERVAL_SECONDS = 1.0
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "write.lock"
+
+# 索引操作は JSON にそのまま載せられるリストで表す:
+#   ["document", document_id, dataset_id]   ドキュメントの作成（所属データセットの登録）
+#   ["knowledge", knowledge_id, document_id, text]   Knowledge の作成・更新（有効なもの）
+#   ["remove", knowledge_id]   Knowledge の削除・無効化
+#   ["remove_document", document_id]   ドキュメントの削除（配下の Knowledge も外す）
+#   ["remove_dataset", dataset_id]   データセットの削除（配下のドキュメント・Knowledge も外す）
+Operation = List[Optional[str]]
+
+
+class _SegmentHandle:
+    """開いたセグメントと、その削除状態（.del ファイルの内容とメモリ上の層による上書き）"""
+
+    def __init__(self, name: str, segment: Segment, deletes_name: Optional[str], deleted: Set[int]):
+        self.name = name
+        self.segment = segment
+        self.deletes_name = deletes_name
+        self.deleted = deleted
+        # 検索対象から外す序数（削除済み・メモリ上の層で変更された Knowledge・削除されたドキュメントの配下）と
+        # その文書長の合計（文書数・平均文書長を検索対象の文書だけで求めるため）
+        self.hidden: Set[int] = set()
+        self.hidden_length = 0
+        self.hide(deleted)
+
+    def hide(self, ordinals: Iterable[int]) -> None:
+        """序数を検索対象から外す"""
+        for ordinal in ordinals:
+            if ordinal not in self.hidden:
+                self.hidden.add(ordinal)
+                self.hidden_length += self.segment.lengths[ordinal]
+
+    def hide_documents(self, indexes: Set[int]) -> None:
+        """ドキュメント番号に属する序数を検索対象から外す（セグメントを全件走査する）"""
+        if indexes:
+            self.hide(self.segment.ordinals_of_documents(indexes))
+
+
+class KnowledgeIndex:
+    """Knowledge の全文検索索引（セグメント＋メモリ上の層）と、その構築・更新の管理"""
+
+    def __init__(
+        self,
+        directory: str,
+        l2: Optional[CacheBackend] = None,
+        key_prefix: str = CACHE_KEY_PREFIX,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            directory (str): セグメントを置くディレクトリ
+            l2 (Optional[CacheBackend]): 索引操作の publish 先。None の場合は自プロセスのみ
+            key_prefix (str): チャネル名の接頭辞
+        """
+        self.l2 = l2
+        self.channel = f"{key_prefix}:invalidate"
+        self.message_name = "search:knowledges"
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock_file = None
+        self.reset(directory)
+
+    def reset(self, directory: Optional[str] = None) -> None:
+        """
+        開いている索引・メモリ上の層を破棄する（ディレクトリ内のファイルは消さない）
+
+        Args:
+            directory (Optional[str]): 以降に使うディレクトリ（None の場合は変更しない）
+        """
+        self.stop(flush=False)
+        with self._lock:
+            if directory is not None:
+                self.directory = directory
+            self.memtable = InvertedIndex()
+            self._segments: List[_SegmentHandle] = []
+            self._manifest: Optional[Dict[str, Any]] = None
+            self._cut = 0.0
+            # 変更・削除を反映した時刻（watermark より前のものはセグメント側に含まれる）
+            self._changes: Dict[str, float] = {}
+            self._removed_documents: Dict[str, float] = {}
+            # ドキュメントID → データセットID（データセットでの絞り込みに使う）
+            self._datasets: Dict[str, str] = {}
+            self._documents_loaded = False
+            self._last_flush = time.monotonic()
+
+    @property
+    def ready(self) -> bool:
+        """索引を開き、検索できる状態か"""
+        return self._manifest is not None and self._documents_loaded
+
+    @property
+    def is_leader(self) -> bool:
+        """このプロセスがセグメントを書き出すリーダーか"""
+        return self._lock_file is not None
+
+    @property
+    def segment_count(self) -> int:
+        """開いているセグメントの数"""
+        return len(self._segments)
+
+    def search(
+        self, query: str, dataset_id: Optional[str] = None, limit: int = 10
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        検索語の全ての語を含む Knowledge を BM25 のスコアの降順（同点は ID 順）に返す
+
+        1文字の検索語は、その文字を含むいずれかの語に一致すればよい（本文側は bigram で索引するため）。
+        文書数・平均文書長・文書頻度は、セグメントとメモリ上の層のうち検索対象になる同じ文書の集合で求める
+        （削除済み・メモリ上の層で上書きされたセグメント側の文書は含めない）。
+
+        Args:
+            query (str): 検索語
+            dataset_id (Optional[str]): 指定した場合はそのデータセットの Knowledge に絞り込む
+            limit (int): 返す件数の上限
+
+        Returns:
+            Tuple[List[Tuple[str, float]], int]: ([(Knowledge ID, スコア)], 一致した総件数)
+
+        Raises:
+            SearchUnavailableError: 無効化されている、または索引を開いていない場合
+        """
+        with self._lock:
+            if not self.ready:
+                raise SearchUnavailableError(
+                    "Search index is disabled" if not SEARCH_INDEX_ENABLED else "Search index is not ready"
+                )
+            query_terms = list(dict.fromkeys(tokenize(query)))
+            if not query_terms:
+                return [], 0
+            groups = [self._expand(term) for term in query_terms]
+            terms = list(dict.fromkeys(term for group in groups for term in group))
+            memtable = self.memtable
+            # 文書数・合計文書長は、セグメント側の隠した文書を除いた検索対象の文書で数える
+            # （更新された Knowledge をセグメントの古い版とメモリ上の層で二重に数えない）
+            sources = [(handle.segment, frozenset(handle.hidden)) for handle in self._segments]
+            doc_count = len(memtable) + sum(
+                handle.segment.doc_count - len(handle.hidden) for handle in self._segments
+            )
+            total_length = memtable.total_length + sum(
+                handle.segment.total_length - handle.hidden_length for handle in self._segments
+            )
+            memtable_postings = {term: list(memtable.postings.get(term, {}).items()) for term in terms}
+            memtable_documents = {
+                knowledge_id: (memtable.length(knowledge_id), memtable.document_of(knowledge_id))
+                for postings in memtable_postings.values()
+                for knowledge_id, _ in postings
+            }
+
+        # セグメントは不変なので、ロックを外してポスティングを読む（文書頻度も隠した文書を除いて数える）
+        doc_freqs = {term: len(postings) for term, postings in memtable_postings.items()}
+        segment_postings: List[Dict[str, List[Tuple[int, int]]]] = []
+        for segment, hidden in sources:
+            postings: Dict[str, List[Tuple[int, int]]] = {}
+            for term in terms:
+                index = segment.find_term(term)
+                if index is None:
+                    continue
+                entries = segment.postings(index)
+                if hidden:
+                    entries = [entry for entry in entries if entry[0] not in hidden]
+                postings[term] = entries
+                doc_freqs[term] += len(entries)
+            segment_postings.append(postings)
+        average_length = total_length / doc_count if doc_count else 0.0
+        idfs = {term: idf(doc_count, doc_freq) for term, doc_freq in doc_freqs.items() if doc_freq}
+
+        results = [
+            (knowledge_id, score)
+            for knowledge_id, score in _match(
+                groups,
+                memtable_postings.__getitem__,
+                lambda knowledge_id: memtable_documents[knowledge_id][0],
+                idfs,
+                average_length,
+            ).items()
+            if dataset_id is None or self._datasets.get(memtable_documents[knowledge_id][1]) == dataset_id
+        ]
+        for (segment, _), postings in zip(sources, segment_postings):
+            matched = _match(
+                groups,
+                lambda term: postings.get(term, ()),
+                segment.lengths.__getitem__,
+                idfs,
+                average_length,
+            )
+            for ordinal, score in matched.items():
+                if (
+                    dataset_id is not None
+                    and self._datasets.get(segment.document_id(segment.document_index(ordinal))) != dataset_id
+                ):
+                    continue
+                results.append((segment.knowledge_id(ordinal), score))
+        ranked = heapq.nsmallest(limit, results, key=lambda item: (-item[1], item[0]))
+        return ranked, len(results)
+
+    def apply(self, operations: Iterable[Operation]) -> None:
+        """
+        索引操作を自プロセスのメモリ上の層に反映する
+
+        Args:
+            operations (Iterable[Operation]): 索引操作
+        """
+        with self._lock:
+            now = time.time()
+            for operation in operations:
+                kind = operation[0]
+                if kind == "document":
+                    self._datasets[operation[1]] = operation[2]
+                elif kind in ("knowledge", "remove"):
+                    knowledge_id = operation[1]
+                    self._changes[knowledge_id] = now
+                    if kind == "knowledge":
+                        self.memtable.add(knowledge_id, operation[2], operation[3])
+                    else:
+                        self.memtable.remove(knowledge_id)
+                    for handle in self._segments:
+                        ordinal = handle.segment.ordinal_of(knowledge_id)
+                        if ordinal is not None:
+                            handle.hide([ordinal])
+                elif kind == "remove_document":
+                    self._remove_document(operation[1], now)
+                elif kind == "remove_dataset":
+                    for document_id in [
+                        document_id for document_id, owner in self._datasets.items() if owner == operation[1]
+                    ]:
+                        self._remove_document(document_id, now)
+
+    def publish(self, operations: List[Operation]) -> None:
+        """
+        索引操作を他ノードに通知する
+
+        Args:
+            operations (List[Operation]): 索引操作
+        """
+        if self.l2 is None:
+            return
+        try:
+            for start in range(0, len(operations), MESSAGE_BATCH_SIZE):
+                message = json.dumps(
+                    {
+                        "origin": NODE_ID,
+                        "cache": self.message_name,
+                        "op": "apply",
+                        "value": operations[start : start + MESSAGE_BATCH_SIZE],
+                    },
+                    ensure_ascii=False,
+                )
+                self.l2.publish(self.channel, message.encode("utf-8"))
+        except CacheBackendError as e:
+            logger.warning("Error: Failed to publish search index updates. Error: %s", str(e))
+
+    def apply_message(self, op: str, value) -> None:
+        """
+        他ノードからの索引操作メッセージを反映する
+
+        Args:
+            op (str): apply
+            value: 索引操作のリスト
+        """
+        if op == "apply":
+            self.apply(value)
+
+    def load_documents(self, documents: Iterable[Tuple[str, str]]) -> None:
+        """
+        ドキュメントの所属データセットを登録する（起動時に DB から読む）
+
+        Args:
+            documents (Iterable[Tuple[str, str]]): (ドキュメントID, データセットID)
+        """
+        for document_id, dataset_id in documents:
+            with self._lock:
+                # 読み取り中に反映された削除を、古い読み取り結果で戻さない
+                if document_id not in self._removed_documents:
+                    self._datasets.setdefault(document_id, dataset_id)
+        self._documents_loaded = True
+
+    def open(self) -> bool:
+        """
+        ディレクトリの manifest が更新されていればセグメントを開き直す
+
+        Returns:
+            bool: 開き直した場合は True
+        """
+        manifest = self._read_manifest()
+        if manifest is None or (
+            self._manifest is not None and manifest["generation"] == self._manifest["generation"]
+        ):
+            return False
+        try:
+            self._install(manifest, manifest["watermark"] - SEARCH_SYNC_GRACE_SECONDS)
+        except FileNotFoundError:
+            # 読んだ後にリーダーが次の世代に置き換えた（次の監視で開き直す）
+            return False
+        logger.info("Success: Opened search index generation %d", manifest["generation"])
+        return True
+
+    def rebuild(
+        self,
+        load_documents: Callable[[], Iterable[Tuple[str, str]]],
+        load_knowledges: Callable[[], Iterable[Tuple[str, str, str]]],
+    ) -> int:
+        """
+        DB から全件を読んでセグメントを作り直す（リーダーのみ）
+
+        読み取り開始後の書き込みはメモリ上の層に残り、読み取り結果（古い可能性がある）を隠す。
+
+        Args:
+            load_documents (Callable[[], Iterable[Tuple[str, str]]]): 全ドキュメントの
+                (ドキュメントID, データセットID) を読む関数
+            load_knowledges (Callable[[], Iterable[Tuple[str, str, str]]]): 有効な全 Knowledge の
+                (Knowledge ID, ドキュメントID, 本文) を読む関数
+
+        Returns:
+            int: 索引した Knowledge の件数
+
+        Raises:
+            RuntimeError: 他のプロセスがリーダーの場合
+        """
+        if not self._acquire_leadership():
+            raise RuntimeError("Another process owns the search index")
+        with self._lock:
+            watermark = time.time()
+            manifest = self._manifest or self._read_manifest() or _empty_manifest()
+        self.load_documents(load_documents())
+        next_segment = manifest["next_segment"]
+        entries: List[Dict[str, Any]] = []
+        count = 0
+        batch = InvertedIndex()
+        for knowledge_id, document_id, text in load_knowledges():
+            batch.add(knowledge_id, document_id, text)
+            if len(batch) >= SEARCH_SEGMENT_MAX_DOCS:
+                count += self._write_segment(batch.snapshot(), next_segment, entries)
+                next_segment += 1
+                batch = InvertedIndex()
+        if len(batch):
+            count += self._write_segment(batch.snapshot(), next_segment, entries)
+            next_segment += 1
+        self._commit(
+            {
+                "generation": manifest["generation"] + 1,
+                "watermark": watermark,
+                "next_segment": next_segment,
+                "segments": entries,
+            },
+            watermark,
+        )
+        return count
+
+    def flush(self) -> bool:
+        """
+        メモリ上の層を新しいセグメントとして書き出し、watermark を進める（リーダーのみ）
+
+        Returns:
+            bool: 書き出した場合は True
+        """
+        with self._lock:
+            if not self.is_leader or self._manifest is None or not (self._changes or self._removed_documents):
+                return False
+            watermark = time.time()
+            documents = self.memtable.snapshot()
+            plan = [(handle, set(handle.hidden)) for handle in self._segments]
+            manifest = self._manifest
+        generation = manifest["generation"] + 1
+        next_segment = manifest["next_segment"]
+        entries: List[Dict[str, Any]] = []
+        for handle, deleted in plan:
+            if len(deleted) >= handle.segment.doc_count:
+                # 全件が削除されたセグメントは manifest から外す
+                continue
+            deletes_name = handle.deletes_name
+            if deleted != handle.deleted:
+                deletes_name = f"{handle.name}.{generation}.del"
+                write_deletes(os.path.join(self.directory, deletes_name), deleted)
+            entries.append({"name": handle.name, "deletes": deletes_name})
+        if documents:
+            self._write_segment(documents, next_segment, entries)
+            next_segment += 1
+        self._commit(
+            {
+                "generation": generation,
+                "watermark": watermark,
+                "next_segment": next_segment,
+                "segments": entries,
+            },
+            watermark,
+        )
+        self._last_flush = time.monotonic()
+        logger.info(
+            "Success: Flushed %d knowledges to search index generation %d", len(documents), generation
+        )
+        return True
+
+    def merge(self) -> bool:
+        """
+        セグメント数が上限を超えていれば、小さいものから併合する（リーダーのみ）
+
+        Returns:
+            bool: 併合した場合は True
+        """
+        with self._lock:
+            if not self.is_leader or self._manifest is None or len(self._segments) <= SEARCH_MAX_SEGMENTS:
+                return False
+            handles = list(self._segments)
+            manifest = self._manifest
+            cut = self._cut
+        count = min(len(handles), max(SEARCH_MERGE_FACTOR, len(handles) - SEARCH_MAX_SEGMENTS + 1, 2))
+        chosen = sorted(handles, key=lambda handle: handle.segment.doc_count - len(handle.deleted))[:count]
+        chosen_names = {handle.name for handle in chosen}
+        name = _segment_name(manifest["next_segment"])
+        merged = merge_segments(
+            os.path.join(self.directory, name),
+            [(handle.segment, handle.deleted) for handle in handles if handle.name in chosen_names],
+        )
+        entries = [
+            {"name": handle.name, "deletes": handle.deletes_name}
+            for handle in handles
+            if handle.name not in chosen_names
+        ]
+        if merged:
+            entries.append({"name": name, "deletes": None})
+        self._commit(
+            {
+                "generation": manifest["generation"] + 1,
+                "watermark": manifest["watermark"],
+                "next_segment": manifest["next_segment"] + 1,
+                "segments": entries,
+            },
+            cut,
+        )
+        logger.info("Success: Merged %d search segments into %s", len(chosen), name)
+        return True
+
+    def start(self, session_factory: Callable[[], Session]) -> threading.Thread:
+        """
+        索引を開き、manifest の監視・リーダーの処理を行うスレッドを開始する
+
+        Args:
+            session_factory (Callable[[], Session]): プライマリに接続するセッションを返す関数
+
+        Returns:
+            threading.Thread: 開始したスレッド
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(session_factory,), name="search-index", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def stop(self, flush: bool = True) -> None:
+        """
+        スレッドを止め、リーダーの場合はロックを手放す
+
+        Args:
+            flush (bool): リーダーの場合、ロックを手放す前にメモリ上の層を書き出すか
+        """
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        if self._lock_file is None:
+            return
+        if flush:
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Error: Failed to flush search index on shutdown. Error: %s", str(e))
+        self._lock_file.close()
+        self._lock_file = None
+
+    def _run(self, session_factory: Callable[[], Session]) -> None:
+        try:
+            with session_factory() as session:
+                self.load_documents(
+                    session.execute(
+                        select(DocumentModel.id, DocumentModel.dataset_id).execution_options(
+                            yield_per=BUILD_BATCH_SIZE
+                        )
+                    ).tuples()
+                )
+            self._acquire_leadership()
+            if self.open():
+                self._catch_up(session_factory)
+        except Exception as e:
+            logger.error("Error: Failed to open search index. Error: %s", str(e))
+        while True:
+            try:
+                if not self._acquire_leadership():
+                    self.open()
+                elif self._manifest is None:
+                    rebuild_search_index(session_factory, self)
+                else:
+                    if len(self._changes) + len(self._removed_documents) >= SEARCH_FLUSH_DOCS or (
+                        time.monotonic() - self._last_flush >= SEARCH_FLUSH_INTERVAL_SECONDS
+                    ):
+                        self.flush()
+                    while self.merge():
+                        pass
+            except Exception as e:
+                logger.error("Error: Failed to maintain search index. Error: %s", str(e))
+            if self._stop.wait(MAINTENANCE_INTERVAL_SECONDS):
+                return
+
+    def _catch_up(self, session_factory: Callable[[], Session]) -> None:
+        # 索引を閉じていた間（watermark 以降）に作成・更新された Knowledge を読み直し、削除を反映する
+        since = datetime.fromtimestamp(self._manifest["watermark"] - SEARCH_SYNC_GRACE_SECONDS)
+        logger.info("Start: Catching up search index since %s", since.isoformat())
+        count = 0
+        with session_factory() as session:
+            rows = session.execute(
+                select(
+                    KnowledgeModel.id,
+                    KnowledgeModel.document_id,
+                    KnowledgeModel.knowledge_text,
+                    KnowledgeModel.is_active,
+                )
+                .where(KnowledgeModel.updated_at >= since)
+                .execution_options(yield_per=BUILD_BATCH_SIZE)
+            ).tuples()
+            for knowledge_id, document_id, text, is_active in rows:
+                self.apply(
+                    [["knowledge", knowledge_id, document_id, text] if is_active else ["remove", knowledge_id]]
+                )
+                count += 1
+            # 削除は行が残らないため、変更履歴から読む
+            self.apply(
+                change_operations(
+                    session,
+                    [change for change in load_changes_since(session, since) if change.operation == "delete"],
+                )
+            )
+        logger.info("Success: Caught up %d knowledges in search index", count)
+
+    def _expand(self, term: str) -> List[str]:
+        # 1文字の語は、その文字を含む語のいずれかに一致すればよい
+        if len(term) != 1:
+            return [term]
+        terms = dict.fromkeys([term, *self.memtable.terms_with_char(term)])
+        for handle in self._segments:
+            terms.update(dict.fromkeys(handle.segment.terms_with_char(term)))
+        return list(terms)
+
+    def _remove_document(self, document_id: str, now: float) -> None:
+        self._removed_documents[document_id] = now
+        self._datasets.pop(document_id, None)
+        self.memtable.remove_document(document_id)
+        for handle in self._segments:
+            index = handle.segment.find_document(document_id)
+            if index is not None:
+                handle.hide_documents({index})
+
+    def _acquire_leadership(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, LOCK_FILE), "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info("Success: Acquired search index writer lock in %s", self.directory)
+        return True
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_segment(
+        self, documents: List[Tuple[str, str, Dict[str, int]]], number: int, entries: List[Dict[str, Any]]
+    ) -> int:
+        postings: Dict[bytes, List[Tuple[int, int]]] = {}
+        for ordinal, (_, _, counts) in enumerate(documents):
+            for term, count in counts.items():
+                postings.setdefault(term.encode("utf-8"), []).append((ordinal, count))
+        name = _segment_name(number)
+        written = write_segment(
+            os.path.join(self.directory, name),
+            (
+                (knowledge_id, document_id, sum(counts.values()))
+                for knowledge_id, document_id, counts in documents
+            ),
+            sorted(postings.items()),
+        )
+        entries.append({"name": name, "deletes": None})
+        return written
+
+    def _commit(self, manifest: Dict[str, Any], cut: float) -> None:
+        # manifest を置き換えてから開き直し、参照されなくなったファイルを消す
+        manifest = {"version": 1, **manifest}
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{path}.tmp", path)
+        self._install(manifest, cut)
+        referenced = set()
+        for entry in manifest["segments"]:
+            referenced.update(name for name in (entry["name"], entry["deletes"]) if name)
+        for name in os.listdir(self.directory):
+            if name.endswith((".kseg", ".del")) and name not in referenced:
+                # mmap 中のワーカーは、閉じるまで消したファイルを読める
+                os.remove(os.path.join(self.directory, name))
+
+    def _install(self, manifest: Dict[str, Any], cut: float) -> None:
+        opened = {handle.name: handle for handle in self._segments}
+        handles = []
+        for entry in manifest["segments"]:
+            previous = opened.get(entry["name"])
+            segment = previous.segment if previous else Segment(os.path.join(self.directory, entry["name"]))
+            if previous is not None and previous.deletes_name == entry["deletes"]:
+                deleted = previous.deleted
+            elif entry["deletes"]:
+                deleted = read_deletes(os.path.join(self.directory, entry["deletes"]))
+            else:
+                deleted = set()
+            handles.append(_SegmentHandle(entry["name"], segment, entry["deletes"], deleted))
+        with self._lock:
+            # watermark より前の変更はセグメント側に含まれるため、メモリ上の層から捨てる
+            self._cut = cut
+            for knowledge_id, applied_at in list(self._changes.items()):
+                if applied_at < cut:
+                    del self._changes[knowledge_id]
+                    self.memtable.remove(knowledge_id)
+            for document_id, applied_at in list(self._removed_documents.items()):
+                if applied_at < cut:
+                    del self._removed_documents[document_id]
+            for handle in handles:
+                handle.hide(
+                    ordinal
+                    for ordinal in map(handle.segment.ordinal_of, self._changes)
+                    if ordinal is not None
+                )
+                handle.hide_documents(
+                    {
+                        index
+                        for index in map(handle.segment.find_document, self._removed_documents)
+                        if index is not None
+                    }
+                )
+            self._segments = handles
+            self._manifest = manifest
+
+
+def _match(
+    groups: List[List[str]],
+    postings_of: Callable[[str], Iterable[Tuple[Any, int]]],
+    length_of: Callable[[Any], int],
+    idfs: Dict[str, float],
+    average_length: float,
+) -> Dict[Any, float]:
+    # 全ての語グループに一致する文書の BM25 スコアを求める（2つ目以降のグループは一致済みの文書だけを見る）
+    matched: Optional[Dict[Any, float]] = None
+    for group in groups:
+        scores: Dict[Any, float] = {}
+        for term in group:
+            term_idf = idfs.get(term)
+            if term_idf is None:
+                continue
+            for key, term_frequency in postings_of(term):
+                if matched is not None and key not in matched:
+                    continue
+                scores[key] = scores.get(key, 0.0) + term_score(
+                    term_idf, term_frequency, length_of(key), average_length
+                )
+        if matched is None:
+            matched = scores
+        else:
+            matched = {key: score + scores[key] for key, score in matched.items() if key in scores}
+        if not matched:
+            return {}
+    return matched or {}
+
+
+def _segment_name(number: int) -> str:
+    return f"seg-{number:010d}.kseg"
+
+
+def _empty_manifest() -> Dict[str, Any]:
+    return {"generation": 0, "watermark": 0.0, "next_segment": 1, "segments": []}
+
+
+knowledge_index = KnowledgeIndex(SEARCH_INDEX_DIR, l2_backend)
+message_handlers[knowledge_index.message_name] = knowledge_index.apply_message
+
+
+def record_index_changes(session: Session, *operations: Operation) -> None:
+    """
+    書き込みに伴う索引操作を記録する（コミット後に反映・通知する）
+
+    Args:
+        session (Session): 書き込みを行ったセッション
+        *operations (Operation): 索引操作
+    """
+    if not SEARCH_INDEX_ENABLED:
+        return
+    session.info.setdefault(PENDING_KEY, []).extend(operations)
+
+
+def change_operations(session: Session, changes: List[Change]) -> List[Operation]:
+    """
+    変更履歴を索引操作にする（Knowledge の作成・更新は DB の現在の行を読み直す）
+
+    Args:
+        session (Session): 読み取りに使うセッション
+        changes (List[Change]): 連番順の変更
+
+    Returns:
+        List[Operation]: 索引操作
+    """
+    knowledge_ids = [
+        change.entity_id for change in changes if change.entity == "knowledge" and change.operation != "delete"
+    ]
+    current = {}
+    if knowledge_ids:
+        current = {
+            row.id: row
+            for row in session.execute(
+                select(
+                    KnowledgeModel.id,
+                    KnowledgeModel.document_id,
+                    KnowledgeModel.knowledge_text,
+                    KnowledgeModel.is_active,
+                ).where(KnowledgeModel.id.in_(knowledge_ids))
+            )
+        }
+    operations: List[Operation] = []
+    for change in changes:
+        if change.entity == "knowledge":
+            row = current.get(change.entity_id) if change.operation != "delete" else None
+            # 削除・無効化された Knowledge（読み直した時点で無いものを含む）は索引から外す
+            operations.append(
+                ["knowledge", row.id, row.document_id, row.knowledge_text]
+                if row is not None and row.is_active
+                else ["remove", change.entity_id]
+            )
+        elif change.entity == "document":
+            if change.operation == "delete":
+                operations.append(["remove_document", change.entity_id])
+            elif change.operation == "create" and change.dataset_id is not None:
+                operations.append(["document", change.entity_id, change.dataset_id])
+        elif change.entity == "dataset" and change.operation == "delete":
+            operations.append(["remove_dataset", change.entity_id])
+    return operations
+
+
+def apply_changes(session: Session, changes: List[Change]) -> None:
+    """
+    他ノードの変更を索引に反映する（変更履歴の追従スレッドから呼ばれる）
+
+    Args:
+        session (Session): 読み取りに使うセッション
+        changes (List[Change]): 連番順の変更
+    """
+    if SEARCH_INDEX_ENABLED:
+        knowledge_index.apply(change_operations(session, changes))
+
+
+change_handlers["search:knowledges"] = apply_changes
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session) -> None:
+    # SAVEPOINT の解放でも呼ばれるため、最も外側のトランザクションのコミットでのみ反映する
+    if session.in_nested_transaction():
+        return
+    operations = session.info.pop(PENDING_KEY, None)
+    if operations:
+        knowledge_index.apply(operations)
+        knowledge_index.publish(operations)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_rollback(session: Session, transaction) -> None:
+    # ロールバックされた書き込みの索引操作は破棄する（コミット時は after_commit で処理済み）
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+def rebuild_search_index(
+    session_factory: Callable[[], Session], index: KnowledgeIndex = knowledge_index
+) -> None:
+    """
+    Knowledge の全文検索索引を DB から作り直す（リーダーのみ）
+
+    Args:
+        session_factory (Callable[[], Session]): プライマリに接続するセッションを返す関数
+            （レプリカの遅延で直前の書き込みを取りこぼさないため）
+        index (KnowledgeIndex): 作り直す索引
+    """
+    if not SEARCH_INDEX_ENABLED:
+        return
+    logger.info("Start: Building search index for knowledges")
+    try:
+        with session_factory() as session:
+            count = index.rebuild(
+                lambda: session.execute(
+                    select(DocumentModel.id, DocumentModel.dataset_id).execution_options(
+                        yield_per=BUILD_BATCH_SIZE
+                    )
+                ).tuples(),
+                lambda: session.execute(
+                    select(KnowledgeModel.id, KnowledgeModel.document_id, KnowledgeModel.knowledge_text)
+                    .where(KnowledgeModel.is_active)
+                    .execution_options(yield_per=BUILD_BATCH_SIZE)
+                ).tuples(),
+            )
+        logger.info("Success: Built search index with %d knowledges", count)
+    except Exception as e:
+        logger.error("Error: Failed to build search index. Error: %s", str(e))
+
+
+def start_search_index(session_factory: Callable[[], Session]) -> Optional[threading.Thread]:
+    """
+    索引を開くスレッドを開始する（アプリケーション起動時に呼び出す）
+
+    既存の索引があれば mmap して開き、無ければリーダーが DB から構築する（構築中の検索は 503）。
+    以降は同じスレッドで manifest の監視（リーダー以外）・書き出しと併合（リーダー）を行う。
+
+    Args:
+        session_factory (Callable[[], Session]): プライマリに接続するセッションを返す関数
+
+    Returns:
+        Optional[threading.Thread]: 索引のスレッド。索引が無効の場合は None
+    """
+    if not SEARCH_INDEX_ENABLED:
+        return None
+    return knowledge_index.start(session_factory)
+
+
+def stop_search_index() -> None:
+    """索引のスレッドを止める（アプリケーション終了時に呼び出す。リーダーは書き出してからロックを手放す）"""
+    if SEARCH_INDEX_ENABLED:
+        knowledge_index.stop()
@@ -0,0 +1,448 @@
+"""
+転置インデックスのセグメント（ディスク上の不変ファイル）
+
+1セグメントは1ファイルで、書き込み後は変更しない。読み取りは mmap で行うため、
+同じファイルを開いた複数のワーカープロセスは OS のページキャッシュを共有し、
+プロセスごとのメモリ使用量はコーパスの大きさに比例しない。
+
+ファイルの構成（数値はホストのバイト順。セクションは8バイト境界に配置する）:
+
+- ヘッダー: マジック・件数（Knowledge / ドキュメント / 語）・総語数・セクション表
+- Knowledge ID（序数順の文字列）と、ID の昇順に並べた序数（ID から序数を二分探索する）
+- 序数ごとのドキュメント番号（uint32）と文書長（語数, uint32）
+- ドキュメントID（昇順の文字列。ドキュメント番号はこの並びの位置）
+- 語辞書（UTF-8 バイト列の昇順）と、語を逆順にした並び（末尾の文字での検索用）
+- 語ごとの文書頻度（uint32）とポスティングの位置（uint64）
+- ポスティング: 序数の差分と出現回数を可変長整数（LEB128）で符号化した列
+
+削除はセグメントを書き換えず、削除した序数の一覧（.del ファイル）で表す。
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from heapq import merge
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+MAGIC = b"KSEG"
+VERSION = 1
+# マジック・バージョン・Knowledge 数・ドキュメント数・語数・予約・総語数
+_HEADER = struct.Struct("<4sIIIIIQ")
+_SECTION = struct.Struct("<QQ")
+
+(
+    _IDS_OFFSETS,
+    _IDS_BLOB,
+    _ID_ORDER,
+    _DOC_INDEX,
+    _LENGTHS,
+    _DOCS_OFFSETS,
+    _DOCS_BLOB,
+    _TERM_OFFSETS,
+    _TERM_BLOB,
+    _REVERSED_ORDER,
+    _DOC_FREQS,
+    _POSTING_OFFSETS,
+    _POSTINGS,
+) = range(13)
+_SECTION_COUNT = 13
+
+# write_segment に渡す文書: (Knowledge ID, ドキュメントID, 文書長)
+SegmentDocument = Tuple[str, str, int]
+# write_segment に渡すポスティング: (語の UTF-8 バイト列, [(序数, 出現回数)])（語の昇順・序数の昇順）
+SegmentPostings = Tuple[bytes, List[Tuple[int, int]]]
+
+
+def _encode_postings(postings: Iterable[Tuple[int, int]], out: bytearray) -> int:
+    count = 0
+    previous = 0
+    for ordinal, term_frequency in postings:
+        for value in (ordinal - previous, term_frequency):
+            while value >= 0x80:
+                out.append((value & 0x7F) | 0x80)
+                value >>= 7
+            out.append(value)
+        previous = ordinal
+        count += 1
+    return count
+
+
+def _decode_postings(data: bytes) -> List[Tuple[int, int]]:
+    postings = []
+    values = []
+    value = shift = 0
+    ordinal = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+        if len(values) == 2:
+            ordinal += values[0]
+            postings.append((ordinal, values[1]))
+            values = []
+    return postings
+
+
+def _strings_section(values: Sequence[str]) -> Tuple[bytes, bytes]:
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets.tobytes(), bytes(blob)
+
+
+def _reversed_key(term: bytes) -> bytes:
+    return term.decode("utf-8")[::-1].encode("utf-8")
+
+
+def write_segment(
+    path: str, documents: Iterable[SegmentDocument], postings: Iterable[SegmentPostings]
+) -> int:
+    """
+    セグメントファイルを書き出す（一時ファイルに書いてから置き換える）
+
+    Args:
+        path (str): 書き出し先のパス
+        documents (Iterable[SegmentDocument]): 序数順の文書
+        postings (Iterable[SegmentPostings]): 語の昇順のポスティング（documents の後に読む）
+
+    Returns:
+        int: 書き出した文書数
+    """
+    knowledge_ids: List[str] = []
+    document_ids: List[str] = []
+    lengths = array("I")
+    for knowledge_id, document_id, length in documents:
+        knowledge_ids.append(knowledge_id)
+        document_ids.append(document_id)
+        lengths.append(length)
+    document_table = sorted(set(document_ids))
+    document_numbers = {document_id: number for number, document_id in enumerate(document_table)}
+    doc_index = array("I", (document_numbers[document_id] for document_id in document_ids))
+    id_order = array("I", sorted(range(len(knowledge_ids)), key=knowledge_ids.__getitem__))
+
+    sections: List[Optional[Tuple[int, int]]] = [None] * _SECTION_COUNT
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * (_HEADER.size + _SECTION.size * _SECTION_COUNT))
+
+        def write(index: int, data: bytes) -> None:
+            f.write(b"\0" * (-f.tell() % 8))
+            sections[index] = (f.tell(), len(data))
+            f.write(data)
+
+        ids_offsets, ids_blob = _strings_section(knowledge_ids)
+        write(_IDS_OFFSETS, ids_offsets)
+        write(_IDS_BLOB, ids_blob)
+        write(_ID_ORDER, id_order.tobytes())
+        write(_DOC_INDEX, doc_index.tobytes())
+        write(_LENGTHS, lengths.tobytes())
+        docs_offsets, docs_blob = _strings_section(document_table)
+        write(_DOCS_OFFSETS, docs_offsets)
+        write(_DOCS_BLOB, docs_blob)
+        del knowledge_ids, document_ids, document_numbers
+
+        # ポスティングは件数が多いため、語ごとに符号化してそのまま書き出す
+        terms: List[bytes] = []
+        doc_freqs = array("I")
+        posting_offsets = array("Q", [0])
+        f.write(b"\0" * (-f.tell() % 8))
+        postings_start = f.tell()
+        buffer = bytearray()
+        written = 0
+        for term, term_postings in postings:
+            buffer.clear()
+            count = _encode_postings(term_postings, buffer)
+            if not count:
+                continue
+            f.write(buffer)
+            written += len(buffer)
+            terms.append(term)
+            doc_freqs.append(count)
+            posting_offsets.append(written)
+        sections[_POSTINGS] = (postings_start, written)
+
+        term_offsets = array("I", [0])
+        term_blob = bytearray()
+        for term in terms:
+            term_blob += term
+            term_offsets.append(len(term_blob))
+        write(_TERM_OFFSETS, term_offsets.tobytes())
+        write(_TERM_BLOB, bytes(term_blob))
+        reversed_keys = [_reversed_key(term) for term in terms]
+        write(
+            _REVERSED_ORDER,
+            array("I", sorted(range(len(terms)), key=reversed_keys.__getitem__)).tobytes(),
+        )
+        write(_DOC_FREQS, doc_freqs.tobytes())
+        write(_POSTING_OFFSETS, posting_offsets.tobytes())
+
+        f.seek(0)
+        f.write(
+            _HEADER.pack(
+                MAGIC, VERSION, len(lengths), len(document_table), len(terms), 0, sum(lengths)
+            )
+        )
+        for offset, length in sections:
+            f.write(_SECTION.pack(offset, length))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(lengths)
+
+
+class Segment:
+    """mmap したセグメントファイルの読み取り（スレッドセーフ・読み取り専用）"""
+
+    def __init__(self, path: str):
+        """
+        コンストラクタ
+
+        Args:
+            path (str): セグメントファイルのパス
+
+        Raises:
+            ValueError: セグメントファイルではない場合
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, doc_count, document_count, term_count, _, total_length = _HEADER.unpack_from(
+            self._mmap, 0
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a search segment: {path}")
+        self.doc_count = doc_count
+        self.document_count = document_count
+        self.term_count = term_count
+        self.total_length = total_length
+        view = memoryview(self._mmap)
+        self._sections = []
+        for index in range(_SECTION_COUNT):
+            offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + index * _SECTION.size)
+            self._sections.append(view[offset : offset + length])
+        self._ids_offsets = self._sections[_IDS_OFFSETS].cast("I")
+        self._id_order = self._sections[_ID_ORDER].cast("I")
+        self._doc_index = self._sections[_DOC_INDEX].cast("I")
+        self.lengths = self._sections[_LENGTHS].cast("I")
+        self._docs_offsets = self._sections[_DOCS_OFFSETS].cast("I")
+        self._term_offsets = self._sections[_TERM_OFFSETS].cast("I")
+        self._reversed_order = self._sections[_REVERSED_ORDER].cast("I")
+        self._doc_freqs = self._sections[_DOC_FREQS].cast("I")
+        self._posting_offsets = self._sections[_POSTING_OFFSETS].cast("Q")
+
+    def knowledge_id(self, ordinal: int) -> str:
+        """序数の Knowledge ID を返す"""
+        return bytes(
+            self._sections[_IDS_BLOB][self._ids_offsets[ordinal] : self._ids_offsets[ordinal + 1]]
+        ).decode("utf-8")
+
+    def document_index(self, ordinal: int) -> int:
+        """序数のドキュメント番号を返す"""
+        return self._doc_index[ordinal]
+
+    def document_id(self, index: int) -> str:
+        """ドキュメント番号のドキュメントIDを返す"""
+        return bytes(
+            self._sections[_DOCS_BLOB][self._docs_offsets[index] : self._docs_offsets[index + 1]]
+        ).decode("utf-8")
+
+    def ordinal_of(self, knowledge_id: str) -> Optional[int]:
+        """
+        Knowledge ID の序数を返す
+
+        Args:
+            knowledge_id (str): Knowledge ID
+
+        Returns:
+            Optional[int]: 序数（このセグメントに無い場合は None）
+        """
+        position = _lower_bound(self.doc_count, lambda i: self.knowledge_id(self._id_order[i]), knowledge_id)
+        if position < self.doc_count and self.knowledge_id(self._id_order[position]) == knowledge_id:
+            return self._id_order[position]
+        return None
+
+    def find_document(self, document_id: str) -> Optional[int]:
+        """
+        ドキュメントIDのドキュメント番号を返す
+
+        Args:
+            document_id (str): ドキュメントID
+
+        Returns:
+            Optional[int]: ドキュメント番号（このセグメントに無い場合は None）
+        """
+        position = _lower_bound(self.document_count, self.document_id, document_id)
+        if position < self.document_count and self.document_id(position) == document_id:
+            return position
+        return None
+
+    def ordinals_of_documents(self, indexes: Set[int]) -> Iterator[int]:
+        """指定したドキュメント番号に属する序数を返す（全件を走査する）"""
+        doc_index = self._doc_index
+        return (ordinal for ordinal in range(self.doc_count) if doc_index[ordinal] in indexes)
+
+    def term(self, index: int) -> bytes:
+        """語番号の語（UTF-8 バイト列）を返す"""
+        return bytes(
+            self._sections[_TERM_BLOB][self._term_offsets[index] : self._term_offsets[index + 1]]
+        )
+
+    def find_term(self, term: str) -> Optional[int]:
+        """
+        語の語番号を返す
+
+        Args:
+            term (str): 語
+
+        Returns:
+            Optional[int]: 語番号（このセグメントに無い場合は None）
+        """
+        key = term.encode("utf-8")
+        position = _lower_bound(self.term_count, self.term, key)
+        if position < self.term_count and self.term(position) == key:
+            return position
+        return None
+
+    def terms_with_char(self, char: str) -> List[str]:
+        """
+        1文字を先頭または末尾に含む語を返す（1文字の検索語の展開に使う）
+
+        Args:
+            char (str): 1文字
+
+        Returns:
+            List[str]: 語のリスト
+        """
+        key = char.encode("utf-8")
+        terms = set()
+        position = _lower_bound(self.term_count, self.term, key)
+        while position < self.term_count and self.term(position).startswith(key):
+            terms.add(self.term(position).decode("utf-8"))
+            position += 1
+        reversed_term = lambda i: _reversed_key(self.term(self._reversed_order[i]))  # noqa: E731
+        position = _lower_bound(self.term_count, reversed_term, key)
+        while position < self.term_count and reversed_term(position).startswith(key):
+            terms.add(self.term(self._reversed_order[position]).decode("utf-8"))
+            position += 1
+        return list(terms)
+
+    def doc_freq(self, index: int) -> int:
+        """語番号の文書頻度を返す"""
+        return self._doc_freqs[index]
+
+    def postings(self, index: int) -> List[Tuple[int, int]]:
+        """語番号のポスティング [(序数, 出現回数)] を返す"""
+        data = self._sections[_POSTINGS][self._posting_offsets[index] : self._posting_offsets[index + 1]]
+        return _decode_postings(bytes(data))
+
+    def iter_terms(self) -> Iterator[Tuple[bytes, int]]:
+        """(語, 語番号) を語の昇順に返す"""
+        for index in range(self.term_count):
+            yield self.term(index), index
+
+
+def _lower_bound(count: int, key_at: Callable[[int], object], target) -> int:
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if key_at(middle) < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def merge_segments(path: str, sources: Sequence[Tuple[Segment, Set[int]]]) -> int:
+    """
+    複数のセグメントを、削除済みの文書を除いて1つのセグメントにまとめる
+
+    序数は sources の順に振り直す。語はセグメントごとの語辞書を併合しながら順に書き出すため、
+    ポスティング全体をメモリに載せない。
+
+    Args:
+        path (str): 書き出し先のパス
+        sources (Sequence[Tuple[Segment, Set[int]]]): (セグメント, 削除済みの序数) のリスト
+
+    Returns:
+        int: 書き出した文書数
+    """
+    remaps: List[Dict[int, int]] = []
+    next_ordinal = 0
+    for segment, deleted in sources:
+        remap = {}
+        for ordinal in range(segment.doc_count):
+            if ordinal not in deleted:
+                remap[ordinal] = next_ordinal
+                next_ordinal += 1
+        remaps.append(remap)
+
+    def documents() -> Iterator[SegmentDocument]:
+        for (segment, _), remap in zip(sources, remaps):
+            for ordinal in remap:
+                yield (
+                    segment.knowledge_id(ordinal),
+                    segment.document_id(segment.document_index(ordinal)),
+                    segment.lengths[ordinal],
+                )
+
+    def terms(source: int) -> Iterator[Tuple[bytes, int, int]]:
+        for term, index in sources[source][0].iter_terms():
+            yield term, source, index
+
+    def postings() -> Iterator[SegmentPostings]:
+        streams = [terms(source) for source in range(len(sources))]
+        current: Optional[bytes] = None
+        merged: List[Tuple[int, int]] = []
+        for term, source, index in merge(*streams):
+            if term != current:
+                if current is not None:
+                    yield current, merged
+                current, merged = term, []
+            remap = remaps[source]
+            merged.extend(
+                (remap[ordinal], term_frequency)
+                for ordinal, term_frequency in sources[source][0].postings(index)
+                if ordinal in remap
+            )
+        if current is not None:
+            yield current, merged
+
+    return write_segment(path, documents(), postings())
+
+
+def write_deletes(path: str, ordinals: Iterable[int]) -> None:
+    """
+    削除した序数の一覧（.del ファイル）を書き出す
+
+    Args:
+        path (str): 書き出し先のパス
+        ordinals (Iterable[int]): 削除した序数
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(array("I", sorted(ordinals)).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_deletes(path: str) -> Set[int]:
+    """
+    削除した序数の一覧を読む
+
+    Args:
+        path (str): .del ファイルのパス
+
+    Returns:
+        Set[int]: 削除した序数
+    """
+    ordinals = array("I")
+    with open(path, "rb") as f:
+        ordinals.frombytes(f.read())
+    return set(ordinals)
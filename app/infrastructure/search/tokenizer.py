@@ -0,0 +1,49 @@
+"""
+検索用のテキスト正規化と分割
+
+本文・検索語のどちらも同じ規則で語（term）に分割する:
+
+1. NFKC 正規化（全角英数字・半角カナ等を揃える）と小文字化
+2. 文字・数字の連続（\\w+）ごとに区切り、記号・空白は区切りとして捨てる
+3. 連続ごとに文字 bigram に分割する（1文字だけの連続はその1文字を語とする）
+
+形態素解析を使わないため辞書が不要で、日本語・英語が混在した文でも同じように扱える。
+"""
+
+import re
+import unicodedata
+from typing import List
+
+_RUN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """
+    検索用にテキストを正規化する
+
+    Args:
+        text (str): 元のテキスト
+
+    Returns:
+        str: NFKC 正規化して小文字にしたテキスト
+    """
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    テキストを語（文字 bigram）に分割する
+
+    Args:
+        text (str): 元のテキスト
+
+    Returns:
+        List[str]: 出現順の語のリスト（同じ語が複数回出現しうる）
+    """
+    terms: List[str] = []
+    for run in _RUN.findall(normalize(text or "")):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
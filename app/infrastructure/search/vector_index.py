@@ -0,0 +1,677 @@
+"""
+Knowledge の埋め込みによるベクトル検索
+
+データセットごとに、有効な Knowledge の埋め込みをプロセス内の索引に保持する。索引は VECTOR_INDEX で選ぶ:
+
+- exact（既定）: float32 の行列（行数 × 次元数）。検索語の埋め込みとのコサイン類似度（行は L2 正規化済みの
+  ため内積）を一定行数ずつまとめて計算して、argpartition で上位 k 件を選ぶ。ANN の精度を比べる基準（正解）にもなる
+- hnsw: HNSW グラフ（hnsw.HNSWIndex）による近似検索。VECTOR_INDEX_DIR にデータセットごとに保存し、
+  次に読み込むときは保存時の watermark 以降に更新された埋め込みだけを DB から読み直す
+  （削除・無効化された Knowledge は DB 上の有効な ID と突き合わせて外す）
+
+行列は検索で初めて使われたときに DB（knowledge_embeddings）から読み込み、以降の書き込みは
+全文検索索引（knowledge_index）と同じ順で反映する:
+
+1. リポジトリが埋め込みの書き込みと同じセッションに変更を記録する（record_vector_changes）
+2. Session の after_commit で自プロセスの行列に反映し、他ノードへ publish する
+   （非同期のコミットから呼ばれた場合は、反映をスレッドで行いイベントループを止めない）
+3. 他ノードは購読スレッドでメッセージを受け取り、自身の行列に反映する（読み込み済みのデータセットのみ）
+
+読み込み中に反映された Knowledge・削除されたドキュメントは、読み込み結果（古い可能性がある）で上書きしない。
+削除した行は詰めずに無効にし、無効な行が半数を超えたら作り直す（行列はその場で、HNSW はメンテナンスの
+スレッドで新しいグラフを組み立て、組み立て中の変更も反映してから差し替える）。
+
+設定は環境変数で行う:
+
+- VECTOR_SEARCH_ENABLED: false で埋め込みの計算・保存とベクトル検索を無効化（検索は 503 を返す）
+- VECTOR_SEARCH_BATCH_ROWS: 類似度を1回にまとめて計算する行数（一時配列の大きさの上限。exact のみ）
+- VECTOR_INDEX: exact / hnsw（HNSW のパラメータは hnsw モジュールを参照）
+- VECTOR_INDEX_DIR: HNSW グラフを保存するディレクトリ
+- VECTOR_INDEX_FLUSH_INTERVAL_SECONDS: 変更のあった HNSW グラフを保存・作り直す間隔（秒）
+- VECTOR_SYNC_GRACE_SECONDS: 保存したグラフの読み直しの起点を watermark より手前にずらす秒数
+  （コミットの遅れ・他ノードからの通知の遅れの見込み）
+
+他ノードでの書き込みは pub/sub（CACHE_BACKEND_URL）で即座に受け取る。L2 が無い・メッセージが届かなかった場合も、
+変更履歴の追従（change_feed）が数秒遅れ（CHANGE_FEED_DELAY_SECONDS + ポーリング間隔）で反映する。
+"""
+
+import base64
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.infrastructure.cache.backends import CacheBackend, CacheBackendError
+from app.infrastructure.cache.entity_cache import (
+    CACHE_KEY_PREFIX,
+    NODE_ID,
+    l2_backend,
+    message_handlers,
+)
+from app.infrastructure.database.offload import run_blocking
+from app.infrastructure.search.hnsw import HNSWIndex
+
+logger = logging.getLogger(__name__)
+
+VECTOR_SEARCH_ENABLED = os.getenv("VECTOR_SEARCH_ENABLED", "true").lower() == "true"
+VECTOR_SEARCH_BATCH_ROWS = int(os.getenv("VECTOR_SEARCH_BATCH_ROWS", "65536"))
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "exact")
+VECTOR_INDEX_DIR = os.getenv(
+    "VECTOR_INDEX_DIR", os.path.join(tempfile.gettempdir(), "knowledge-api-vectors")
+)
+VECTOR_INDEX_FLUSH_INTERVAL_SECONDS = float(os.getenv("VECTOR_INDEX_FLUSH_INTERVAL_SECONDS", "60"))
+VECTOR_SYNC_GRACE_SECONDS = float(os.getenv("VECTOR_SYNC_GRACE_SECONDS", "30"))
+
+# Session.info に変更を溜めておくキー
+PENDING_KEY = "vector_index_pending"
+# メッセージ1件あたりの変更数（一括作成時に分割する）
+MESSAGE_BATCH_SIZE = 100
+# 読み込み時に1回のロックで行列に加える行数
+LOAD_BATCH_SIZE = 1000
+# 行列の初期の行数
+INITIAL_CAPACITY = 64
+
+# 変更は JSON にそのまま載せられるリストで表す:
+#   ["vector", knowledge_id, document_id, dataset_id, base64(float32 リトルエンディアン)]   有効な Knowledge の作成・更新
+#   ["remove", knowledge_id]   Knowledge の削除・無効化
+#   ["remove_document", document_id]   ドキュメントの削除（配下の Knowledge も外す）
+#   ["remove_dataset", dataset_id]   データセットの削除（行列ごと破棄する）
+Operation = List[Optional[str]]
+# 読み込む行: (Knowledge ID, ドキュメントID, ベクトルのバイト列)
+EmbeddingRow = Tuple[str, str, bytes]
+# 埋め込みを読む関数: 引数が None なら有効なものすべて、日時ならそれ以降に更新された有効なもの
+EmbeddingLoader = Callable[[Optional[datetime]], Iterable[EmbeddingRow]]
+
+
+def encode_vector(vector: np.ndarray) -> bytes:
+    """ベクトルを保存・送信用のバイト列（float32 のリトルエンディアン）にする"""
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    """encode_vector のバイト列をベクトルに戻す"""
+    return np.frombuffer(data, dtype="<f4").astype(np.float32)
+
+
+def vector_operation(knowledge_id: str, document_id: str, dataset_id: str, vector: np.ndarray) -> Operation:
+    """有効な Knowledge の作成・更新を表す変更を作る"""
+    return [
+        "vector",
+        knowledge_id,
+        document_id,
+        dataset_id,
+        base64.b64encode(encode_vector(vector)).decode("ascii"),
+    ]
+
+
+class _DatasetMatrix:
+    """1データセット分の埋め込みの行列（追加は末尾に、削除は行を無効にする）"""
+
+    # 保存しないため、読み込みは常に全件から行う
+    watermark: Optional[float] = None
+    needs_compaction = False
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.matrix = np.zeros((INITIAL_CAPACITY, dimension), dtype=np.float32)
+        self.alive = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self.ids: List[Optional[str]] = []
+        self.positions: Dict[str, int] = {}
+        self.document_of: Dict[str, str] = {}
+        self.knowledges_of_document: Dict[str, Set[str]] = {}
+        self.size = 0
+        self.dead = 0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add_many(self, knowledge_ids: List[str], document_ids: List[str], vectors: np.ndarray) -> None:
+        for knowledge_id in knowledge_ids:
+            self.remove(knowledge_id)
+        count = len(knowledge_ids)
+        self._reserve(self.size + count)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        rows = self.matrix[self.size : self.size + count]
+        np.divide(vectors, norms, out=rows, where=norms > 0)
+        rows[(norms == 0).ravel()] = 0
+        self.alive[self.size : self.size + count] = True
+        for offset, (knowledge_id, document_id) in enumerate(zip(knowledge_ids, document_ids)):
+            self.positions[knowledge_id] = self.size + offset
+            self.ids.append(knowledge_id)
+            self.document_of[knowledge_id] = document_id
+            self.knowledges_of_document.setdefault(document_id, set()).add(knowledge_id)
+        self.size += count
+
+    def remove(self, knowledge_id: str) -> None:
+        position = self.positions.pop(knowledge_id, None)
+        if position is None:
+            return
+        self.alive[position] = False
+        self.ids[position] = None
+        self.dead += 1
+        document_id = self.document_of.pop(knowledge_id)
+        siblings = self.knowledges_of_document.get(document_id)
+        if siblings is not None:
+            siblings.discard(knowledge_id)
+            if not siblings:
+                del self.knowledges_of_document[document_id]
+        if self.dead > self.size // 2:
+            self._compact()
+
+    def remove_document(self, document_id: str) -> None:
+        for knowledge_id in list(self.knowledges_of_document.get(document_id, ())):
+            self.remove(knowledge_id)
+
+    def search_batch(self, queries: np.ndarray, limit: int) -> List[List[Tuple[str, float]]]:
+        # 追加は size より後ろの行に、作り直しは別の配列に行うため、検索中に読む範囲は変わらない
+        matrix, alive, ids, size = self.matrix, self.alive, self.ids, self.size
+        candidate_positions: List[np.ndarray] = []
+        candidate_scores: List[np.ndarray] = []
+        for start in range(0, size, VECTOR_SEARCH_BATCH_ROWS):
+            end = min(size, start + VECTOR_SEARCH_BATCH_ROWS)
+            scores = matrix[start:end] @ queries.T
+            scores[~alive[start:end]] = -np.inf
+            positions = _top_k(scores, limit)
+            candidate_positions.append(positions + start)
+            candidate_scores.append(np.take_along_axis(scores, positions, axis=0))
+        results: List[List[Tuple[str, float]]] = [[] for _ in range(len(queries))]
+        if not candidate_positions:
+            return results
+        positions = np.concatenate(candidate_positions)
+        scores = np.concatenate(candidate_scores)
+        best = _top_k(scores, limit)
+        for column in range(len(queries)):
+            rows = best[:, column]
+            order = np.lexsort((positions[rows, column], -scores[rows, column]))
+            for row in rows[order]:
+                score = scores[row, column]
+                knowledge_id = ids[positions[row, column]]
+                if np.isfinite(score) and knowledge_id is not None:
+                    results[column].append((knowledge_id, float(score)))
+        return results
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= len(self.matrix):
+            return
+        new_capacity = max(capacity, len(self.matrix) * 2)
+        matrix = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        matrix[: self.size] = self.matrix[: self.size]
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[: self.size] = self.alive[: self.size]
+        self.matrix, self.alive = matrix, alive
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self.alive[: self.size])
+        capacity = max(INITIAL_CAPACITY, len(keep) * 2)
+        matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        matrix[: len(keep)] = self.matrix[keep]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: len(keep)] = True
+        ids = [self.ids[position] for position in keep]
+        self.positions = {knowledge_id: position for position, knowledge_id in enumerate(ids)}
+        self.matrix, self.alive, self.ids = matrix, alive, ids
+        self.size = len(keep)
+        self.dead = 0
+
+
+# データセットごとの索引
+DatasetIndex = Union[_DatasetMatrix, HNSWIndex]
+
+
+class _Loading:
+    """読み込み中・作り直し中のデータセット（開始後に反映された変更を記録する）"""
+
+    def __init__(self, matrix: DatasetIndex):
+        self.matrix = matrix
+        self.touched: Set[str] = set()
+        self.removed_documents: Set[str] = set()
+        self.dropped = False
+
+
+class VectorIndex:
+    """データセットごとの埋め込みの索引と、その読み込み・更新・保存の管理"""
+
+    def __init__(
+        self,
+        l2: Optional[CacheBackend] = None,
+        key_prefix: str = CACHE_KEY_PREFIX,
+        kind: str = VECTOR_INDEX,
+        directory: str = VECTOR_INDEX_DIR,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            l2 (Optional[CacheBackend]): 変更の publish 先。None の場合は自プロセスのみ
+            key_prefix (str): チャネル名の接頭辞
+            kind (str): 索引の種類（exact / hnsw）
+            directory (str): HNSW グラフを保存するディレクトリ
+        """
+        if kind not in ("exact", "hnsw"):
+            raise ValueError(f"Unsupported VECTOR_INDEX: {kind}")
+        self.l2 = l2
+        self.channel = f"{key_prefix}:invalidate"
+        self.message_name = "vector:knowledges"
+        self.kind = kind
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._matrices: Dict[str, DatasetIndex] = {}
+        self._loading: Dict[str, _Loading] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def is_loaded(self, dataset_id: str) -> bool:
+        """データセットの索引を読み込み済みか"""
+        return dataset_id in self._matrices
+
+    def size(self, dataset_id: str) -> int:
+        """読み込み済みのデータセットの有効な行数（読み込んでいない場合は 0）"""
+        matrix = self._matrices.get(dataset_id)
+        return len(matrix) if matrix is not None else 0
+
+    def search(
+        self,
+        dataset_id: str,
+        vector: np.ndarray,
+        limit: int,
+        load: EmbeddingLoader,
+        load_ids: Optional[Callable[[], Iterable[str]]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        コサイン類似度の降順に上位 limit 件を返す（search_batch を参照）
+
+        Args:
+            dataset_id (str): データセットID
+            vector (np.ndarray): 検索語の埋め込み（次元数のベクトル）
+            limit (int): 返す件数の上限
+            load (EmbeddingLoader): 未読み込みの場合にデータセットの有効な埋め込みを読む関数
+            load_ids (Optional[Callable[[], Iterable[str]]]): データセットの有効な埋め込みの Knowledge ID を読む関数
+                （保存した索引を開いたときに、停止中に削除・無効化された Knowledge を外すのに使う）
+
+        Returns:
+            List[Tuple[str, float]]: [(Knowledge ID, 類似度)]
+        """
+        return self.search_batch(dataset_id, np.asarray(vector, dtype=np.float32)[None, :], limit, load, load_ids)[0]
+
+    def search_batch(
+        self,
+        dataset_id: str,
+        vectors: np.ndarray,
+        limit: int,
+        load: EmbeddingLoader,
+        load_ids: Optional[Callable[[], Iterable[str]]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        複数の検索語について、コサイン類似度の降順に上位 limit 件ずつ返す
+
+        exact では行列を VECTOR_SEARCH_BATCH_ROWS 行ずつ (行数 × 検索語数) の類似度にまとめて計算し、
+        区間ごとに argpartition で上位 limit 件の候補に絞ってから、候補の中で並べる。
+        hnsw ではグラフを探索した近似の上位 limit 件を返す。
+
+        Args:
+            dataset_id (str): データセットID
+            vectors (np.ndarray): 検索語の埋め込み（検索語数 × 次元数）
+            limit (int): 返す件数の上限
+            load (EmbeddingLoader): 未読み込みの場合にデータセットの有効な埋め込みを読む関数
+            load_ids (Optional[Callable[[], Iterable[str]]]): データセットの有効な埋め込みの Knowledge ID を読む関数
+
+        Returns:
+            List[List[Tuple[str, float]]]: 検索語ごとの [(Knowledge ID, 類似度)]（exact の同点は行の順）
+        """
+        queries = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+        matrix = self._matrix(dataset_id, queries.shape[1], load, load_ids)
+        if matrix.dimension != queries.shape[1]:
+            raise ValueError(
+                f"Query dimension {queries.shape[1]} does not match index dimension {matrix.dimension}"
+            )
+        return matrix.search_batch(queries, limit)
+
+    def apply(self, operations: Iterable[Operation]) -> None:
+        """
+        変更を自プロセスの索引（読み込み中・作り直し中のものを含む）に反映する
+
+        Args:
+            operations (Iterable[Operation]): 変更
+        """
+        with self._lock:
+            for operation in operations:
+                kind = operation[0]
+                if kind == "vector":
+                    _, knowledge_id, document_id, dataset_id, encoded = operation
+                    loading = self._loading.get(dataset_id)
+                    if loading is not None:
+                        loading.touched.add(knowledge_id)
+                    for matrix in (self._matrices.get(dataset_id), loading and loading.matrix):
+                        if matrix is None:
+                            continue
+                        vector = decode_vector(base64.b64decode(encoded))
+                        if len(vector) != matrix.dimension:
+                            logger.warning("Error: Ignored embedding with dimension %d", len(vector))
+                            continue
+                        matrix.add_many([knowledge_id], [document_id], vector[None, :])
+                elif kind == "remove":
+                    for loading in self._loading.values():
+                        loading.touched.add(operation[1])
+                    for matrix in self._targets():
+                        matrix.remove(operation[1])
+                elif kind == "remove_document":
+                    for loading in self._loading.values():
+                        loading.removed_documents.add(operation[1])
+                    for matrix in self._targets():
+                        matrix.remove_document(operation[1])
+                elif kind == "remove_dataset":
+                    self._matrices.pop(operation[1], None)
+                    loading = self._loading.get(operation[1])
+                    if loading is not None:
+                        loading.dropped = True
+                    if self.kind == "hnsw":
+                        try:
+                            os.remove(self._path(operation[1]))
+                        except FileNotFoundError:
+                            pass
+
+    def publish(self, operations: List[Operation]) -> None:
+        """
+        変更を他ノードに通知する
+
+        Args:
+            operations (List[Operation]): 変更
+        """
+        if self.l2 is None:
+            return
+        try:
+            for start in range(0, len(operations), MESSAGE_BATCH_SIZE):
+                message = json.dumps(
+                    {
+                        "origin": NODE_ID,
+                        "cache": self.message_name,
+                        "op": "apply",
+                        "value": operations[start : start + MESSAGE_BATCH_SIZE],
+                    },
+                    ensure_ascii=False,
+                )
+                self.l2.publish(self.channel, message.encode("utf-8"))
+        except CacheBackendError as e:
+            logger.warning("Error: Failed to publish vector index updates. Error: %s", str(e))
+
+    def apply_message(self, op: str, value) -> None:
+        """
+        他ノードからの変更メッセージを反映する
+
+        Args:
+            op (str): apply
+            value: 変更のリスト
+        """
+        if op == "apply":
+            self.apply(value)
+
+    def clear(self) -> None:
+        """読み込んだ索引を破棄する（次の検索で読み込み直す）"""
+        with self._lock:
+            self._matrices.clear()
+
+    def compact(self, dataset_id: str) -> bool:
+        """
+        無効な行が半数を超えた HNSW グラフを有効な行だけで作り直して差し替える
+
+        作り直しの間も古いグラフで検索し、作り直し中の変更は新しいグラフにも反映する。
+
+        Args:
+            dataset_id (str): データセットID
+
+        Returns:
+            bool: 作り直した場合は True
+        """
+        current = self._matrices.get(dataset_id)
+        if current is None or not current.needs_compaction:
+            return False
+        with self._lock:
+            load_lock = self._load_locks.setdefault(dataset_id, threading.Lock())
+        with load_lock:
+            if self._matrices.get(dataset_id) is not current:
+                return False
+            logger.info("Start: Compacting vector index for dataset_id=%s", dataset_id)
+            rebuilt = HNSWIndex(current.dimension, current.m, current.ef_construction, current.ef_search)
+            rebuilt.watermark = current.watermark
+            loading = _Loading(rebuilt)
+            with self._lock:
+                self._loading[dataset_id] = loading
+            try:
+                knowledge_ids, document_ids, vectors = current.live_rows()
+                for start in range(0, len(knowledge_ids), LOAD_BATCH_SIZE):
+                    end = start + LOAD_BATCH_SIZE
+                    self._load_vectors(loading, knowledge_ids[start:end], document_ids[start:end], vectors[start:end])
+                with self._lock:
+                    if not loading.dropped and self._matrices.get(dataset_id) is current:
+                        self._matrices[dataset_id] = rebuilt
+            finally:
+                with self._lock:
+                    self._loading.pop(dataset_id, None)
+                    self._load_locks.pop(dataset_id, None)
+            logger.info("Success: Compacted vector index to %d rows for dataset_id=%s", len(rebuilt), dataset_id)
+            return True
+
+    def flush(self) -> int:
+        """
+        変更のあった HNSW グラフを保存する
+
+        Returns:
+            int: 保存したデータセットの数
+        """
+        if self.kind != "hnsw":
+            return 0
+        saved = 0
+        for dataset_id, matrix in list(self._matrices.items()):
+            if not matrix.changes:
+                continue
+            try:
+                matrix.save(self._path(dataset_id))
+                saved += 1
+            except OSError as e:
+                logger.error("Error: Failed to save vector index for dataset_id=%s. Error: %s", dataset_id, str(e))
+        return saved
+
+    def start(self) -> threading.Thread:
+        """
+        HNSW グラフの保存・作り直しを行うスレッドを開始する
+
+        Returns:
+            threading.Thread: 開始したスレッド
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vector-index", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, flush: bool = True) -> None:
+        """
+        スレッドを止める
+
+        Args:
+            flush (bool): 止めた後に変更のあったグラフを保存するか
+        """
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        if flush:
+            self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(VECTOR_INDEX_FLUSH_INTERVAL_SECONDS):
+            try:
+                for dataset_id in list(self._matrices):
+                    self.compact(dataset_id)
+                self.flush()
+            except Exception as e:
+                logger.error("Error: Failed to maintain vector index. Error: %s", str(e))
+
+    def _targets(self) -> List[DatasetIndex]:
+        return [*self._matrices.values(), *(loading.matrix for loading in self._loading.values())]
+
+    def _path(self, dataset_id: str) -> str:
+        return os.path.join(self.directory, f"{dataset_id}.hnsw.npz")
+
+    def _create(self, dataset_id: str, dimension: int) -> DatasetIndex:
+        if self.kind == "exact":
+            return _DatasetMatrix(dimension)
+        try:
+            saved = HNSWIndex.load(self._path(dataset_id), dimension)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Error: Ignored unreadable vector index for dataset_id=%s. Error: %s", dataset_id, str(e))
+            saved = None
+        return saved if saved is not None else HNSWIndex(dimension)
+
+    def _matrix(
+        self,
+        dataset_id: str,
+        dimension: int,
+        load: EmbeddingLoader,
+        load_ids: Optional[Callable[[], Iterable[str]]],
+    ) -> DatasetIndex:
+        matrix = self._matrices.get(dataset_id)
+        if matrix is not None:
+            return matrix
+        with self._lock:
+            load_lock = self._load_locks.setdefault(dataset_id, threading.Lock())
+        # 同じデータセットの読み込みは1回にまとめ、他の検索は読み込みの完了を待つ
+        with load_lock:
+            matrix = self._matrices.get(dataset_id)
+            if matrix is not None:
+                return matrix
+            logger.info("Start: Loading embeddings for dataset_id=%s", dataset_id)
+            started = time.time()
+            matrix = self._create(dataset_id, dimension)
+            since = None
+            if matrix.watermark is not None and load_ids is not None:
+                since = datetime.fromtimestamp(matrix.watermark - VECTOR_SYNC_GRACE_SECONDS)
+            loading = _Loading(matrix)
+            with self._lock:
+                self._loading[dataset_id] = loading
+            try:
+                batch: List[EmbeddingRow] = []
+                for row in load(since):
+                    batch.append(row)
+                    if len(batch) >= LOAD_BATCH_SIZE:
+                        self._load_batch(loading, batch)
+                        batch = []
+                self._load_batch(loading, batch)
+                if since is not None:
+                    self._remove_missing(loading, set(load_ids()))
+                matrix.watermark = started
+                with self._lock:
+                    if not loading.dropped:
+                        self._matrices[dataset_id] = matrix
+            finally:
+                with self._lock:
+                    self._loading.pop(dataset_id, None)
+                    self._load_locks.pop(dataset_id, None)
+            logger.info("Success: Loaded %d embeddings for dataset_id=%s", len(matrix), dataset_id)
+            return matrix
+
+    def _load_batch(self, loading: _Loading, rows: List[EmbeddingRow]) -> None:
+        vectors = [decode_vector(data) for _, _, data in rows]
+        keep = [index for index, vector in enumerate(vectors) if len(vector) == loading.matrix.dimension]
+        if keep:
+            self._load_vectors(
+                loading,
+                [rows[index][0] for index in keep],
+                [rows[index][1] for index in keep],
+                np.stack([vectors[index] for index in keep]),
+            )
+
+    def _load_vectors(
+        self, loading: _Loading, knowledge_ids: List[str], document_ids: List[str], vectors: np.ndarray
+    ) -> None:
+        # 読み取り開始後に反映された書き込みを、古い読み取り結果で上書きしないよう排他する
+        with self._lock:
+            keep = [
+                index
+                for index, (knowledge_id, document_id) in enumerate(zip(knowledge_ids, document_ids))
+                if knowledge_id not in loading.touched and document_id not in loading.removed_documents
+            ]
+            if keep:
+                loading.matrix.add_many(
+                    [knowledge_ids[index] for index in keep],
+                    [document_ids[index] for index in keep],
+                    vectors[keep],
+                )
+
+    def _remove_missing(self, loading: _Loading, live_ids: Set[str]) -> None:
+        # 保存した索引にあるが、DB で削除・無効化された Knowledge を外す（読み込み開始後に反映されたものは除く）
+        with self._lock:
+            for knowledge_id in list(loading.matrix.nodes):
+                if knowledge_id not in live_ids and knowledge_id not in loading.touched:
+                    loading.matrix.remove(knowledge_id)
+
+
+def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+    # 列ごとに大きい順の上位 limit 件の行番号（順不同）を返す
+    if len(scores) <= limit:
+        return np.broadcast_to(np.arange(len(scores))[:, None], scores.shape).copy()
+    return np.argpartition(-scores, limit - 1, axis=0)[:limit]
+
+
+vector_index = VectorIndex(l2_backend)
+message_handlers[vector_index.message_name] = vector_index.apply_message
+
+
+def start_vector_index() -> Optional[threading.Thread]:
+    """
+    HNSW グラフの保存・作り直しを行うスレッドを開始する（アプリケーション起動時に呼び出す）
+
+    Returns:
+        Optional[threading.Thread]: スレッド。ベクトル検索が無効、または exact の場合は None
+    """
+    if not VECTOR_SEARCH_ENABLED or vector_index.kind != "hnsw":
+        return None
+    return vector_index.start()
+
+
+def stop_vector_index() -> None:
+    """スレッドを止め、変更のあった HNSW グラフを保存する（アプリケーション終了時に呼び出す）"""
+    if VECTOR_SEARCH_ENABLED and vector_index.kind == "hnsw":
+        vector_index.stop()
+
+
+def record_vector_changes(session: Session, *operations: Operation) -> None:
+    """
+    書き込みに伴う埋め込みの変更を記録する（コミット後に反映・通知する）
+
+    Args:
+        session (Session): 書き込みを行ったセッション
+        *operations (Operation): 変更
+    """
+    if not VECTOR_SEARCH_ENABLED:
+        return
+    session.info.setdefault(PENDING_KEY, []).extend(operations)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session) -> None:
+    # SAVEPOINT の解放でも呼ばれるため、最も外側のトランザクションのコミットでのみ反映する
+    if session.in_nested_transaction():
+        return
+    operations = session.info.pop(PENDING_KEY, None)
+    if operations:
+        # 非同期のコミットから呼ばれた場合、行列・HNSW グラフへの反映はイベントループの外で行う
+        run_blocking(vector_index.apply, operations)
+        vector_index.publish(operations)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_rollback(session: Session, transaction) -> None:
+    # ロールバックされた書き込みの変更は破棄する（コミット時は after_commit で処理済み）
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,134 @@
+"""
+条件付き GET（ETag / Last-Modified と 304 Not Modified）
+
+単体取得は (id, updated_at) から強い ETag を、一覧は (件数, updated_at の最大値, クエリ条件) から
+ETag を求める。If-None-Match が一致した場合（If-None-Match が無い単体取得では
+If-Modified-Since 以降に更新されていない場合）は本文なしの 304 を返す。
+
+一覧は削除で updated_at の最大値が変わらないことがあるため Last-Modified を返さず、
+If-Modified-Since も評価しない（件数を含む ETag で判定する）。
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+def _quote(*parts: Any) -> str:
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _to_utc(value: datetime) -> datetime:
+    """日時を UTC に変換する（タイムゾーン無しの値はサーバーのローカル時刻とみなす）"""
+    return value.astimezone(timezone.utc)
+
+
+def entity_etag(entity_id: str, updated_at: Optional[datetime], *variant: Any) -> Optional[str]:
+    """
+    エンティティの強い ETag を求める
+
+    Args:
+        entity_id (str): エンティティID
+        updated_at (Optional[datetime]): 更新日時
+        *variant (Any): 表現を変える値（埋め込む関連データの種類や更新日時など）
+
+    Returns:
+        Optional[str]: ダブルクォート付きの ETag。updated_at が無い場合は None
+    """
+    if updated_at is None:
+        return None
+    return _quote(entity_id, _to_utc(updated_at).isoformat(), *variant)
+
+
+def list_etag(count: int, last_updated_at: Optional[datetime], *params: Any) -> str:
+    """
+    一覧の ETag を求める
+
+    Args:
+        count (int): 一覧対象の件数
+        last_updated_at (Optional[datetime]): 一覧対象の updated_at の最大値
+        *params (Any): 表現を変えるクエリ条件（skip / limit / cursor / count など）
+
+    Returns:
+        str: ダブルクォート付きの ETag
+    """
+    changed_at = _to_utc(last_updated_at).isoformat() if last_updated_at else None
+    return _quote(count, changed_at, *params)
+
+
+def http_date(value: datetime) -> str:
+    """
+    日時を HTTP-date（RFC 9110）形式にする
+
+    Args:
+        value (datetime): 日時
+
+    Returns:
+        str: 例 "Wed, 01 May 2024 03:04:05 GMT"
+    """
+    return format_datetime(_to_utc(value).replace(microsecond=0), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    リクエストの条件ヘッダーから 304 を返せるか判定する
+
+    If-None-Match がある場合はそれのみで判定し（弱い比較）、無い場合に限り If-Modified-Since を評価する。
+
+    Args:
+        request (Request): リクエスト
+        etag (str): 現在の ETag
+        last_modified (Optional[datetime]): 現在の最終更新日時（None の場合 If-Modified-Since は評価しない）
+
+    Returns:
+        bool: 変更が無い（304 を返せる）場合は True
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return any(
+            candidate == "*" or candidate.removeprefix("W/") == etag for candidate in candidates
+        )
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return _to_utc(last_modified).replace(microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: Optional[str],
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """
+    検証子（ETag / Last-Modified）をレスポンスヘッダーに設定し、変更が無ければ 304 レスポンスを返す
+
+    Args:
+        request (Request): リクエスト
+        response (Response): FastAPI が本文と合成するレスポンス（ヘッダー設定先）
+        etag (Optional[str]): 現在の ETag（None の場合は何もしない）
+        last_modified (Optional[datetime]): 現在の最終更新日時
+
+    Returns:
+        Optional[Response]: 304 レスポンス。変更がある場合は None（通常どおり本文を返す）
+    """
+    if etag is None:
+        return None
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,55 @@
+"""
+ルートで発生した例外を HTTP のエラー応答に変換する（同期版・非同期版のルートで共通）
+
+ハンドラー（app/interfaces/api/handlers）が送出した HTTPException はそのまま返し、
+それ以外の例外を次のように変換する。
+
+- SearchUnavailableError: 503（索引の構築中。Retry-After を付ける）
+- ValueError: not_found=True の場合は 404（ユースケースが対象の不在を ValueError で伝えるため）
+- その他: 500
+"""
+
+import logging
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi import HTTPException
+
+from app.domain.repositories.knowledge_search_repository import SearchUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# 索引の構築中に返す Retry-After（秒）
+SEARCH_RETRY_AFTER_SECONDS = 5
+
+
+@contextmanager
+def api_errors(action: str, not_found: bool = False) -> Iterator[None]:
+    """
+    ブロック内の例外を HTTPException に変換する
+
+    Args:
+        action (str): エラーログに出す処理名（例: "update knowledge"）
+        not_found (bool): True の場合は ValueError を 404 にする（False の場合は 500）
+
+    Raises:
+        HTTPException: ブロック内で例外が発生した場合
+    """
+    try:
+        yield
+    except HTTPException:
+        raise
+    except SearchUnavailableError as e:
+        logger.error("Error: Search is unavailable. Error: %s", str(e))
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(SEARCH_RETRY_AFTER_SECONDS)}
+        )
+    except ValueError as e:
+        if not not_found:
+            logger.error("Error: Failed to %s. Error: %s", action, str(e))
+            raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Error: %s", str(e))
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error("Error: Failed to %s. Error: %s", action, str(e))
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,42 @@
+"""
+一覧・検索APIの meta_data による絞り込み（?meta.<key>=<value>）
+
+クエリパラメータのうち "meta." で始まるものを meta_data のキーと値の組として受け取る。
+複数指定した場合はすべて一致するものに絞り込む。例: ?meta.source=faq&meta.lang=ja
+"""
+
+from typing import Dict
+
+from fastapi import HTTPException, Request
+
+from app.infrastructure.database.meta_filter import is_valid_meta_key
+
+META_PARAM_PREFIX = "meta."
+
+# 1リクエストで指定できる絞り込み条件の数
+MAX_META_FILTERS = 10
+
+
+def meta_filters(request: Request) -> Dict[str, str]:
+    """
+    クエリパラメータの meta.<key>=<value> を取り出す（不正な場合は 400 を送出。Depends で使う）
+
+    Args:
+        request (Request): リクエスト
+
+    Returns:
+        Dict[str, str]: meta_data のキー → 値。指定が無い場合は空
+    """
+    meta: Dict[str, str] = {}
+    for name, value in request.query_params.multi_items():
+        if not name.startswith(META_PARAM_PREFIX):
+            continue
+        key = name[len(META_PARAM_PREFIX):]
+        if not is_valid_meta_key(key):
+            raise HTTPException(status_code=400, detail=f"Invalid meta filter key: {key}")
+        if key in meta:
+            raise HTTPException(status_code=400, detail=f"Duplicate meta filter key: {key}")
+        meta[key] = value
+    if len(meta) > MAX_META_FILTERS:
+        raise HTTPException(status_code=400, detail=f"Too many meta filters (max {MAX_META_FILTERS})")
+    return meta
@@ -0,0 +1,8 @@
+"""
+API の処理本体（同期版・非同期版のルートで共通）
+
+各関数は同期の Session を受け取り、同期版のルート（app/interfaces/api/v1/<リソース>.py）からは
+そのまま、非同期版のルート（async_<リソース>.py）からは AsyncSession.run_sync 経由で呼ぶ。
+ルートはリクエストの受け取り・条件付き GET・応答の組み立てだけを行い、
+例外の変換は app/interfaces/api/errors.py の api_errors で共通にする。
+"""
@@ -0,0 +1,334 @@
+"""
+データセット API の処理本体（datasets.py・async_datasets.py のルートで共通）
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.dataset_stats import DatasetStats
+from app.domain.entities.retrieval import RetrievalResult
+from app.infrastructure.cache.cached_repositories import (
+    CachedDatasetRepository,
+    CachedDocumentRepository,
+    CachedKnowledgeRepository,
+)
+from app.infrastructure.repositories.dataset_repository_impl import (
+    DatasetRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.document_repository_impl import (
+    DocumentRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.knowledge_repository_impl import (
+    KnowledgeRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.knowledge_search_repository_impl import (
+    get_knowledge_search_repository,
+)
+from app.infrastructure.repositories.knowledge_vector_search_repository_impl import (
+    KnowledgeVectorSearchRepositoryNumpy,
+)
+from app.infrastructure.repositories.stats_repository_impl import StatsRepositorySQLAlchemy
+from app.infrastructure.search.knowledge_index import SEARCH_BACKEND
+from app.interfaces.schemas.dataset import (
+    DatasetCreate,
+    DatasetRetrieveRequest,
+    DatasetRetrieveResponse,
+    RetrievedKnowledgeItem,
+)
+from app.usecases.datasets.create_dataset import CreateDatasetUseCase
+from app.usecases.datasets.delete_dataset import DeleteDatasetUseCase
+from app.usecases.datasets.get_dataset import GetDatasetUseCase
+from app.usecases.datasets.get_dataset_stats import GetDatasetStatsUseCase
+from app.usecases.datasets.list_datasets import ListDatasetsUseCase
+from app.usecases.datasets.retrieve_knowledges import (
+    LEXICAL_MODES,
+    VECTOR_MODES,
+    RetrieveKnowledgesUseCase,
+    candidate_count,
+)
+from app.usecases.datasets.update_dataset import UpdateDatasetUseCase
+
+logger = logging.getLogger(__name__)
+
+
+def create_dataset(session: Session, dataset_create: DatasetCreate) -> Dataset:
+    """
+    データセットを作成する
+
+    Args:
+        session (Session): DBセッション
+        dataset_create (DatasetCreate): 作成する内容
+
+    Returns:
+        Dataset: 作成したデータセット
+    """
+    return CreateDatasetUseCase(DatasetRepositorySQLAlchemy(session)).execute(
+        name=dataset_create.name,
+        description=dataset_create.description,
+        meta_data=dataset_create.meta_data,
+        is_active=dataset_create.is_active,
+    )
+
+
+def summarize_datasets(session: Session) -> Tuple[int, Optional[datetime]]:
+    """
+    データセットの件数と最終更新日時を返す（一覧の ETag に使う）
+
+    Args:
+        session (Session): DBセッション
+
+    Returns:
+        Tuple[int, Optional[datetime]]: (件数, updated_at の最大値)
+    """
+    return CachedDatasetRepository(DatasetRepositorySQLAlchemy(session)).summarize_datasets()
+
+
+def list_datasets(
+    session: Session,
+    skip: int,
+    limit: int,
+    after: Optional[Tuple[datetime, str]],
+    meta: Optional[Dict[str, str]],
+) -> List[Dataset]:
+    """
+    データセットの一覧を返す
+
+    Args:
+        session (Session): DBセッション
+        skip (int): スキップする件数（after を指定した場合は無視）
+        limit (int): 取得する件数の上限
+        after (Optional[Tuple[datetime, str]]): 直前ページ最終行の (created_at, id)
+        meta (Optional[Dict[str, str]]): meta_data の絞り込み条件
+
+    Returns:
+        List[Dataset]: (created_at, id) の昇順のデータセット
+    """
+    return ListDatasetsUseCase(DatasetRepositorySQLAlchemy(session)).execute(
+        skip=skip, limit=limit, after=after, meta=meta
+    )
+
+
+def count_datasets(session: Session, meta: Optional[Dict[str, str]]) -> int:
+    """
+    絞り込み条件に一致するデータセットの件数を返す
+
+    Args:
+        session (Session): DBセッション
+        meta (Optional[Dict[str, str]]): meta_data の絞り込み条件
+
+    Returns:
+        int: 件数
+    """
+    return CachedDatasetRepository(DatasetRepositorySQLAlchemy(session)).count_datasets(meta=meta)
+
+
+def get_dataset(session: Session, dataset_id: str) -> Dataset:
+    """
+    データセットをIDで取得する
+
+    Args:
+        session (Session): DBセッション
+        dataset_id (str): データセットID
+
+    Returns:
+        Dataset: 取得したデータセット
+
+    Raises:
+        ValueError: 存在しない場合
+    """
+    return GetDatasetUseCase(CachedDatasetRepository(DatasetRepositorySQLAlchemy(session))).execute(dataset_id)
+
+
+def get_dataset_stats(session: Session, dataset_id: str) -> DatasetStats:
+    """
+    データセットの集計値を取得する
+
+    Args:
+        session (Session): DBセッション
+        dataset_id (str): データセットID
+
+    Returns:
+        DatasetStats: 集計値
+
+    Raises:
+        ValueError: 存在しない場合
+    """
+    return GetDatasetStatsUseCase(StatsRepositorySQLAlchemy(session)).execute(dataset_id)
+
+
+def _retrieval_usecase(session: Session) -> RetrieveKnowledgesUseCase:
+    return RetrieveKnowledgesUseCase(
+        CachedDatasetRepository(DatasetRepositorySQLAlchemy(session)),
+        get_knowledge_search_repository(session),
+        KnowledgeVectorSearchRepositoryNumpy(),
+        CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session)),
+        CachedDocumentRepository(DocumentRepositorySQLAlchemy(session)),
+    )
+
+
+def retrieve_knowledges(session: Session, dataset_id: str, request_body: DatasetRetrieveRequest) -> RetrievalResult:
+    """
+    データセット内のKnowledgeを全文検索とベクトル検索で探し、融合した結果を返す
+
+    Args:
+        session (Session): DBセッション（Knowledge 本体・ドキュメントのタイトルの取得に使う）
+        dataset_id (str): データセットID
+        request_body (DatasetRetrieveRequest): 検索語・件数・スコアの下限・融合方法
+
+    Returns:
+        RetrievalResult: スコアの降順の結果と段階ごとの所要時間
+
+    Raises:
+        ValueError: データセットが存在しない場合
+        SearchUnavailableError: 使う索引のいずれかが使えない場合
+    """
+    return _retrieval_usecase(session).execute(
+        dataset_id,
+        request_body.query,
+        top_k=request_body.top_k,
+        score_threshold=request_body.score_threshold,
+        mode=request_body.mode,
+        fusion=request_body.fusion,
+        vector_weight=request_body.vector_weight,
+    )
+
+
+async def retrieve_knowledges_async(
+    session: AsyncSession, dataset_id: str, request_body: DatasetRetrieveRequest
+) -> RetrievalResult:
+    """
+    retrieve_knowledges の非同期版（async_datasets.py のルートで使う）
+
+    DB を読む段階（データセットの存在確認・Knowledge 本体とタイトルの取得）だけを AsyncSession.run_sync で実行し、
+    全文検索（プロセス内の索引の BM25）とベクトル検索（埋め込みの計算・索引の読み込みと探索）は
+    スレッドで並行に実行してイベントループを止めない。SEARCH_BACKEND=database の全文検索は DB を読むため run_sync で実行する。
+
+    Args:
+        session (AsyncSession): 非同期DBセッション
+        dataset_id (str): データセットID
+        request_body (DatasetRetrieveRequest): 検索語・件数・スコアの下限・融合方法
+
+    Returns:
+        RetrievalResult: スコアの降順の結果と段階ごとの所要時間
+
+    Raises:
+        ValueError: データセットが存在しない場合
+        SearchUnavailableError: 使う索引のいずれかが使えない場合
+    """
+    started = time.perf_counter()
+    usecase = _retrieval_usecase(session.sync_session)
+    await session.run_sync(lambda _: usecase.check_dataset(dataset_id))
+    query, mode = request_body.query, request_body.mode
+    candidates = candidate_count(request_body.top_k)
+
+    async def no_hits():
+        return [], None
+
+    if mode not in LEXICAL_MODES:
+        lexical_stage = no_hits()
+    elif SEARCH_BACKEND == "database":
+        lexical_stage = session.run_sync(lambda _: usecase.search_lexical(query, dataset_id, candidates))
+    else:
+        lexical_stage = asyncio.to_thread(usecase.search_lexical, query, dataset_id, candidates)
+    if mode in VECTOR_MODES:
+        vector_stage = asyncio.to_thread(usecase.search_vector, query, dataset_id, candidates)
+    else:
+        vector_stage = no_hits()
+    # 一方が失敗しても、もう一方の完了（または失敗）を待ってから返す
+    results = await asyncio.gather(lexical_stage, vector_stage, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    (lexical, lexical_elapsed), (vector, vector_elapsed) = results
+    timings: Dict[str, float] = {}
+    if lexical_elapsed is not None:
+        timings["lexical"] = lexical_elapsed
+    if vector_elapsed is not None:
+        timings["vector"] = vector_elapsed
+
+    return await session.run_sync(
+        lambda _: usecase.combine(
+            lexical,
+            vector,
+            timings,
+            started,
+            top_k=request_body.top_k,
+            score_threshold=request_body.score_threshold,
+            mode=mode,
+            fusion=request_body.fusion,
+            vector_weight=request_body.vector_weight,
+        )
+    )
+
+
+def retrieve_response(result: RetrievalResult) -> DatasetRetrieveResponse:
+    """
+    検索結果を応答に変換する
+
+    Args:
+        result (RetrievalResult): 検索結果
+
+    Returns:
+        DatasetRetrieveResponse: 所属ドキュメントのタイトル・各検索のスコア付きの結果と所要時間
+    """
+    return DatasetRetrieveResponse(
+        items=[
+            RetrievedKnowledgeItem.model_validate(
+                {
+                    **vars(item.knowledge),
+                    "score": item.score,
+                    "document_title": item.document_title,
+                    "lexical_score": item.lexical_score,
+                    "vector_score": item.vector_score,
+                }
+            )
+            for item in result.items
+        ],
+        timings=result.timings,
+    )
+
+
+def update_dataset(session: Session, dataset_id: str, dataset_update: DatasetCreate) -> Dataset:
+    """
+    データセットを更新する
+
+    Args:
+        session (Session): DBセッション（プライマリ）
+        dataset_id (str): データセットID
+        dataset_update (DatasetCreate): 更新する内容
+
+    Returns:
+        Dataset: 更新後のデータセット
+    """
+    return UpdateDatasetUseCase(CachedDatasetRepository(DatasetRepositorySQLAlchemy(session))).execute(
+        dataset_id=dataset_id,
+        name=dataset_update.name,
+        description=dataset_update.description,
+        meta_data=dataset_update.meta_data,
+        is_active=dataset_update.is_active,
+    )
+
+
+def delete_dataset(session: Session, dataset_id: str) -> None:
+    """
+    データセットをIDで削除する
+
+    Args:
+        session (Session): DBセッション（プライマリ）
+        dataset_id (str): データセットID
+
+    Raises:
+        HTTPException: 存在しない場合は 404
+    """
+    success = DeleteDatasetUseCase(CachedDatasetRepository(DatasetRepositorySQLAlchemy(session))).execute(dataset_id)
+    if not success:
+        logger.error("Error: Dataset not found for deletion with id=%s", dataset_id)
+        raise HTTPException(status_code=404, detail="Dataset not found")
@@ -0,0 +1,158 @@
+"""
+ドキュメント API の処理本体（documents.py・async_documents.py のルートで共通）
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.domain.entities.document import Document
+from app.infrastructure.cache.cached_repositories import CachedDocumentRepository
+from app.infrastructure.repositories.document_repository_impl import (
+    DocumentRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.unit_of_work_impl import UnitOfWorkSQLAlchemy
+from app.interfaces.schemas.document import DocumentCreate, DocumentUpdate
+from app.usecases.documents.create_document import CreateDocumentUseCase
+from app.usecases.documents.delete_document import DeleteDocumentUseCase
+from app.usecases.documents.get_document import GetDocumentUseCase
+from app.usecases.documents.list_documents import ListDocumentsUseCase
+from app.usecases.documents.update_document import UpdateDocumentUseCase
+
+logger = logging.getLogger(__name__)
+
+
+def create_document(session: Session, document_create: DocumentCreate) -> Document:
+    """
+    ドキュメントを作成する（データセットの自動生成とドキュメント作成を1トランザクションで行う）
+
+    Args:
+        session (Session): DBセッション
+        document_create (DocumentCreate): 作成する内容
+
+    Returns:
+        Document: 作成したドキュメント
+    """
+    return CreateDocumentUseCase(UnitOfWorkSQLAlchemy(session)).execute(
+        dataset_id=document_create.dataset_id,
+        title=document_create.title,
+        content=document_create.content,
+        meta_data=document_create.meta_data,
+        is_active=document_create.is_active,
+    )
+
+
+def summarize_documents(session: Session, dataset_id: str) -> Tuple[int, Optional[datetime]]:
+    """
+    データセットに属するドキュメントの件数と最終更新日時を返す（一覧の ETag に使う）
+
+    Args:
+        session (Session): DBセッション
+        dataset_id (str): データセットID
+
+    Returns:
+        Tuple[int, Optional[datetime]]: (件数, updated_at の最大値)
+    """
+    return CachedDocumentRepository(DocumentRepositorySQLAlchemy(session)).summarize_documents(dataset_id)
+
+
+def list_documents(
+    session: Session,
+    dataset_id: str,
+    skip: int,
+    limit: int,
+    after: Optional[Tuple[datetime, str]],
+    meta: Optional[Dict[str, str]],
+) -> List[Document]:
+    """
+    データセットに属するドキュメントの一覧を返す
+
+    Args:
+        session (Session): DBセッション
+        dataset_id (str): データセットID
+        skip (int): スキップする件数（after を指定した場合は無視）
+        limit (int): 取得する件数の上限
+        after (Optional[Tuple[datetime, str]]): 直前ページ最終行の (created_at, id)
+        meta (Optional[Dict[str, str]]): meta_data の絞り込み条件
+
+    Returns:
+        List[Document]: (created_at, id) の昇順のドキュメント
+    """
+    return ListDocumentsUseCase(CachedDocumentRepository(DocumentRepositorySQLAlchemy(session))).execute(
+        dataset_id=dataset_id, skip=skip, limit=limit, after=after, meta=meta
+    )
+
+
+def count_documents(session: Session, dataset_id: str, meta: Optional[Dict[str, str]]) -> int:
+    """
+    データセットに属するドキュメントのうち絞り込み条件に一致する件数を返す
+
+    Args:
+        session (Session): DBセッション
+        dataset_id (str): データセットID
+        meta (Optional[Dict[str, str]]): meta_data の絞り込み条件
+
+    Returns:
+        int: 件数
+    """
+    return CachedDocumentRepository(DocumentRepositorySQLAlchemy(session)).count_documents(dataset_id, meta=meta)
+
+
+def get_document(session: Session, document_id: str) -> Document:
+    """
+    ドキュメントをIDで取得する
+
+    Args:
+        session (Session): DBセッション
+        document_id (str): ドキュメントID
+
+    Returns:
+        Document: 取得したドキュメント
+
+    Raises:
+        ValueError: 存在しない場合
+    """
+    return GetDocumentUseCase(CachedDocumentRepository(DocumentRepositorySQLAlchemy(session))).execute(document_id)
+
+
+def update_document(session: Session, document_id: str, document_update: DocumentUpdate) -> Document:
+    """
+    ドキュメントを更新する
+
+    Args:
+        session (Session): DBセッション（プライマリ）
+        document_id (str): ドキュメントID
+        document_update (DocumentUpdate): 更新する内容
+
+    Returns:
+        Document: 更新後のドキュメント
+    """
+    return UpdateDocumentUseCase(CachedDocumentRepository(DocumentRepositorySQLAlchemy(session))).execute(
+        document_id=document_id,
+        title=document_update.title,
+        content=document_update.content,
+        meta_data=document_update.meta_data,
+        is_active=document_update.is_active,
+    )
+
+
+def delete_document(session: Session, document_id: str) -> None:
+    """
+    ドキュメントをIDで削除する
+
+    Args:
+        session (Session): DBセッション（プライマリ）
+        document_id (str): ドキュメントID
+
+    Raises:
+        HTTPException: 存在しない場合は 404
+    """
+    success = DeleteDocumentUseCase(CachedDocumentRepository(DocumentRepositorySQLAlchemy(session))).execute(
+        document_id
+    )
+    if not success:
+        logger.error("Error: Document not found for deletion with id=%s", document_id)
+        raise HTTPException(status_code=404, detail="Document not found")
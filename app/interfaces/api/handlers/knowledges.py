@@ -0,0 +1,268 @@
+"""
+Knowledge API の処理本体（knowledges.py・async_knowledges.py のルートで共通）
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.domain.entities.knowledge import Knowledge
+from app.domain.entities.knowledge_search import KnowledgeSearchResult
+from app.infrastructure.cache.cached_repositories import CachedKnowledgeRepository
+from app.infrastructure.repositories.knowledge_repository_impl import KnowledgeRepositorySQLAlchemy
+from app.infrastructure.repositories.knowledge_search_repository_impl import (
+    get_knowledge_search_repository,
+)
+from app.infrastructure.repositories.knowledge_vector_search_repository_impl import (
+    KnowledgeVectorSearchRepositoryNumpy,
+)
+from app.interfaces.schemas.knowledge import (
+    KnowledgeBulkCreate,
+    KnowledgeCreate,
+    KnowledgeSearchItem,
+    KnowledgeUpdate,
+    KnowledgeVectorSearchRequest,
+)
+from app.usecases.knowledges.bulk_create_knowledges import BulkCreateKnowledgesUseCase
+from app.usecases.knowledges.create_knowledge import CreateKnowledgeUseCase
+from app.usecases.knowledges.delete_knowledge import DeleteKnowledgeUseCase
+from app.usecases.knowledges.get_knowledge import GetKnowledgeUseCase
+from app.usecases.knowledges.list_knowledges import ListKnowledgesUseCase
+from app.usecases.knowledges.search_knowledges import SearchKnowledgesUseCase
+from app.usecases.knowledges.update_knowledge import UpdateKnowledgeUseCase
+from app.usecases.knowledges.vector_search_knowledges import VectorSearchKnowledgesUseCase
+
+logger = logging.getLogger(__name__)
+
+
+def create_knowledge(session: Session, knowledge_create: KnowledgeCreate) -> Knowledge:
+    """
+    Knowledgeを作成する
+
+    Args:
+        session (Session): DBセッション
+        knowledge_create (KnowledgeCreate): 作成する内容
+
+    Returns:
+        Knowledge: 作成したKnowledge
+    """
+    return CreateKnowledgeUseCase(KnowledgeRepositorySQLAlchemy(session)).execute(
+        document_id=knowledge_create.document_id,
+        sequence=knowledge_create.sequence,
+        knowledge_text=knowledge_create.knowledge_text,
+        meta_data=knowledge_create.meta_data,
+        is_active=knowledge_create.is_active,
+    )
+
+
+def bulk_create_knowledges(session: Session, knowledge_bulk_create: KnowledgeBulkCreate) -> List[str]:
+    """
+    複数のKnowledgeを1トランザクションで作成する
+
+    Args:
+        session (Session): DBセッション
+        knowledge_bulk_create (KnowledgeBulkCreate): 作成する内容のリスト
+
+    Returns:
+        List[str]: 作成したKnowledgeのID（入力順）
+    """
+    items = [item.model_dump() for item in knowledge_bulk_create.items]
+    return BulkCreateKnowledgesUseCase(KnowledgeRepositorySQLAlchemy(session)).execute(items)
+
+
+def summarize_knowledges(session: Session, document_id: str) -> Tuple[int, Optional[datetime]]:
+    """
+    ドキュメントに紐付くKnowledgeの件数と最終更新日時を返す（一覧の ETag に使う）
+
+    Args:
+        session (Session): DBセッション
+        document_id (str): ドキュメントID
+
+    Returns:
+        Tuple[int, Optional[datetime]]: (件数, updated_at の最大値)
+    """
+    return CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session)).summarize_knowledges(document_id)
+
+
+def list_knowledges(
+    session: Session,
+    document_id: str,
+    skip: int,
+    limit: int,
+    after: Optional[Tuple[int, str]],
+    meta: Optional[Dict[str, str]],
+) -> List[Knowledge]:
+    """
+    ドキュメントに紐付くKnowledgeの一覧を返す
+
+    Args:
+        session (Session): DBセッション
+        document_id (str): ドキュメントID
+        skip (int): スキップする件数（after を指定した場合は無視）
+        limit (int): 取得する件数の上限
+        after (Optional[Tuple[int, str]]): 直前ページ最終行の (sequence, id)
+        meta (Optional[Dict[str, str]]): meta_data の絞り込み条件
+
+    Returns:
+        List[Knowledge]: (sequence, id) の昇順のKnowledge
+    """
+    return ListKnowledgesUseCase(CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session))).execute(
+        document_id=document_id, skip=skip, limit=limit, after=after, meta=meta
+    )
+
+
+def count_knowledges(session: Session, document_id: str, meta: Optional[Dict[str, str]]) -> int:
+    """
+    ドキュメントに紐付くKnowledgeのうち絞り込み条件に一致する件数を返す
+
+    Args:
+        session (Session): DBセッション
+        document_id (str): ドキュメントID
+        meta (Optional[Dict[str, str]]): meta_data の絞り込み条件
+
+    Returns:
+        int: 件数
+    """
+    return CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session)).count_knowledges(
+        document_id, meta=meta
+    )
+
+
+def search_knowledges(
+    session: Session, q: str, dataset_id: Optional[str], limit: int, meta: Optional[Dict[str, str]]
+) -> Tuple[List[KnowledgeSearchResult], int]:
+    """
+    Knowledge本文を全文検索する
+
+    Args:
+        session (Session): DBセッション
+        q (str): 検索語
+        dataset_id (Optional[str]): 指定した場合はそのデータセットのKnowledgeに絞り込む
+        limit (int): 返す件数の上限
+        meta (Optional[Dict[str, str]]): meta_data の絞り込み条件
+
+    Returns:
+        Tuple[List[KnowledgeSearchResult], int]: (スコアの降順の検索結果, 一致した総件数)
+
+    Raises:
+        SearchUnavailableError: 索引が使えない場合
+    """
+    return SearchKnowledgesUseCase(
+        get_knowledge_search_repository(session),
+        CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session)),
+    ).execute(q, dataset_id=dataset_id, limit=limit, meta=meta)
+
+
+def vector_search_knowledges(
+    session: Session, request_body: KnowledgeVectorSearchRequest
+) -> List[KnowledgeSearchResult]:
+    """
+    Knowledge本文をベクトル検索する
+
+    Args:
+        session (Session): DBセッション
+        request_body (KnowledgeVectorSearchRequest): 検索語・データセットID・件数
+
+    Returns:
+        List[KnowledgeSearchResult]: 類似度の降順の検索結果
+
+    Raises:
+        SearchUnavailableError: 索引が使えない場合
+    """
+    return VectorSearchKnowledgesUseCase(
+        KnowledgeVectorSearchRepositoryNumpy(),
+        CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session)),
+    ).execute(request_body.query, request_body.dataset_id, limit=request_body.top_k)
+
+
+def search_items(results: List[KnowledgeSearchResult]) -> List[KnowledgeSearchItem]:
+    """
+    検索結果を応答の項目に変換する
+
+    Args:
+        results (List[KnowledgeSearchResult]): 検索結果
+
+    Returns:
+        List[KnowledgeSearchItem]: スコア付きのKnowledge
+    """
+    return [
+        KnowledgeSearchItem.model_validate({**vars(result.knowledge), "score": result.score})
+        for result in results
+    ]
+
+
+def get_knowledge(session: Session, knowledge_id: str) -> Knowledge:
+    """
+    KnowledgeをIDで取得する
+
+    Args:
+        session (Session): DBセッション
+        knowledge_id (str): KnowledgeID
+
+    Returns:
+        Knowledge: 取得したKnowledge
+
+    Raises:
+        HTTPException: 存在しない場合は 404
+    """
+    knowledge = GetKnowledgeUseCase(CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session))).execute(
+        knowledge_id
+    )
+    if not knowledge:
+        logger.error("Error: Knowledge not found with id=%s", knowledge_id)
+        raise HTTPException(status_code=404, detail="Knowledge not found")
+    return knowledge
+
+
+def update_knowledge(session: Session, knowledge_id: str, knowledge_update: KnowledgeUpdate) -> Knowledge:
+    """
+    Knowledgeの指定された項目を更新する
+
+    Args:
+        session (Session): DBセッション（プライマリ）
+        knowledge_id (str): KnowledgeID
+        knowledge_update (KnowledgeUpdate): 更新する項目（None の項目は変更しない）
+
+    Returns:
+        Knowledge: 更新後のKnowledge
+
+    Raises:
+        HTTPException: 存在しない場合は 404
+    """
+    # 更新前の取得はキャッシュを使わない（古い値で上書きしないため）
+    repo = KnowledgeRepositorySQLAlchemy(session)
+    knowledge = GetKnowledgeUseCase(repo).execute(knowledge_id)
+    if not knowledge:
+        logger.error("Error: Knowledge not found for update with id=%s", knowledge_id)
+        raise HTTPException(status_code=404, detail="Knowledge not found")
+    if knowledge_update.sequence is not None:
+        knowledge.sequence = knowledge_update.sequence
+    if knowledge_update.knowledge_text is not None:
+        knowledge.knowledge_text = knowledge_update.knowledge_text
+    if knowledge_update.meta_data is not None:
+        knowledge.meta_data = knowledge_update.meta_data
+    if knowledge_update.is_active is not None:
+        knowledge.is_active = knowledge_update.is_active
+    return UpdateKnowledgeUseCase(CachedKnowledgeRepository(repo)).execute(knowledge)
+
+
+def delete_knowledge(session: Session, knowledge_id: str) -> None:
+    """
+    KnowledgeをIDで削除する
+
+    Args:
+        session (Session): DBセッション（プライマリ）
+        knowledge_id (str): KnowledgeID
+
+    Raises:
+        HTTPException: 存在しない場合は 404
+    """
+    success = DeleteKnowledgeUseCase(CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session))).execute(
+        knowledge_id
+    )
+    if not success:
+        logger.error("Error: Knowledge not found for deletion with id=%s", knowledge_id)
+        raise HTTPException(status_code=404, detail="Knowledge not found")
@@ -0,0 +1,178 @@
+"""
+一覧APIのページネーション（カーソル・総件数）
+
+カーソルは直前ページ最終行の並び順キー（例: (created_at, id)）を JSON にして
+URL セーフな Base64 で符号化した不透明な文字列。クライアントは値を解釈せず、
+レスポンスの nextCursor を次のリクエストの cursor にそのまま渡す。
+
+総件数（total）は ?count= で求め方を選ぶ。
+- exact: COUNT クエリで正確な件数を返す（既定）
+- estimated: 件数キャッシュの値を返す（期限切れ時のみ COUNT を発行）
+- none: 件数を求めず null を返す
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException
+
+from app.infrastructure.database.count_cache import count_cache
+
+T = TypeVar("T")
+
+# 並び順キーの型（データセット・ドキュメントは (created_at, id)、Knowledge は (sequence, id)）
+CREATED_AT_CURSOR = (datetime, str)
+SEQUENCE_CURSOR = (int, str)
+
+
+class CountMode(str, Enum):
+    """総件数（total）の求め方"""
+
+    exact = "exact"
+    estimated = "estimated"
+    none = "none"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    並び順キーをカーソル文字列に符号化する
+
+    Args:
+        values (Sequence[Any]): 並び順キーの値（datetime / int / str）
+
+    Returns:
+        str: 不透明なカーソル文字列
+    """
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ...]:
+    """
+    カーソル文字列を並び順キーに復号する
+
+    Args:
+        cursor (str): encode_cursor で生成したカーソル文字列
+
+    Returns:
+        Tuple[Any, ...]: 並び順キーの値
+
+    Raises:
+        ValueError: カーソルの形式が不正な場合
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(payload, list) or len(payload) != 2:
+        raise ValueError("Invalid cursor")
+    return tuple(
+        datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+        for value in payload
+    )
+
+
+def parse_cursor(cursor: Optional[str], types: Sequence[type]) -> Optional[Tuple[Any, ...]]:
+    """
+    クエリパラメータのカーソルを復号する（不正な場合は 400 を送出）
+
+    別の一覧のカーソルや改ざんされたカーソルをリポジトリに渡さないよう、値の型も一覧の並び順キーと照合する。
+
+    Args:
+        cursor (Optional[str]): クエリパラメータ cursor の値
+        types (Sequence[type]): 並び順キーの各値の型（例: (datetime, str)）
+
+    Returns:
+        Optional[Tuple[Any, ...]]: 並び順キー。cursor が未指定の場合は None
+    """
+    if cursor is None:
+        return None
+    try:
+        values = decode_cursor(cursor)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if len(values) != len(types) or not all(
+        # bool は int のサブクラスのため、int のキーには bool を受け付けない
+        isinstance(value, expected) and not isinstance(value, bool)
+        for value, expected in zip(values, types)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def paginate(
+    items: List[T], limit: int, key: Callable[[T], Sequence[Any]]
+) -> Tuple[List[T], Optional[str]]:
+    """
+    limit + 1 件取得した結果からページと次ページのカーソルを求める
+
+    Args:
+        items (List[T]): limit + 1 件を上限に取得したエンティティのリスト
+        limit (int): ページサイズ
+        key (Callable[[T], Sequence[Any]]): エンティティから並び順キーを取り出す関数
+
+    Returns:
+        Tuple[List[T], Optional[str]]: ページ内のエンティティと次ページのカーソル（最終ページの場合は None）
+    """
+    if limit <= 0 or len(items) <= limit:
+        return items[: max(limit, 0)], None
+    page = items[:limit]
+    return page, encode_cursor(key(page[-1]))
+
+
+def resolve_total(
+    mode: CountMode, key: Hashable, compute: Callable[[], int]
+) -> Optional[int]:
+    """
+    count モードに従って一覧の総件数を求める
+
+    Args:
+        mode (CountMode): 総件数の求め方
+        key (Hashable): 件数キャッシュのキー（例: ("documents", dataset_id)）
+        compute (Callable[[], int]): 正確な件数を求める関数（COUNT クエリ）
+
+    Returns:
+        Optional[int]: 総件数。mode が none の場合は None
+    """
+    if mode is CountMode.none:
+        return None
+    if mode is CountMode.estimated:
+        return count_cache.get_or_compute(key, compute)
+    total = compute()
+    # 正確な件数を求めたついでに estimated 用のキャッシュも更新する
+    count_cache.set(key, total)
+    return total
+
+
+async def resolve_total_async(
+    mode: CountMode, key: Hashable, compute: Callable[[], Awaitable[int]]
+) -> Optional[int]:
+    """
+    count モードに従って一覧の総件数を求める（非同期ルート用。compute は必要な場合だけ呼ぶ）
+
+    Args:
+        mode (CountMode): 総件数の求め方
+        key (Hashable): 件数キャッシュのキー（例: ("documents", dataset_id)）
+        compute (Callable[[], Awaitable[int]]): 正確な件数を求めるコルーチン関数（COUNT クエリ）
+
+    Returns:
+        Optional[int]: 総件数。mode が none の場合は None
+    """
+    if mode is CountMode.none:
+        return None
+    if mode is CountMode.estimated:
+        cached = count_cache.get(key)
+        if cached is not None:
+            return cached
+    total = await compute()
+    count_cache.set(key, total)
+    return total
@@ -0,0 +1,32 @@
+"""
+ルーター構成のユーティリティ
+
+同期版ルーターと非同期版ルーターを設定に応じて組み合わせるための関数を提供する。
+"""
+
+from fastapi import APIRouter
+
+
+def with_async_routes(sync_router: APIRouter, async_router: APIRouter) -> APIRouter:
+    """
+    同期版ルーターのうち、非同期版に同一パス・同一メソッドのルートがあるものを差し替えたルーターを返す
+
+    ルートの並び順は同期版ルーターのものを維持するため、"/search" のような固定パスを
+    "/{id}" より前に定義する前提が崩れない。非同期版が存在しないルートは同期版のまま残る。
+
+    Args:
+        sync_router (APIRouter): 同期版（def）ルートを持つルーター
+        async_router (APIRouter): 非同期版（async def）ルートを持つルーター
+
+    Returns:
+        APIRouter: 差し替え済みのルーター
+    """
+    async_routes = {
+        (route.path, frozenset(route.methods)): route for route in async_router.routes
+    }
+    merged = APIRouter()
+    for route in sync_router.routes:
+        merged.routes.append(
+            async_routes.get((route.path, frozenset(route.methods)), route)
+        )
+    return merged
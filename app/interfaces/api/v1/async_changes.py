@@ -0,0 +1,41 @@
+# app/interfaces/api/v1/async_changes.py
+"""
+変更履歴APIの非同期版ルート（USE_ASYNC_DB=true の場合に changes.py の同名ルートを置き換える）
+
+ユースケース・リポジトリは同期版と共通で、AsyncSession.run_sync 経由で実行する。
+"""
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.database.connection import get_async_db
+from app.infrastructure.repositories.change_repository_impl import ChangeRepositorySQLAlchemy
+from app.interfaces.schemas.change import CHANGE_LIST_MAX_LIMIT, ChangeListResponse, ChangeResponse
+from app.usecases.changes.list_changes import ListChangesUseCase
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/", response_model=ChangeListResponse)
+async def list_changes(
+    session: Annotated[AsyncSession, Depends(get_async_db)],
+    since: int = Query(0, ge=0, description="この連番より後の変更を返す（前回の応答の nextSince）"),
+    limit: int = Query(100, ge=1, le=CHANGE_LIST_MAX_LIMIT, description="取得する件数の上限"),
+):
+    """データセット・ドキュメント・Knowledge の変更履歴を連番の昇順に取得するエンドポイント（非同期版）"""
+    logger.info("Start: Listing changes since=%d", since)
+    try:
+        changes = await session.run_sync(
+            lambda s: ListChangesUseCase(ChangeRepositorySQLAlchemy(s)).execute(since, limit)
+        )
+        logger.info("Success: Listed %d changes", len(changes))
+        return ChangeListResponse(
+            items=[ChangeResponse.model_validate(change) for change in changes],
+            next_since=changes[-1].seq if changes else since,
+        )
+    except Exception as e:
+        logger.error("Error: Failed to list changes. Error: %s", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,200 @@
+# app/interfaces/api/v1/async_datasets.py
+"""
+データセットAPIの非同期版ルート（USE_ASYNC_DB=true の場合に datasets.py の同名ルートを置き換える）
+
+処理本体は同期版と共通（app/interfaces/api/handlers/datasets.py）で、AsyncSession.run_sync 経由で実行する。
+ただし retrieve は全文検索・ベクトル検索をスレッドで実行し、DB を読む段階だけを run_sync で実行する。
+DB I/O の待機中もワーカースレッドを占有しないため、1ワーカーで多数のクエリを並行処理できる。
+"""
+import logging
+from typing import Annotated, Dict, Optional
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.cache.single_flight import flights
+from app.infrastructure.database.connection import (
+    get_async_db,
+    get_async_read_db,
+    session_bind_name,
+)
+from app.infrastructure.database.meta_filter import meta_key
+from app.interfaces.api.conditional import conditional_response, entity_etag, list_etag
+from app.interfaces.api.errors import api_errors
+from app.interfaces.api.filters import meta_filters
+from app.interfaces.api.handlers import datasets as handlers
+from app.interfaces.api.pagination import (
+    CREATED_AT_CURSOR,
+    CountMode,
+    paginate,
+    parse_cursor,
+    resolve_total_async,
+)
+from app.interfaces.schemas.dataset import (
+    DatasetCreate,
+    DatasetListResponse,
+    DatasetResponse,
+    DatasetRetrieveRequest,
+    DatasetRetrieveResponse,
+    DatasetStatsResponse,
+)
+from app.interfaces.middleware.read_your_writes import read_only
+
+# モジュール固有のロガー（ログは英語で出力されます）
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post("/", response_model=DatasetResponse, status_code=201)
+async def create_dataset(
+    dataset_create: DatasetCreate,
+    session: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    """新規データセットを作成するエンドポイント（非同期版）"""
+    logger.info("Start: Creating new dataset with name=%s", dataset_create.name)
+    with api_errors("create dataset"):
+        dataset = await session.run_sync(handlers.create_dataset, dataset_create)
+    logger.info("Success: Dataset created with id=%s", dataset.id)
+    return DatasetResponse.model_validate(dataset)
+
+
+@router.get("/", response_model=DatasetListResponse)
+async def list_datasets(
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+    meta: Annotated[Dict[str, str], Depends(meta_filters)],
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.exact,
+):
+    """データセット一覧を取得するエンドポイント（非同期版）"""
+    logger.info("Start: Listing datasets with skip=%d, limit=%d", skip, limit)
+    after = parse_cursor(cursor, CREATED_AT_CURSOR)
+    with api_errors("list datasets"):
+        # 件数と最終更新日時だけで変更を判定し、変更が無ければ一覧を読み込まずに 304 を返す
+        rows, last_updated_at = await session.run_sync(handlers.summarize_datasets)
+        etag = list_etag(rows, last_updated_at, skip, limit, cursor, count.value, meta_key(meta))
+        not_modified = conditional_response(request, response, etag)
+        if not_modified:
+            logger.info("Success: Datasets not modified")
+            return not_modified
+        # 次ページの有無を判定するため1件多く取得する
+        datasets = await session.run_sync(handlers.list_datasets, skip, limit + 1, after, meta)
+        datasets, next_cursor = paginate(
+            datasets, limit, lambda ds: (ds.created_at, ds.id)
+        )
+
+        async def count_rows() -> int:
+            # 絞り込んだ場合の総件数は、絞り込み条件ごとに数える
+            if not meta:
+                return rows
+            return await session.run_sync(handlers.count_datasets, meta)
+
+        total = await resolve_total_async(count, ("datasets", meta_key(meta)), count_rows)
+    logger.info("Success: Retrieved %d datasets", len(datasets))
+    return DatasetListResponse(
+        items=[DatasetResponse.model_validate(ds) for ds in datasets],
+        total=total,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/{dataset_id}", response_model=DatasetResponse)
+async def get_dataset(
+    dataset_id: str,
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+    include_stats: bool = False,
+):
+    """指定IDのデータセット詳細を取得するエンドポイント（非同期版）"""
+    logger.info("Start: Retrieving dataset with id=%s", dataset_id)
+    with api_errors("retrieve dataset", not_found=True):
+        dataset = await flights.do_async(
+            ("dataset", dataset_id),
+            ("get", session_bind_name(session)),
+            lambda: session.run_sync(handlers.get_dataset, dataset_id),
+        )
+        if include_stats:
+            stats = await session.run_sync(handlers.get_dataset_stats, dataset_id)
+        else:
+            stats = None
+    if stats:
+        # 集計値はデータセットの updated_at を変えずに更新されるため、ETag に含めて Last-Modified は返さない
+        etag = entity_etag(dataset.id, dataset.updated_at, "stats", stats.updated_at)
+        not_modified = conditional_response(request, response, etag)
+    else:
+        not_modified = conditional_response(
+            request, response, entity_etag(dataset.id, dataset.updated_at), dataset.updated_at
+        )
+    if not_modified:
+        logger.info("Success: Dataset not modified with id=%s", dataset_id)
+        return not_modified
+    logger.info("Success: Retrieved dataset with id=%s", dataset_id)
+    result = DatasetResponse.model_validate(dataset)
+    if stats:
+        result.stats = DatasetStatsResponse.model_validate(stats)
+    return result
+
+
+@router.get("/{dataset_id}/stats", response_model=DatasetStatsResponse)
+async def get_dataset_stats(
+    dataset_id: str,
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+):
+    """指定IDのデータセットの集計値を取得するエンドポイント（非同期版）"""
+    logger.info("Start: Retrieving stats for dataset_id=%s", dataset_id)
+    with api_errors("retrieve dataset stats", not_found=True):
+        stats = await session.run_sync(handlers.get_dataset_stats, dataset_id)
+    not_modified = conditional_response(
+        request, response, entity_etag(dataset_id, stats.updated_at, "stats"), stats.updated_at
+    )
+    if not_modified:
+        logger.info("Success: Dataset stats not modified for dataset_id=%s", dataset_id)
+        return not_modified
+    logger.info("Success: Retrieved stats for dataset_id=%s", dataset_id)
+    return DatasetStatsResponse.model_validate(stats)
+
+
+@router.post("/{dataset_id}/retrieve", response_model=DatasetRetrieveResponse)
+@read_only
+async def retrieve_knowledges(
+    dataset_id: str,
+    request_body: DatasetRetrieveRequest,
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+):
+    """データセット内のKnowledgeを全文検索とベクトル検索で探し、融合した結果を返すエンドポイント（非同期版）"""
+    logger.info("Start: Retrieving knowledges for dataset_id=%s, mode=%s", dataset_id, request_body.mode)
+    with api_errors("retrieve knowledges", not_found=True):
+        result = await handlers.retrieve_knowledges_async(session, dataset_id, request_body)
+    logger.info("Success: Retrieved %d knowledges in %.1fms", len(result.items), result.timings["total"])
+    return handlers.retrieve_response(result)
+
+
+@router.put("/{dataset_id}", response_model=DatasetResponse)
+async def update_dataset(
+    dataset_id: str,
+    dataset_update: DatasetCreate,
+    session: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    """指定IDのデータセットを更新するエンドポイント（非同期版）"""
+    logger.info("Start: Updating dataset with id=%s", dataset_id)
+    with api_errors(f"update dataset with id={dataset_id}"):
+        updated_dataset = await session.run_sync(handlers.update_dataset, dataset_id, dataset_update)
+    logger.info("Success: Updated dataset with id=%s", dataset_id)
+    return DatasetResponse.model_validate(updated_dataset)
+
+
+@router.delete("/{dataset_id}", status_code=204)
+async def delete_dataset(
+    dataset_id: str, session: Annotated[AsyncSession, Depends(get_async_db)]
+):
+    """指定IDのデータセットを削除するエンドポイント（非同期版）"""
+    logger.info("Start: Deleting dataset with id=%s", dataset_id)
+    with api_errors(f"delete dataset with id={dataset_id}"):
+        await session.run_sync(handlers.delete_dataset, dataset_id)
+    logger.info("Success: Deleted dataset with id=%s", dataset_id)
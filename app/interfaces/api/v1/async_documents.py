@@ -0,0 +1,157 @@
+# app/interfaces/api/v1/async_documents.py
+"""
+ドキュメントAPIの非同期版ルート（USE_ASYNC_DB=true の場合に documents.py の同名ルートを置き換える）
+
+処理本体は同期版と共通（app/interfaces/api/handlers/documents.py）で、AsyncSession.run_sync 経由で実行する。
+読み取りは flights.do_async で同一の同時リクエストをまとめる。
+"""
+import logging
+from typing import Annotated, Dict, Optional
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.cache.single_flight import flights
+from app.infrastructure.database.connection import (
+    get_async_db,
+    get_async_read_db,
+    session_bind_name,
+)
+from app.infrastructure.database.meta_filter import meta_key
+from app.interfaces.api.conditional import conditional_response, entity_etag, list_etag
+from app.interfaces.api.errors import api_errors
+from app.interfaces.api.filters import meta_filters
+from app.interfaces.api.handlers import documents as handlers
+from app.interfaces.api.pagination import (
+    CREATED_AT_CURSOR,
+    CountMode,
+    paginate,
+    parse_cursor,
+    resolve_total_async,
+)
+from app.interfaces.schemas.document import (
+    DocumentCreate,
+    DocumentListResponse,
+    DocumentResponse,
+    DocumentUpdate,
+)
+
+# モジュール固有のロガー（ログは英語で出力）
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post("/", response_model=DocumentResponse, status_code=201)
+async def create_document(
+    document_create: DocumentCreate,
+    session: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    """新規ドキュメントを作成するエンドポイント（非同期版）"""
+    logger.info("Start: Creating new document with title=%s", document_create.title)
+    with api_errors("create document"):
+        document = await session.run_sync(handlers.create_document, document_create)
+    logger.info("Success: Document created with id=%s", document.id)
+    return DocumentResponse.model_validate(document)
+
+
+@router.get("/", response_model=DocumentListResponse)
+async def list_documents(
+    dataset_id: str,
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+    meta: Annotated[Dict[str, str], Depends(meta_filters)],
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.exact,
+):
+    """指定されたデータセットに属するドキュメント一覧を取得するエンドポイント（非同期版）"""
+    logger.info("Start: Listing documents for dataset_id=%s", dataset_id)
+    after = parse_cursor(cursor, CREATED_AT_CURSOR)
+    with api_errors("list documents"):
+        scope = ("documents", dataset_id)
+        # プライマリに固定されたクライアントの読み取りをレプリカの読み取りとまとめない
+        bind = session_bind_name(session)
+        rows, last_updated_at = await flights.do_async(
+            scope, ("summary", bind), lambda: session.run_sync(handlers.summarize_documents, dataset_id)
+        )
+        etag = list_etag(rows, last_updated_at, skip, limit, cursor, count.value, meta_key(meta))
+        not_modified = conditional_response(request, response, etag)
+        if not_modified:
+            logger.info("Success: Documents not modified for dataset_id=%s", dataset_id)
+            return not_modified
+        documents = await flights.do_async(
+            scope,
+            ("list", bind, skip, limit + 1, after, meta_key(meta)),
+            lambda: session.run_sync(handlers.list_documents, dataset_id, skip, limit + 1, after, meta),
+        )
+        documents, next_cursor = paginate(
+            documents, limit, lambda document: (document.created_at, document.id)
+        )
+
+        async def count_rows() -> int:
+            # 絞り込んだ場合の総件数は、絞り込み条件ごとに数える（ページキャッシュにあれば DB に問い合わせない）
+            if not meta:
+                return rows
+            return await session.run_sync(handlers.count_documents, dataset_id, meta)
+
+        total = await resolve_total_async(count, ("documents", dataset_id, meta_key(meta)), count_rows)
+    logger.info(
+        "Success: Retrieved %d documents for dataset_id=%s", len(documents), dataset_id
+    )
+    return DocumentListResponse(
+        items=[DocumentResponse.model_validate(document) for document in documents],
+        total=total,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/{document_id}", response_model=DocumentResponse)
+async def get_document(
+    document_id: str,
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+):
+    """指定IDのドキュメント詳細を取得するエンドポイント（非同期版）"""
+    logger.info("Start: Retrieving document with id=%s", document_id)
+    with api_errors("retrieve document", not_found=True):
+        document = await flights.do_async(
+            ("document", document_id),
+            ("get", session_bind_name(session)),
+            lambda: session.run_sync(handlers.get_document, document_id),
+        )
+    not_modified = conditional_response(
+        request, response, entity_etag(document.id, document.updated_at), document.updated_at
+    )
+    if not_modified:
+        logger.info("Success: Document not modified with id=%s", document_id)
+        return not_modified
+    logger.info("Success: Retrieved document with id=%s", document_id)
+    return DocumentResponse.model_validate(document)
+
+
+@router.put("/{document_id}", response_model=DocumentResponse)
+async def update_document(
+    document_id: str,
+    document_update: DocumentUpdate,
+    session: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    """指定IDのドキュメントを更新するエンドポイント（非同期版）"""
+    logger.info("Start: Updating document with id=%s", document_id)
+    with api_errors(f"update document with id={document_id}"):
+        updated_document = await session.run_sync(handlers.update_document, document_id, document_update)
+    logger.info("Success: Updated document with id=%s", document_id)
+    return DocumentResponse.model_validate(updated_document)
+
+
+@router.delete("/{document_id}", status_code=204)
+async def delete_document(
+    document_id: str, session: Annotated[AsyncSession, Depends(get_async_db)]
+):
+    """指定IDのドキュメントを削除するエンドポイント（非同期版）"""
+    logger.info("Start: Deleting document with id=%s", document_id)
+    with api_errors(f"delete document with id={document_id}"):
+        await session.run_sync(handlers.delete_document, document_id)
+    logger.info("Success: Deleted document with id=%s", document_id)
@@ -0,0 +1,201 @@
+# app/interfaces/api/v1/async_knowledges.py
+"""
+Knowledge APIの非同期版ルート（USE_ASYNC_DB=true の場合に knowledges.py の同名ルートを置き換える）
+
+処理本体は同期版と共通（app/interfaces/api/handlers/knowledges.py）で、AsyncSession.run_sync 経由で実行する。
+読み取りは flights.do_async で同一の同時リクエストをまとめる。
+"""
+import logging
+from typing import Annotated, Dict, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.cache.single_flight import flights
+from app.infrastructure.database.connection import (
+    get_async_db,
+    get_async_read_db,
+    session_bind_name,
+)
+from app.infrastructure.database.meta_filter import meta_key
+from app.interfaces.api.conditional import conditional_response, entity_etag, list_etag
+from app.interfaces.api.errors import api_errors
+from app.interfaces.api.filters import meta_filters
+from app.interfaces.api.handlers import knowledges as handlers
+from app.interfaces.api.pagination import (
+    SEQUENCE_CURSOR,
+    CountMode,
+    paginate,
+    parse_cursor,
+    resolve_total_async,
+)
+from app.interfaces.schemas.knowledge import (
+    KnowledgeBulkCreate,
+    KnowledgeBulkCreateResponse,
+    KnowledgeCreate,
+    KnowledgeListResponse,
+    KnowledgeResponse,
+    KnowledgeSearchResponse,
+    KnowledgeUpdate,
+    KnowledgeVectorSearchRequest,
+    KnowledgeVectorSearchResponse,
+)
+from app.interfaces.middleware.read_your_writes import read_only
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post("/", response_model=KnowledgeResponse, status_code=201)
+async def create_knowledge(
+    knowledge_create: KnowledgeCreate,
+    session: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    """新規Knowledge（ページ情報）を作成するエンドポイント（非同期版）"""
+    logger.info("Start: Creating new knowledge for document_id=%s, sequence=%d", knowledge_create.document_id, knowledge_create.sequence)
+    with api_errors("create knowledge"):
+        knowledge = await session.run_sync(handlers.create_knowledge, knowledge_create)
+    logger.info("Success: Knowledge created with id=%s", knowledge.id)
+    return KnowledgeResponse.model_validate(knowledge)
+
+@router.post("/bulk", response_model=KnowledgeBulkCreateResponse, status_code=201)
+async def bulk_create_knowledges(
+    knowledge_bulk_create: KnowledgeBulkCreate,
+    session: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    """複数のKnowledge（ページ情報）を1トランザクションで一括作成するエンドポイント（非同期版）"""
+    logger.info("Start: Bulk creating %d knowledges", len(knowledge_bulk_create.items))
+    with api_errors("bulk create knowledges"):
+        ids = await session.run_sync(handlers.bulk_create_knowledges, knowledge_bulk_create)
+    logger.info("Success: Bulk created %d knowledges", len(ids))
+    return KnowledgeBulkCreateResponse(ids=ids, total=len(ids))
+
+
+@router.get("/", response_model=KnowledgeListResponse)
+async def list_knowledges(
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+    meta: Annotated[Dict[str, str], Depends(meta_filters)],
+    document_id: str = Query(..., description="紐付くドキュメントID"),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="前ページの nextCursor（指定時は skip を無視）"),
+    count: CountMode = Query(CountMode.exact, description="総件数の求め方（exact / estimated / none）"),
+):
+    """指定ドキュメントに紐付くKnowledge（ページ情報）一覧を取得するエンドポイント（非同期版）"""
+    logger.info("Start: Listing knowledges for document_id=%s", document_id)
+    after = parse_cursor(cursor, SEQUENCE_CURSOR)
+    with api_errors("list knowledges"):
+        scope = ("knowledges", document_id)
+        # プライマリに固定されたクライアントの読み取りをレプリカの読み取りとまとめない
+        bind = session_bind_name(session)
+        rows, last_updated_at = await flights.do_async(
+            scope, ("summary", bind), lambda: session.run_sync(handlers.summarize_knowledges, document_id)
+        )
+        etag = list_etag(rows, last_updated_at, skip, limit, cursor, count.value, meta_key(meta))
+        not_modified = conditional_response(request, response, etag)
+        if not_modified:
+            logger.info("Success: Knowledges not modified for document_id=%s", document_id)
+            return not_modified
+        knowledges = await flights.do_async(
+            scope,
+            ("list", bind, skip, limit + 1, after, meta_key(meta)),
+            lambda: session.run_sync(handlers.list_knowledges, document_id, skip, limit + 1, after, meta),
+        )
+        knowledges, next_cursor = paginate(knowledges, limit, lambda k: (k.sequence, k.id))
+
+        async def count_rows() -> int:
+            # 絞り込んだ場合の総件数は、絞り込み条件ごとに数える（ページキャッシュにあれば DB に問い合わせない）
+            if not meta:
+                return rows
+            return await session.run_sync(handlers.count_knowledges, document_id, meta)
+
+        total = await resolve_total_async(count, ("knowledges", document_id, meta_key(meta)), count_rows)
+    logger.info("Success: Retrieved %d knowledges for document_id=%s", len(knowledges), document_id)
+    return KnowledgeListResponse(
+        items=[KnowledgeResponse.model_validate(k) for k in knowledges],
+        total=total,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/search", response_model=KnowledgeSearchResponse)
+async def search_knowledges(
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+    meta: Annotated[Dict[str, str], Depends(meta_filters)],
+    q: str = Query(..., min_length=1, description="検索語（NFKC 正規化・文字 bigram で照合）"),
+    dataset_id: Optional[str] = Query(None, description="指定した場合はそのデータセットのKnowledgeに絞り込む"),
+    limit: int = Query(10, ge=1, le=100, description="返す件数の上限"),
+):
+    """Knowledge本文を全文検索するエンドポイント（非同期版）"""
+    logger.info("Start: Searching knowledges with dataset_id=%s", dataset_id)
+    with api_errors("search knowledges"):
+        results, total = await session.run_sync(handlers.search_knowledges, q, dataset_id, limit, meta)
+    logger.info("Success: Found %d knowledges", total)
+    return KnowledgeSearchResponse(items=handlers.search_items(results), total=total)
+
+
+@router.post("/vector-search", response_model=KnowledgeVectorSearchResponse)
+@read_only
+async def vector_search_knowledges(
+    request_body: KnowledgeVectorSearchRequest,
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+):
+    """Knowledge本文をベクトル検索するエンドポイント（非同期版）"""
+    logger.info("Start: Vector searching knowledges with dataset_id=%s", request_body.dataset_id)
+    with api_errors("vector search knowledges"):
+        results = await session.run_sync(handlers.vector_search_knowledges, request_body)
+    logger.info("Success: Found %d knowledges", len(results))
+    return KnowledgeVectorSearchResponse(items=handlers.search_items(results))
+
+
+@router.get("/{knowledge_id}", response_model=KnowledgeResponse)
+async def get_knowledge(
+    knowledge_id: str,
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_async_read_db)],
+):
+    """Knowledge（ページ情報）をIDで取得するエンドポイント（非同期版）"""
+    logger.info("Start: Retrieving knowledge with id=%s", knowledge_id)
+    with api_errors("retrieve knowledge", not_found=True):
+        knowledge = await flights.do_async(
+            ("knowledge", knowledge_id),
+            ("get", session_bind_name(session)),
+            lambda: session.run_sync(handlers.get_knowledge, knowledge_id),
+        )
+    not_modified = conditional_response(
+        request, response, entity_etag(knowledge.id, knowledge.updated_at), knowledge.updated_at
+    )
+    if not_modified:
+        logger.info("Success: Knowledge not modified with id=%s", knowledge_id)
+        return not_modified
+    logger.info("Success: Retrieved knowledge with id=%s", knowledge_id)
+    return KnowledgeResponse.model_validate(knowledge)
+
+
+@router.put("/{knowledge_id}", response_model=KnowledgeResponse)
+async def update_knowledge(
+    knowledge_id: str,
+    knowledge_update: KnowledgeUpdate,
+    session: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    """Knowledge（ページ情報）を更新するエンドポイント（非同期版）"""
+    logger.info("Start: Updating knowledge with id=%s", knowledge_id)
+    with api_errors(f"update knowledge with id={knowledge_id}"):
+        # 取得・差分反映・更新を1回の run_sync 内で行う
+        updated_knowledge = await session.run_sync(handlers.update_knowledge, knowledge_id, knowledge_update)
+    logger.info("Success: Updated knowledge with id=%s", knowledge_id)
+    return KnowledgeResponse.model_validate(updated_knowledge)
+
+
+@router.delete("/{knowledge_id}", status_code=204)
+async def delete_knowledge(
+    knowledge_id: str, session: Annotated[AsyncSession, Depends(get_async_db)]
+):
+    """Knowledge（ページ情報）をIDで削除するエンドポイント（非同期版）"""
+    logger.info("Start: Deleting knowledge with id=%s", knowledge_id)
+    with api_errors(f"delete knowledge with id={knowledge_id}"):
+        await session.run_sync(handlers.delete_knowledge, knowledge_id)
+    logger.info("Success: Deleted knowledge with id=%s", knowledge_id)
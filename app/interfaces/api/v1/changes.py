@@ -0,0 +1,39 @@
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.infrastructure.database.connection import get_db
+from app.infrastructure.repositories.change_repository_impl import ChangeRepositorySQLAlchemy
+from app.interfaces.schemas.change import CHANGE_LIST_MAX_LIMIT, ChangeListResponse, ChangeResponse
+from app.usecases.changes.list_changes import ListChangesUseCase
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/", response_model=ChangeListResponse)
+def list_changes(
+    session: Annotated[Session, Depends(get_db)],
+    since: int = Query(0, ge=0, description="この連番より後の変更を返す（前回の応答の nextSince）"),
+    limit: int = Query(100, ge=1, le=CHANGE_LIST_MAX_LIMIT, description="取得する件数の上限"),
+):
+    """
+    データセット・ドキュメント・Knowledge の変更履歴を連番の昇順に取得するエンドポイント
+
+    応答の nextSince を次の since に渡して追従する。記録直後の変更は連番の欠けを避けるため
+    数秒遅れて返る。レプリカの遅延で読み飛ばさないよう、プライマリから読む。
+    ドキュメント・データセットの削除では、一緒に削除された配下の Knowledge・ドキュメントも1件ずつ delete として返す。
+    """
+    logger.info("Start: Listing changes since=%d", since)
+    try:
+        changes = ListChangesUseCase(ChangeRepositorySQLAlchemy(session)).execute(since, limit)
+        logger.info("Success: Listed %d changes", len(changes))
+        return ChangeListResponse(
+            items=[ChangeResponse.model_validate(change) for change in changes],
+            next_since=changes[-1].seq if changes else since,
+        )
+    except Exception as e:
+        logger.error("Error: Failed to list changes. Error: %s", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,24 +1,32 @@
 # app/interfaces/api/v1/datasets.py
 import logging
-from typing import Annotated
+from typing import Annotated, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 
-from app.infrastructure.database.connection import get_db
-from app.infrastructure.repositories.dataset_repository_impl import (
-    DatasetRepositorySQLAlchemy,
+from app.infrastructure.database.connection import get_db, get_read_db
+from app.infrastructure.database.meta_filter import meta_key
+from app.interfaces.api.conditional import conditional_response, entity_etag, list_etag
+from app.interfaces.api.errors import api_errors
+from app.interfaces.api.filters import meta_filters
+from app.interfaces.api.handlers import datasets as handlers
+from app.interfaces.api.pagination import (
+    CREATED_AT_CURSOR,
+    CountMode,
+    paginate,
+    parse_cursor,
+    resolve_total,
 )
 from app.interfaces.schemas.dataset import (
     DatasetCreate,
     DatasetListResponse,
     DatasetResponse,
+    DatasetRetrieveRequest,
+    DatasetRetrieveResponse,
+    DatasetStatsResponse,
 )
-from app.usecases.datasets.create_dataset import CreateDatasetUseCase
-from app.usecases.datasets.delete_dataset import DeleteDatasetUseCase
-from app.usecases.datasets.get_dataset import GetDatasetUseCase
-from app.usecases.datasets.list_datasets import ListDatasetsUseCase
-from app.usecases.datasets.update_dataset import UpdateDatasetUseCase
+from app.interfaces.middleware.read_your_writes import read_only
 
 # モジュール固有のロガー（ログは英語で出力されます）
 logger = logging.getLogger(__name__)
@@ -40,110 +48,187 @@ def create_dataset(
         DatasetResponse: 作成されたデータセット情報
     """
     logger.info("Start: Creating new dataset with name=%s", dataset_create.name)
-    try:
-        repo = DatasetRepositorySQLAlchemy(session)
-        usecase = CreateDatasetUseCase(repo)
-        dataset = usecase.execute(
-            name=dataset_create.name,
-            description=dataset_create.description,
-            meta_data=dataset_create.meta_data,
-            is_active=dataset_create.is_active,
-        )
-        logger.info("Success: Dataset created with id=%s", dataset.id)
-        return DatasetResponse(
-            id=dataset.id,
-            name=dataset.name,
-            description=dataset.description,
-            meta_data=dataset.meta_data,
-            is_active=dataset.is_active,
-            created_at=dataset.created_at,
-            updated_at=dataset.updated_at,
-        )
-    except Exception as e:
-        logger.error("Error: Failed to create dataset. Error: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors("create dataset"):
+        dataset = handlers.create_dataset(session, dataset_create)
+    logger.info("Success: Dataset created with id=%s", dataset.id)
+    return DatasetResponse.model_validate(dataset)
 
 
 @router.get("/", response_model=DatasetListResponse)
 def list_datasets(
-    session: Annotated[Session, Depends(get_db)], skip: int = 0, limit: int = 100
+    request: Request,
+    response: Response,
+    session: Annotated[Session, Depends(get_read_db)],
+    meta: Annotated[Dict[str, str], Depends(meta_filters)],
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.exact,
 ):
     """
     データセット一覧を取得するエンドポイント
 
     引数:
+        request (Request): リクエスト（If-None-Match の判定に使用）
+        response (Response): レスポンス（ETag の設定先）
         session (Session): DBセッション
+        meta (Dict[str, str]): ?meta.<key>=<value> で指定した meta_data の絞り込み条件
         skip (int): スキップする件数
         limit (int): 取得件数の上限
+        cursor (Optional[str]): 前ページの nextCursor（指定時は skip を無視）
+        count (CountMode): 総件数の求め方（exact / estimated / none）
 
     戻り値:
-        DatasetListResponse: 取得したデータセット一覧と総件数
+        DatasetListResponse: 取得したデータセット一覧と総件数、次ページのカーソル
+        （If-None-Match が一致した場合は本文なしの 304）
     """
     logger.info("Start: Listing datasets with skip=%d, limit=%d", skip, limit)
-    try:
-        repo = DatasetRepositorySQLAlchemy(session)
-        usecase = ListDatasetsUseCase(repo)
-        datasets = usecase.execute(skip=skip, limit=limit)
-        total = len(datasets)
-        logger.info("Success: Retrieved %d datasets", total)
-        return DatasetListResponse(
-            items=[
-                DatasetResponse(
-                    id=ds.id,
-                    name=ds.name,
-                    description=ds.description,
-                    meta_data=ds.meta_data,
-                    is_active=ds.is_active,
-                    created_at=ds.created_at,
-                    updated_at=ds.updated_at,
-                )
-                for ds in datasets
-            ],
-            total=total,
+    after = parse_cursor(cursor, CREATED_AT_CURSOR)
+    with api_errors("list datasets"):
+        # 件数と最終更新日時だけで変更を判定し、変更が無ければ一覧を読み込まずに 304 を返す
+        rows, last_updated_at = handlers.summarize_datasets(session)
+        etag = list_etag(rows, last_updated_at, skip, limit, cursor, count.value, meta_key(meta))
+        not_modified = conditional_response(request, response, etag)
+        if not_modified:
+            logger.info("Success: Datasets not modified")
+            return not_modified
+        # 次ページの有無を判定するため1件多く取得する
+        datasets = handlers.list_datasets(session, skip, limit + 1, after, meta)
+        datasets, next_cursor = paginate(
+            datasets, limit, lambda ds: (ds.created_at, ds.id)
+        )
+        # 絞り込んだ場合の総件数は、絞り込み条件ごとに数える
+        total = resolve_total(
+            count,
+            ("datasets", meta_key(meta)),
+            lambda: handlers.count_datasets(session, meta) if meta else rows,
         )
-    except Exception as e:
-        logger.error("Error: Failed to list datasets. Error: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.info("Success: Retrieved %d datasets", len(datasets))
+    return DatasetListResponse(
+        items=[DatasetResponse.model_validate(ds) for ds in datasets],
+        total=total,
+        next_cursor=next_cursor,
+    )
 
 
 @router.get("/{dataset_id}", response_model=DatasetResponse)
-def get_dataset(dataset_id: str, session: Annotated[Session, Depends(get_db)]):
+def get_dataset(
+    dataset_id: str,
+    request: Request,
+    response: Response,
+    session: Annotated[Session, Depends(get_read_db)],
+    include_stats: bool = False,
+):
     """
     指定IDのデータセット詳細を取得するエンドポイント
 
     引数:
         dataset_id (str): 取得対象のデータセットID
+        request (Request): リクエスト（If-None-Match / If-Modified-Since の判定に使用）
+        response (Response): レスポンス（ETag / Last-Modified の設定先）
         session (Session): DBセッション（FastAPI の Depends 経由）
+        include_stats (bool): True の場合は集計値（stats）を埋め込む
 
     戻り値:
         DatasetResponse: 取得したデータセットの詳細情報を含むレスポンスオブジェクト
+        （変更が無い場合は本文なしの 304）
 
     例外:
         HTTPException: 指定されたデータセットが存在しない場合、404 エラーを返す
                    : その他エラー発生時に 500 エラーを返す
     """
     logger.info("Start: Retrieving dataset with id=%s", dataset_id)
-    try:
-        # リポジトリの初期化
-        repo = DatasetRepositorySQLAlchemy(session)
-        usecase = GetDatasetUseCase(repo)
-        dataset = usecase.execute(dataset_id)
-        logger.info("Success: Retrieved dataset with id=%s", dataset_id)
-        return DatasetResponse(
-            id=dataset.id,
-            name=dataset.name,
-            description=dataset.description,
-            meta_data=dataset.meta_data,
-            is_active=dataset.is_active,
-            created_at=dataset.created_at,
-            updated_at=dataset.updated_at,
+    with api_errors("retrieve dataset", not_found=True):
+        dataset = handlers.get_dataset(session, dataset_id)
+        if include_stats:
+            stats = handlers.get_dataset_stats(session, dataset_id)
+        else:
+            stats = None
+    if stats:
+        # 集計値はデータセットの updated_at を変えずに更新されるため、ETag に含めて Last-Modified は返さない
+        etag = entity_etag(dataset.id, dataset.updated_at, "stats", stats.updated_at)
+        not_modified = conditional_response(request, response, etag)
+    else:
+        not_modified = conditional_response(
+            request, response, entity_etag(dataset.id, dataset.updated_at), dataset.updated_at
         )
-    except ValueError as ve:
-        logger.error("Error: %s", str(ve))
-        raise HTTPException(status_code=404, detail=str(ve))
-    except Exception as e:
-        logger.error("Error: Failed to retrieve dataset. Error: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    if not_modified:
+        logger.info("Success: Dataset not modified with id=%s", dataset_id)
+        return not_modified
+    logger.info("Success: Retrieved dataset with id=%s", dataset_id)
+    result = DatasetResponse.model_validate(dataset)
+    if stats:
+        result.stats = DatasetStatsResponse.model_validate(stats)
+    return result
+
+
+@router.get("/{dataset_id}/stats", response_model=DatasetStatsResponse)
+def get_dataset_stats(
+    dataset_id: str,
+    request: Request,
+    response: Response,
+    session: Annotated[Session, Depends(get_read_db)],
+):
+    """
+    指定IDのデータセットの集計値（ドキュメント数・Knowledge 数・文字数）を取得するエンドポイント
+
+    集計値は書き込みのたびに差分更新されたものを返すため、配下のテーブルを走査しない。
+
+    引数:
+        dataset_id (str): 対象のデータセットID
+        request (Request): リクエスト（If-None-Match / If-Modified-Since の判定に使用）
+        response (Response): レスポンス（ETag / Last-Modified の設定先）
+        session (Session): DBセッション
+
+    戻り値:
+        DatasetStatsResponse: 集計値（変更が無い場合は本文なしの 304）
+
+    例外:
+        HTTPException: 指定されたデータセットが存在しない場合、404 エラーを返す
+                   : その他エラー発生時に 500 エラーを返す
+    """
+    logger.info("Start: Retrieving stats for dataset_id=%s", dataset_id)
+    with api_errors("retrieve dataset stats", not_found=True):
+        stats = handlers.get_dataset_stats(session, dataset_id)
+    not_modified = conditional_response(
+        request, response, entity_etag(dataset_id, stats.updated_at, "stats"), stats.updated_at
+    )
+    if not_modified:
+        logger.info("Success: Dataset stats not modified for dataset_id=%s", dataset_id)
+        return not_modified
+    logger.info("Success: Retrieved stats for dataset_id=%s", dataset_id)
+    return DatasetStatsResponse.model_validate(stats)
+
+
+@router.post("/{dataset_id}/retrieve", response_model=DatasetRetrieveResponse)
+@read_only
+def retrieve_knowledges(
+    dataset_id: str,
+    request_body: DatasetRetrieveRequest,
+    session: Annotated[Session, Depends(get_read_db)],
+):
+    """
+    データセット内のKnowledgeを全文検索（BM25）とベクトル検索で探し、融合した上位 top_k 件を返すエンドポイント
+
+    2つの検索は並行に実行し、段階ごとの所要時間（ミリ秒）をレスポンスの timings に含める。
+
+    引数:
+        dataset_id (str): 検索対象のデータセットID
+        request_body (DatasetRetrieveRequest): 検索語・件数・スコアの下限・融合方法
+        session (Session): DBセッション（Knowledge 本体・ドキュメントのタイトルの取得に使う）
+
+    戻り値:
+        DatasetRetrieveResponse: スコアの降順の結果（所属ドキュメントのタイトル付き）と所要時間
+
+    例外:
+        HTTPException: データセットが存在しない場合は 404、索引が使えない場合は 503、
+                       その他エラーの場合は 500 を返す
+    """
+    logger.info("Start: Retrieving knowledges for dataset_id=%s, mode=%s", dataset_id, request_body.mode)
+    with api_errors("retrieve knowledges", not_found=True):
+        result = handlers.retrieve_knowledges(session, dataset_id, request_body)
+    logger.info("Success: Retrieved %d knowledges in %.1fms", len(result.items), result.timings["total"])
+    return handlers.retrieve_response(result)
 
 
 @router.put("/{dataset_id}", response_model=DatasetResponse)
@@ -164,31 +249,10 @@ def update_dataset(
         DatasetResponse: 更新後のデータセット詳細
     """
     logger.info("Start: Updating dataset with id=%s", dataset_id)
-    try:
-        repo = DatasetRepositorySQLAlchemy(session)
-        usecase = UpdateDatasetUseCase(repo)
-        updated_dataset = usecase.execute(
-            dataset_id=dataset_id,
-            name=dataset_update.name,
-            description=dataset_update.description,
-            meta_data=dataset_update.meta_data,
-            is_active=dataset_update.is_active,
-        )
-        logger.info("Success: Updated dataset with id=%s", dataset_id)
-        return DatasetResponse(
-            id=updated_dataset.id,
-            name=updated_dataset.name,
-            description=updated_dataset.description,
-            meta_data=updated_dataset.meta_data,
-            is_active=updated_dataset.is_active,
-            created_at=updated_dataset.created_at,
-            updated_at=updated_dataset.updated_at,
-        )
-    except Exception as e:
-        logger.error(
-            "Error: Failed to update dataset with id=%s, error: %s", dataset_id, str(e)
-        )
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors(f"update dataset with id={dataset_id}"):
+        updated_dataset = handlers.update_dataset(session, dataset_id, dataset_update)
+    logger.info("Success: Updated dataset with id=%s", dataset_id)
+    return DatasetResponse.model_validate(updated_dataset)
 
 
 @router.delete("/{dataset_id}", status_code=204)
@@ -207,20 +271,6 @@ def delete_dataset(dataset_id: str, session: Annotated[Session, Depends(get_db)]
         HTTPException: 対象データセットが存在しない場合は 404 を返す、その他エラーの場合は 500 を返す
     """
     logger.info("Start: Deleting dataset with id=%s", dataset_id)
-    try:
-        repo = DatasetRepositorySQLAlchemy(session)
-        usecase = DeleteDatasetUseCase(repo)
-        success = usecase.execute(dataset_id)
-        if not success:
-            logger.error("Error: Dataset not found for deletion with id=%s", dataset_id)
-            raise HTTPException(status_code=404, detail="Dataset not found")
-        logger.info("Success: Deleted dataset with id=%s", dataset_id)
-        return
-    except Exception as e:
-        if isinstance(e, HTTPException):
-            # 既に HTTPException の場合はそのまま再送出
-            raise e
-        logger.error(
-            "Error: Failed to delete dataset with id=%s, error: %s", dataset_id, str(e)
-        )
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors(f"delete dataset with id={dataset_id}"):
+        handlers.delete_dataset(session, dataset_id)
+    logger.info("Success: Deleted dataset with id=%s", dataset_id)
@@ -1,15 +1,21 @@
 import logging
-from typing import Annotated
+from typing import Annotated, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 
-from app.infrastructure.database.connection import get_db
-from app.infrastructure.repositories.dataset_repository_impl import (
-    DatasetRepositorySQLAlchemy,
-)
-from app.infrastructure.repositories.document_repository_impl import (
-    DocumentRepositorySQLAlchemy,
+from app.infrastructure.database.connection import get_db, get_read_db
+from app.infrastructure.database.meta_filter import meta_key
+from app.interfaces.api.conditional import conditional_response, entity_etag, list_etag
+from app.interfaces.api.errors import api_errors
+from app.interfaces.api.filters import meta_filters
+from app.interfaces.api.handlers import documents as handlers
+from app.interfaces.api.pagination import (
+    CREATED_AT_CURSOR,
+    CountMode,
+    paginate,
+    parse_cursor,
+    resolve_total,
 )
 from app.interfaces.schemas.document import (
     DocumentCreate,
@@ -17,11 +23,6 @@ from app.interfaces.schemas.document import (
     DocumentResponse,
     DocumentUpdate,
 )
-from app.usecases.documents.create_document import CreateDocumentUseCase
-from app.usecases.documents.delete_document import DeleteDocumentUseCase
-from app.usecases.documents.get_document import GetDocumentUseCase
-from app.usecases.documents.list_documents import ListDocumentsUseCase
-from app.usecases.documents.update_document import UpdateDocumentUseCase
 
 # モジュール固有のロガー（ログは英語で出力）
 logger = logging.getLogger(__name__)
@@ -36,119 +37,103 @@ def create_document(
     新規ドキュメントを作成するエンドポイント
     """
     logger.info("Start: Creating new document with title=%s", document_create.title)
-    try:
-        doc_repo = DocumentRepositorySQLAlchemy(session)
-        dataset_repo = DatasetRepositorySQLAlchemy(session)
-        # ★ UseCaseにdataset_repositoryを渡す
-        usecase = CreateDocumentUseCase(
-            document_repository=doc_repo, dataset_repository=dataset_repo
-        )
-        document = usecase.execute(
-            dataset_id=document_create.dataset_id,
-            title=document_create.title,
-            content=document_create.content,
-            meta_data=document_create.meta_data,
-            is_active=document_create.is_active,
-        )
-        logger.info("Success: Document created with id=%s", document.id)
-        return DocumentResponse(
-            id=document.id,
-            dataset_id=document.dataset_id,
-            title=document.title,
-            content=document.content,
-            meta_data=document.meta_data,
-            is_active=document.is_active,
-            created_at=document.created_at,
-            updated_at=document.updated_at,
-        )
-    except Exception as e:
-        logger.error("Error: Failed to create document. Error: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors("create document"):
+        document = handlers.create_document(session, document_create)
+    logger.info("Success: Document created with id=%s", document.id)
+    return DocumentResponse.model_validate(document)
 
 
 @router.get("/", response_model=DocumentListResponse)
 def list_documents(
     dataset_id: str,
-    session: Annotated[Session, Depends(get_db)],
+    request: Request,
+    response: Response,
+    session: Annotated[Session, Depends(get_read_db)],
+    meta: Annotated[Dict[str, str], Depends(meta_filters)],
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.exact,
 ):
     """
     指定されたデータセットに属するドキュメント一覧を取得するエンドポイント
 
     引数:
         dataset_id (str): 対象となるデータセットのID
+        request (Request): リクエスト（If-None-Match の判定に使用）
+        response (Response): レスポンス（ETag の設定先）
         session (Session): DB セッション
+        meta (Dict[str, str]): ?meta.<key>=<value> で指定した meta_data の絞り込み条件
         skip (int): スキップするレコード数
         limit (int): 取得するレコード数の上限
+        cursor (Optional[str]): 前ページの nextCursor（指定時は skip を無視）
+        count (CountMode): 総件数の求め方（exact / estimated / none）
 
     戻り値:
-        DocumentListResponse: ドキュメント一覧と総件数
+        DocumentListResponse: ドキュメント一覧と総件数、次ページのカーソル
+        （If-None-Match が一致した場合は本文なしの 304）
     """
     logger.info("Start: Listing documents for dataset_id=%s", dataset_id)
-    try:
-        repo = DocumentRepositorySQLAlchemy(session)
-        usecase = ListDocumentsUseCase(repo)
-        documents = usecase.execute(dataset_id=dataset_id, skip=skip, limit=limit)
-        total = len(documents)
-        logger.info(
-            "Success: Retrieved %d documents for dataset_id=%s", total, dataset_id
+    after = parse_cursor(cursor, CREATED_AT_CURSOR)
+    with api_errors("list documents"):
+        # 件数と最終更新日時だけで変更を判定し、変更が無ければ一覧を読み込まずに 304 を返す
+        rows, last_updated_at = handlers.summarize_documents(session, dataset_id)
+        etag = list_etag(rows, last_updated_at, skip, limit, cursor, count.value, meta_key(meta))
+        not_modified = conditional_response(request, response, etag)
+        if not_modified:
+            logger.info("Success: Documents not modified for dataset_id=%s", dataset_id)
+            return not_modified
+        # 次ページの有無を判定するため1件多く取得する
+        documents = handlers.list_documents(session, dataset_id, skip, limit + 1, after, meta)
+        documents, next_cursor = paginate(
+            documents, limit, lambda document: (document.created_at, document.id)
         )
-        return DocumentListResponse(
-            items=[
-                DocumentResponse(
-                    id=document.id,
-                    dataset_id=document.dataset_id,
-                    title=document.title,
-                    content=document.content,
-                    meta_data=document.meta_data,
-                    is_active=document.is_active,
-                    created_at=document.created_at,
-                    updated_at=document.updated_at,
-                )
-                for document in documents
-            ],
-            total=total,
+        # 絞り込んだ場合の総件数は、絞り込み条件ごとに数える
+        total = resolve_total(
+            count,
+            ("documents", dataset_id, meta_key(meta)),
+            lambda: handlers.count_documents(session, dataset_id, meta) if meta else rows,
         )
-    except Exception as e:
-        logger.error("Error: Failed to list documents. Error: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.info(
+        "Success: Retrieved %d documents for dataset_id=%s", len(documents), dataset_id
+    )
+    return DocumentListResponse(
+        items=[DocumentResponse.model_validate(document) for document in documents],
+        total=total,
+        next_cursor=next_cursor,
+    )
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
-def get_document(document_id: str, session: Annotated[Session, Depends(get_db)]):
+def get_document(
+    document_id: str,
+    request: Request,
+    response: Response,
+    session: Annotated[Session, Depends(get_read_db)],
+):
     """
     指定IDのドキュメント詳細を取得するエンドポイント
 
     引数:
         document_id (str): 取得対象のドキュメントID
+        request (Request): リクエスト（If-None-Match / If-Modified-Since の判定に使用）
+        response (Response): レスポンス（ETag / Last-Modified の設定先）
         session (Session): DB セッション
 
     戻り値:
-        DocumentResponse: 取得したドキュメントの詳細
+        DocumentResponse: 取得したドキュメントの詳細（変更が無い場合は本文なしの 304）
     """
     logger.info("Start: Retrieving document with id=%s", document_id)
-    try:
-        repo = DocumentRepositorySQLAlchemy(session)
-        usecase = GetDocumentUseCase(repo)
-        document = usecase.execute(document_id)
-        logger.info("Success: Retrieved document with id=%s", document_id)
-        return DocumentResponse(
-            id=document.id,
-            dataset_id=document.dataset_id,
-            title=document.title,
-            content=document.content,
-            meta_data=document.meta_data,
-            is_active=document.is_active,
-            created_at=document.created_at,
-            updated_at=document.updated_at,
-        )
-    except ValueError as ve:
-        logger.error("Error: %s", str(ve))
-        raise HTTPException(status_code=404, detail=str(ve))
-    except Exception as e:
-        logger.error("Error: Failed to retrieve document. Error: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors("retrieve document", not_found=True):
+        document = handlers.get_document(session, document_id)
+    not_modified = conditional_response(
+        request, response, entity_etag(document.id, document.updated_at), document.updated_at
+    )
+    if not_modified:
+        logger.info("Success: Document not modified with id=%s", document_id)
+        return not_modified
+    logger.info("Success: Retrieved document with id=%s", document_id)
+    return DocumentResponse.model_validate(document)
 
 
 @router.put("/{document_id}", response_model=DocumentResponse)
@@ -169,34 +154,10 @@ def update_document(
         DocumentResponse: 更新後のドキュメント詳細
     """
     logger.info("Start: Updating document with id=%s", document_id)
-    try:
-        repo = DocumentRepositorySQLAlchemy(session)
-        usecase = UpdateDocumentUseCase(repo)
-        updated_document = usecase.execute(
-            document_id=document_id,
-            title=document_update.title,
-            content=document_update.content,
-            meta_data=document_update.meta_data,
-            is_active=document_update.is_active,
-        )
-        logger.info("Success: Updated document with id=%s", document_id)
-        return DocumentResponse(
-            id=updated_document.id,
-            dataset_id=updated_document.dataset_id,
-            title=updated_document.title,
-            content=updated_document.content,
-            meta_data=updated_document.meta_data,
-            is_active=updated_document.is_active,
-            created_at=updated_document.created_at,
-            updated_at=updated_document.updated_at,
-        )
-    except Exception as e:
-        logger.error(
-            "Error: Failed to update document with id=%s, error: %s",
-            document_id,
-            str(e),
-        )
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors(f"update document with id={document_id}"):
+        updated_document = handlers.update_document(session, document_id, document_update)
+    logger.info("Success: Updated document with id=%s", document_id)
+    return DocumentResponse.model_validate(updated_document)
 
 
 @router.delete("/{document_id}", status_code=204)
@@ -212,23 +173,6 @@ def delete_document(document_id: str, session: Annotated[Session, Depends(get_db
         204 No Content（削除成功時）
     """
     logger.info("Start: Deleting document with id=%s", document_id)
-    try:
-        repo = DocumentRepositorySQLAlchemy(session)
-        usecase = DeleteDocumentUseCase(repo)
-        success = usecase.execute(document_id)
-        if not success:
-            logger.error(
-                "Error: Document not found for deletion with id=%s", document_id
-            )
-            raise HTTPException(status_code=404, detail="Document not found")
-        logger.info("Success: Deleted document with id=%s", document_id)
-        return
-    except Exception as e:
-        if isinstance(e, HTTPException):
-            raise e
-        logger.error(
-            "Error: Failed to delete document with id=%s, error: %s",
-            document_id,
-            str(e),
-        )
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors(f"delete document with id={document_id}"):
+        handlers.delete_document(session, document_id)
+    logger.info("Success: Deleted document with id=%s", document_id)
@@ -1,22 +1,35 @@
 import logging
-from typing import Annotated
+from typing import Annotated, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 
-from app.infrastructure.database.connection import get_db
-from app.infrastructure.repositories.knowledge_repository_impl import KnowledgeRepositorySQLAlchemy
+from app.infrastructure.database.connection import get_db, get_read_db
+from app.infrastructure.database.meta_filter import meta_key
+from app.interfaces.api.conditional import conditional_response, entity_etag, list_etag
+from app.interfaces.api.errors import api_errors
+from app.interfaces.api.filters import meta_filters
+from app.interfaces.api.handlers import knowledges as handlers
+from app.interfaces.api.pagination import (
+    SEQUENCE_CURSOR,
+    CountMode,
+    paginate,
+    parse_cursor,
+    resolve_total,
+)
 from app.interfaces.schemas.knowledge import (
+    KnowledgeBulkCreate,
+    KnowledgeBulkCreateResponse,
     KnowledgeCreate,
     KnowledgeListResponse,
     KnowledgeResponse,
+    KnowledgeSearchResponse,
     KnowledgeUpdate,
+    KnowledgeVectorSearchRequest,
+    KnowledgeVectorSearchResponse,
 )
-from app.usecases.knowledges.create_knowledge import CreateKnowledgeUseCase
-from app.usecases.knowledges.delete_knowledge import DeleteKnowledgeUseCase
-from app.usecases.knowledges.get_knowledge import GetKnowledgeUseCase
-from app.usecases.knowledges.list_knowledges import ListKnowledgesUseCase
-from app.usecases.knowledges.update_knowledge import UpdateKnowledgeUseCase
+from app.interfaces.middleware.read_your_writes import read_only
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
@@ -29,99 +42,132 @@ def create_knowledge(
     新規Knowledge（ページ情報）を作成するエンドポイント
     """
     logger.info("Start: Creating new knowledge for document_id=%s, sequence=%d", knowledge_create.document_id, knowledge_create.sequence)
-    try:
-        repo = KnowledgeRepositorySQLAlchemy(session)
-        usecase = CreateKnowledgeUseCase(repo)
-        knowledge = usecase.execute(
-            document_id=knowledge_create.document_id,
-            sequence=knowledge_create.sequence,
-            knowledge_text=knowledge_create.knowledge_text,
-            meta_data=knowledge_create.meta_data,
-            is_active=knowledge_create.is_active,
-        )
-        logger.info("Success: Knowledge created with id=%s", knowledge.id)
-        return KnowledgeResponse(
-            id=knowledge.id,
-            document_id=knowledge.document_id,
-            sequence=knowledge.sequence,
-            knowledge_text=knowledge.knowledge_text,
-            meta_data=knowledge.meta_data,
-            is_active=knowledge.is_active,
-            created_at=knowledge.created_at,
-            updated_at=knowledge.updated_at,
-        )
-    except Exception as e:
-        logger.error("Error: Failed to create knowledge. Error: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors("create knowledge"):
+        knowledge = handlers.create_knowledge(session, knowledge_create)
+    logger.info("Success: Knowledge created with id=%s", knowledge.id)
+    return KnowledgeResponse.model_validate(knowledge)
+
+@router.post("/bulk", response_model=KnowledgeBulkCreateResponse, status_code=201)
+def bulk_create_knowledges(
+    knowledge_bulk_create: KnowledgeBulkCreate, session: Annotated[Session, Depends(get_db)]
+):
+    """
+    複数のKnowledge（ページ情報）を1トランザクションで一括作成するエンドポイント
+    """
+    logger.info("Start: Bulk creating %d knowledges", len(knowledge_bulk_create.items))
+    with api_errors("bulk create knowledges"):
+        ids = handlers.bulk_create_knowledges(session, knowledge_bulk_create)
+    logger.info("Success: Bulk created %d knowledges", len(ids))
+    return KnowledgeBulkCreateResponse(ids=ids, total=len(ids))
 
 
 @router.get("/", response_model=KnowledgeListResponse)
 def list_knowledges(
-    session: Annotated[Session, Depends(get_db)],
+    request: Request,
+    response: Response,
+    session: Annotated[Session, Depends(get_read_db)],
+    meta: Annotated[Dict[str, str], Depends(meta_filters)],
     document_id: str = Query(..., description="紐付くドキュメントID"),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="前ページの nextCursor（指定時は skip を無視）"),
+    count: CountMode = Query(CountMode.exact, description="総件数の求め方（exact / estimated / none）"),
 ):
     """
     指定ドキュメントに紐付くKnowledge（ページ情報）一覧を取得するエンドポイント
+
+    ETag を返し、If-None-Match が一致した場合は一覧を読み込まずに 304 を返す。
+    ?meta.<key>=<value> を指定した場合は meta_data の値がすべて一致するものに絞り込む
     """
     logger.info("Start: Listing knowledges for document_id=%s", document_id)
-    try:
-        repo = KnowledgeRepositorySQLAlchemy(session)
-        usecase = ListKnowledgesUseCase(repo)
-        knowledges = usecase.execute(document_id=document_id, skip=skip, limit=limit)
-        total = len(knowledges)
-        logger.info("Success: Retrieved %d knowledges for document_id=%s", total, document_id)
-        return KnowledgeListResponse(
-            items=[
-                KnowledgeResponse(
-                    id=k.id,
-                    document_id=k.document_id,
-                    sequence=k.sequence,
-                    knowledge_text=k.knowledge_text,
-                    meta_data=k.meta_data,
-                    is_active=k.is_active,
-                    created_at=k.created_at,
-                    updated_at=k.updated_at,
-                )
-                for k in knowledges
-            ],
-            total=total,
+    after = parse_cursor(cursor, SEQUENCE_CURSOR)
+    with api_errors("list knowledges"):
+        # 件数と最終更新日時だけで変更を判定し、変更が無ければ一覧を読み込まずに 304 を返す
+        rows, last_updated_at = handlers.summarize_knowledges(session, document_id)
+        etag = list_etag(rows, last_updated_at, skip, limit, cursor, count.value, meta_key(meta))
+        not_modified = conditional_response(request, response, etag)
+        if not_modified:
+            logger.info("Success: Knowledges not modified for document_id=%s", document_id)
+            return not_modified
+        # 次ページの有無を判定するため1件多く取得する
+        knowledges = handlers.list_knowledges(session, document_id, skip, limit + 1, after, meta)
+        knowledges, next_cursor = paginate(knowledges, limit, lambda k: (k.sequence, k.id))
+        # 絞り込んだ場合の総件数は、絞り込み条件ごとに数える
+        total = resolve_total(
+            count,
+            ("knowledges", document_id, meta_key(meta)),
+            lambda: handlers.count_knowledges(session, document_id, meta) if meta else rows,
         )
-    except Exception as e:
-        logger.error("Error: Failed to list knowledges. Error: %s", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    logger.info("Success: Retrieved %d knowledges for document_id=%s", len(knowledges), document_id)
+    return KnowledgeListResponse(
+        items=[KnowledgeResponse.model_validate(k) for k in knowledges],
+        total=total,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/search", response_model=KnowledgeSearchResponse)
+def search_knowledges(
+    session: Annotated[Session, Depends(get_read_db)],
+    meta: Annotated[Dict[str, str], Depends(meta_filters)],
+    q: str = Query(..., min_length=1, description="検索語（NFKC 正規化・文字 bigram で照合）"),
+    dataset_id: Optional[str] = Query(None, description="指定した場合はそのデータセットのKnowledgeに絞り込む"),
+    limit: int = Query(10, ge=1, le=100, description="返す件数の上限"),
+):
+    """
+    Knowledge本文を全文検索するエンドポイント
+
+    全文検索索引で検索語の全ての語を含むKnowledgeを探し、BM25 のスコアの降順に返す。
+    索引の構築中は 503 を返す。SEARCH_BACKEND=database の場合は DB の全文検索を使い、スコアは DB の値になる。
+    ?meta.<key>=<value> を指定した場合は、meta_data の値がすべて一致するものに絞り込む（total も絞り込んだ後の件数）。
+    """
+    logger.info("Start: Searching knowledges with dataset_id=%s", dataset_id)
+    with api_errors("search knowledges"):
+        results, total = handlers.search_knowledges(session, q, dataset_id, limit, meta)
+    logger.info("Success: Found %d knowledges", total)
+    return KnowledgeSearchResponse(items=handlers.search_items(results), total=total)
+
+
+@router.post("/vector-search", response_model=KnowledgeVectorSearchResponse)
+@read_only
+def vector_search_knowledges(
+    request_body: KnowledgeVectorSearchRequest, session: Annotated[Session, Depends(get_read_db)]
+):
+    """
+    Knowledge本文をベクトル検索するエンドポイント
+
+    検索語の埋め込みとデータセット内の全Knowledgeの埋め込みのコサイン類似度を求め、上位 top_k 件を返す。
+    """
+    logger.info("Start: Vector searching knowledges with dataset_id=%s", request_body.dataset_id)
+    with api_errors("vector search knowledges"):
+        results = handlers.vector_search_knowledges(session, request_body)
+    logger.info("Success: Found %d knowledges", len(results))
+    return KnowledgeVectorSearchResponse(items=handlers.search_items(results))
 
 
 @router.get("/{knowledge_id}", response_model=KnowledgeResponse)
-def get_knowledge(knowledge_id: str, session: Annotated[Session, Depends(get_db)]):
+def get_knowledge(
+    knowledge_id: str,
+    request: Request,
+    response: Response,
+    session: Annotated[Session, Depends(get_read_db)],
+):
     """
     Knowledge（ページ情報）をIDで取得するエンドポイント
+
+    ETag / Last-Modified を返し、変更が無い場合は本文なしの 304 を返す
     """
     logger.info("Start: Retrieving knowledge with id=%s", knowledge_id)
-    try:
-        repo = KnowledgeRepositorySQLAlchemy(session)
-        usecase = GetKnowledgeUseCase(repo)
-        knowledge = usecase.execute(knowledge_id)
-    except Exception as e:
-        logger.error("Error: Failed to retrieve knowledge. Error: %s", str(e))
-        if isinstance(e, ValueError) or "not found" in str(e).lower():
-            raise HTTPException(status_code=404, detail="Knowledge not found")
-        raise HTTPException(status_code=500, detail=str(e))
-    if not knowledge:
-        logger.error("Error: Knowledge not found with id=%s", knowledge_id)
-        raise HTTPException(status_code=404, detail="Knowledge not found")
-    logger.info("Success: Retrieved knowledge with id=%s", knowledge_id)
-    return KnowledgeResponse(
-        id=knowledge.id,
-        document_id=knowledge.document_id,
-        sequence=knowledge.sequence,
-        knowledge_text=knowledge.knowledge_text,
-        meta_data=knowledge.meta_data,
-        is_active=knowledge.is_active,
-        created_at=knowledge.created_at,
-        updated_at=knowledge.updated_at,
+    with api_errors("retrieve knowledge", not_found=True):
+        knowledge = handlers.get_knowledge(session, knowledge_id)
+    not_modified = conditional_response(
+        request, response, entity_etag(knowledge.id, knowledge.updated_at), knowledge.updated_at
     )
+    if not_modified:
+        logger.info("Success: Knowledge not modified with id=%s", knowledge_id)
+        return not_modified
+    logger.info("Success: Retrieved knowledge with id=%s", knowledge_id)
+    return KnowledgeResponse.model_validate(knowledge)
 
 
 @router.put("/{knowledge_id}", response_model=KnowledgeResponse)
@@ -132,40 +178,14 @@ def update_knowledge(
 ):
     """
     Knowledge（ページ情報）を更新するエンドポイント
+
+    対象が存在しない場合は 404 を返す
     """
     logger.info("Start: Updating knowledge with id=%s", knowledge_id)
-    try:
-        repo = KnowledgeRepositorySQLAlchemy(session)
-        get_usecase = GetKnowledgeUseCase(repo)
-        knowledge = get_usecase.execute(knowledge_id)
-        if not knowledge:
-            logger.error("Error: Knowledge not found for update with id=%s", knowledge_id)
-            raise HTTPException(status_code=404, detail="Knowledge not found")
-        # 更新内容を反映
-        if knowledge_update.sequence is not None:
-            knowledge.sequence = knowledge_update.sequence
-        if knowledge_update.knowledge_text is not None:
-            knowledge.knowledge_text = knowledge_update.knowledge_text
-        if knowledge_update.meta_data is not None:
-            knowledge.meta_data = knowledge_update.meta_data
-        if knowledge_update.is_active is not None:
-            knowledge.is_active = knowledge_update.is_active
-        update_usecase = UpdateKnowledgeUseCase(repo)
-        updated_knowledge = update_usecase.execute(knowledge)
-        logger.info("Success: Updated knowledge with id=%s", knowledge_id)
-        return KnowledgeResponse(
-            id=updated_knowledge.id,
-            document_id=updated_knowledge.document_id,
-            sequence=updated_knowledge.sequence,
-            knowledge_text=updated_knowledge.knowledge_text,
-            meta_data=updated_knowledge.meta_data,
-            is_active=updated_knowledge.is_active,
-            created_at=updated_knowledge.created_at,
-            updated_at=updated_knowledge.updated_at,
-        )
-    except Exception as e:
-        logger.error("Error: Failed to update knowledge with id=%s, error: %s", knowledge_id, str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors(f"update knowledge with id={knowledge_id}"):
+        updated_knowledge = handlers.update_knowledge(session, knowledge_id, knowledge_update)
+    logger.info("Success: Updated knowledge with id=%s", knowledge_id)
+    return KnowledgeResponse.model_validate(updated_knowledge)
 
 
 @router.delete("/{knowledge_id}", status_code=204)
@@ -174,17 +194,6 @@ def delete_knowledge(knowledge_id: str, session: Annotated[Session, Depends(get_
     Knowledge（ページ情報）をIDで削除するエンドポイント
     """
     logger.info("Start: Deleting knowledge with id=%s", knowledge_id)
-    try:
-        repo = KnowledgeRepositorySQLAlchemy(session)
-        usecase = DeleteKnowledgeUseCase(repo)
-        success = usecase.execute(knowledge_id)
-        if not success:
-            logger.error("Error: Knowledge not found for deletion with id=%s", knowledge_id)
-            raise HTTPException(status_code=404, detail="Knowledge not found")
-        logger.info("Success: Deleted knowledge with id=%s", knowledge_id)
-        return
-    except Exception as e:
-        if isinstance(e, HTTPException):
-            raise e
-        logger.error("Error: Failed to delete knowledge with id=%s, error: %s", knowledge_id, str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    with api_errors(f"delete knowledge with id={knowledge_id}"):
+        handlers.delete_knowledge(session, knowledge_id)
+    logger.info("Success: Deleted knowledge with id=%s", knowledge_id)
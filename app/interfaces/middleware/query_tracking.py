@@ -0,0 +1,97 @@
+"""
+リクエスト単位のSQLクエリ計測ミドルウェア
+
+リクエストごとにクエリ数・DB処理時間・最も遅いステートメントを集計し、
+以下の形で公開する。
+
+- Server-Timing レスポンスヘッダ（例: db;dur=12.3;desc="4 queries"）
+- OpenTelemetry のサーバースパン属性（db.query_count など）
+- クエリ予算（QUERY_BUDGET_COUNT / QUERY_BUDGET_MS）を超えたリクエストの警告ログ
+- 同一ステートメントが QUERY_N_PLUS_ONE_THRESHOLD 回以上実行された場合の N+1 警告ログ
+"""
+
+import logging
+import os
+
+from opentelemetry import trace
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infrastructure.database.query_tracker import (
+    QueryStats,
+    start_tracking,
+    stop_tracking,
+)
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_COUNT = int(os.getenv("QUERY_BUDGET_COUNT", "20"))
+QUERY_BUDGET_MS = float(os.getenv("QUERY_BUDGET_MS", "500"))
+QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "5"))
+
+# ログに出力するステートメントの最大文字数
+_STATEMENT_LOG_LENGTH = 200
+
+
+def server_timing_value(stats: QueryStats) -> str:
+    """QueryStats から Server-Timing ヘッダ値を組み立てる"""
+    return f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} queries"'
+
+
+class QueryTrackingMiddleware:
+    """リクエスト単位でSQLクエリを集計する ASGI ミドルウェア"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = start_tracking()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing_value(stats))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            stop_tracking(token)
+            self._report(scope, stats)
+
+    def _report(self, scope: Scope, stats: QueryStats) -> None:
+        """スパン属性の設定と、予算超過・N+1 の警告ログ出力を行う"""
+        total_ms = stats.total_time * 1000
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.set_attribute("db.query_count", stats.count)
+            span.set_attribute("db.total_time_ms", total_ms)
+            if stats.slowest_statement:
+                span.set_attribute("db.slowest_time_ms", stats.slowest_time * 1000)
+                span.set_attribute(
+                    "db.slowest_statement", stats.slowest_statement[:_STATEMENT_LOG_LENGTH]
+                )
+
+        path = f"{scope.get('method')} {scope.get('path')}"
+        if stats.count > QUERY_BUDGET_COUNT or total_ms > QUERY_BUDGET_MS:
+            logger.warning(
+                "Query budget exceeded: %s ran %d queries in %.1fms (budget: %d queries / %.0fms), slowest %.1fms: %s",
+                path,
+                stats.count,
+                total_ms,
+                QUERY_BUDGET_COUNT,
+                QUERY_BUDGET_MS,
+                stats.slowest_time * 1000,
+                (stats.slowest_statement or "")[:_STATEMENT_LOG_LENGTH],
+            )
+        for statement, n in stats.repeated_statements(QUERY_N_PLUS_ONE_THRESHOLD):
+            logger.warning(
+                "Probable N+1 pattern: %s executed the same statement %d times: %s",
+                path,
+                n,
+                statement[:_STATEMENT_LOG_LENGTH],
+            )
@@ -0,0 +1,79 @@
+"""
+read-your-writes 用ミドルウェア
+
+書き込み系リクエスト（POST/PUT/PATCH/DELETE）が成功した場合に、書き込み時刻（UNIX秒）を
+X-Last-Write-At ヘッダと last_write_at Cookie で返す。クライアントが次の GET で
+この値を送り返すと、get_read_db はレプリカではなくプライマリから読み取る。
+
+検索のように本文を POST で受け取るだけで書き込まないエンドポイントは read_only を付けて除外する
+（付けないと検索のたびに以降の読み取りがプライマリに固定される）。
+"""
+
+import time
+from typing import Callable, TypeVar
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infrastructure.database.connection import (
+    LAST_WRITE_COOKIE,
+    LAST_WRITE_HEADER,
+    READ_YOUR_WRITES_WINDOW_SECONDS,
+)
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# read_only を付けたエンドポイントの目印
+READ_ONLY_ATTRIBUTE = "__read_only__"
+
+F = TypeVar("F", bound=Callable)
+
+
+def read_only(endpoint: F) -> F:
+    """
+    書き込みを行わないエンドポイントに付け、成功しても書き込み時刻を返さないようにする
+
+    Args:
+        endpoint (F): ルートのエンドポイント関数
+
+    Returns:
+        F: 同じ関数（目印の属性を付けたもの）
+    """
+    setattr(endpoint, READ_ONLY_ATTRIBUTE, True)
+    return endpoint
+
+
+def _is_read_only(scope: Scope) -> bool:
+    """ルーティング済みのエンドポイントが read_only か（ルーティング前・未一致の場合は False）"""
+    return getattr(scope.get("endpoint"), READ_ONLY_ATTRIBUTE, False)
+
+
+class ReadYourWritesMiddleware:
+    """書き込み成功時に書き込み時刻をクライアントへ返す ASGI ミドルウェア"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_write_marker(message: Message) -> None:
+            # エンドポイントはルーティング時に scope に入るため、応答の開始時に判定する
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+                and not _is_read_only(scope)
+            ):
+                written_at = f"{time.time():.3f}"
+                headers = MutableHeaders(scope=message)
+                headers.append(LAST_WRITE_HEADER, written_at)
+                headers.append(
+                    "Set-Cookie",
+                    f"{LAST_WRITE_COOKIE}={written_at}; Max-Age={int(READ_YOUR_WRITES_WINDOW_SECONDS) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_write_marker)
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import Field
+
+from app.interfaces.schemas.base import CustomBaseModel
+
+# 変更フィードの1回の取得件数の上限
+CHANGE_LIST_MAX_LIMIT = 1000
+
+
+class ChangeResponse(CustomBaseModel):
+    """
+    変更履歴1件のレスポンススキーマ
+
+    Attributes:
+        seq: 連番
+        entity: 変更されたもの（dataset / document / knowledge）
+        entity_id: 変更されたもののID
+        operation: 変更の種類（create / update / delete）
+        document_id: Knowledge の所属ドキュメントID
+        dataset_id: ドキュメントの所属データセットID
+        created_at: 記録日時
+    """
+
+    seq: int = Field(..., description="連番")
+    entity: str = Field(..., description="変更されたもの（dataset / document / knowledge）")
+    entity_id: str = Field(..., description="変更されたもののID")
+    operation: str = Field(
+        ..., description="変更の種類（create / update / delete。親の削除で一緒に削除された配下も delete）"
+    )
+    document_id: Optional[str] = Field(None, description="Knowledge の所属ドキュメントID")
+    dataset_id: Optional[str] = Field(None, description="ドキュメントの所属データセットID")
+    created_at: datetime = Field(..., description="記録日時")
+
+
+class ChangeListResponse(CustomBaseModel):
+    """変更履歴一覧のレスポンススキーマ"""
+
+    items: List[ChangeResponse] = Field(..., description="連番の昇順の変更")
+    next_since: int = Field(..., description="次の取得で since に渡す値（変更が無ければリクエストの since）")
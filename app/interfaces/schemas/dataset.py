@@ -1,8 +1,9 @@
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import Field
 from app.interfaces.schemas.base import CustomBaseModel
+from app.interfaces.schemas.knowledge import KnowledgeSearchItem
 
 
 class DatasetCreate(CustomBaseModel):
@@ -39,6 +40,27 @@ class DatasetUpdate(CustomBaseModel):
     is_active: Optional[bool] = Field(None, description="有効フラグ（True:有効, False:無効）")
 
 
+class DatasetStatsResponse(CustomBaseModel):
+    """
+    データセット集計値レスポンス
+
+    Attributes:
+        dataset_id: データセットID
+        document_count: ドキュメント数
+        knowledge_count: Knowledge 数
+        document_characters: ドキュメント本文の合計文字数
+        knowledge_characters: Knowledge 本文の合計文字数
+        updated_at: 集計値の更新日時
+    """
+
+    dataset_id: str
+    document_count: int
+    knowledge_count: int
+    document_characters: int
+    knowledge_characters: int
+    updated_at: Optional[datetime] = None
+
+
 class DatasetResponse(CustomBaseModel):
     """
     データセットレスポンス
@@ -51,6 +73,7 @@ class DatasetResponse(CustomBaseModel):
         is_active: 有効フラグ（True:有効, False:無効）
         created_at: 作成日時
         updated_at: 更新日時
+        stats: 集計値（include_stats=true の場合のみ）
     """
 
     id: str
@@ -60,10 +83,56 @@ class DatasetResponse(CustomBaseModel):
     is_active: bool
     created_at: datetime
     updated_at: datetime
+    stats: Optional[DatasetStatsResponse] = Field(
+        None, description="集計値（GET /{id}?include_stats=true の場合のみ）"
+    )
 
 
 class DatasetListResponse(CustomBaseModel):
     """データセット一覧レスポンス"""
 
     items: List[DatasetResponse]
-    total: int
+    total: Optional[int] = Field(
+        None, description="総件数（count=none の場合は null、estimated の場合は推定値）"
+    )
+    next_cursor: Optional[str] = Field(
+        None, description="次ページ取得用のカーソル（最終ページの場合は null）"
+    )
+
+
+class DatasetRetrieveRequest(CustomBaseModel):
+    """
+    データセット内のKnowledgeのハイブリッド検索リクエスト
+
+    Attributes:
+        query: 検索語
+        top_k: 返す件数の上限
+        score_threshold: スコアの下限
+        mode: 使う検索（hybrid: 全文検索とベクトル検索 / lexical: 全文検索のみ / vector: ベクトル検索のみ）
+        fusion: hybrid の融合方法（rrf: 順位による Reciprocal Rank Fusion / weighted: 正規化したスコアの重み付き和）
+        vector_weight: hybrid でのベクトル検索の重み（全文検索は 1 - vector_weight）
+    """
+
+    query: str = Field(..., min_length=1, description="検索語")
+    top_k: int = Field(10, ge=1, le=100, description="返す件数の上限")
+    score_threshold: Optional[float] = Field(None, description="指定した場合はスコアがこれ未満の結果を除く")
+    mode: Literal["hybrid", "lexical", "vector"] = Field("hybrid", description="使う検索")
+    fusion: Literal["rrf", "weighted"] = Field("rrf", description="hybrid の融合方法")
+    vector_weight: float = Field(0.5, ge=0, le=1, description="hybrid でのベクトル検索の重み")
+
+
+class RetrievedKnowledgeItem(KnowledgeSearchItem):
+    """ハイブリッド検索の結果1件のスキーマ"""
+
+    document_title: Optional[str] = Field(None, description="所属ドキュメントのタイトル")
+    lexical_score: Optional[float] = Field(None, description="全文検索（BM25）のスコア（候補に無い場合は null）")
+    vector_score: Optional[float] = Field(None, description="コサイン類似度（候補に無い場合は null）")
+
+
+class DatasetRetrieveResponse(CustomBaseModel):
+    """データセット内のKnowledgeのハイブリッド検索レスポンス"""
+
+    items: List[RetrievedKnowledgeItem] = Field(..., description="スコアの降順の検索結果")
+    timings: Dict[str, float] = Field(
+        ..., description="段階ごとの所要時間（ミリ秒。lexical / vector / fusion / hydrate / total）"
+    )
@@ -72,4 +72,9 @@ class DocumentListResponse(CustomBaseModel):
     """
 
     items: List[DocumentResponse]
-    total: int
+    total: Optional[int] = Field(
+        None, description="総件数（count=none の場合は null、estimated の場合は推定値）"
+    )
+    next_cursor: Optional[str] = Field(
+        None, description="次ページ取得用のカーソル（最終ページの場合は null）"
+    )
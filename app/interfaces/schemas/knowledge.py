@@ -29,6 +29,33 @@ class KnowledgeCreate(KnowledgeBase):
     pass
 
 
+# 一括作成APIで1リクエストに含められる件数の上限
+KNOWLEDGE_BULK_MAX_ITEMS = 10000
+
+
+class KnowledgeBulkCreate(CustomBaseModel):
+    """
+    Knowledge一括作成用スキーマ
+
+    Attributes:
+        items: 作成するKnowledgeのリスト（複数ドキュメントの混在可）
+    """
+
+    items: List[KnowledgeCreate] = Field(
+        ...,
+        min_length=1,
+        max_length=KNOWLEDGE_BULK_MAX_ITEMS,
+        description="作成するKnowledgeのリスト",
+    )
+
+
+class KnowledgeBulkCreateResponse(CustomBaseModel):
+    """Knowledge一括作成レスポンススキーマ"""
+
+    ids: List[str] = Field(..., description="作成されたKnowledge ID（リクエストと同じ順序）")
+    total: int = Field(..., description="作成件数")
+
+
 class KnowledgeUpdate(CustomBaseModel):
     """
     Knowledge更新用スキーマ
@@ -58,4 +85,36 @@ class KnowledgeListResponse(CustomBaseModel):
     """Knowledge一覧レスポンススキーマ"""
 
     items: List[KnowledgeResponse]
-    total: int
+    total: Optional[int] = Field(
+        None, description="総件数（count=none の場合は null、estimated の場合は推定値）"
+    )
+    next_cursor: Optional[str] = Field(
+        None, description="次ページ取得用のカーソル（最終ページの場合は null）"
+    )
+
+
+class KnowledgeSearchItem(KnowledgeResponse):
+    """Knowledge全文検索の結果1件のスキーマ"""
+
+    score: float = Field(..., description="一致の度合い（大きいほど上位）")
+
+
+class KnowledgeSearchResponse(CustomBaseModel):
+    """Knowledge全文検索レスポンススキーマ"""
+
+    items: List[KnowledgeSearchItem] = Field(..., description="スコアの降順の検索結果")
+    total: int = Field(..., description="一致した総件数")
+
+
+class KnowledgeVectorSearchRequest(CustomBaseModel):
+    """Knowledgeベクトル検索リクエストスキーマ"""
+
+    query: str = Field(..., min_length=1, description="検索語（埋め込みに変換して類似度を求める）")
+    dataset_id: str = Field(..., description="検索対象のデータセットID")
+    top_k: int = Field(10, ge=1, le=100, description="返す件数の上限")
+
+
+class KnowledgeVectorSearchResponse(CustomBaseModel):
+    """Knowledgeベクトル検索レスポンススキーマ"""
+
+    items: List[KnowledgeSearchItem] = Field(..., description="コサイン類似度の降順の検索結果")
@@ -7,13 +7,19 @@ import logging
 logging.info("test log: FastAPI app startup")
 
 # OpenTelemetry/Azure Monitor初期化
-from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter, AzureMonitorLogExporter
+from azure.monitor.opentelemetry.exporter import (
+    AzureMonitorLogExporter,
+    AzureMonitorMetricExporter,
+    AzureMonitorTraceExporter,
+)
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.logging import LoggingInstrumentor
-from opentelemetry import trace
+from opentelemetry import metrics, trace
 import logging
 import os
 
@@ -31,6 +37,16 @@ if connection_string:
     span_processor = BatchSpanProcessor(trace_exporter)
     trace_provider.add_span_processor(span_processor)
 
+# MeterProviderとExporterの設定（DBプール等のメトリクス送信用）
+metric_readers = []
+if connection_string:
+    metric_readers.append(
+        PeriodicExportingMetricReader(
+            AzureMonitorMetricExporter(connection_string=connection_string)
+        )
+    )
+metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=metric_readers))
+
 # LoggingのExporter設定
 if connection_string:
     log_exporter = AzureMonitorLogExporter(connection_string=connection_string)
@@ -38,8 +54,36 @@ if connection_string:
 else:
     LoggingInstrumentor().instrument(set_logging_format=True)
 
-from app.infrastructure.database.connection import init_db
-from app.interfaces.api.v1 import datasets, documents, knowledges
+import anyio.to_thread
+
+from app.infrastructure.cache.entity_cache import (
+    start_invalidation_listener,
+    stop_invalidation_listener,
+)
+from app.infrastructure.cache.existence import start_id_filter_rebuild
+from app.infrastructure.database.change_feed import start_change_feed, stop_change_feed
+from app.infrastructure.search.knowledge_index import start_search_index, stop_search_index
+from app.infrastructure.search.vector_index import start_vector_index, stop_vector_index
+from app.infrastructure.database.connection import (
+    DATABASE_READ_URL,
+    USE_ASYNC_DB,
+    SessionLocal,
+    init_db,
+)
+from app.infrastructure.database.pool import monitors as pool_monitors
+from app.interfaces.middleware.query_tracking import QueryTrackingMiddleware
+from app.interfaces.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.interfaces.api.routing import with_async_routes
+from app.interfaces.api.v1 import (
+    async_changes,
+    async_datasets,
+    async_documents,
+    async_knowledges,
+    changes,
+    datasets,
+    documents,
+    knowledges,
+)
 
 # logging設定（uvicornの--log-configで適用するため、ここでは不要）
 
@@ -53,8 +97,22 @@ async def lifespan(app):
     # アプリケーション起動時の処理
     init_db()
     logging.info("Database initialized on startup.")
+    # 共有キャッシュ（L2）利用時は、他ノードからのキャッシュ無効化メッセージを購読する
+    start_invalidation_listener()
+    # ID_FILTER_ENABLED=true の場合は、存在するIDのフィルターをバックグラウンドで構築する（プライマリから読む）
+    start_id_filter_rebuild(SessionLocal)
+    # Knowledge 全文検索の索引（セグメント）をバックグラウンドで開く（無ければ構築する。構築中の検索は 503）
+    start_search_index(SessionLocal)
+    # VECTOR_INDEX=hnsw の場合は、HNSW グラフの定期的な保存・作り直しを開始する
+    start_vector_index()
+    # 変更履歴を追従し、pub/sub で届かなかった他ノードの書き込みを索引・キャッシュに反映する
+    start_change_feed(SessionLocal)
     yield
     # アプリケーション終了時の処理（必要に応じて追加）
+    stop_change_feed()
+    stop_invalidation_listener()
+    stop_search_index()
+    stop_vector_index()
 
 # FastAPIアプリケーションの生成（lifespanを指定）
 app = FastAPI(
@@ -74,10 +132,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ルーターの登録
-app.include_router(datasets.router, prefix="/api/v1/datasets", tags=["datasets"])
-app.include_router(documents.router, prefix="/api/v1/documents", tags=["documents"])
-app.include_router(knowledges.router, prefix="/api/v1/knowledges", tags=["knowledges"])
+# リクエスト単位のSQLクエリ計測（Server-Timing ヘッダ・スパン属性・クエリ予算超過ログ）
+app.add_middleware(QueryTrackingMiddleware)
+
+# リードレプリカ利用時は、書き込み直後のクライアントをプライマリに固定するための書き込み時刻を返す
+if DATABASE_READ_URL:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# ルーターの登録（USE_ASYNC_DB=true の場合は CRUD ルートを async def 版に差し替える）
+datasets_router = datasets.router
+documents_router = documents.router
+knowledges_router = knowledges.router
+changes_router = changes.router
+if USE_ASYNC_DB:
+    datasets_router = with_async_routes(datasets.router, async_datasets.router)
+    documents_router = with_async_routes(documents.router, async_documents.router)
+    knowledges_router = with_async_routes(knowledges.router, async_knowledges.router)
+    changes_router = with_async_routes(changes.router, async_changes.router)
+app.include_router(datasets_router, prefix="/api/v1/datasets", tags=["datasets"])
+app.include_router(documents_router, prefix="/api/v1/documents", tags=["documents"])
+app.include_router(knowledges_router, prefix="/api/v1/knowledges", tags=["knowledges"])
+app.include_router(changes_router, prefix="/api/v1/changes", tags=["changes"])
 
 
 @app.get("/")
@@ -94,3 +169,21 @@ def ping():
 def status():
     """Functionsランタイムの死活監視用エンドポイント（status）"""
     return {"status": "ok"}
+
+
+@app.get("/admin/db/pool")
+async def db_pool_status():
+    """
+    DBコネクションプールの利用状況を返す管理用エンドポイント
+
+    同期ルートは anyio のワーカースレッド上で実行されるため、
+    スレッド数の上限（thread_limit）と併せてプールサイズの妥当性を判断できる。
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        "pools": {name: monitor.status() for name, monitor in pool_monitors.items()},
+        "threads": {
+            "thread_limit": limiter.total_tokens,
+            "in_use": limiter.borrowed_tokens,
+        },
+    }
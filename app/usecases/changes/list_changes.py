@@ -0,0 +1,32 @@
+from typing import List
+
+from app.domain.entities.change import Change
+from app.domain.repositories.change_repository import ChangeRepository
+
+
+class ListChangesUseCase:
+    """
+    変更履歴（データセット・ドキュメント・Knowledge の作成・更新・削除）の取得ユースケース
+    """
+
+    def __init__(self, change_repository: ChangeRepository):
+        """
+        コンストラクタ
+
+        Args:
+            change_repository (ChangeRepository): 変更履歴リポジトリ
+        """
+        self.change_repository = change_repository
+
+    def execute(self, since: int = 0, limit: int = 100) -> List[Change]:
+        """
+        指定した連番より後の変更を連番の昇順に取得する
+
+        Args:
+            since (int, optional): この連番より後の変更を返す（前回の応答の nextSince を渡す）
+            limit (int, optional): 取得する件数の上限
+
+        Returns:
+            List[Change]: 変更のリスト
+        """
+        return self.change_repository.list_changes(since, limit)
@@ -0,0 +1,32 @@
+from app.domain.entities.dataset_stats import DatasetStats
+from app.domain.repositories.stats_repository import StatsRepository
+
+
+class GetDatasetStatsUseCase:
+    """
+    データセット集計値取得ユースケース
+
+    差分更新されている集計値（ドキュメント数・Knowledge 数・文字数）を取得し、
+    存在しない場合は例外を発生させます。
+    """
+
+    def __init__(self, stats_repository: StatsRepository):
+        self.stats_repository = stats_repository
+
+    def execute(self, dataset_id: str) -> DatasetStats:
+        """
+        指定されたデータセットの集計値を取得する
+
+        Args:
+            dataset_id (str): 対象のデータセットID
+
+        Returns:
+            DatasetStats: 集計値のエンティティ
+
+        Raises:
+            ValueError: データセット（の集計値）が存在しない場合
+        """
+        stats = self.stats_repository.get_dataset_stats(dataset_id)
+        if stats is None:
+            raise ValueError("Dataset not found")
+        return stats
@@ -1,4 +1,5 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from app.domain.entities.dataset import Dataset
 from app.domain.repositories.dataset_repository import DatasetRepository
@@ -14,15 +15,23 @@ class ListDatasetsUseCase:
     def __init__(self, dataset_repository: DatasetRepository):
         self.dataset_repository = dataset_repository
 
-    def execute(self, skip: int = 0, limit: int = 100) -> List[Dataset]:
+    def execute(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> List[Dataset]:
         """
         データセット一覧を取得する
 
         Args:
             skip (int, optional): スキップするレコード数。デフォルトは0。
             limit (int, optional): 取得するレコード数の上限。デフォルトは100。
+            after (Optional[Tuple[datetime, str]], optional): 直前ページ最終行の (created_at, id)。
+            meta (Optional[Dict[str, str]], optional): meta_data のキー → 値（すべて一致するものに絞り込む）。
 
         Returns:
             List[Dataset]: 取得されたデータセットエンティティのリスト
         """
-        return self.dataset_repository.list_datasets(skip=skip, limit=limit)
+        return self.dataset_repository.list_datasets(skip=skip, limit=limit, after=after, meta=meta)
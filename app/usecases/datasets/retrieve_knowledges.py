@@ -0,0 +1,291 @@
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.domain.entities.knowledge_search import KnowledgeSearchHit
+from app.domain.entities.retrieval import RetrievalResult, RetrievedKnowledge
+from app.domain.repositories.dataset_repository import DatasetRepository
+from app.domain.repositories.document_repository import DocumentRepository
+from app.domain.repositories.knowledge_repository import KnowledgeRepository
+from app.domain.repositories.knowledge_search_repository import KnowledgeSearchRepository
+from app.domain.repositories.knowledge_vector_search_repository import KnowledgeVectorSearchRepository
+
+T = TypeVar("T")
+
+# 融合前に各検索から取る候補数（top_k の倍数と上限）
+CANDIDATE_FACTOR = 4
+MAX_CANDIDATES = 200
+# Reciprocal Rank Fusion の定数 k（順位 r の寄与は 1 / (k + r)）
+RRF_K = 60
+# 全文検索・ベクトル検索を使う mode
+LEXICAL_MODES = ("hybrid", "lexical")
+VECTOR_MODES = ("hybrid", "vector")
+
+# ベクトル検索を全文検索と並行に実行するスレッド（どちらも索引はプロセス内にある）
+_executor = ThreadPoolExecutor(thread_name_prefix="retrieval")
+
+
+class RetrieveKnowledgesUseCase:
+    """
+    データセット内のKnowledgeのハイブリッド検索ユースケース
+
+    全文検索（BM25）とベクトル検索を並行に実行して候補を取り、順位（RRF）またはスコア（重み付き和）で
+    融合してから、上位のKnowledge本体と所属ドキュメントのタイトルをまとめて取得して返します。
+    非同期ルートは各段階（check_dataset / search_lexical / search_vector / combine）を個別に呼び出し、
+    DB を読む段階だけをイベントループ上で実行します。
+    """
+
+    def __init__(
+        self,
+        dataset_repository: DatasetRepository,
+        search_repository: KnowledgeSearchRepository,
+        vector_search_repository: KnowledgeVectorSearchRepository,
+        knowledge_repository: KnowledgeRepository,
+        document_repository: DocumentRepository,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            dataset_repository (DatasetRepository): データセットリポジトリ（存在確認に使う）
+            search_repository (KnowledgeSearchRepository): 全文検索リポジトリ
+            vector_search_repository (KnowledgeVectorSearchRepository): ベクトル検索リポジトリ
+            knowledge_repository (KnowledgeRepository): Knowledgeリポジトリ
+            document_repository (DocumentRepository): ドキュメントリポジトリ（タイトルの取得に使う）
+            executor (Optional[Executor]): ベクトル検索を実行するスレッドプール（既定はプロセス共有のもの）
+        """
+        self.dataset_repository = dataset_repository
+        self.search_repository = search_repository
+        self.vector_search_repository = vector_search_repository
+        self.knowledge_repository = knowledge_repository
+        self.document_repository = document_repository
+        self.executor = executor or _executor
+
+    def execute(
+        self,
+        dataset_id: str,
+        query: str,
+        top_k: int = 10,
+        score_threshold: Optional[float] = None,
+        mode: str = "hybrid",
+        fusion: str = "rrf",
+        vector_weight: float = 0.5,
+    ) -> RetrievalResult:
+        """
+        データセット内のKnowledgeを検索する
+
+        スコアは mode・fusion によって次の値になる:
+
+        - lexical: BM25 のスコア / vector: コサイン類似度
+        - hybrid + rrf: 各検索の順位 r から求めた (1 + k) / (k + r) の重み付き和（両方で1位なら 1）
+        - hybrid + weighted: 各検索のスコアを候補内で 0〜1 に正規化した値の重み付き和
+
+        Args:
+            dataset_id (str): 検索対象のデータセットID
+            query (str): 検索語
+            top_k (int): 返す件数の上限
+            score_threshold (Optional[float]): 指定した場合はスコアがこれ未満の結果を除く
+            mode (str): hybrid（両方）/ lexical（全文検索のみ）/ vector（ベクトル検索のみ）
+            fusion (str): hybrid の融合方法（rrf / weighted）
+            vector_weight (float): hybrid でのベクトル検索の重み（全文検索は 1 - vector_weight）
+
+        Returns:
+            RetrievalResult: スコアの降順の結果と段階ごとの所要時間
+
+        Raises:
+            ValueError: データセットが存在しない場合
+            SearchUnavailableError: 使う索引のいずれかが使えない場合
+        """
+        started = time.perf_counter()
+        self.check_dataset(dataset_id)
+        timings: Dict[str, float] = {}
+        candidates = candidate_count(top_k)
+
+        vector_future: Optional[Future] = None
+        if mode in VECTOR_MODES:
+            vector_future = self.executor.submit(self.search_vector, query, dataset_id, candidates)
+        lexical: List[KnowledgeSearchHit] = []
+        vector: List[KnowledgeSearchHit] = []
+        try:
+            if mode in LEXICAL_MODES:
+                lexical, timings["lexical"] = self.search_lexical(query, dataset_id, candidates)
+        finally:
+            # 全文検索が失敗しても、ベクトル検索の完了（または失敗）を待ってから返す
+            if vector_future is not None:
+                vector, timings["vector"] = vector_future.result()
+
+        return self.combine(
+            lexical,
+            vector,
+            timings,
+            started,
+            top_k=top_k,
+            score_threshold=score_threshold,
+            mode=mode,
+            fusion=fusion,
+            vector_weight=vector_weight,
+        )
+
+    def check_dataset(self, dataset_id: str) -> None:
+        """
+        検索対象のデータセットの存在を確認する
+
+        Args:
+            dataset_id (str): データセットID
+
+        Raises:
+            ValueError: データセットが存在しない場合
+        """
+        if self.dataset_repository.get_by_id(dataset_id) is None:
+            raise ValueError("Dataset not found")
+
+    def search_lexical(self, query: str, dataset_id: str, candidates: int) -> Tuple[List[KnowledgeSearchHit], float]:
+        """
+        全文検索で候補を取る
+
+        Args:
+            query (str): 検索語
+            dataset_id (str): 検索対象のデータセットID
+            candidates (int): 取る候補数
+
+        Returns:
+            Tuple[List[KnowledgeSearchHit], float]: (スコアの降順の候補, 所要時間（ミリ秒）)
+        """
+        (hits, _), elapsed = _timed(
+            lambda: self.search_repository.search(query, dataset_id=dataset_id, limit=candidates)
+        )
+        return hits, elapsed
+
+    def search_vector(self, query: str, dataset_id: str, candidates: int) -> Tuple[List[KnowledgeSearchHit], float]:
+        """
+        ベクトル検索で候補を取る
+
+        Args:
+            query (str): 検索語
+            dataset_id (str): 検索対象のデータセットID
+            candidates (int): 取る候補数
+
+        Returns:
+            Tuple[List[KnowledgeSearchHit], float]: (類似度の降順の候補, 所要時間（ミリ秒）)
+        """
+        return _timed(lambda: self.vector_search_repository.search(query, dataset_id, limit=candidates))
+
+    def combine(
+        self,
+        lexical: List[KnowledgeSearchHit],
+        vector: List[KnowledgeSearchHit],
+        timings: Dict[str, float],
+        started: float,
+        top_k: int = 10,
+        score_threshold: Optional[float] = None,
+        mode: str = "hybrid",
+        fusion: str = "rrf",
+        vector_weight: float = 0.5,
+    ) -> RetrievalResult:
+        """
+        各検索の候補を融合し、上位のKnowledge本体と所属ドキュメントのタイトルを取得する
+
+        Args:
+            lexical (List[KnowledgeSearchHit]): 全文検索の候補
+            vector (List[KnowledgeSearchHit]): ベクトル検索の候補
+            timings (Dict[str, float]): 検索の所要時間（fusion / hydrate / total を追加する）
+            started (float): 検索の開始時刻（time.perf_counter() の値）
+            top_k (int): 返す件数の上限
+            score_threshold (Optional[float]): 指定した場合はスコアがこれ未満の結果を除く
+            mode (str): hybrid / lexical / vector
+            fusion (str): hybrid の融合方法（rrf / weighted）
+            vector_weight (float): hybrid でのベクトル検索の重み
+
+        Returns:
+            RetrievalResult: スコアの降順の結果と段階ごとの所要時間
+        """
+        (fused, lexical_scores, vector_scores), timings["fusion"] = _timed(
+            lambda: _fuse(lexical, vector, mode, fusion, vector_weight)
+        )
+        if score_threshold is not None:
+            fused = [(knowledge_id, score) for knowledge_id, score in fused if score >= score_threshold]
+        fused = fused[:top_k]
+
+        hydrate_started = time.perf_counter()
+        knowledges = {
+            knowledge.id: knowledge
+            for knowledge in self.knowledge_repository.get_many([knowledge_id for knowledge_id, _ in fused])
+        }
+        document_ids = list(dict.fromkeys(knowledge.document_id for knowledge in knowledges.values()))
+        titles = {document.id: document.title for document in self.document_repository.get_many(document_ids)}
+        # 索引への反映より先に削除された Knowledge は結果から除く
+        items = [
+            RetrievedKnowledge(
+                knowledge=knowledges[knowledge_id],
+                document_title=titles.get(knowledges[knowledge_id].document_id),
+                score=score,
+                lexical_score=lexical_scores.get(knowledge_id),
+                vector_score=vector_scores.get(knowledge_id),
+            )
+            for knowledge_id, score in fused
+            if knowledge_id in knowledges
+        ]
+        timings["hydrate"] = _elapsed(hydrate_started)
+        timings["total"] = _elapsed(started)
+        return RetrievalResult(items=items, timings=timings)
+
+
+def candidate_count(top_k: int) -> int:
+    """
+    融合前に各検索から取る候補数を返す
+
+    Args:
+        top_k (int): 返す件数の上限
+
+    Returns:
+        int: 候補数
+    """
+    return min(top_k * CANDIDATE_FACTOR, max(MAX_CANDIDATES, top_k))
+
+
+def _fuse(
+    lexical: List[KnowledgeSearchHit],
+    vector: List[KnowledgeSearchHit],
+    mode: str,
+    fusion: str,
+    vector_weight: float,
+) -> Tuple[List[Tuple[str, float]], Dict[str, float], Dict[str, float]]:
+    # 融合後の [(Knowledge ID, スコア)]（スコアの降順。同点は先に現れた順）と、各検索のスコアを返す
+    lexical_scores = {hit.knowledge_id: hit.score for hit in lexical}
+    vector_scores = {hit.knowledge_id: hit.score for hit in vector}
+    if mode == "lexical":
+        return [(hit.knowledge_id, hit.score) for hit in lexical], lexical_scores, vector_scores
+    if mode == "vector":
+        return [(hit.knowledge_id, hit.score) for hit in vector], lexical_scores, vector_scores
+    scores: Dict[str, float] = {}
+    for hits, weight in ((lexical, 1.0 - vector_weight), (vector, vector_weight)):
+        if fusion == "weighted":
+            contributions = _normalized(hits)
+        else:
+            contributions = [(1 + RRF_K) / (RRF_K + rank) for rank in range(1, len(hits) + 1)]
+        for hit, contribution in zip(hits, contributions):
+            scores[hit.knowledge_id] = scores.get(hit.knowledge_id, 0.0) + weight * contribution
+    order = {knowledge_id: position for position, knowledge_id in enumerate(scores)}
+    fused = sorted(scores.items(), key=lambda item: (-item[1], order[item[0]]))
+    return fused, lexical_scores, vector_scores
+
+
+def _normalized(hits: List[KnowledgeSearchHit]) -> List[float]:
+    # 候補内の最小・最大で 0〜1 に正規化する（全て同じスコアなら 1）
+    if not hits:
+        return []
+    high = max(hit.score for hit in hits)
+    low = min(hit.score for hit in hits)
+    if high == low:
+        return [1.0] * len(hits)
+    return [(hit.score - low) / (high - low) for hit in hits]
+
+
+def _timed(func: Callable[[], T]) -> Tuple[T, float]:
+    started = time.perf_counter()
+    return func(), _elapsed(started)
+
+
+def _elapsed(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
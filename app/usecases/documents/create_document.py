@@ -1,21 +1,23 @@
-from app.domain.entities.dataset import Dataset  # 既存の Dataset エンティティ
+from app.domain.entities.dataset import Dataset
 from app.domain.entities.document import Document
-from app.domain.repositories.dataset_repository import DatasetRepository
-from app.domain.repositories.document_repository import DocumentRepository
+from app.domain.repositories.unit_of_work import UnitOfWork
 
 
 class CreateDocumentUseCase:
     """
     ドキュメント作成ユースケース
+
+    データセットの確認・自動生成とドキュメントの作成を1トランザクション（UnitOfWork）で行う。
     """
 
-    def __init__(
-        self,
-        document_repository: DocumentRepository,
-        dataset_repository: DatasetRepository,  # dataset repository も受け取る
-    ):
-        self.document_repository = document_repository
-        self.dataset_repository = dataset_repository
+    def __init__(self, unit_of_work: UnitOfWork):
+        """
+        コンストラクタ
+
+        Args:
+            unit_of_work (UnitOfWork): データセット・ドキュメントのリポジトリを束ねる UnitOfWork
+        """
+        self.unit_of_work = unit_of_work
 
     def execute(
         self, dataset_id: str, title: str, content: str, meta_data: dict = None, is_active: bool = True
@@ -23,6 +25,8 @@ class CreateDocumentUseCase:
         """
         新規ドキュメントを作成する。
         dataset_id が存在しない場合は、document の title と同じ Dataset を自動生成します。
+        自動生成する Dataset の ID は title から決定的に決まるため、同じ title で並行に
+        作成されても Dataset は1件のみとなります。
 
         Args:
             dataset_id (str): Document 作成時に指定された Dataset ID（オプショナル）
@@ -34,33 +38,24 @@ class CreateDocumentUseCase:
         Returns:
             Document: 作成されたドキュメントエンティティ
         """
-        # dataset_id が指定されているか、または存在しているか確認
-        dataset = None
-        if dataset_id:
-            dataset = self.dataset_repository.get_by_id(dataset_id)
-
-        # 存在しない場合は document の title を利用して Dataset を自動生成
-        if not dataset:
-            from app.usecases.datasets.create_dataset import (
-                CreateDatasetUseCase as CreateDatasetUC,
-            )
-
-            # Dataset 作成用ユースケース（既存の実装）を利用し、新たな Dataset を作成する
-            create_dataset_uc = CreateDatasetUC(self.dataset_repository)
-            dataset = create_dataset_uc.execute(
-                name=title,  # document title と同じ名前
-                description="Auto-created from document creation",
-                meta_data={},
-                is_active=True,
+        with self.unit_of_work as uow:
+            # dataset_id が指定されているか、または存在しているか確認
+            dataset = None
+            if dataset_id:
+                dataset = uow.datasets.get_by_id(dataset_id)
+
+            # 存在しない場合は document の title を利用して Dataset を自動生成（既にあれば再利用）
+            if not dataset:
+                dataset = uow.datasets.get_or_create(Dataset.create_auto(name=title))
+
+            document = uow.documents.create(
+                Document.create(
+                    dataset_id=dataset.id,
+                    title=title,
+                    content=content,
+                    meta_data=meta_data,
+                    is_active=is_active,
+                )
             )
-            dataset_id = dataset.id
-
-        # Document を作成する
-        document = Document.create(
-            dataset_id=dataset_id,
-            title=title,
-            content=content,
-            meta_data=meta_data,
-            is_active=is_active,
-        )
-        return self.document_repository.create(document)
+            uow.commit()
+        return document
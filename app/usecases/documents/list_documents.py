@@ -1,4 +1,5 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from app.domain.entities.document import Document
 from app.domain.repositories.document_repository import DocumentRepository
@@ -15,7 +16,12 @@ class ListDocumentsUseCase:
         self.document_repository = document_repository
 
     def execute(
-        self, dataset_id: str, skip: int = 0, limit: int = 100
+        self,
+        dataset_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
     ) -> List[Document]:
         """
         ドキュメント一覧を取得する
@@ -24,10 +30,12 @@ class ListDocumentsUseCase:
             dataset_id (str): データセットのID
             skip (int, optional): スキップする件数。デフォルトは 0
             limit (int, optional): 取得件数の上限。デフォルトは 100
+            after (Optional[Tuple[datetime, str]], optional): 直前ページ最終行の (created_at, id)
+            meta (Optional[Dict[str, str]], optional): meta_data のキー → 値（すべて一致するものに絞り込む）
 
         Returns:
             List[Document]: 取得したドキュメントエンティティのリスト
         """
         return self.document_repository.list_documents(
-            dataset_id, skip=skip, limit=limit
+            dataset_id, skip=skip, limit=limit, after=after, meta=meta
         )
@@ -0,0 +1,42 @@
+from typing import Any, Dict, List
+
+from app.domain.entities.knowledge import Knowledge
+from app.domain.repositories.knowledge_repository import KnowledgeRepository
+
+
+class BulkCreateKnowledgesUseCase:
+    """
+    Knowledge（ページ情報）一括作成ユースケース
+    """
+
+    def __init__(self, knowledge_repository: KnowledgeRepository):
+        """
+        コンストラクタ
+
+        Args:
+            knowledge_repository (KnowledgeRepository): Knowledgeリポジトリ
+        """
+        self.knowledge_repository = knowledge_repository
+
+    def execute(self, items: List[Dict[str, Any]]) -> List[str]:
+        """
+        複数のKnowledgeを1トランザクションで作成する
+
+        Args:
+            items (List[Dict[str, Any]]): document_id, sequence, knowledge_text,
+                meta_data, is_active を持つ辞書のリスト
+
+        Returns:
+            List[str]: 作成されたKnowledge IDのリスト（入力と同じ順序）
+        """
+        knowledges = [
+            Knowledge.create(
+                document_id=item["document_id"],
+                sequence=item["sequence"],
+                knowledge_text=item["knowledge_text"],
+                meta_data=item.get("meta_data"),
+                is_active=item.get("is_active", True),
+            )
+            for item in items
+        ]
+        return self.knowledge_repository.create_many(knowledges)
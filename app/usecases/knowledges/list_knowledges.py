@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from app.domain.entities.knowledge import Knowledge
 from app.domain.repositories.knowledge_repository import KnowledgeRepository
 
@@ -17,7 +17,14 @@ class ListKnowledgesUseCase:
         """
         self.knowledge_repository = knowledge_repository
 
-    def execute(self, document_id: str, skip: int = 0, limit: int = 100) -> List[Knowledge]:
+    def execute(
+        self,
+        document_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[int, str]] = None,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> List[Knowledge]:
         """
         指定ドキュメントに紐付くKnowledge（ページ情報）一覧を取得する
 
@@ -25,8 +32,10 @@ class ListKnowledgesUseCase:
             document_id (str): 紐付くドキュメントID
             skip (int, optional): スキップするレコード数
             limit (int, optional): 取得するレコード数の上限
+            after (Optional[Tuple[int, str]], optional): 直前ページ最終行の (sequence, id)
+            meta (Optional[Dict[str, str]], optional): meta_data のキー → 値（すべて一致するものに絞り込む）
 
         Returns:
             List[Knowledge]: Knowledgeエンティティのリスト
         """
-        return self.knowledge_repository.list_knowledges(document_id, skip, limit)
+        return self.knowledge_repository.list_knowledges(document_id, skip, limit, after=after, meta=meta)
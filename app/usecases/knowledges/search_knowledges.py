@@ -0,0 +1,64 @@
+from typing import Dict, List, Optional, Tuple
+
+from app.domain.entities.knowledge_search import KnowledgeSearchResult
+from app.domain.repositories.knowledge_repository import KnowledgeRepository
+from app.domain.repositories.knowledge_search_repository import KnowledgeSearchRepository
+
+
+class SearchKnowledgesUseCase:
+    """
+    Knowledge（ページ情報）全文検索ユースケース
+
+    索引で一致したKnowledge IDをスコア順に受け取り、Knowledge本体をまとめて取得して返します。
+    meta を指定した場合の絞り込みは検索リポジトリが行います（総件数も絞り込んだ後の件数）。
+    """
+
+    def __init__(
+        self,
+        search_repository: KnowledgeSearchRepository,
+        knowledge_repository: KnowledgeRepository,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            search_repository (KnowledgeSearchRepository): 全文検索リポジトリ
+            knowledge_repository (KnowledgeRepository): Knowledgeリポジトリ
+        """
+        self.search_repository = search_repository
+        self.knowledge_repository = knowledge_repository
+
+    def execute(
+        self,
+        query: str,
+        dataset_id: Optional[str] = None,
+        limit: int = 10,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> Tuple[List[KnowledgeSearchResult], int]:
+        """
+        Knowledge本文を検索する
+
+        Args:
+            query (str): 検索語
+            dataset_id (Optional[str]): 指定した場合はそのデータセットのKnowledgeに絞り込む
+            limit (int): 返す件数の上限
+            meta (Optional[Dict[str, str]]): meta_data のキー → 値（文字列の値がすべて一致するものに絞り込む）
+
+        Returns:
+            Tuple[List[KnowledgeSearchResult], int]: (スコアの降順の検索結果, 一致した総件数)
+
+        Raises:
+            SearchUnavailableError: 索引が使えない場合
+        """
+        hits, total = self.search_repository.search(query, dataset_id=dataset_id, limit=limit, meta=meta)
+        knowledges = {
+            knowledge.id: knowledge
+            for knowledge in self.knowledge_repository.get_many([hit.knowledge_id for hit in hits])
+        }
+        # 索引への反映より先に削除された Knowledge は結果から除く
+        results = [
+            KnowledgeSearchResult(knowledge=knowledges[hit.knowledge_id], score=hit.score)
+            for hit in hits
+            if hit.knowledge_id in knowledges
+        ]
+        return results, total
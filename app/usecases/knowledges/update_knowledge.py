@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from app.domain.entities.knowledge import Knowledge
 from app.domain.repositories.knowledge_repository import KnowledgeRepository
 
@@ -18,7 +20,7 @@ class UpdateKnowledgeUseCase:
 
     def execute(self, knowledge: Knowledge) -> Knowledge:
         """
-        Knowledge（ナレッジ情報）を更新する
+        Knowledge（ナレッジ情報）を更新する（updated_at は現在時刻にする）
 
         Args:
             knowledge (Knowledge): 更新対象のKnowledgeエンティティ（ID必須）
@@ -29,4 +31,6 @@ class UpdateKnowledgeUseCase:
         Raises:
             ValueError: 指定されたKnowledgeが存在しない場合
         """
+        # 取得済みエンティティの updated_at のままだと更新が検知できない（ETag が変わらない）ため更新する
+        knowledge.updated_at = datetime.now()
         return self.knowledge_repository.update(knowledge)
@@ -0,0 +1,55 @@
+from typing import List
+
+from app.domain.entities.knowledge_search import KnowledgeSearchResult
+from app.domain.repositories.knowledge_repository import KnowledgeRepository
+from app.domain.repositories.knowledge_vector_search_repository import KnowledgeVectorSearchRepository
+
+
+class VectorSearchKnowledgesUseCase:
+    """
+    Knowledge（ページ情報）ベクトル検索ユースケース
+
+    埋め込みの索引で類似したKnowledge IDを類似度順に受け取り、Knowledge本体をまとめて取得して返します。
+    """
+
+    def __init__(
+        self,
+        vector_search_repository: KnowledgeVectorSearchRepository,
+        knowledge_repository: KnowledgeRepository,
+    ):
+        """
+        コンストラクタ
+
+        Args:
+            vector_search_repository (KnowledgeVectorSearchRepository): ベクトル検索リポジトリ
+            knowledge_repository (KnowledgeRepository): Knowledgeリポジトリ
+        """
+        self.vector_search_repository = vector_search_repository
+        self.knowledge_repository = knowledge_repository
+
+    def execute(self, query: str, dataset_id: str, limit: int = 10) -> List[KnowledgeSearchResult]:
+        """
+        検索語に意味の近いKnowledgeを探す
+
+        Args:
+            query (str): 検索語
+            dataset_id (str): 検索対象のデータセットID
+            limit (int): 返す件数の上限
+
+        Returns:
+            List[KnowledgeSearchResult]: 類似度の降順の検索結果
+
+        Raises:
+            SearchUnavailableError: 索引が使えない場合
+        """
+        hits = self.vector_search_repository.search(query, dataset_id, limit=limit)
+        knowledges = {
+            knowledge.id: knowledge
+            for knowledge in self.knowledge_repository.get_many([hit.knowledge_id for hit in hits])
+        }
+        # 索引への反映より先に削除された Knowledge は結果から除く
+        return [
+            KnowledgeSearchResult(knowledge=knowledges[hit.knowledge_id], score=hit.score)
+            for hit in hits
+            if hit.knowledge_id in knowledges
+        ]
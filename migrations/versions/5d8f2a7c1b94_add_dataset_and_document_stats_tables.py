@@ -0,0 +1,111 @@
+"""Add dataset and document stats tables
+
+Revision ID: 5d8f2a7c1b94
+Revises: 7b1e4c2a9d30
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8f2a7c1b94'
+down_revision: Union[str, None] = '7b1e4c2a9d30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 集計値の初期投入に使う既存テーブルの列
+datasets = sa.table("datasets", sa.column("id", sa.String))
+documents = sa.table(
+    "documents", sa.column("id", sa.String), sa.column("dataset_id", sa.String), sa.column("content", sa.UnicodeText)
+)
+knowledges = sa.table(
+    "knowledges", sa.column("id", sa.String), sa.column("document_id", sa.String), sa.column("knowledge_text", sa.UnicodeText)
+)
+
+
+def upgrade() -> None:
+    """
+    データセット・ドキュメント単位の集計値テーブルを追加し、既存の行から初期値を集計するマイグレーション
+    以降はリポジトリ実装が作成・更新・削除のたびに差分更新する
+    """
+    dataset_stats = op.create_table(
+        "dataset_stats",
+        sa.Column("dataset_id", sa.String(36), sa.ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("document_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("knowledge_count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("document_characters", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("knowledge_characters", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    document_stats = op.create_table(
+        "document_stats",
+        sa.Column("document_id", sa.String(36), sa.ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("dataset_id", sa.String(36), nullable=False),
+        sa.Column("knowledge_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("knowledge_characters", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_document_stats_dataset_id", "document_stats", ["dataset_id"])
+
+    op.execute(
+        document_stats.insert().from_select(
+            ["document_id", "dataset_id", "knowledge_count", "knowledge_characters", "updated_at"],
+            sa.select(
+                documents.c.id,
+                documents.c.dataset_id,
+                sa.func.count(knowledges.c.id),
+                sa.func.coalesce(sa.func.sum(sa.func.length(knowledges.c.knowledge_text)), 0),
+                sa.func.current_timestamp(),
+            )
+            .select_from(documents.outerjoin(knowledges, knowledges.c.document_id == documents.c.id))
+            .group_by(documents.c.id, documents.c.dataset_id),
+        )
+    )
+    document_totals = (
+        sa.select(
+            documents.c.dataset_id,
+            sa.func.count().label("document_count"),
+            sa.func.coalesce(sa.func.sum(sa.func.length(documents.c.content)), 0).label("document_characters"),
+        )
+        .group_by(documents.c.dataset_id)
+        .subquery()
+    )
+    knowledge_totals = (
+        sa.select(
+            document_stats.c.dataset_id,
+            sa.func.sum(document_stats.c.knowledge_count).label("knowledge_count"),
+            sa.func.sum(document_stats.c.knowledge_characters).label("knowledge_characters"),
+        )
+        .group_by(document_stats.c.dataset_id)
+        .subquery()
+    )
+    op.execute(
+        dataset_stats.insert().from_select(
+            ["dataset_id", "document_count", "knowledge_count", "document_characters", "knowledge_characters", "updated_at"],
+            sa.select(
+                datasets.c.id,
+                sa.func.coalesce(document_totals.c.document_count, 0),
+                sa.func.coalesce(knowledge_totals.c.knowledge_count, 0),
+                sa.func.coalesce(document_totals.c.document_characters, 0),
+                sa.func.coalesce(knowledge_totals.c.knowledge_characters, 0),
+                sa.func.current_timestamp(),
+            )
+            .select_from(
+                datasets.outerjoin(document_totals, document_totals.c.dataset_id == datasets.c.id).outerjoin(
+                    knowledge_totals, knowledge_totals.c.dataset_id == datasets.c.id
+                )
+            ),
+        )
+    )
+
+
+def downgrade() -> None:
+    """
+    集計値テーブルを削除します
+    """
+    op.drop_index("ix_document_stats_dataset_id", table_name="document_stats")
+    op.drop_table("document_stats")
+    op.drop_table("dataset_stats")
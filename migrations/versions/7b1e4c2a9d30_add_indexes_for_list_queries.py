@@ -0,0 +1,43 @@
+"""Add indexes for list queries
+
+Revision ID: 7b1e4c2a9d30
+Revises: dab2d82c919c
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1e4c2a9d30'
+down_revision: Union[str, None] = 'dab2d82c919c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    一覧取得のキーセットページネーション（ORDER BY 列, id）に合わせた複合インデックスを追加するマイグレーション
+    SQL Server は外部キー列に自動でインデックスを作らないため、dataset_id / document_id を先頭列にする
+    """
+    op.create_index("ix_datasets_created_at_id", "datasets", ["created_at", "id"])
+    op.create_index(
+        "ix_documents_dataset_id_created_at_id",
+        "documents",
+        ["dataset_id", "created_at", "id"],
+    )
+    op.create_index(
+        "ix_knowledges_document_id_sequence_id",
+        "knowledges",
+        ["document_id", "sequence", "id"],
+    )
+
+
+def downgrade() -> None:
+    """
+    追加したインデックスを削除します
+    """
+    op.drop_index("ix_knowledges_document_id_sequence_id", table_name="knowledges")
+    op.drop_index("ix_documents_dataset_id_created_at_id", table_name="documents")
+    op.drop_index("ix_datasets_created_at_id", table_name="datasets")
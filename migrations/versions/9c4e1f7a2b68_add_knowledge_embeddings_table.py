@@ -0,0 +1,45 @@
+"""Add knowledge embeddings table
+
+Revision ID: 9c4e1f7a2b68
+Revises: 5d8f2a7c1b94
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e1f7a2b68'
+down_revision: Union[str, None] = '5d8f2a7c1b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Knowledge 本文の埋め込みテーブルを追加するマイグレーション
+    既存の Knowledge の埋め込みは scripts/backfill_embeddings.py で計算する
+    """
+    op.create_table(
+        "knowledge_embeddings",
+        sa.Column("knowledge_id", sa.String(36), sa.ForeignKey("knowledges.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("document_id", sa.String(36), nullable=False),
+        sa.Column("dataset_id", sa.String(36), nullable=False),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("dimension", sa.Integer(), nullable=False),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_knowledge_embeddings_dataset_id", "knowledge_embeddings", ["dataset_id"])
+    op.create_index("ix_knowledge_embeddings_document_id", "knowledge_embeddings", ["document_id"])
+
+
+def downgrade() -> None:
+    """
+    埋め込みテーブルを削除します
+    """
+    op.drop_index("ix_knowledge_embeddings_document_id", table_name="knowledge_embeddings")
+    op.drop_index("ix_knowledge_embeddings_dataset_id", table_name="knowledge_embeddings")
+    op.drop_table("knowledge_embeddings")
@@ -0,0 +1,48 @@
+"""Add knowledge full-text index
+
+Revision ID: b7d3e5f1a2c4
+Revises: 9c4e1f7a2b68
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+from app.infrastructure.search.full_text import CREATE_STATEMENTS, DROP_STATEMENTS, EXISTS_STATEMENTS
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e5f1a2c4'
+down_revision: Union[str, None] = '9c4e1f7a2b68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Knowledge 本文の全文検索（SEARCH_BACKEND=database）の索引を追加するマイグレーション
+
+    方言ごとに SQLite は FTS5 の仮想テーブルとトリガー、PostgreSQL は GIN インデックス、
+    SQL Server は全文カタログと全文インデックスを作る（全文インデックスはトランザクション外で作る）。
+    SEARCH_BACKEND の値によらず作る（DDL は full_text.CREATE_STATEMENTS。起動時の init_db と共通）。
+    全文検索に対応しない方言、または init_db で作成済みの場合は何もしない。
+    """
+    dialect = op.get_bind().dialect.name
+    if dialect not in CREATE_STATEMENTS:
+        return
+    if op.get_bind().execute(text(EXISTS_STATEMENTS[dialect])).first() is not None:
+        return
+    with op.get_context().autocommit_block():
+        for statement in CREATE_STATEMENTS[dialect]:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """
+    全文検索の索引を削除します（作っていない場合は何もしない）
+    """
+    statements = DROP_STATEMENTS.get(op.get_bind().dialect.name, [])
+    with op.get_context().autocommit_block():
+        for statement in statements:
+            op.execute(statement)
@@ -0,0 +1,44 @@
+"""Add changes table
+
+Revision ID: c1f8a3d5e7b9
+Revises: b7d3e5f1a2c4
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f8a3d5e7b9'
+down_revision: Union[str, None] = 'b7d3e5f1a2c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    データセット・ドキュメント・Knowledge の変更履歴（changes）テーブルを追加するマイグレーション
+    既存の行の履歴は作らない（各ノードの索引は起動時に DB から構築・読み直す）
+    """
+    op.create_table(
+        "changes",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("entity", sa.String(20), nullable=False),
+        sa.Column("entity_id", sa.String(36), nullable=False),
+        sa.Column("operation", sa.String(10), nullable=False),
+        sa.Column("document_id", sa.String(36), nullable=True),
+        sa.Column("dataset_id", sa.String(36), nullable=True),
+        sa.Column("origin", sa.String(32), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_changes_created_at", "changes", ["created_at"])
+
+
+def downgrade() -> None:
+    """
+    変更履歴テーブルを削除します
+    """
+    op.drop_index("ix_changes_created_at", table_name="changes")
+    op.drop_table("changes")
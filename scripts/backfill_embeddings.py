@@ -0,0 +1,44 @@
+"""
+Knowledge の埋め込み（knowledge_embeddings）のバックフィルバッチ
+
+埋め込みは Knowledge の作成・更新時に計算されるが、埋め込みの導入前に作成された Knowledge や、
+埋め込みの実装（EMBEDDER・EMBEDDING_DIMENSION）を変えた後の Knowledge の分をまとめて計算する。
+1000 件ごとにコミットするため、途中で止めても再実行すれば続きから計算する。
+
+使い方:
+    python scripts/backfill_embeddings.py                   # 全データセット
+    python scripts/backfill_embeddings.py --dataset-id <ID>  # 指定したデータセットのみ
+
+注意:
+    計算した埋め込みは他ノードにも通知されるが、実装を変えた場合は読み込み済みの行列と次元・種類が
+    合わなくなるため、バックフィル後にアプリケーションを再起動すること。
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath("."))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset-id", default=None, help="対象のデータセットID（省略時は全データセット）")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from app.infrastructure.database.connection import SessionLocal
+    from app.infrastructure.repositories.embedding_repository_impl import backfill_embeddings
+
+    with SessionLocal() as session:
+        count = backfill_embeddings(session, args.dataset_id)
+    print(f"Backfilled embeddings for {count} knowledges")
+
+
+if __name__ == "__main__":
+    main()
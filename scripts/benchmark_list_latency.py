@@ -0,0 +1,184 @@
+"""
+一覧APIのレイテンシ計測スクリプト（インデックス追加前後の比較）
+
+指定DBに datasets / documents / knowledges を生成し、リポジトリ経由の一覧取得
+（先頭ページ・OFFSET による深いページ・カーソルによる深いページ・COUNT）の
+レイテンシを、一覧用インデックスなし → あり の順に計測して表示する。
+
+使い方:
+    python scripts/benchmark_list_latency.py --knowledges 2000000
+    python scripts/benchmark_list_latency.py --url postgresql+psycopg2://... --knowledges 3000000
+
+注意:
+    対象DBのテーブルは作り直される（drop_all → create_all）。本番DBには実行しないこと。
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath("."))
+
+DEFAULT_URL = "sqlite:///./benchmark_list_latency.db"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL, help="SQLAlchemy 接続文字列")
+    parser.add_argument("--datasets", type=int, default=20, help="データセット数")
+    parser.add_argument("--documents", type=int, default=2000, help="ドキュメント数")
+    parser.add_argument("--knowledges", type=int, default=2_000_000, help="Knowledge 数")
+    parser.add_argument("--limit", type=int, default=100, help="1ページの件数")
+    parser.add_argument("--repeat", type=int, default=20, help="各クエリの計測回数")
+    parser.add_argument("--batch-size", type=int, default=10000, help="投入時の executemany 行数")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ.setdefault("DATABASE_URL", args.url)
+logging.basicConfig(level=logging.WARNING)
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.infrastructure.database.connection import Base  # noqa: E402
+from app.infrastructure.database.models import (  # noqa: E402
+    DatasetModel,
+    DocumentModel,
+    KnowledgeModel,
+)
+from app.infrastructure.repositories.document_repository_impl import (  # noqa: E402
+    DocumentRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.knowledge_repository_impl import (  # noqa: E402
+    KnowledgeRepositorySQLAlchemy,
+)
+
+# 比較対象の一覧用インデックス（主キー以外）
+LIST_INDEXES = [
+    index
+    for model in (DatasetModel, DocumentModel, KnowledgeModel)
+    for index in model.__table__.indexes
+]
+
+
+def load_data(engine) -> tuple:
+    """テーブルを作り直してデータを投入し、計測対象の (dataset_id, document_id) を返す"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    for index in LIST_INDEXES:
+        index.drop(engine)
+
+    base_time = datetime(2024, 1, 1)
+    dataset_ids = [str(uuid.uuid4()) for _ in range(args.datasets)]
+    document_ids = [str(uuid.uuid4()) for _ in range(args.documents)]
+    per_document = max(args.knowledges // args.documents, 1)
+
+    with engine.begin() as conn:
+        conn.execute(
+            insert(DatasetModel),
+            [
+                {"id": dataset_id, "name": f"dataset {i}", "meta_data": {}, "is_active": True,
+                 "created_at": base_time, "updated_at": base_time}
+                for i, dataset_id in enumerate(dataset_ids)
+            ],
+        )
+        conn.execute(
+            insert(DocumentModel),
+            [
+                {"id": document_id, "dataset_id": dataset_ids[i % len(dataset_ids)],
+                 "title": f"document {i}", "content": "content", "meta_data": {},
+                 "is_active": i % 10 != 0,
+                 "created_at": base_time + timedelta(seconds=i), "updated_at": base_time}
+                for i, document_id in enumerate(document_ids)
+            ],
+        )
+
+    started = time.perf_counter()
+    rows = []
+    total = 0
+    with engine.begin() as conn:
+        for i, document_id in enumerate(document_ids):
+            for sequence in range(per_document):
+                rows.append(
+                    {"id": str(uuid.uuid4()), "document_id": document_id, "sequence": sequence,
+                     "knowledge_text": f"knowledge {i}-{sequence}", "meta_data": {},
+                     "is_active": sequence % 10 != 0,
+                     "created_at": base_time, "updated_at": base_time}
+                )
+                if len(rows) >= args.batch_size:
+                    conn.execute(insert(KnowledgeModel), rows)
+                    total += len(rows)
+                    rows = []
+        if rows:
+            conn.execute(insert(KnowledgeModel), rows)
+            total += len(rows)
+    print(f"Loaded {total:,} knowledges in {time.perf_counter() - started:.1f}s")
+    return dataset_ids[0], document_ids[len(document_ids) // 2], per_document
+
+
+def measure(func) -> tuple:
+    """func を repeat 回実行し、(中央値, p95) をミリ秒で返す"""
+    func()  # ウォームアップ
+    samples = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def run_queries(engine, dataset_id: str, document_id: str, per_document: int) -> dict:
+    """一覧取得パターンごとのレイテンシを計測する"""
+    results = {}
+    deep_skip = max(per_document - args.limit, 0)
+    with Session(engine) as session:
+        knowledges = KnowledgeRepositorySQLAlchemy(session)
+        documents = DocumentRepositorySQLAlchemy(session)
+        last = knowledges.list_knowledges(document_id, skip=deep_skip - 1, limit=1) if deep_skip else []
+        after = (last[0].sequence, last[0].id) if last else None
+
+        results["knowledges: first page"] = measure(
+            lambda: knowledges.list_knowledges(document_id, limit=args.limit)
+        )
+        results[f"knowledges: skip={deep_skip}"] = measure(
+            lambda: knowledges.list_knowledges(document_id, skip=deep_skip, limit=args.limit)
+        )
+        results["knowledges: cursor (same page)"] = measure(
+            lambda: knowledges.list_knowledges(document_id, limit=args.limit, after=after)
+        )
+        results["knowledges: count"] = measure(lambda: knowledges.count_knowledges(document_id))
+        results["documents: first page"] = measure(
+            lambda: documents.list_documents(dataset_id, limit=args.limit)
+        )
+        results["documents: count"] = measure(lambda: documents.count_documents(dataset_id))
+    return results
+
+
+def main() -> None:
+    engine = create_engine(args.url)
+    dataset_id, document_id, per_document = load_data(engine)
+
+    before = run_queries(engine, dataset_id, document_id, per_document)
+    started = time.perf_counter()
+    for index in LIST_INDEXES:
+        index.create(engine)
+    print(f"Created {len(LIST_INDEXES)} indexes in {time.perf_counter() - started:.1f}s")
+    after = run_queries(engine, dataset_id, document_id, per_document)
+
+    print()
+    print(f"{'query':<36}{'before p50/p95 (ms)':>24}{'after p50/p95 (ms)':>24}")
+    for name in before:
+        b50, b95 = before[name]
+        a50, a95 = after[name]
+        print(f"{name:<36}{b50:>12.2f}/{b95:<11.2f}{a50:>12.2f}/{a95:<11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+ベクトル検索の再現率・レイテンシ計測スクリプト（総当たり vs HNSW）
+
+クラスタを持つ合成ベクトルを生成し、総当たり（VECTOR_INDEX=exact の行列）の結果を正解として、
+HNSW グラフの構築時間と、ef ごとの recall@k・1検索あたりのレイテンシを表示する。
+DB は使わない。
+
+使い方:
+    python scripts/benchmark_vector_search.py --vectors 100000
+    python scripts/benchmark_vector_search.py --vectors 20000 --m 32 --ef-construction 400 --ef 32,64,128
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath("."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000, help="ベクトル数")
+    parser.add_argument("--dimension", type=int, default=256, help="次元数")
+    parser.add_argument("--clusters", type=int, default=100, help="クラスタ数")
+    parser.add_argument("--queries", type=int, default=200, help="検索語の数")
+    parser.add_argument("--k", type=int, default=10, help="上位 k 件")
+    parser.add_argument("--m", type=int, default=16, help="HNSW の M")
+    parser.add_argument("--ef-construction", type=int, default=200, help="HNSW の ef_construction")
+    parser.add_argument("--ef", default="16,32,64,128,256", help="計測する ef（カンマ区切り）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    return parser.parse_args()
+
+
+args = parse_args()
+logging.basicConfig(level=logging.WARNING)
+
+import numpy as np  # noqa: E402
+
+from app.infrastructure.search.hnsw import HNSWIndex  # noqa: E402
+from app.infrastructure.search.vector_index import _DatasetMatrix  # noqa: E402
+
+
+def generate(rng: np.random.Generator, centers: np.ndarray, count: int) -> np.ndarray:
+    """クラスタの中心の周りにベクトルを生成し、L2 正規化して返す"""
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.standard_normal((count, centers.shape[1]))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def measure(func, queries: np.ndarray) -> tuple:
+    """検索語を1件ずつ検索し、(結果, 中央値, p95) を返す（レイテンシはミリ秒）"""
+    results, samples = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(func(query[None, :])[0])
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return results, statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def recall(expected: list, actual: list) -> float:
+    """正解の上位 k 件のうち、近似の上位 k 件に含まれる割合の平均"""
+    return statistics.mean(
+        len({knowledge_id for knowledge_id, _ in e} & {knowledge_id for knowledge_id, _ in a}) / max(len(e), 1)
+        for e, a in zip(expected, actual)
+    )
+
+
+def main() -> None:
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dimension))
+    vectors = generate(rng, centers, args.vectors)
+    queries = generate(rng, centers, args.queries)
+    knowledge_ids = [f"k{i}" for i in range(args.vectors)]
+    document_ids = ["doc"] * args.vectors
+
+    exact = _DatasetMatrix(args.dimension)
+    exact.add_many(knowledge_ids, document_ids, vectors)
+    expected, exact_p50, exact_p95 = measure(lambda query: exact.search_batch(query, args.k), queries)
+
+    graph = HNSWIndex(args.dimension, args.m, args.ef_construction, seed=args.seed)
+    started = time.perf_counter()
+    graph.add_many(knowledge_ids, document_ids, vectors)
+    print(
+        f"Built HNSW (M={args.m}, ef_construction={args.ef_construction}) over {args.vectors:,} vectors "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+    print()
+    print(f"{'search':<20}{f'recall@{args.k}':>12}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    print(f"{'exact':<20}{1.0:>12.3f}{exact_p50:>12.2f}{exact_p95:>12.2f}")
+    for ef in (int(value) for value in args.ef.split(",")):
+        graph.ef_search = ef
+        actual, p50, p95 = measure(lambda query: graph.search_batch(query, args.k), queries)
+        print(f"{f'hnsw ef={ef}':<20}{recall(expected, actual):>12.3f}{p50:>12.2f}{p95:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+meta_data のホットキーの索引を作るマイグレーションの生成スクリプト
+
+?meta.<key>=<value> でよく絞り込むキー（ホットキー）を <テーブル>:<キー> で指定すると、
+(親の列, 値の式) の索引を作る Alembic のマイグレーションを migrations/versions に書き出す。
+SQLite・PostgreSQL は式インデックス、SQL Server は JSON_VALUE の計算列とそのインデックスを作る。
+索引の式は一覧・検索の WHERE 句と同じ（app/infrastructure/database/meta_filter.py）なので、
+絞り込みのクエリはそのままインデックスシークになる。
+
+使い方:
+    python scripts/generate_meta_index_migration.py knowledges:source documents:category
+    python scripts/generate_meta_index_migration.py knowledges:source --message "add source index"
+    alembic upgrade head
+
+注意:
+    テーブルは datasets / documents / knowledges のいずれか。索引はテーブル単位で、先頭の列で
+    親（documents はデータセット、knowledges はドキュメント）に絞り込んだ範囲をシークする。
+"""
+
+import argparse
+import json
+import os
+import sys
+import uuid
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.abspath("."))
+
+TEMPLATE = '''"""{message}
+
+Revision ID: {revision}
+Revises: {down_revision}
+Create Date: {create_date}
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = {revision!r}
+down_revision: Union[str, None] = {down_revision!r}
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# scripts/generate_meta_index_migration.py で生成（{keys}）
+CREATE_STATEMENTS = {create}
+
+DROP_STATEMENTS = {drop}
+
+
+def upgrade() -> None:
+    """
+    meta_data のホットキー（{keys}）の索引を追加するマイグレーション
+
+    PostgreSQL の CONCURRENTLY はトランザクション内で実行できないため、トランザクション外で実行する。
+    """
+    statements = CREATE_STATEMENTS.get(op.get_bind().dialect.name, [])
+    with op.get_context().autocommit_block():
+        for statement in statements:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """
+    meta_data のホットキーの索引を削除します
+    """
+    statements = DROP_STATEMENTS.get(op.get_bind().dialect.name, [])
+    with op.get_context().autocommit_block():
+        for statement in statements:
+            op.execute(statement)
+'''
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("keys", nargs="+", help="<テーブル>:<キー>（例: knowledges:source）")
+    parser.add_argument("--message", default=None, help="マイグレーションの説明（省略時はキーから作る）")
+    parser.add_argument("--rev-id", default=None, help="リビジョンID（省略時は自動採番）")
+    parser.add_argument("--down-revision", default=None, help="直前のリビジョン（省略時は現在の head）")
+    parser.add_argument("--versions-dir", default="migrations/versions", help="書き出し先のディレクトリ")
+    return parser.parse_args()
+
+
+def parse_key(spec: str) -> Tuple[str, str]:
+    table, separator, key = spec.partition(":")
+    if not separator:
+        raise SystemExit(f"Invalid key (expected <table>:<key>): {spec}")
+    return table, key
+
+
+def render_statements(statements: Dict[str, List[str]]) -> str:
+    lines = ["{"]
+    for dialect, dialect_statements in statements.items():
+        lines.append(f"    {json.dumps(dialect)}: [")
+        lines.extend(f"        {json.dumps(statement)}," for statement in dialect_statements)
+        lines.append("    ],")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def render_migration(
+    specs: List[Tuple[str, str]], revision: str, down_revision: str, message: str, create_date: datetime
+) -> str:
+    """
+    ホットキーの索引を作るマイグレーションのソースを返す
+
+    Args:
+        specs (List[Tuple[str, str]]): (テーブル, キー) のリスト
+        revision (str): リビジョンID
+        down_revision (str): 直前のリビジョン
+        message (str): マイグレーションの説明
+        create_date (datetime): 作成日時
+
+    Returns:
+        str: マイグレーションのソース
+
+    Raises:
+        ValueError: テーブル名またはキーが不正な場合
+    """
+    from app.infrastructure.database.meta_filter import meta_index_statements
+
+    create: Dict[str, List[str]] = {}
+    drop: Dict[str, List[str]] = {}
+    for table, key in specs:
+        table_create, table_drop = meta_index_statements(table, key)
+        for dialect, statements in table_create.items():
+            create.setdefault(dialect, []).extend(statements)
+        # 削除は作成と逆順に行う
+        for dialect, statements in table_drop.items():
+            drop[dialect] = statements + drop.get(dialect, [])
+    return TEMPLATE.format(
+        message=message,
+        revision=revision,
+        down_revision=down_revision,
+        create_date=create_date.strftime("%Y-%m-%d %H:%M:%S.%f"),
+        keys=", ".join(f"{table}.{key}" for table, key in specs),
+        create=render_statements(create),
+        drop=render_statements(drop),
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    specs = [parse_key(spec) for spec in args.keys]
+    down_revision = args.down_revision
+    if down_revision is None:
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+
+        down_revision = ScriptDirectory.from_config(Config("alembic.ini")).get_current_head()
+    revision = args.rev_id or uuid.uuid4().hex[:12]
+    message = args.message or "Add meta_data indexes for " + ", ".join(f"{table}.{key}" for table, key in specs)
+    try:
+        source = render_migration(specs, revision, down_revision, message, datetime.now())
+    except ValueError as e:
+        raise SystemExit(str(e))
+    slug = "add_meta_indexes_" + "_".join(key for _, key in specs)
+    path = os.path.join(args.versions_dir, f"{revision}_{slug[:60]}.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    print(f"Generated {path}")
+
+
+if __name__ == "__main__":
+    main()
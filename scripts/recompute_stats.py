@@ -0,0 +1,42 @@
+"""
+データセット・ドキュメントの集計値（dataset_stats / document_stats）の再集計バッチ
+
+集計値は書き込みのたびに差分更新されるが、並行更新の行き違いや手作業での DB 変更でずれた場合に
+元のテーブルから数え直す。データセットごとに1トランザクションでコミットする。
+
+使い方:
+    python scripts/recompute_stats.py                   # 全データセット
+    python scripts/recompute_stats.py --dataset-id <ID>  # 指定したデータセットのみ
+
+注意:
+    再集計中のデータセットへの書き込みの差分は失われうるため、書き込みの少ない時間帯に実行すること。
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath("."))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset-id", default=None, help="対象のデータセットID（省略時は全データセット）")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from app.infrastructure.database.connection import SessionLocal
+    from app.infrastructure.repositories.stats_repository_impl import StatsRepositorySQLAlchemy
+
+    with SessionLocal() as session:
+        recomputed = StatsRepositorySQLAlchemy(session).recompute(args.dataset_id)
+    print(f"Recomputed stats for {recomputed} datasets")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,3 +37,25 @@ async def db_session(engine):
     async with async_session() as session:
         yield session
         await session.rollback()
+
+
+@pytest.fixture(autouse=True)
+def clear_entity_caches(tmp_path):
+    """テスト間でプロセス内のエンティティキャッシュ・検索索引を共有しない"""
+    from app.infrastructure.cache.entity_cache import clear_entity_caches as clear
+    from app.infrastructure.cache.existence import clear_existence_caches
+    from app.infrastructure.cache.page_cache import page_cache
+    from app.infrastructure.search.knowledge_index import knowledge_index
+    from app.infrastructure.search.vector_index import vector_index
+
+    clear()
+    clear_existence_caches()
+    page_cache.clear()
+    knowledge_index.reset(str(tmp_path / "search-index"))
+    vector_index.clear()
+    yield
+    clear()
+    clear_existence_caches()
+    page_cache.clear()
+    knowledge_index.reset()
+    vector_index.clear()
@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.infrastructure.repositories import change_repository_impl
+from app.main import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    テスト用FastAPIクライアント（記録直後の変更も返すよう、待ち時間を無くす）
+    """
+    monkeypatch.setattr(change_repository_impl, "CHANGE_FEED_DELAY_SECONDS", 0)
+    return TestClient(app)
+
+
+def latest_seq(client) -> int:
+    """
+    現在までの変更を読み進め、最後の連番を返すヘルパー関数
+    """
+    since = 0
+    while True:
+        data = client.get("/api/v1/changes/", params={"since": since, "limit": 1000}).json()
+        if not data["items"]:
+            return since
+        since = data["nextSince"]
+
+
+def test_list_changes_follows_writes(client):
+    since = latest_seq(client)
+    dataset = client.post("/api/v1/datasets/", json={"name": "Change feed", "meta_data": {}}).json()
+    document = client.post(
+        "/api/v1/documents/",
+        json={"dataset_id": dataset["id"], "title": "Change feed doc", "content": "body", "meta_data": {}},
+    ).json()
+    knowledge = client.post(
+        "/api/v1/knowledges/",
+        json={"document_id": document["id"], "sequence": 0, "knowledge_text": "text", "meta_data": {}},
+    ).json()
+    assert client.delete(f"/api/v1/knowledges/{knowledge['id']}").status_code == 204
+
+    resp = client.get("/api/v1/changes/", params={"since": since})
+    assert resp.status_code == 200
+    data = resp.json()
+    items = [(item["entity"], item["entityId"], item["operation"]) for item in data["items"]]
+    assert items == [
+        ("dataset", dataset["id"], "create"),
+        ("document", document["id"], "create"),
+        ("knowledge", knowledge["id"], "create"),
+        ("knowledge", knowledge["id"], "delete"),
+    ]
+    assert data["items"][1]["datasetId"] == dataset["id"]
+    assert data["items"][3]["documentId"] == document["id"]
+    assert "origin" not in data["items"][0]
+    assert data["nextSince"] == data["items"][-1]["seq"]
+
+    # 読み終えたら空で、nextSince は since のまま
+    data = client.get("/api/v1/changes/", params={"since": data["nextSince"]}).json()
+    assert data["items"] == [] and data["nextSince"] == latest_seq(client)
+
+
+def test_list_changes_validates_params(client):
+    assert client.get("/api/v1/changes/", params={"since": -1}).status_code == 422
+    assert client.get("/api/v1/changes/", params={"limit": 0}).status_code == 422
+    assert client.get("/api/v1/changes/", params={"limit": 1001}).status_code == 422
@@ -1,5 +1,10 @@
+from uuid import uuid4
+
+import pytest
 from fastapi.testclient import TestClient
 
+from app.infrastructure.database.connection import SessionLocal
+from app.infrastructure.search.knowledge_index import rebuild_search_index
 from app.main import app
 
 # 同期的なテストクライアントを生成
@@ -70,6 +75,30 @@ def test_list_datasets_and_get_dataset():
     assert get_data["isActive"] is True
 
 
+def test_list_datasets_with_meta_filter():
+    # 他のテストのデータセットと区別するため、一意な値で絞り込む
+    owner = uuid4().hex
+    for team in ["search", "search", "billing"]:
+        response = client.post(
+            "/api/v1/datasets/",
+            json={"name": f"Dataset {team}", "meta_data": {"owner": owner, "team": team}},
+        )
+        assert response.status_code == 201
+
+    response = client.get("/api/v1/datasets/", params={"meta.owner": owner, "meta.team": "search"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    assert {ds["metaData"]["team"] for ds in data["items"]} == {"search"}
+
+    response = client.get("/api/v1/datasets/", params={"meta.owner": owner, "count": "none"})
+    assert len(response.json()["items"]) == 3
+    assert response.json()["total"] is None
+
+    response = client.get("/api/v1/datasets/", params={"meta.": owner})
+    assert response.status_code == 400
+
+
 def test_get_dataset_not_found():
     response = client.get("/api/v1/datasets/nonexistent-id")
     assert response.status_code == 404
@@ -137,3 +166,74 @@ def test_delete_dataset():
     assert get_resp.status_code == 404
     get_data = get_resp.json()
     assert get_data["detail"] == "Dataset not found"
+
+
+def test_get_dataset_stats():
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Stats Dataset"}).json()["id"]
+    document_id = client.post(
+        "/api/v1/documents/",
+        json={"dataset_id": dataset_id, "title": "Doc", "content": "hello"},
+    ).json()["id"]
+    client.post(
+        "/api/v1/knowledges/",
+        json={"document_id": document_id, "sequence": 0, "knowledge_text": "abc"},
+    )
+
+    response = client.get(f"/api/v1/datasets/{dataset_id}/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["documentCount"] == 1
+    assert data["knowledgeCount"] == 1
+    assert data["documentCharacters"] == 5
+    assert data["knowledgeCharacters"] == 3
+    assert client.get(
+        f"/api/v1/datasets/{dataset_id}/stats", headers={"If-None-Match": response.headers["etag"]}
+    ).status_code == 304
+
+    embedded = client.get(f"/api/v1/datasets/{dataset_id}?include_stats=true")
+    assert embedded.json()["stats"]["knowledgeCount"] == 1
+    assert embedded.headers["etag"] != client.get(f"/api/v1/datasets/{dataset_id}").headers["etag"]
+    assert client.get(f"/api/v1/datasets/{dataset_id}").json()["stats"] is None
+
+    assert client.get("/api/v1/datasets/missing/stats").status_code == 404
+
+
+def test_retrieve_knowledges():
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Retrieve Dataset"}).json()["id"]
+    document_id = client.post(
+        "/api/v1/documents/",
+        json={"dataset_id": dataset_id, "title": "天気のまとめ", "content": "body"},
+    ).json()["id"]
+    # 全文検索の索引の構築前は 503
+    response = client.post(f"/api/v1/datasets/{dataset_id}/retrieve", json={"query": "天気"})
+    assert response.status_code == 503
+
+    rebuild_search_index(SessionLocal)
+    for sequence, text in enumerate(["東京都の天気は晴れ", "京都の天気は雨", "ベクトル検索の実装"]):
+        client.post(
+            "/api/v1/knowledges/",
+            json={"document_id": document_id, "sequence": sequence, "knowledge_text": text},
+        )
+
+    response = client.post(
+        f"/api/v1/datasets/{dataset_id}/retrieve", json={"query": "東京 天気", "topK": 2}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["knowledgeText"] for item in data["items"]] == ["東京都の天気は晴れ", "京都の天気は雨"]
+    first = data["items"][0]
+    assert first["documentTitle"] == "天気のまとめ"
+    assert first["lexicalScore"] > 0 and first["vectorScore"] > 0
+    assert first["score"] == pytest.approx(1.0)
+    assert {"lexical", "vector", "fusion", "hydrate", "total"} <= set(data["timings"])
+
+    response = client.post(
+        f"/api/v1/datasets/{dataset_id}/retrieve",
+        json={"query": "東京 天気", "mode": "vector", "scoreThreshold": 0.99},
+    )
+    assert response.json()["items"] == []
+
+    assert client.post("/api/v1/datasets/missing/retrieve", json={"query": "天気"}).status_code == 404
+    assert client.post(
+        f"/api/v1/datasets/{dataset_id}/retrieve", json={"query": "天気", "fusion": "max"}
+    ).status_code == 422
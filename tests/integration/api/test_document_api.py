@@ -3,6 +3,7 @@ from uuid import uuid4
 import pytest
 from fastapi.testclient import TestClient
 
+from app.interfaces.api.pagination import encode_cursor
 from app.main import app
 
 
@@ -150,3 +151,62 @@ def test_delete_document(client):
     # 念のため GET を試して 404 になることを確認
     resp_get = client.get(f"/api/v1/documents/{doc_id}")
     assert resp_get.status_code == 404
+
+
+def test_get_document_conditional(client):
+    """
+    ドキュメント取得で If-None-Match が一致すれば本文を返さず 304 を返すケース
+    """
+    dataset_resp = create_dataset(client, "ConditionalDocumentCase")
+    doc_resp = create_document(client, dataset_id=dataset_resp["id"])
+
+    resp = client.get(f"/api/v1/documents/{doc_resp['id']}")
+    etag = resp.headers["etag"]
+
+    resp = client.get(f"/api/v1/documents/{doc_resp['id']}", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert resp.status_code == 304
+    resp = client.get(f"/api/v1/documents/{doc_resp['id']}", headers={"If-None-Match": '"other"'})
+    assert resp.status_code == 200
+
+
+def test_list_documents_with_meta_filter(client):
+    """
+    ?meta.<key>=<value> で meta_data の値が一致するドキュメントに絞り込むケース
+    """
+    dataset = create_dataset(client, "DocumentMetaFilterCase")
+    for category in ["manual", "manual", "faq"]:
+        resp = client.post(
+            "/api/v1/documents/",
+            json={
+                "dataset_id": dataset["id"],
+                "title": f"Test Document {uuid4()}",
+                "content": "body",
+                "meta_data": {"category": category},
+            },
+        )
+        assert resp.status_code == 201
+
+    resp = client.get(
+        "/api/v1/documents/", params={"dataset_id": dataset["id"], "meta.category": "manual", "limit": 1}
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] == 2
+    assert [item["metaData"]["category"] for item in data["items"]] == ["manual"]
+    resp = client.get(
+        "/api/v1/documents/",
+        params={"dataset_id": dataset["id"], "meta.category": "manual", "limit": 1, "cursor": data["nextCursor"]},
+    )
+    assert [item["metaData"]["category"] for item in resp.json()["items"]] == ["manual"]
+    assert resp.json()["nextCursor"] is None
+
+    resp = client.get("/api/v1/documents/", params={"dataset_id": dataset["id"], "meta.category": "none"})
+    assert resp.json() == {"items": [], "total": 0, "nextCursor": None}
+
+
+def test_list_documents_rejects_mistyped_cursor(client):
+    dataset = create_dataset(client, f"Cursor Dataset {uuid4()}")
+    for cursor in [encode_cursor([[1, 2], "x"]), encode_cursor([0, "x"])]:
+        resp = client.get("/api/v1/documents/", params={"dataset_id": dataset["id"], "cursor": cursor})
+        assert resp.status_code == 400
+        assert resp.json() == {"detail": "Invalid cursor"}
@@ -3,6 +3,8 @@ from uuid import uuid4
 import pytest
 from fastapi.testclient import TestClient
 
+from app.infrastructure.database.connection import SessionLocal
+from app.infrastructure.search.knowledge_index import rebuild_search_index
 from app.main import app
 
 
@@ -115,6 +117,41 @@ def test_list_knowledges(client):
         assert item["isActive"] == (i % 2 == 0)
 
 
+def test_list_knowledges_with_cursor(client):
+    """
+    nextCursor を辿って全ページを取得するケース
+    """
+    dataset = create_dataset(client, "KnowledgeCursorCase")
+    document = create_document(client, dataset_id=dataset["id"])
+    items = [
+        {"document_id": document["id"], "sequence": i // 2, "knowledge_text": f"chunk {i}"}
+        for i in range(7)
+    ]
+    resp = client.post("/api/v1/knowledges/bulk", json={"items": items})
+    assert resp.status_code == 201
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"document_id": document["id"], "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        resp = client.get("/api/v1/knowledges/", params=params)
+        assert resp.status_code == 200
+        data = resp.json()
+        seen.extend((item["sequence"], item["id"]) for item in data["items"])
+        cursor = data["nextCursor"]
+        if cursor is None:
+            break
+    assert len(seen) == 7
+    assert seen == sorted(seen)
+
+    resp = client.get(
+        "/api/v1/knowledges/", params={"document_id": document["id"], "cursor": "bogus"}
+    )
+    assert resp.status_code == 400
+
+
 def test_update_knowledge(client):
     """
     Knowledgeを作成後、PUTで更新するケース
@@ -140,6 +177,15 @@ def test_update_knowledge(client):
     assert updated["isActive"] is False
 
 
+def test_update_knowledge_not_found(client):
+    """
+    存在しないKnowledgeを PUT で更新すると 404 になるケース
+    """
+    resp = client.put("/api/v1/knowledges/nonexistent-id", json={"knowledge_text": "x"})
+    assert resp.status_code == 404
+    assert resp.json()["detail"] == "Knowledge not found"
+
+
 def test_delete_knowledge(client):
     """
     Knowledgeを作成後、DELETEで削除するケース
@@ -155,3 +201,245 @@ def test_delete_knowledge(client):
     # 念のため GET を試して 404 になることを確認
     resp_get = client.get(f"/api/v1/knowledges/{knowledge_id}")
     assert resp_get.status_code == 404
+
+
+def test_bulk_create_knowledges(client):
+    """
+    複数ドキュメント分のKnowledgeを一括作成するケース
+    """
+    dataset = create_dataset(client, "KnowledgeBulkCase")
+    doc_a = create_document(client, dataset_id=dataset["id"])
+    doc_b = create_document(client, dataset_id=dataset["id"])
+    items = [
+        {"document_id": doc["id"], "sequence": i, "knowledge_text": f"chunk {i}"}
+        for doc in (doc_a, doc_b)
+        for i in range(3)
+    ]
+
+    resp = client.post("/api/v1/knowledges/bulk", json={"items": items})
+    assert resp.status_code == 201
+    data = resp.json()
+    assert data["total"] == 6
+    assert len(data["ids"]) == 6
+
+    resp_list = client.get(f"/api/v1/knowledges/?document_id={doc_b['id']}")
+    assert resp_list.status_code == 200
+    assert [k["sequence"] for k in resp_list.json()["items"]] == [0, 1, 2]
+
+    resp_get = client.get(f"/api/v1/knowledges/{data['ids'][0]}")
+    assert resp_get.status_code == 200
+    assert resp_get.json()["documentId"] == doc_a["id"]
+
+
+def test_bulk_create_knowledges_rejects_empty(client):
+    resp = client.post("/api/v1/knowledges/bulk", json={"items": []})
+    assert resp.status_code == 422
+
+
+def test_list_knowledges_count_modes(client):
+    """
+    count=exact/estimated/none で total の求め方が切り替わるケース
+    """
+    dataset = create_dataset(client, "KnowledgeCountCase")
+    document = create_document(client, dataset_id=dataset["id"])
+    items = [
+        {"document_id": document["id"], "sequence": i, "knowledge_text": f"chunk {i}"}
+        for i in range(5)
+    ]
+    client.post("/api/v1/knowledges/bulk", json={"items": items})
+
+    params = {"document_id": document["id"], "limit": 2}
+    resp = client.get("/api/v1/knowledges/", params=params)
+    assert len(resp.json()["items"]) == 2
+    assert resp.json()["total"] == 5
+
+    # 追加後も estimated はキャッシュ済みの件数を返す
+    create_knowledge(client, document_id=document["id"], sequence=5)
+    resp = client.get("/api/v1/knowledges/", params={**params, "count": "estimated"})
+    assert resp.json()["total"] == 5
+    resp = client.get("/api/v1/knowledges/", params={**params, "count": "exact"})
+    assert resp.json()["total"] == 6
+
+    resp = client.get("/api/v1/knowledges/", params={**params, "count": "none"})
+    assert resp.json()["total"] is None
+    assert len(resp.json()["items"]) == 2
+
+    resp = client.get("/api/v1/knowledges/", params={**params, "count": "bogus"})
+    assert resp.status_code == 422
+
+
+def test_get_knowledge_conditional(client):
+    """
+    ETag / Last-Modified を返し、If-None-Match・If-Modified-Since が一致すれば 304 を返すケース
+    """
+    dataset = create_dataset(client, "KnowledgeEtagCase")
+    document = create_document(client, dataset_id=dataset["id"])
+    knowledge = create_knowledge(client, document_id=document["id"])
+    url = f"/api/v1/knowledges/{knowledge['id']}"
+
+    resp = client.get(url)
+    assert resp.status_code == 200
+    etag = resp.headers["etag"]
+    last_modified = resp.headers["last-modified"]
+
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    client.put(url, json={"knowledge_text": "changed"})
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    assert resp.json()["knowledgeText"] == "changed"
+
+
+def test_list_knowledges_conditional(client):
+    """
+    一覧の ETag は件数と最終更新日時から求め、変更が無ければ 304、追加・削除で変わるケース
+    """
+    dataset = create_dataset(client, "KnowledgeListEtagCase")
+    document = create_document(client, dataset_id=dataset["id"])
+    first = create_knowledge(client, document_id=document["id"], sequence=0)
+    params = {"document_id": document["id"]}
+
+    resp = client.get("/api/v1/knowledges/", params=params)
+    etag = resp.headers["etag"]
+    assert "last-modified" not in resp.headers
+    assert client.get("/api/v1/knowledges/", params=params, headers={"If-None-Match": etag}).status_code == 304
+    # クエリ条件が異なれば別の表現として扱う
+    resp = client.get("/api/v1/knowledges/", params={**params, "limit": 1}, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+
+    create_knowledge(client, document_id=document["id"], sequence=1)
+    resp = client.get("/api/v1/knowledges/", params=params, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["total"] == 2
+    etag = resp.headers["etag"]
+
+    client.delete(f"/api/v1/knowledges/{first['id']}")
+    resp = client.get("/api/v1/knowledges/", params=params, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["total"] == 1
+
+
+def test_search_knowledges(client):
+    """
+    Knowledge本文を全文検索し、データセットで絞り込むケース
+    """
+    resp = client.get("/api/v1/knowledges/search", params={"q": "検索"})
+    assert resp.status_code == 503
+
+    rebuild_search_index(SessionLocal)
+    marker = uuid4().hex[:12]
+    dataset = create_dataset(client, "KnowledgeSearchCase")
+    other = create_dataset(client, "KnowledgeSearchOtherCase")
+    document = create_document(client, dataset_id=dataset["id"])
+    other_document = create_document(client, dataset_id=other["id"])
+    for document_id, text in [
+        (document["id"], f"{marker} 東京都の天気は晴れ"),
+        (document["id"], f"{marker} 京都の天気は雨"),
+        (other_document["id"], f"{marker} 東京の天気"),
+    ]:
+        resp = client.post(
+            "/api/v1/knowledges/",
+            json={"document_id": document_id, "sequence": 0, "knowledge_text": text, "meta_data": {}},
+        )
+        assert resp.status_code == 201
+
+    # 全角英数字は NFKC 正規化で半角と同じ語になる
+    resp = client.get(
+        "/api/v1/knowledges/search",
+        params={"q": f"{marker.upper()} 東京", "dataset_id": dataset["id"]},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] == 1
+    assert data["items"][0]["knowledgeText"] == f"{marker} 東京都の天気は晴れ"
+    assert data["items"][0]["score"] > 0
+
+    resp = client.get("/api/v1/knowledges/search", params={"q": f"{marker} 天気"})
+    assert resp.json()["total"] == 3
+
+
+def test_vector_search_knowledges(client):
+    """
+    Knowledge本文をベクトル検索し、類似度の降順に返すケース
+    """
+    dataset = create_dataset(client, "KnowledgeVectorSearchCase")
+    document = create_document(client, dataset_id=dataset["id"])
+    for sequence, text in enumerate(["東京都の天気は晴れ", "京都の天気は雨", "ベクトル検索の実装"]):
+        resp = client.post(
+            "/api/v1/knowledges/",
+            json={"document_id": document["id"], "sequence": sequence, "knowledge_text": text, "meta_data": {}},
+        )
+        assert resp.status_code == 201
+
+    resp = client.post(
+        "/api/v1/knowledges/vector-search",
+        json={"query": "東京の天気", "datasetId": dataset["id"], "topK": 2},
+    )
+    assert resp.status_code == 200
+    items = resp.json()["items"]
+    assert [item["knowledgeText"] for item in items] == ["東京都の天気は晴れ", "京都の天気は雨"]
+    assert items[0]["score"] > items[1]["score"]
+
+    resp = client.post("/api/v1/knowledges/vector-search", json={"query": "", "datasetId": dataset["id"]})
+    assert resp.status_code == 422
+
+
+def test_list_and_search_knowledges_with_meta_filter(client):
+    """
+    ?meta.<key>=<value> で meta_data の値が一致するKnowledgeに絞り込むケース
+    """
+    rebuild_search_index(SessionLocal)
+    marker = uuid4().hex[:12]
+    dataset = create_dataset(client, "KnowledgeMetaFilterCase")
+    document = create_document(client, dataset_id=dataset["id"])
+    for sequence, meta_data in enumerate(
+        [
+            {"source": "faq", "lang": "ja"},
+            {"source": "faq", "lang": "en"},
+            {"source": "blog", "lang": "ja"},
+            {"source": 1},
+        ]
+    ):
+        resp = client.post(
+            "/api/v1/knowledges/",
+            json={
+                "document_id": document["id"],
+                "sequence": sequence,
+                "knowledge_text": f"{marker} 天気 {sequence}",
+                "meta_data": meta_data,
+            },
+        )
+        assert resp.status_code == 201
+
+    params = {"document_id": document["id"], "meta.source": "faq"}
+    resp = client.get("/api/v1/knowledges/", params=params)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] == 2
+    assert [item["sequence"] for item in data["items"]] == [0, 1]
+    # 絞り込み条件ごとに ETag が変わる
+    unfiltered = client.get("/api/v1/knowledges/", params={"document_id": document["id"]})
+    assert unfiltered.json()["total"] == 4
+    assert unfiltered.headers["etag"] != resp.headers["etag"]
+
+    resp = client.get("/api/v1/knowledges/", params={**params, "meta.lang": "ja", "count": "estimated"})
+    assert [item["sequence"] for item in resp.json()["items"]] == [0]
+    assert resp.json()["total"] == 1
+
+    resp = client.get("/api/v1/knowledges/", params={"document_id": document["id"], "meta.bad-key": "x"})
+    assert resp.status_code == 400
+
+    resp = client.get(
+        "/api/v1/knowledges/search",
+        params={"q": f"{marker} 天気", "dataset_id": dataset["id"], "meta.source": "faq", "limit": 1},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] == 2
+    assert len(data["items"]) == 1
+    assert data["items"][0]["metaData"]["source"] == "faq"
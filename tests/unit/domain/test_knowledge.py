@@ -32,3 +32,18 @@ def test_create_knowledge_inactive():
         is_active=False,
     )
     assert knowledge.is_active is False
+
+
+def test_matches_meta_compares_string_values():
+    """
+    matches_meta は meta_data の文字列の値がすべて一致する場合のみ True を返す
+    """
+    knowledge = Knowledge.create(
+        document_id="doc-1", sequence=0, knowledge_text="テスト", meta_data={"source": "faq", "page": 1}
+    )
+    assert knowledge.matches_meta({})
+    assert knowledge.matches_meta({"source": "faq"})
+    assert not knowledge.matches_meta({"source": "faq", "lang": "ja"})
+    assert not knowledge.matches_meta({"page": "1"})
+    assert not Knowledge(meta_data={"draft": True}).matches_meta({"draft": "true"})
+    assert not Knowledge(meta_data=None).matches_meta({"source": "faq"})
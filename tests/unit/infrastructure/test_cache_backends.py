@@ -0,0 +1,283 @@
+import asyncio
+import fnmatch
+import json
+import socketserver
+import threading
+import time
+
+import pytest
+from sqlalchemy.util.concurrency import greenlet_spawn
+
+from app.domain.entities.document import Document
+from app.infrastructure.cache.backends import CacheBackendError, InMemoryCacheBackend
+from app.infrastructure.cache.entity_cache import EntityCache
+from app.infrastructure.cache.lru import LRUCache
+from app.infrastructure.cache.redis_backend import RedisCacheBackend
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """テスト用の最小限の Redis 互換サーバー（RESP2。未対応のコマンドは ERR を返す）"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, password=None):
+        super().__init__(("127.0.0.1", 0), _FakeRedisHandler)
+        self.password = password
+        self.values = {}
+        self.sets = {}
+        self.subscribers = {}
+        self.commands = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{self.server_address[1]}/0"
+
+
+class _FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.write_lock = threading.Lock()
+        self.authenticated = self.server.password is None
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            name = command[0].upper().decode()
+            self.server.commands.append(name)
+            if name != "AUTH" and not self.authenticated:
+                self._write(b"-NOAUTH Authentication required.\r\n")
+                continue
+            self._write(self._execute(name, command[1:]))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _write(self, data):
+        with self.write_lock:
+            self.wfile.write(data)
+
+    def _execute(self, name, args):
+        server = self.server
+        with server.lock:
+            if name == "AUTH":
+                self.authenticated = args[-1].decode() == server.password
+                return b"+OK\r\n" if self.authenticated else b"-WRONGPASS invalid password\r\n"
+            if name == "SELECT":
+                return b"+OK\r\n"
+            if name == "GET":
+                entry = server.values.get(args[0])
+                if entry is None or entry[1] <= time.monotonic():
+                    return b"$-1\r\n"
+                return _bulk(entry[0])
+            if name == "SET":
+                ttl = int(args[3]) / 1000 if len(args) > 3 else 3600
+                server.values[args[0]] = (args[1], time.monotonic() + ttl)
+                return b"+OK\r\n"
+            if name in ("INCR", "INCRBY"):
+                amount = int(args[1]) if name == "INCRBY" else 1
+                entry = server.values.get(args[0])
+                value = int(entry[0]) + amount if entry else amount
+                server.values[args[0]] = (str(value).encode(), float("inf"))
+                return b":%d\r\n" % value
+            if name == "DEL":
+                removed = sum(
+                    1 for key in args
+                    if server.values.pop(key, None) is not None or server.sets.pop(key, None) is not None
+                )
+                return b":%d\r\n" % removed
+            if name == "SADD":
+                server.sets.setdefault(args[0], set()).update(args[1:])
+                return b":1\r\n"
+            if name == "SMEMBERS":
+                members = sorted(server.sets.get(args[0], ()))
+                return b"*%d\r\n" % len(members) + b"".join(_bulk(m) for m in members)
+            if name == "PEXPIRE":
+                return b":1\r\n"
+            if name == "SCAN":
+                pattern = args[args.index(b"MATCH") + 1].decode()
+                keys = [k for k in server.values if fnmatch.fnmatchcase(k.decode(), pattern)]
+                return b"*2\r\n" + _bulk(b"0") + b"*%d\r\n" % len(keys) + b"".join(_bulk(k) for k in keys)
+            if name == "PUBLISH":
+                handlers = list(server.subscribers.get(args[0], ()))
+            elif name == "SUBSCRIBE":
+                server.subscribers.setdefault(args[0], []).append(self)
+                return b"*3\r\n" + _bulk(b"subscribe") + _bulk(args[0]) + b":1\r\n"
+            else:
+                return b"-ERR unknown command\r\n"
+        # PUBLISH: 購読中の接続へ配信する
+        for handler in handlers:
+            handler._write(b"*3\r\n" + _bulk(b"message") + _bulk(args[0]) + _bulk(args[1]))
+        return b":%d\r\n" % len(handlers)
+
+
+def _bulk(value):
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+@pytest.fixture
+def redis_server():
+    server = FakeRedisServer(password="secret")
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        backend = InMemoryCacheBackend()
+    else:
+        backend = RedisCacheBackend(request.getfixturevalue("redis_server").url)
+    yield backend
+    backend.close()
+
+
+def test_backend_get_set_delete_and_tags(backend):
+    backend.set("kapi:knowledges:k1", b"one", 60, tags=["kapi:knowledges:document:d1"])
+    backend.set("kapi:knowledges:k2", "二".encode("utf-8"), 60, tags=["kapi:knowledges:document:d1"])
+    backend.set("kapi:knowledges:k3", b"three", 60, tags=["kapi:knowledges:document:d2"])
+
+    assert backend.get("kapi:knowledges:k2") == "二".encode("utf-8")
+    assert backend.get("missing") is None
+
+    backend.delete_tag("kapi:knowledges:document:d1")
+    assert backend.get("kapi:knowledges:k1") is None
+    assert backend.get("kapi:knowledges:k2") is None
+    assert backend.get("kapi:knowledges:k3") == b"three"
+
+    backend.delete("kapi:knowledges:k3")
+    assert backend.get("kapi:knowledges:k3") is None
+
+
+def test_backend_incr_counts_from_zero(backend):
+    assert backend.incr("kapi:version:knowledges:d1") == 1
+    assert backend.incr("kapi:version:knowledges:d1") == 2
+    assert backend.get("kapi:version:knowledges:d1") == b"2"
+
+
+def test_backend_delete_prefix_keeps_other_namespaces(backend):
+    backend.set("kapi:knowledges:k1", b"1", 60)
+    backend.set("kapi:knowledges:k2", b"2", 60)
+    backend.set("kapi:documents:d1", b"3", 60)
+
+    backend.delete_prefix("kapi:knowledges:")
+
+    assert backend.get("kapi:knowledges:k1") is None
+    assert backend.get("kapi:knowledges:k2") is None
+    assert backend.get("kapi:documents:d1") == b"3"
+
+
+def test_backend_publish_subscribe(backend):
+    received = []
+    delivered = threading.Event()
+    backend.subscribe("kapi:invalidate", lambda message: (received.append(message), delivered.set()))
+    for subscriber in getattr(backend, "_subscribers", []):
+        assert subscriber.ready.wait(2)
+
+    backend.publish("kapi:invalidate", b"hello")
+
+    assert delivered.wait(2)
+    assert received == [b"hello"]
+
+
+def test_redis_backend_reports_unreachable_server_as_cache_error():
+    backend = RedisCacheBackend("redis://127.0.0.1:1/0", timeout=0.2)
+    with pytest.raises(CacheBackendError):
+        backend.get("key")
+
+
+def test_redis_backend_rejects_wrong_password(redis_server):
+    backend = RedisCacheBackend(f"redis://:wrong@127.0.0.1:{redis_server.server_address[1]}/0")
+    with pytest.raises(CacheBackendError):
+        backend.get("key")
+
+
+def test_redis_backend_runs_commands_off_the_event_loop_inside_run_sync(redis_server):
+    backend = RedisCacheBackend(redis_server.url)
+    backend.set("kapi:knowledges:k1", b"one", 60)
+
+    def in_run_sync():
+        # AsyncSession.run_sync と同じく greenlet 内の同期処理から呼び出す
+        return backend.get("kapi:knowledges:k1"), backend._run(lambda client: threading.get_ident())
+
+    async def main():
+        return threading.get_ident(), await greenlet_spawn(in_run_sync)
+
+    try:
+        loop_thread, (value, command_thread) = asyncio.run(main())
+    finally:
+        backend.close()
+    assert value == b"one"
+    assert command_thread != loop_thread
+
+
+def _node(name, l2):
+    """1ノード分の EntityCache（L1 は各ノード固有、L2 は共有）と無効化メッセージの購読"""
+    cache = EntityCache(
+        "documents",
+        Document,
+        LRUCache(f"documents-{name}", max_entries=100, max_bytes=1 << 20, ttl_seconds=60),
+        l2,
+        key_prefix="kapi",
+    )
+    applied = threading.Event()
+
+    def handle(message):
+        data = json.loads(message)
+        cache.apply_message(data["op"], data["value"])
+        applied.set()
+
+    l2.subscribe(cache.channel, handle)
+    for subscriber in getattr(l2, "_subscribers", []):
+        assert subscriber.ready.wait(2)
+    return cache, applied
+
+
+def test_layered_cache_shares_entries_and_invalidates_other_nodes(redis_server):
+    node_a_backend = RedisCacheBackend(redis_server.url)
+    node_b_backend = RedisCacheBackend(redis_server.url)
+    try:
+        node_a, _ = _node("a", node_a_backend)
+        node_b, b_invalidated = _node("b", node_b_backend)
+        document = Document(id="d1", dataset_id="ds1", title="title", content="本文", meta_data={"k": 1})
+
+        node_a.put("d1", document, tags=["dataset:ds1"])
+        # B は L1 に無くても L2 から取得でき、以降は L1 から返す
+        assert node_b.get("d1") == document
+        assert node_b.l1.get("d1") == document
+
+        node_a.invalidate("d1")
+
+        assert b_invalidated.wait(2)
+        assert node_b.l1.get("d1") is None
+        assert node_b.get("d1") is None
+    finally:
+        node_a_backend.close()
+        node_b_backend.close()
+
+
+def test_layered_cache_treats_l2_failures_as_misses():
+    l2 = RedisCacheBackend("redis://127.0.0.1:1/0", timeout=0.2)
+    cache = EntityCache(
+        "documents",
+        Document,
+        LRUCache("documents-offline", max_entries=100, max_bytes=1 << 20, ttl_seconds=60),
+        l2,
+    )
+    document = Document(id="d1", dataset_id="ds1", title="title", meta_data={})
+
+    cache.put("d1", document)
+    assert cache.get("d1") == document  # L1 は利用できる
+    cache.invalidate("d1")
+    assert cache.get("d1") is None
@@ -0,0 +1,277 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.infrastructure.cache import cached_repositories  # noqa: F401 キャッシュのハンドラーを登録する
+from app.infrastructure.cache.entity_cache import NODE_ID, knowledge_cache
+from app.infrastructure.database.change_feed import ChangeFeedConsumer
+from app.infrastructure.database.connection import Base
+from app.infrastructure.database.models import ChangeModel, DocumentModel, KnowledgeModel
+from app.infrastructure.repositories import embedding_repository_impl
+from app.infrastructure.repositories.change_repository_impl import (
+    ChangeRepositorySQLAlchemy,
+    load_changes_since,
+    prune_changes,
+)
+from app.infrastructure.repositories.dataset_repository_impl import DatasetRepositorySQLAlchemy
+from app.infrastructure.repositories.document_repository_impl import DocumentRepositorySQLAlchemy
+from app.infrastructure.repositories.knowledge_repository_impl import KnowledgeRepositorySQLAlchemy
+from app.infrastructure.search import knowledge_index as search
+from app.infrastructure.search.knowledge_index import knowledge_index
+from app.infrastructure.search.vector_index import vector_index
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _summary(changes):
+    return [(change.entity, change.entity_id, change.operation) for change in changes]
+
+
+def _remote_change(
+    session, entity, entity_id, operation, document_id=None, dataset_id=None, origin="other-node", seq=None
+):
+    # 他ノードの書き込みを模して、変更履歴だけを直接書き込む
+    session.execute(
+        insert(ChangeModel).values(
+            **({"id": seq} if seq is not None else {}),
+            entity=entity,
+            entity_id=entity_id,
+            operation=operation,
+            document_id=document_id,
+            dataset_id=dataset_id,
+            origin=origin,
+            created_at=datetime.now(),
+        )
+    )
+    session.commit()
+
+
+def test_writes_record_changes_in_order(session):
+    dataset = DatasetRepositorySQLAlchemy(session).create(Dataset.create(name="Dataset"))
+    documents = DocumentRepositorySQLAlchemy(session)
+    document = documents.create(Document.create(dataset_id=dataset.id, title="Doc", content="body"))
+    knowledges = KnowledgeRepositorySQLAlchemy(session)
+    knowledge = knowledges.create(Knowledge.create(document_id=document.id, sequence=0, knowledge_text="one"))
+    ids = knowledges.create_many(
+        [Knowledge.create(document_id=document.id, sequence=i, knowledge_text=f"bulk {i}") for i in (1, 2)]
+    )
+    knowledge.knowledge_text = "updated"
+    knowledges.update(knowledge)
+    knowledges.delete(knowledge.id)
+    documents.delete(document.id)
+
+    changes = ChangeRepositorySQLAlchemy(session, delay_seconds=0).list_changes()
+    assert _summary(changes) == [
+        ("dataset", dataset.id, "create"),
+        ("document", document.id, "create"),
+        ("knowledge", knowledge.id, "create"),
+        ("knowledge", ids[0], "create"),
+        ("knowledge", ids[1], "create"),
+        ("knowledge", knowledge.id, "update"),
+        ("knowledge", knowledge.id, "delete"),
+        # 配下の Knowledge の削除（CASCADE）も同じトランザクションで記録する
+        *sorted(("knowledge", knowledge_id, "delete") for knowledge_id in ids),
+        ("document", document.id, "delete"),
+    ]
+    assert [change.seq for change in changes] == sorted(change.seq for change in changes)
+    assert changes[1].dataset_id == dataset.id and changes[2].document_id == document.id
+    assert all(change.origin == NODE_ID for change in changes)
+
+    # since より後のものを limit 件ずつ読む
+    page = ChangeRepositorySQLAlchemy(session, delay_seconds=0).list_changes(since=changes[2].seq, limit=2)
+    assert [change.seq for change in page] == [changes[3].seq, changes[4].seq]
+
+
+def test_dataset_delete_records_cascaded_deletes(session):
+    datasets = DatasetRepositorySQLAlchemy(session)
+    dataset = datasets.create(Dataset.create(name="Dataset"))
+    other = datasets.create(Dataset.create(name="Other"))
+    documents = DocumentRepositorySQLAlchemy(session)
+    first = documents.create(Document.create(dataset_id=dataset.id, title="First", content="body"))
+    second = documents.create(Document.create(dataset_id=dataset.id, title="Second", content="body"))
+    kept = documents.create(Document.create(dataset_id=other.id, title="Kept", content="body"))
+    knowledges = KnowledgeRepositorySQLAlchemy(session)
+    ids = knowledges.create_many(
+        [
+            Knowledge.create(document_id=document.id, sequence=0, knowledge_text="text")
+            for document in (first, second, kept)
+        ]
+    )
+    repository = ChangeRepositorySQLAlchemy(session, delay_seconds=0)
+    since = repository.list_changes(limit=1000)[-1].seq
+
+    assert datasets.delete(dataset.id)
+    assert not datasets.delete("missing")
+
+    changes = repository.list_changes(since=since)
+    assert _summary(changes) == [
+        *sorted(("knowledge", knowledge_id, "delete") for knowledge_id in ids[:2]),
+        *sorted(("document", document_id, "delete") for document_id in (first.id, second.id)),
+        ("dataset", dataset.id, "delete"),
+    ]
+    assert {change.document_id for change in changes[:2]} == {first.id, second.id}
+    assert {change.dataset_id for change in changes[2:4]} == {dataset.id}
+
+
+def test_rolled_back_writes_are_not_recorded(session):
+    dataset = DatasetRepositorySQLAlchemy(session).create(Dataset.create(name="Dataset"))
+    documents = DocumentRepositorySQLAlchemy(session, auto_commit=False)
+    documents.create(Document.create(dataset_id=dataset.id, title="Doc", content="body"))
+    session.rollback()
+    # 失敗した更新（存在しない ID）も記録しない
+    missing = Dataset.create(name="missing")
+    missing.id = "missing"
+    with pytest.raises(ValueError):
+        DatasetRepositorySQLAlchemy(session).update(missing)
+    session.commit()
+
+    changes = ChangeRepositorySQLAlchemy(session, delay_seconds=0).list_changes()
+    assert _summary(changes) == [("dataset", dataset.id, "create")]
+
+
+def test_recent_changes_wait_for_settle_delay_and_old_ones_are_pruned(session):
+    _remote_change(session, "dataset", "ds-1", "create")
+    assert ChangeRepositorySQLAlchemy(session, delay_seconds=60).list_changes() == []
+    assert len(ChangeRepositorySQLAlchemy(session, delay_seconds=0).list_changes()) == 1
+
+    old = datetime.now() - timedelta(days=30)
+    session.execute(
+        insert(ChangeModel).values(
+            entity="dataset", entity_id="ds-0", operation="delete", origin="other-node", created_at=old
+        )
+    )
+    session.commit()
+    assert _summary(load_changes_since(session, old)) == [
+        ("dataset", "ds-1", "create"),
+        ("dataset", "ds-0", "delete"),
+    ]
+    assert prune_changes(session, retention_days=7) == 1
+    assert session.execute(select(ChangeModel.entity_id)).scalars().all() == ["ds-1"]
+
+
+def test_consumer_passes_remote_changes_and_retries_failed_handlers(session):
+    _remote_change(session, "dataset", "ds-0", "create")
+    received = []
+    failures = [RuntimeError("temporary")]
+
+    def handler(_, changes):
+        if failures:
+            raise failures.pop()
+        received.append(_summary(changes))
+
+    consumer = ChangeFeedConsumer({"test": handler}, batch_size=2, delay_seconds=0)
+    # 起動時点までの変更は読まない
+    assert consumer.seek_latest(session) > 0
+    assert consumer.poll(session) == 0
+
+    _remote_change(session, "dataset", "ds-1", "create")
+    _remote_change(session, "dataset", "ds-2", "update", origin=NODE_ID)
+    _remote_change(session, "dataset", "ds-3", "delete")
+    cursor = consumer.cursor
+    # ハンドラーが失敗したら読み取り位置を進めない
+    assert consumer.poll(session) == 0 and consumer.cursor == cursor
+    assert consumer.poll(session) == 2
+    assert consumer.poll(session) == 1
+    # 自プロセスの変更（ds-2）は渡さない
+    assert received == [[("dataset", "ds-1", "create")], [("dataset", "ds-3", "delete")]]
+
+
+def test_consumer_rereads_skipped_seqs_until_they_commit_or_time_out(session):
+    received = []
+    consumer = ChangeFeedConsumer({"test": lambda _, changes: received.extend(_summary(changes))}, delay_seconds=0)
+    cursor = consumer.seek_latest(session)
+
+    # cursor + 1 のコミットが遅れ、大きい連番が先に読めた場合
+    _remote_change(session, "dataset", "ds-late", "create", seq=cursor + 2)
+    assert consumer.poll(session) == 1
+    assert consumer.cursor == cursor + 2 and set(consumer.gaps) == {cursor + 1}
+
+    _remote_change(session, "dataset", "ds-slow", "create", seq=cursor + 1)
+    assert consumer.poll(session) == 1
+    assert consumer.gaps == {}
+    assert received == [("dataset", "ds-late", "create"), ("dataset", "ds-slow", "create")]
+
+    # 読めないまま gap_timeout を過ぎた連番（ロールバックされた書き込み）は諦める
+    consumer.gap_timeout = 0
+    _remote_change(session, "dataset", "ds-next", "create", seq=cursor + 4)
+    assert consumer.poll(session) == 1
+    assert consumer.gaps == {}
+
+
+def test_handlers_reload_current_state(session, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_INDEX_ENABLED", True)
+    session.add_all(
+        [
+            DocumentModel(id="doc-1", dataset_id="ds-1", title="Doc", content="body"),
+            KnowledgeModel(id="k1", document_id="doc-1", sequence=0, knowledge_text="東京の天気", is_active=True),
+            KnowledgeModel(id="k2", document_id="doc-1", sequence=1, knowledge_text="大阪の天気", is_active=False),
+        ]
+    )
+    session.commit()
+    _remote_change(session, "document", "doc-1", "create", dataset_id="ds-1")
+    _remote_change(session, "knowledge", "k1", "create", document_id="doc-1")
+    _remote_change(session, "knowledge", "k2", "update", document_id="doc-1")
+    _remote_change(session, "knowledge", "k3", "create", document_id="doc-1")
+    knowledge_index.memtable.add("k2", "doc-1", "大阪の天気")
+    knowledge_cache.l1.put("k1", object(), 1)
+    changes = ChangeRepositorySQLAlchemy(session, delay_seconds=0).list_changes()
+
+    assert search.change_operations(session, changes) == [
+        ["document", "doc-1", "ds-1"],
+        ["knowledge", "k1", "doc-1", "東京の天気"],
+        # 無効化されたもの・読み直した時点で無いものは索引から外す
+        ["remove", "k2"],
+        ["remove", "k3"],
+    ]
+    consumer = ChangeFeedConsumer(batch_size=10, delay_seconds=0)
+    consumer.cursor = 0
+    assert consumer.poll(session) == 4
+    assert knowledge_index.memtable.document_of("k1") == "doc-1"
+    assert "k2" not in knowledge_index.memtable
+    assert knowledge_cache.l1.get("k1") is None
+
+    _remote_change(session, "document", "doc-1", "delete", dataset_id="ds-1")
+    assert consumer.poll(session) == 1
+    assert "k1" not in knowledge_index.memtable
+
+
+def test_vector_handler_reloads_embeddings(session, monkeypatch):
+    monkeypatch.setattr(embedding_repository_impl, "VECTOR_SEARCH_ENABLED", True)
+    dataset = DatasetRepositorySQLAlchemy(session).create(Dataset.create(name="Dataset"))
+    document = DocumentRepositorySQLAlchemy(session).create(
+        Document.create(dataset_id=dataset.id, title="Doc", content="body")
+    )
+    knowledge = KnowledgeRepositorySQLAlchemy(session).create(
+        Knowledge.create(document_id=document.id, sequence=0, knowledge_text="東京の天気")
+    )
+    applied = []
+    monkeypatch.setattr(vector_index, "apply", lambda operations: applied.extend(operations))
+    changes = ChangeRepositorySQLAlchemy(session, delay_seconds=0).list_changes()
+
+    embedding_repository_impl.apply_changes(session, changes)
+    assert [operation[0] for operation in applied] == ["vector"]
+    assert applied[0][1:4] == [knowledge.id, document.id, dataset.id]
+
+    applied.clear()
+    _remote_change(session, "knowledge", "missing", "update", document_id=document.id)
+    _remote_change(session, "dataset", dataset.id, "delete")
+    embedding_repository_impl.apply_changes(
+        session, ChangeRepositorySQLAlchemy(session, delay_seconds=0).list_changes(since=changes[-1].seq)
+    )
+    assert applied == [["remove", "missing"], ["remove_dataset", dataset.id]]
@@ -0,0 +1,29 @@
+from unittest.mock import Mock
+
+from app.infrastructure.database import count_cache as count_cache_module
+from app.infrastructure.database.count_cache import CountCache
+
+
+def test_get_or_compute_uses_cached_value_until_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(count_cache_module.time, "monotonic", lambda: now[0])
+    cache = CountCache(ttl_seconds=10, max_entries=10)
+    compute = Mock(side_effect=[3, 5])
+
+    assert cache.get_or_compute(("documents", "ds-1"), compute) == 3
+    assert cache.get_or_compute(("documents", "ds-1"), compute) == 3
+    assert compute.call_count == 1
+
+    now[0] += 11
+    assert cache.get_or_compute(("documents", "ds-1"), compute) == 5
+    assert compute.call_count == 2
+
+
+def test_evicts_oldest_entries_beyond_max():
+    cache = CountCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
@@ -128,6 +128,30 @@ def test_update_dataset(test_session):
     assert updated.updated_at > created.updated_at
 
 
+def test_create_and_update_without_returning(test_session, monkeypatch):
+    """
+    RETURNING 非対応の方言では、入力値と UPDATE 件数（rowcount）から結果を求めることを検証します。
+    """
+    from app.infrastructure.repositories import dataset_repository_impl
+
+    monkeypatch.setattr(
+        dataset_repository_impl, "supports_returning", lambda session, statement: False
+    )
+    repo = DatasetRepositorySQLAlchemy(test_session)
+    created = repo.create(Dataset.create(name="No returning", description="d", meta_data={}))
+    assert repo.get_by_id(created.id).name == "No returning"
+
+    created.name = "Renamed"
+    created.created_at = None
+    updated = repo.update(created)
+    assert updated.name == "Renamed"
+    assert updated.created_at is not None
+
+    created.id = "missing"
+    with pytest.raises(ValueError):
+        repo.update(created)
+
+
 def test_delete_dataset(test_session):
     """
     DatasetRepositorySQLAlchemy.delete() のテスト
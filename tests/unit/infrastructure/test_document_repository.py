@@ -162,3 +162,28 @@ def test_delete_document(test_session):
     assert success is True
     fetched = repo.get_by_id(created.id)
     assert fetched is None
+
+
+def test_list_documents_keyset_with_tied_created_at(test_session):
+    repo = DocumentRepositorySQLAlchemy(test_session)
+    created_at = datetime(2024, 1, 1, 12, 0, 0)
+    ids = []
+    for i in range(5):
+        doc = Document.create(
+            dataset_id="test-dataset-keyset",
+            title=f"Doc {i}",
+            content="content",
+            meta_data={},
+        )
+        # created_at が同一でも (created_at, id) で一意に順序付けられること
+        doc.created_at = created_at
+        ids.append(repo.create(doc).id)
+
+    first = repo.list_documents(dataset_id="test-dataset-keyset", limit=2)
+    last = first[-1]
+    rest = repo.list_documents(
+        dataset_id="test-dataset-keyset",
+        limit=10,
+        after=(last.created_at, last.id),
+    )
+    assert [d.id for d in first + rest] == sorted(ids)
@@ -0,0 +1,266 @@
+import threading
+from unittest.mock import MagicMock
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.domain.repositories.dataset_repository import DatasetRepository
+from app.domain.repositories.document_repository import DocumentRepository
+from app.domain.repositories.knowledge_repository import KnowledgeRepository
+from app.infrastructure.cache import lru as lru_module
+from app.infrastructure.cache.backends import InMemoryCacheBackend
+from app.infrastructure.cache.cached_repositories import (
+    CachedDatasetRepository,
+    CachedDocumentRepository,
+    CachedKnowledgeRepository,
+)
+from app.infrastructure.cache.entity_cache import (
+    EntityCache,
+    document_cache,
+    estimate_size,
+    knowledge_cache,
+)
+from app.infrastructure.cache.lru import LRUCache
+from app.infrastructure.database.connection import REPLICA_SESSION_INFO_KEY
+
+
+def test_lru_expires_entries_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lru_module.time, "monotonic", lambda: now[0])
+    cache = LRUCache("test-ttl", max_entries=10, max_bytes=1000, ttl_seconds=10)
+    cache.put("a", "value", size=10)
+
+    assert cache.get("a") == "value"
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 0, "bytes": 0, "hits": 1, "misses": 1, "evictions": 1}
+
+
+def test_lru_evicts_least_recently_used_by_count_and_bytes():
+    cache = LRUCache("test-capacity", max_entries=3, max_bytes=100, ttl_seconds=60)
+    cache.put("a", 1, size=40)
+    cache.put("b", 2, size=40)
+    cache.get("a")  # a を最近使用したものにする
+    cache.put("c", 3, size=40)  # 合計 120 バイト → 最も古い b を破棄
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["bytes"] == 80
+
+    cache.put("too-large", 4, size=101)
+    assert cache.get("too-large") is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_lru_invalidate_tag_removes_tagged_entries_only():
+    cache = LRUCache("test-tags", max_entries=10, max_bytes=1000, ttl_seconds=60)
+    cache.put("k1", 1, size=1, tags=[("document", "d1")])
+    cache.put("k2", 2, size=1, tags=[("document", "d1")])
+    cache.put("k3", 3, size=1, tags=[("document", "d2")])
+
+    cache.invalidate_tag(("document", "d1"))
+
+    assert cache.get("k1") is None
+    assert cache.get("k2") is None
+    assert cache.get("k3") == 3
+
+
+def test_estimate_size_counts_utf8_text_and_meta_data():
+    small = Knowledge(id="k", document_id="d", knowledge_text="a", meta_data={})
+    large = Knowledge(id="k", document_id="d", knowledge_text="あ" * 1000, meta_data={"x": "y"})
+    assert estimate_size(large) - estimate_size(small) == 3000 - 1 + len('{"x": "y"}') - len("{}")
+
+
+def test_cached_knowledge_repository_reads_through_and_returns_copies():
+    inner = MagicMock(spec=KnowledgeRepository)
+    inner.get_by_id.return_value = Knowledge(id="k1", document_id="d1", knowledge_text="text", meta_data={})
+    repo = CachedKnowledgeRepository(inner)
+
+    first = repo.get_by_id("k1")
+    first.knowledge_text = "changed by caller"
+    second = repo.get_by_id("k1")
+
+    assert second.knowledge_text == "text"
+    inner.get_by_id.assert_called_once_with("k1")
+
+
+def test_cached_knowledge_repository_remembers_missing_entities():
+    inner = MagicMock(spec=KnowledgeRepository)
+    inner.get_by_id.return_value = None
+    repo = CachedKnowledgeRepository(inner)
+
+    assert repo.get_by_id("missing") is None
+    assert repo.get_by_id("missing") is None
+    assert inner.get_by_id.call_count == 1
+
+
+def test_cached_knowledge_repository_invalidates_on_update_and_delete():
+    inner = MagicMock(spec=KnowledgeRepository)
+    knowledge = Knowledge(id="k1", document_id="d1", knowledge_text="text", meta_data={})
+    inner.get_by_id.return_value = knowledge
+    repo = CachedKnowledgeRepository(inner)
+
+    repo.get_by_id("k1")
+    repo.update(knowledge)
+    repo.get_by_id("k1")
+    assert inner.get_by_id.call_count == 2
+
+    inner.delete.return_value = True
+    repo.delete("k1")
+    # 削除したIDはネガティブキャッシュから返す
+    assert repo.get_by_id("k1") is None
+    assert inner.get_by_id.call_count == 2
+
+
+def test_cached_repository_invalidates_even_when_write_fails():
+    inner = MagicMock(spec=DatasetRepository)
+    dataset = Dataset(id="ds1", name="name", meta_data={})
+    inner.get_by_id.return_value = dataset
+    inner.update.side_effect = RuntimeError("db error")
+    repo = CachedDatasetRepository(inner)
+
+    repo.get_by_id("ds1")
+    try:
+        repo.update(dataset)
+    except RuntimeError:
+        pass
+    repo.get_by_id("ds1")
+    assert inner.get_by_id.call_count == 2
+
+
+def test_deleting_document_invalidates_its_knowledges():
+    document_inner = MagicMock(spec=DocumentRepository)
+    document_inner.get_by_id.return_value = Document(id="d1", dataset_id="ds1", title="t", meta_data={})
+    knowledge_inner = MagicMock(spec=KnowledgeRepository)
+    knowledge_inner.get_by_id.side_effect = lambda knowledge_id: Knowledge(
+        id=knowledge_id, document_id="d1" if knowledge_id == "k1" else "d2", meta_data={}
+    )
+    documents = CachedDocumentRepository(document_inner)
+    knowledges = CachedKnowledgeRepository(knowledge_inner)
+
+    documents.get_by_id("d1")
+    knowledges.get_by_id("k1")
+    knowledges.get_by_id("k2")
+    documents.delete("d1")
+
+    assert document_cache.l1.get("d1") is None
+    assert knowledge_cache.l1.get("k1") is None
+    assert knowledge_cache.l1.get("k2") is not None
+
+
+def test_deleting_dataset_invalidates_its_documents_and_knowledges():
+    document_inner = MagicMock(spec=DocumentRepository)
+    document_inner.get_by_id.side_effect = lambda document_id: Document(
+        id=document_id, dataset_id="ds1" if document_id == "d1" else "ds2", meta_data={}
+    )
+    knowledge_inner = MagicMock(spec=KnowledgeRepository)
+    knowledge_inner.get_by_id.return_value = Knowledge(id="k1", document_id="d1", meta_data={})
+    documents = CachedDocumentRepository(document_inner)
+    knowledges = CachedKnowledgeRepository(knowledge_inner)
+
+    documents.get_by_id("d1")
+    documents.get_by_id("d2")
+    knowledges.get_by_id("k1")
+    CachedDatasetRepository(MagicMock(spec=DatasetRepository)).delete("ds1")
+
+    assert document_cache.l1.get("d1") is None
+    assert document_cache.l1.get("d2") is not None
+    assert knowledge_cache.l1.get("k1") is None
+
+
+def test_cached_repository_does_not_fill_cache_from_replica_reads():
+    replica_inner = MagicMock(spec=KnowledgeRepository)
+    replica_inner.session = MagicMock(info={REPLICA_SESSION_INFO_KEY: True})
+    replica_inner.get_by_id.return_value = Knowledge(id="k-replica", document_id="d1", meta_data={})
+    replica_inner.get_many.return_value = [Knowledge(id="k-many", document_id="d1", meta_data={})]
+    replica = CachedKnowledgeRepository(replica_inner)
+
+    assert replica.get_by_id("k-replica").id == "k-replica"
+    assert [k.id for k in replica.get_many(["k-many"])] == ["k-many"]
+    assert knowledge_cache.get("k-replica") is None
+    assert knowledge_cache.get("k-many") is None
+
+    # プライマリのセッションで読んだ結果は登録し、レプリカ側からも参照できる
+    primary_inner = MagicMock(spec=KnowledgeRepository)
+    primary_inner.session = MagicMock(info={})
+    primary_inner.get_by_id.return_value = Knowledge(id="k-replica", document_id="d1", meta_data={})
+    CachedKnowledgeRepository(primary_inner).get_by_id("k-replica")
+    replica.get_by_id("k-replica")
+    assert replica_inner.get_by_id.call_count == 1
+
+
+def test_primary_reads_are_not_coalesced_with_replica_reads():
+    replica_started = threading.Event()
+    release_replica = threading.Event()
+
+    def replica_read(knowledge_id):
+        replica_started.set()
+        release_replica.wait(2)
+        return Knowledge(id=knowledge_id, document_id="d1", knowledge_text="stale", meta_data={})
+
+    replica_inner = MagicMock(spec=KnowledgeRepository)
+    replica_inner.session = MagicMock(info={REPLICA_SESSION_INFO_KEY: True})
+    replica_inner.get_by_id.side_effect = replica_read
+    primary_inner = MagicMock(spec=KnowledgeRepository)
+    primary_inner.session = MagicMock(info={})
+    primary_inner.get_by_id.return_value = Knowledge(
+        id="k-bind", document_id="d1", knowledge_text="fresh", meta_data={}
+    )
+
+    replica_thread = threading.Thread(target=CachedKnowledgeRepository(replica_inner).get_by_id, args=("k-bind",))
+    replica_thread.start()
+    assert replica_started.wait(2)
+    try:
+        # レプリカの読み取りが実行中でも、プライマリに固定された読み取りはその結果を待たずに自身で読む
+        assert CachedKnowledgeRepository(primary_inner).get_by_id("k-bind").knowledge_text == "fresh"
+    finally:
+        release_replica.set()
+        replica_thread.join(2)
+    primary_inner.get_by_id.assert_called_once_with("k-bind")
+
+
+def test_cached_repository_does_not_write_back_rows_invalidated_during_load():
+    inner = MagicMock(spec=KnowledgeRepository)
+    repo = CachedKnowledgeRepository(inner)
+    stale = Knowledge(id="k-race", document_id="d1", knowledge_text="stale", meta_data={})
+
+    def read_then_concurrent_update(knowledge_id):
+        # 読み込んだ直後に別のリクエストが更新をコミットし、キャッシュを無効化する
+        inner.update.return_value = stale
+        repo.update(stale)
+        return stale
+
+    inner.get_by_id.side_effect = read_then_concurrent_update
+    inner.get_many.side_effect = lambda ids: [read_then_concurrent_update(i) for i in ids]
+
+    assert repo.get_by_id("k-race").knowledge_text == "stale"
+    assert knowledge_cache.get("k-race") is None
+    assert [k.id for k in repo.get_many(["k-race"])] == ["k-race"]
+    assert knowledge_cache.get("k-race") is None
+
+    # 無効化されなかった読み込みは登録する
+    inner.get_by_id.side_effect = None
+    inner.get_by_id.return_value = stale
+    repo.get_by_id("k-race")
+    assert knowledge_cache.get("k-race") is not None
+
+
+def test_entity_cache_fill_discards_entries_invalidated_after_the_generation_check():
+    l2 = InMemoryCacheBackend()
+    cache = EntityCache("test-fill", Dataset, LRUCache("test-fill", 10, 10000, 60), l2)
+    dataset = Dataset(id="ds-fill", name="stale", meta_data={})
+
+    generation = cache.generation("ds-fill")
+    cache.invalidate("ds-fill")
+    cache.fill("ds-fill", dataset, generation)
+    assert cache.get("ds-fill") is None
+
+    # タグ単位の無効化もキャッシュ全体の世代を進めるため、その間の読み込みは登録しない
+    generation = cache.generation("ds-fill")
+    cache.invalidate_tag("dataset:other")
+    cache.fill("ds-fill", dataset, generation)
+    assert cache.get("ds-fill") is None
+
+    cache.fill("ds-fill", dataset, cache.generation("ds-fill"))
+    assert cache.get("ds-fill").name == "stale"
@@ -0,0 +1,151 @@
+import json
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.infrastructure.cache import existence
+from app.infrastructure.cache.backends import InMemoryCacheBackend
+from app.infrastructure.cache.cached_repositories import CachedKnowledgeRepository
+from app.infrastructure.cache.entity_cache import handle_invalidation_message
+from app.infrastructure.cache.existence import (
+    BloomFilter,
+    ExistenceCache,
+    knowledge_ids,
+    rebuild_id_filters,
+)
+from app.infrastructure.cache.lru import LRUCache
+from app.infrastructure.database.connection import REPLICA_SESSION_INFO_KEY, Base
+from app.infrastructure.repositories.dataset_repository_impl import (
+    DatasetRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.document_repository_impl import (
+    DocumentRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.knowledge_repository_impl import (
+    KnowledgeRepositorySQLAlchemy,
+)
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def document(session_factory):
+    with session_factory() as session:
+        dataset = DatasetRepositorySQLAlchemy(session).create(Dataset.create(name="Ids"))
+        return DocumentRepositorySQLAlchemy(session).create(
+            Document.create(dataset_id=dataset.id, title="Doc", content="body")
+        )
+
+
+def _new_cache(l2=None):
+    return ExistenceCache("knowledges", LRUCache("test.missing", 100, 6400, 60), l2)
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(5000, 0.01)
+    ids = [str(uuid.uuid4()) for _ in range(5000)]
+    for entity_id in ids:
+        bloom.add(entity_id)
+
+    assert all(entity_id in bloom for entity_id in ids)
+    false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(5000))
+    assert false_positives < 5000 * 0.03
+
+
+def test_filter_answers_unknown_ids_and_created_ids_pass_through():
+    cache = _new_cache()
+    cache.rebuild(lambda: ["k1", "k2"], 2)
+
+    assert cache.is_missing("unknown")
+    assert not cache.is_missing("k1")
+    cache.add(["k3"])
+    assert not cache.is_missing("k3")
+
+
+def test_created_id_clears_negative_entry():
+    cache = _new_cache()
+    cache.mark_missing("k1")
+    assert cache.is_missing("k1")
+
+    cache.add(["k1"])
+    assert not cache.is_missing("k1")
+
+
+def test_ids_created_during_rebuild_are_kept():
+    cache = _new_cache()
+
+    def load_ids():
+        # 読み取り中に作成された行（スキャン結果には含まれない）
+        cache.add(["created-during-build"])
+        yield "existing"
+
+    cache.rebuild(load_ids, 1)
+
+    assert not cache.is_missing("existing")
+    assert not cache.is_missing("created-during-build")
+
+
+def test_created_ids_are_published_to_other_nodes():
+    backend = InMemoryCacheBackend()
+    messages = []
+    backend.subscribe(f"{existence.CACHE_KEY_PREFIX}:invalidate", messages.append)
+    _new_cache(backend).publish_created(["k1", "k2"])
+
+    assert json.loads(messages[0])["value"] == ["k1", "k2"]
+
+    # 他ノード発のメッセージとして受け取ると、その名前の ExistenceCache に反映される
+    knowledge_ids.mark_missing("k1")
+    handle_invalidation_message(
+        json.dumps({"origin": "other", "cache": "ids:knowledges", "op": "created", "value": ["k1"]})
+    )
+    assert not knowledge_ids.is_missing("k1")
+
+
+def test_commit_of_created_rows_clears_negative_entries(session_factory, document):
+    knowledge_id = str(uuid.uuid4())
+    with session_factory() as session:
+        repo = CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session))
+        assert repo.get_by_id(knowledge_id) is None
+        assert knowledge_ids.is_missing(knowledge_id)
+
+        KnowledgeRepositorySQLAlchemy(session).create(
+            Knowledge(id=knowledge_id, document_id=document.id, knowledge_text="text", meta_data={})
+        )
+        assert repo.get_by_id(knowledge_id).id == knowledge_id
+
+
+def test_replica_misses_are_not_remembered(session_factory, document):
+    knowledge_id = str(uuid.uuid4())
+    with session_factory(info={REPLICA_SESSION_INFO_KEY: True}) as replica_session:
+        replica = CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(replica_session))
+        # 作成がレプリカに未反映の場合を想定し、レプリカで見つからなくても覚えない
+        assert replica.get_by_id(knowledge_id) is None
+        assert not knowledge_ids.is_missing(knowledge_id)
+
+    with session_factory() as session:
+        assert CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(session)).get_by_id(knowledge_id) is None
+        assert knowledge_ids.is_missing(knowledge_id)
+
+
+def test_rebuild_id_filters_reads_existing_ids(monkeypatch, session_factory, document):
+    monkeypatch.setattr(existence, "ID_FILTER_ENABLED", True)
+    with session_factory() as session:
+        created = KnowledgeRepositorySQLAlchemy(session).create_many(
+            [Knowledge(document_id=document.id, sequence=i, knowledge_text="t", meta_data={}) for i in range(3)]
+        )
+
+    rebuild_id_filters(session_factory)
+
+    assert not any(knowledge_ids.is_missing(knowledge_id) for knowledge_id in created)
+    assert knowledge_ids.is_missing(str(uuid.uuid4()))
+    assert not existence.document_ids.is_missing(document.id)
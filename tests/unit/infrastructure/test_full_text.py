@@ -0,0 +1,162 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mssql, postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.domain.repositories.knowledge_search_repository import SearchUnavailableError
+from app.infrastructure.database.connection import Base
+from app.infrastructure.database.models import DatasetModel, DocumentModel, KnowledgeModel
+from app.infrastructure.repositories import knowledge_search_repository_impl
+from app.infrastructure.repositories.knowledge_search_repository_impl import (
+    KnowledgeSearchRepositoryDatabase,
+    KnowledgeSearchRepositoryInvertedIndex,
+    get_knowledge_search_repository,
+)
+from app.infrastructure.search.full_text import create_full_text_index, full_text_search, search_statement
+from app.infrastructure.search.knowledge_index import KnowledgeIndex
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    session = sessionmaker(bind=engine)()
+    session.add_all(
+        [
+            DatasetModel(id="ds-1", name="Dataset 1"),
+            DatasetModel(id="ds-2", name="Dataset 2"),
+            DocumentModel(id="doc-1", dataset_id="ds-1", title="Doc 1", content="body"),
+            DocumentModel(id="doc-2", dataset_id="ds-2", title="Doc 2", content="body"),
+        ]
+    )
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def add_knowledge(session, knowledge_id, text, document_id="doc-1", is_active=True, meta_data=None):
+    session.add(
+        KnowledgeModel(
+            id=knowledge_id,
+            document_id=document_id,
+            sequence=0,
+            knowledge_text=text,
+            is_active=is_active,
+            meta_data=meta_data or {},
+        )
+    )
+    session.commit()
+
+
+def test_create_full_text_index_indexes_existing_rows_once(engine, session):
+    add_knowledge(session, "k1", "東京都の天気は晴れ")
+
+    assert create_full_text_index(engine) is True
+    assert create_full_text_index(engine) is False
+
+    ranked, total = full_text_search(session, "東京都")
+    assert [knowledge_id for knowledge_id, _ in ranked] == ["k1"] and total == 1
+
+
+def test_search_matches_all_terms_and_follows_writes(engine, session):
+    create_full_text_index(engine)
+    add_knowledge(session, "k1", "東京都の天気は晴れ")
+    add_knowledge(session, "k2", "京都の天気は雨")
+    add_knowledge(session, "k3", "東京都の天気は雪", document_id="doc-2")
+    add_knowledge(session, "k4", "東京都の天気は曇り", is_active=False)
+
+    ranked, total = full_text_search(session, "東京都 天気は")
+    assert total == 2
+    assert sorted(knowledge_id for knowledge_id, _ in ranked) == ["k1", "k3"]
+    assert all(score > 0 for _, score in ranked)
+
+    # 3文字未満の語は LIKE で照合する
+    ranked, total = full_text_search(session, "天気 雨")
+    assert (ranked, total) == ([("k2", 0.0)], 1)
+
+    ranked, total = full_text_search(session, "東京都", dataset_id="ds-2")
+    assert [knowledge_id for knowledge_id, _ in ranked] == ["k3"]
+
+    ranked, total = full_text_search(session, "天気", limit=1)
+    assert len(ranked) == 1 and total == 3
+
+    # トリガーで更新・削除に追従する
+    session.get(KnowledgeModel, "k1").knowledge_text = "大阪府の天気は晴れ"
+    session.delete(session.get(KnowledgeModel, "k3"))
+    session.commit()
+    assert full_text_search(session, "東京都") == ([], 0)
+    assert [knowledge_id for knowledge_id, _ in full_text_search(session, "大阪府")[0]] == ["k1"]
+
+    assert full_text_search(session, "   ") == ([], 0)
+
+
+def test_search_escapes_quotes_and_like_wildcards(engine, session):
+    create_full_text_index(engine)
+    add_knowledge(session, "k1", 'say "hello" 100% done')
+    add_knowledge(session, "k2", "100 items")
+
+    assert [knowledge_id for knowledge_id, _ in full_text_search(session, '"hello"')[0]] == ["k1"]
+    assert [knowledge_id for knowledge_id, _ in full_text_search(session, "0%")[0]] == ["k1"]
+
+
+def test_both_backends_filter_search_hits_by_meta(engine, session, tmp_path):
+    create_full_text_index(engine)
+    # meta に一致するヒットが上位の候補の外にあっても返し、総件数は一致した件数にする
+    for i in range(6):
+        add_knowledge(session, f"k{i}", "天気" * (6 - i), meta_data={"source": "faq" if i >= 4 else "web"})
+    add_knowledge(session, "k-number", "天気", meta_data={"source": 1})
+    index = KnowledgeIndex(str(tmp_path / "index"))
+    index.rebuild(
+        lambda: [("doc-1", "ds-1")],
+        lambda: [(f"k{i}", "doc-1", "天気" * (6 - i)) for i in range(6)] + [("k-number", "doc-1", "天気")],
+    )
+
+    for repository in (
+        KnowledgeSearchRepositoryDatabase(session),
+        KnowledgeSearchRepositoryInvertedIndex(index, session=session),
+    ):
+        hits, total = repository.search("天気", limit=1, meta={"source": "faq"})
+        assert total == 2 and [hit.knowledge_id for hit in hits] == ["k4"]
+        hits, total = repository.search("天気", meta={"source": "none"})
+        assert (hits, total) == ([], 0)
+
+
+def test_search_statements_for_server_dialects():
+    pg = str(search_statement("postgresql", "東京 天気", "ds-1", 5).compile(dialect=postgresql.dialect()))
+    # GIN インデックスの式と同じ形で、構成はリテラルで書く
+    assert "to_tsvector('simple'::regconfig, coalesce(knowledges.knowledge_text, '')) @@ plainto_tsquery" in pg
+    assert "ts_rank_cd" in pg and "documents.dataset_id" in pg
+
+    statement = search_statement("mssql", 'a"b 天気', None, 5)
+    sql = str(statement.compile(dialect=mssql.dialect()))
+    assert "containstable(knowledges, knowledge_text," in sql
+    assert "JOIN knowledges ON knowledges.id = ft.[KEY]" in sql
+    assert "knowledges.is_active = 1" in sql
+    params = statement.compile(dialect=mssql.dialect()).params
+    assert '"a""b" AND "天気"' in params.values()
+
+
+def test_unsupported_dialect_is_unavailable():
+    with pytest.raises(SearchUnavailableError):
+        search_statement("oracle", "天気", None, 10)
+
+
+def test_repository_and_backend_selection(engine, session, monkeypatch):
+    create_full_text_index(engine)
+    add_knowledge(session, "k1", "ベクトル検索の実装")
+
+    hits, total = KnowledgeSearchRepositoryDatabase(session).search("ベクトル検索")
+    assert total == 1 and hits[0].knowledge_id == "k1" and hits[0].score > 0
+
+    assert isinstance(get_knowledge_search_repository(session), KnowledgeSearchRepositoryInvertedIndex)
+    monkeypatch.setattr(knowledge_search_repository_impl, "SEARCH_BACKEND", "database")
+    assert isinstance(get_knowledge_search_repository(session), KnowledgeSearchRepositoryDatabase)
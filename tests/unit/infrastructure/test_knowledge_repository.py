@@ -158,3 +158,70 @@ def test_delete_knowledge(test_session):
     assert success is True
     fetched = repo.get_by_id(created.id)
     assert fetched is None
+
+
+def test_create_many_knowledges(test_session, monkeypatch):
+    from app.infrastructure.repositories import knowledge_repository_impl
+
+    # バッチ境界をまたぐ件数で検証する
+    monkeypatch.setattr(knowledge_repository_impl, "BULK_INSERT_BATCH_SIZE", 2)
+    repo = KnowledgeRepositorySQLAlchemy(test_session)
+    doc = create_document_for_knowledge(test_session)
+    knowledges = [
+        Knowledge.create(
+            document_id=doc.id,
+            sequence=i,
+            knowledge_text=f"Bulk {i}",
+            meta_data={"k": i},
+        )
+        for i in range(5)
+    ]
+
+    ids = repo.create_many(knowledges)
+    assert len(ids) == 5
+    assert len(set(ids)) == 5
+
+    result = repo.list_knowledges(document_id=doc.id, skip=0, limit=10)
+    assert [k.sequence for k in result] == [0, 1, 2, 3, 4]
+    assert repo.count_knowledges(doc.id) == 5
+    fetched = repo.get_by_id(ids[3])
+    assert fetched.knowledge_text == "Bulk 3"
+    assert fetched.meta_data == {"k": 3}
+
+
+def test_writes_are_single_statements(test_session):
+    from sqlalchemy import event
+
+    repo = KnowledgeRepositorySQLAlchemy(test_session)
+    doc = create_document_for_knowledge(test_session)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(test_session.get_bind(), "before_cursor_execute", record)
+    try:
+        created = repo.create(
+            Knowledge.create(document_id=doc.id, sequence=0, knowledge_text="one")
+        )
+        # 本体の INSERT・集計値（document_stats / dataset_stats）の差分更新・埋め込みの INSERT・
+        # 変更履歴の INSERT のみで、読み直しの SELECT は無い
+        assert statements == ["INSERT", "UPDATE", "UPDATE", "INSERT", "INSERT"]
+        assert created.created_at is not None
+
+        statements.clear()
+        created.knowledge_text = "updated"
+        updated = repo.update(created)
+        assert statements == ["UPDATE", "UPDATE", "UPDATE", "UPDATE", "INSERT"]
+        assert updated.knowledge_text == "updated"
+        assert updated.document_id == doc.id
+
+        statements.clear()
+        assert repo.delete(created.id) is True
+        assert statements == ["UPDATE", "UPDATE", "DELETE", "DELETE", "INSERT"]
+    finally:
+        event.remove(test_session.get_bind(), "before_cursor_execute", record)
+
+    with pytest.raises(ValueError):
+        repo.update(created)
+    assert repo.delete(created.id) is False
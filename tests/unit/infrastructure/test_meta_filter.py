@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.infrastructure.database.connection import Base
+from app.infrastructure.database.meta_filter import (
+    meta_clause,
+    meta_expression_sql,
+    meta_index_statements,
+    meta_key,
+    meta_string_type_sql,
+)
+from app.domain.entities.knowledge import Knowledge
+from app.infrastructure.database.models import KnowledgeModel
+from app.infrastructure.repositories.knowledge_repository_impl import KnowledgeRepositorySQLAlchemy
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_expression_is_dialect_specific_and_rejects_unsafe_keys():
+    assert meta_expression_sql("source", "sqlite") == "json_extract(meta_data, '$.\"source\"')"
+    assert meta_expression_sql("source", "postgresql", "knowledges.meta_data") == "(knowledges.meta_data ->> 'source')"
+    assert meta_expression_sql("source", "mssql") == (
+        "CAST(JSON_VALUE(meta_data, '$.\"source\"') AS NVARCHAR(450))"
+    )
+    assert meta_expression_sql("source", "oracle") is None
+    for key in ["", "a'b", "a.b", "x" * 41]:
+        with pytest.raises(ValueError):
+            meta_expression_sql(key, "sqlite")
+    assert meta_key({"b": "2", "a": "1"}) == (("a", "1"), ("b", "2"))
+    assert meta_key(None) == ()
+
+
+def test_list_and_count_filter_by_meta(session):
+    session.add_all(
+        [
+            KnowledgeModel(id="k1", document_id="doc-1", sequence=0, knowledge_text="a", meta_data={"source": "faq"}),
+            KnowledgeModel(
+                id="k2", document_id="doc-1", sequence=1, knowledge_text="b", meta_data={"source": "faq", "lang": "en"}
+            ),
+            KnowledgeModel(id="k3", document_id="doc-1", sequence=2, knowledge_text="c", meta_data={"source": "blog"}),
+            KnowledgeModel(id="k4", document_id="doc-1", sequence=3, knowledge_text="d", meta_data={}),
+            KnowledgeModel(id="k5", document_id="doc-2", sequence=0, knowledge_text="e", meta_data={"source": "faq"}),
+        ]
+    )
+    session.commit()
+    repository = KnowledgeRepositorySQLAlchemy(session)
+
+    assert [k.id for k in repository.list_knowledges("doc-1", meta={"source": "faq"})] == ["k1", "k2"]
+    assert [k.id for k in repository.list_knowledges("doc-1", meta={"source": "faq", "lang": "en"})] == ["k2"]
+    assert [k.id for k in repository.list_knowledges("doc-1", after=(0, "k1"), meta={"source": "faq"})] == ["k2"]
+    assert repository.count_knowledges("doc-1", meta={"source": "faq"}) == 2
+    assert repository.count_knowledges("doc-1", meta={"missing": "x"}) == 0
+    assert repository.count_knowledges("doc-1", meta={}) == 4
+
+
+def test_non_string_values_match_the_same_way_as_matches_meta(session):
+    values = {"k1": "1", "k2": 1, "k3": True, "k4": "true", "k5": 1.5, "k6": None, "k7": ["1"]}
+    session.add_all(
+        [
+            KnowledgeModel(id=knowledge_id, document_id="doc-1", sequence=0, knowledge_text="a", meta_data={"page": v})
+            for knowledge_id, v in values.items()
+        ]
+    )
+    session.commit()
+    repository = KnowledgeRepositorySQLAlchemy(session)
+
+    for value in ["1", "true", "1.5", "None", "null"]:
+        expected = [k for k, v in values.items() if Knowledge(meta_data={"page": v}).matches_meta({"page": value})]
+        assert [k.id for k in repository.list_knowledges("doc-1", meta={"page": value})] == expected, value
+    # 文字列の値だけが一致する
+    assert [k.id for k in repository.list_knowledges("doc-1", meta={"page": "1"})] == ["k1"]
+    assert [k.id for k in repository.list_knowledges("doc-1", meta={"page": "true"})] == ["k4"]
+
+    assert meta_string_type_sql("page", "postgresql", "knowledges.meta_data") == (
+        "json_typeof(knowledges.meta_data -> 'page') = 'string'"
+    )
+    assert meta_string_type_sql("page", "mssql") == (
+        "EXISTS (SELECT 1 FROM OPENJSON(meta_data) WHERE [key] = N'page' AND [type] = 1)"
+    )
+    assert meta_string_type_sql("page", "oracle") is None
+    with pytest.raises(ValueError):
+        meta_string_type_sql("a'b", "sqlite")
+
+
+def test_generated_index_is_used_by_filtered_query(session):
+    create, drop = meta_index_statements("knowledges", "source")
+    for statement in create["sqlite"]:
+        session.execute(text(statement))
+    stmt = select(KnowledgeModel.id).where(
+        KnowledgeModel.document_id == "doc-1", meta_clause(session, KnowledgeModel, {"source": "faq"})
+    )
+    sql = str(stmt.compile(session.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = " ".join(str(row) for row in session.execute(text("EXPLAIN QUERY PLAN " + sql)))
+    assert "ix_knowledges_meta_source" in plan
+
+    assert create["mssql"] == [
+        "ALTER TABLE knowledges ADD meta_source AS CAST(JSON_VALUE(meta_data, '$.\"source\"') AS NVARCHAR(450))",
+        "CREATE INDEX ix_knowledges_meta_source ON knowledges (document_id, meta_source)",
+    ]
+    assert create["postgresql"] == [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_knowledges_meta_source ON knowledges "
+        "(document_id, (meta_data ->> 'source'))"
+    ]
+    assert meta_index_statements("datasets", "team")[0]["sqlite"] == [
+        "CREATE INDEX IF NOT EXISTS ix_datasets_meta_team ON datasets (json_extract(meta_data, '$.\"team\"'))"
+    ]
+    for statement in drop["sqlite"]:
+        session.execute(text(statement))
+    with pytest.raises(ValueError):
+        meta_index_statements("changes", "source")
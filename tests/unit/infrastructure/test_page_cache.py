@@ -0,0 +1,177 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.infrastructure.cache.backends import InMemoryCacheBackend
+from app.infrastructure.cache.cached_repositories import (
+    CachedDatasetRepository,
+    CachedKnowledgeRepository,
+)
+from app.infrastructure.cache.page_cache import VersionCounters, versions
+from app.infrastructure.database.connection import REPLICA_SESSION_INFO_KEY, Base
+from app.infrastructure.repositories.dataset_repository_impl import (
+    DatasetRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.document_repository_impl import (
+    DocumentRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.knowledge_repository_impl import (
+    KnowledgeRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.unit_of_work_impl import UnitOfWorkSQLAlchemy
+
+
+@pytest.fixture(scope="function")
+def test_session():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def document(test_session):
+    dataset = DatasetRepositorySQLAlchemy(test_session).create(Dataset.create(name="Pages"))
+    return DocumentRepositorySQLAlchemy(test_session).create(
+        Document.create(dataset_id=dataset.id, title="Doc", content="body")
+    )
+
+
+def count_selects(session):
+    statements = []
+    event.listen(
+        session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement)
+        if statement.lstrip().upper().startswith("SELECT")
+        else None,
+    )
+    return statements
+
+
+def test_list_is_served_from_cache_until_parent_changes(test_session, document):
+    inner = KnowledgeRepositorySQLAlchemy(test_session)
+    inner.create(Knowledge(document_id=document.id, sequence=0, knowledge_text="first"))
+    repo = CachedKnowledgeRepository(inner)
+    selects = count_selects(test_session)
+
+    assert [k.knowledge_text for k in repo.list_knowledges(document.id)] == ["first"]
+    assert repo.summarize_knowledges(document.id)[0] == 1
+    assert len(selects) == 2
+    repo.list_knowledges(document.id)[0].knowledge_text = "mutated by caller"
+    assert [k.knowledge_text for k in repo.list_knowledges(document.id)] == ["first"]
+    assert repo.summarize_knowledges(document.id)[0] == 1
+    assert len(selects) == 2
+
+    inner.create(Knowledge(document_id=document.id, sequence=1, knowledge_text="second"))
+    assert [k.knowledge_text for k in repo.list_knowledges(document.id)] == ["first", "second"]
+    assert repo.summarize_knowledges(document.id)[0] == 2
+
+
+def test_dataset_summary_is_served_from_cache_until_a_dataset_changes(test_session):
+    inner = DatasetRepositorySQLAlchemy(test_session)
+    first = inner.create(Dataset.create(name="first"))
+    repo = CachedDatasetRepository(inner)
+    selects = count_selects(test_session)
+
+    assert repo.summarize_datasets()[0] == 1
+    assert repo.count_datasets() == 1
+    assert len(selects) == 2
+    assert repo.summarize_datasets()[0] == 1
+    assert repo.count_datasets() == 1
+    assert len(selects) == 2
+
+    first.name = "renamed"
+    updated = inner.update(first)
+    assert repo.summarize_datasets() == (1, updated.updated_at)
+    second = inner.create(Dataset.create(name="second"))
+    assert repo.summarize_datasets()[0] == 2
+    inner.delete(second.id)
+    assert repo.count_datasets() == 1
+
+
+def test_replica_reads_use_but_do_not_fill_the_page_cache(test_session, document):
+    replica_session = sessionmaker(bind=test_session.get_bind(), info={REPLICA_SESSION_INFO_KEY: True})()
+    KnowledgeRepositorySQLAlchemy(test_session).create(
+        Knowledge(document_id=document.id, sequence=0, knowledge_text="first")
+    )
+    replica = CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(replica_session))
+    selects = count_selects(test_session)
+
+    # レプリカから読んだページは登録しない（遅延した古い行が新しいバージョンで残らないように）
+    assert [k.knowledge_text for k in replica.list_knowledges(document.id)] == ["first"]
+    assert [k.knowledge_text for k in replica.list_knowledges(document.id)] == ["first"]
+    assert len(selects) == 2
+
+    # プライマリから読んだページはレプリカ側からも参照する
+    CachedKnowledgeRepository(KnowledgeRepositorySQLAlchemy(test_session)).list_knowledges(document.id)
+    assert len(selects) == 3
+    assert [k.knowledge_text for k in replica.list_knowledges(document.id)] == ["first"]
+    assert len(selects) == 3
+    replica_session.close()
+
+
+def test_each_write_bumps_the_parent_version_after_commit(test_session, document):
+    repo = KnowledgeRepositorySQLAlchemy(test_session)
+    scope = ("knowledges", document.id)
+    start = versions.get(scope)
+
+    created = repo.create(Knowledge(document_id=document.id, sequence=0))
+    repo.create_many([Knowledge(document_id=document.id, sequence=i) for i in (1, 2)])
+    created.knowledge_text = "changed"
+    repo.update(created)
+    repo.delete(created.id)
+    assert versions.get(scope) == start + 4
+
+    assert repo.delete("missing") is False
+    assert versions.get(scope) == start + 4
+
+
+def test_version_is_not_bumped_for_rolled_back_or_uncommitted_writes(test_session, document):
+    scope = ("knowledges", document.id)
+    start = versions.get(scope)
+
+    with UnitOfWorkSQLAlchemy(test_session) as uow:
+        uow.knowledges.create(Knowledge(document_id=document.id, sequence=0))
+        assert versions.get(scope) == start
+    # コミットせずに抜けたためロールバックされ、予約も破棄される
+    assert versions.get(scope) == start
+    test_session.commit()
+    assert versions.get(scope) == start
+
+    with UnitOfWorkSQLAlchemy(test_session) as uow:
+        uow.knowledges.create(Knowledge(document_id=document.id, sequence=0))
+        with test_session.begin_nested():
+            pass  # SAVEPOINT の解放ではまだ反映しない
+        assert versions.get(scope) == start
+        uow.commit()
+    assert versions.get(scope) == start + 1
+
+
+def test_deleting_document_bumps_dataset_and_document_versions(test_session, document):
+    documents_scope = ("documents", document.dataset_id)
+    knowledges_scope = ("knowledges", document.id)
+    before = (versions.get(documents_scope), versions.get(knowledges_scope))
+
+    assert DocumentRepositorySQLAlchemy(test_session).delete(document.id) is True
+
+    assert versions.get(documents_scope) == before[0] + 1
+    assert versions.get(knowledges_scope) == before[1] + 1
+
+
+def test_shared_counters_are_visible_to_every_node():
+    backend = InMemoryCacheBackend()
+    node_a = VersionCounters(backend, key_prefix="kapi")
+    node_b = VersionCounters(backend, key_prefix="kapi")
+
+    assert node_b.get(("knowledges", "d1")) == 0
+    node_a.bump(("knowledges", "d1"))
+    assert node_b.get(("knowledges", "d1")) == 1
+    assert node_b.get(("knowledges", "d2")) == 0
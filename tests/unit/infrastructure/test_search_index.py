@@ -0,0 +1,400 @@
+import json
+import os
+import time
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.domain.repositories.knowledge_search_repository import SearchUnavailableError
+from app.infrastructure.cache.backends import InMemoryCacheBackend
+from app.infrastructure.cache.entity_cache import handle_invalidation_message
+from app.infrastructure.database.connection import Base
+from app.infrastructure.database.models import KnowledgeModel
+from app.infrastructure.repositories.dataset_repository_impl import (
+    DatasetRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.document_repository_impl import (
+    DocumentRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.knowledge_repository_impl import (
+    KnowledgeRepositorySQLAlchemy,
+)
+from app.infrastructure.search import knowledge_index as search
+from app.infrastructure.search.bm25 import idf, term_score
+from app.infrastructure.search.inverted_index import InvertedIndex
+from app.infrastructure.search.knowledge_index import (
+    KnowledgeIndex,
+    knowledge_index,
+    rebuild_search_index,
+)
+from app.infrastructure.search.segment import (
+    Segment,
+    merge_segments,
+    read_deletes,
+    write_deletes,
+    write_segment,
+)
+from app.infrastructure.search.tokenizer import tokenize
+
+
+@pytest.fixture
+def session_factory():
+    # 索引のスレッドからも同じインメモリDBを読めるよう、接続を共有する
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False, connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return str(tmp_path / "index")
+
+
+def _ids(index, query, **kwargs):
+    ranked, _ = index.search(query, **kwargs)
+    return [knowledge_id for knowledge_id, _ in ranked]
+
+
+def _build(index, knowledges, documents=(("doc-1", "ds-1"),)):
+    index.rebuild(lambda: list(documents), lambda: list(knowledges))
+
+
+def _write(path, texts):
+    # texts: [(Knowledge ID, ドキュメントID, 本文)] を InvertedIndex 経由でセグメントに書き出す
+    memtable = InvertedIndex()
+    for knowledge_id, document_id, text in texts:
+        memtable.add(knowledge_id, document_id, text)
+    documents = memtable.snapshot()
+    postings = {}
+    for ordinal, (_, _, counts) in enumerate(documents):
+        for term, count in counts.items():
+            postings.setdefault(term.encode("utf-8"), []).append((ordinal, count))
+    write_segment(
+        path,
+        [(knowledge_id, document_id, sum(counts.values())) for knowledge_id, document_id, counts in documents],
+        sorted(postings.items()),
+    )
+    return Segment(path)
+
+
+def test_tokenize_normalizes_and_splits_into_bigrams():
+    # 全角英数字は NFKC で半角に、英字は小文字に揃え、記号・空白は区切りとして捨てる
+    assert tokenize("ＡＰＩ、東京都") == ["ap", "pi", "東京", "京都"]
+    assert tokenize("猫 と 犬") == ["猫", "と", "犬"]
+    assert tokenize("") == []
+
+
+def test_memtable_replaces_and_removes_postings():
+    memtable = InvertedIndex()
+    memtable.add("k1", "doc-1", "古い本文")
+    memtable.add("k1", "doc-1", "新しい本文")
+    memtable.add("k2", "doc-2", "別の本文")
+
+    assert "古い" not in memtable.postings
+    assert memtable.postings["本文"] == {"k1": 1, "k2": 1}
+    assert sorted(memtable.terms_with_char("本")) == ["い本", "の本", "本文"]
+    assert memtable.length("k1") == 4 and memtable.total_length == 7
+    memtable.remove_document("doc-2")
+    assert [knowledge_id for knowledge_id, _, _ in memtable.snapshot()] == ["k1"]
+    memtable.remove("k1")
+    assert len(memtable) == 0 and memtable.postings == {} and memtable.total_length == 0
+
+
+def test_segment_round_trip(tmp_path):
+    segment = _write(
+        str(tmp_path / "a.kseg"),
+        [("k2", "doc-b", "東京都の天気"), ("k1", "doc-a", "京都の天気。京都"), ("k3", "doc-b", "猫")],
+    )
+
+    assert (segment.doc_count, segment.document_count) == (3, 2)
+    assert [segment.knowledge_id(ordinal) for ordinal in range(3)] == ["k2", "k1", "k3"]
+    assert segment.ordinal_of("k1") == 1 and segment.ordinal_of("missing") is None
+    assert segment.document_id(segment.document_index(0)) == "doc-b"
+    assert segment.find_document("doc-a") == 0 and segment.find_document("doc-c") is None
+    assert sorted(segment.ordinals_of_documents({segment.find_document("doc-b")})) == [0, 2]
+    assert list(segment.lengths) == [5, 5, 1]
+    assert segment.total_length == 11
+    term = segment.find_term("京都")
+    assert segment.doc_freq(term) == 2
+    assert segment.postings(term) == [(0, 1), (1, 2)]
+    assert segment.find_term("大阪") is None
+    # 1文字の検索語は、その文字で始まる語・終わる語に展開する
+    assert sorted(segment.terms_with_char("京")) == ["京都", "東京"]
+    assert segment.terms_with_char("猫") == ["猫"]
+
+    write_deletes(str(tmp_path / "a.del"), [2, 0])
+    assert read_deletes(str(tmp_path / "a.del")) == {0, 2}
+
+
+def test_merge_segments_drops_deleted_documents(tmp_path):
+    first = _write(str(tmp_path / "a.kseg"), [("k1", "doc-1", "東京の天気"), ("k2", "doc-1", "大阪の天気")])
+    second = _write(str(tmp_path / "b.kseg"), [("k3", "doc-2", "京都の天気")])
+
+    assert merge_segments(str(tmp_path / "c.kseg"), [(first, {0}), (second, set())]) == 2
+
+    merged = Segment(str(tmp_path / "c.kseg"))
+    assert [merged.knowledge_id(ordinal) for ordinal in range(merged.doc_count)] == ["k2", "k3"]
+    assert merged.find_term("東京") is None
+    assert merged.postings(merged.find_term("天気")) == [(0, 1), (1, 1)]
+    assert merged.document_id(merged.document_index(1)) == "doc-2"
+
+
+def test_search_ranks_by_bm25(index_dir):
+    index = KnowledgeIndex(index_dir)
+    _build(
+        index,
+        [
+            ("k1", "doc-1", "東京都の天気"),
+            ("k2", "doc-1", "京都の天気。京都は晴れ"),
+            ("k3", "doc-1", "大阪の天気"),
+        ],
+    )
+
+    assert _ids(index, "京都") == ["k2", "k1"]
+    assert _ids(index, "東京都") == ["k1"]
+    assert _ids(index, "京都 晴れ") == ["k2"]
+    assert _ids(index, "名古屋") == []
+    ranked, total = index.search("天気", limit=1)
+    assert total == 3 and len(ranked) == 1
+
+    # スコアは BM25（N=3・df=2・avgdl=(5+8+4)/3）
+    scores = dict(index.search("京都")[0])
+    term_idf = idf(3, 2)
+    assert scores["k2"] == pytest.approx(term_score(term_idf, 2, 8, 17 / 3))
+    assert scores["k1"] == pytest.approx(term_score(term_idf, 1, 5, 17 / 3))
+
+
+def test_single_character_query_matches_inside_bigrams(index_dir):
+    index = KnowledgeIndex(index_dir)
+    _build(index, [("k1", "doc-1", "吾輩は猫である"), ("k2", "doc-1", "犬")])
+    index.apply([["knowledge", "k3", "doc-1", "猫舌"]])
+
+    assert _ids(index, "猫") == ["k3", "k1"]
+    assert _ids(index, "犬") == ["k2"]
+
+
+def test_writes_mask_segment_contents(index_dir):
+    index = KnowledgeIndex(index_dir)
+    _build(
+        index,
+        [("k1", "doc-1", "古い本文"), ("k2", "doc-2", "別の本文"), ("k3", "doc-1", "消える本文")],
+        documents=[("doc-1", "ds-1"), ("doc-2", "ds-2")],
+    )
+    index.apply([["knowledge", "k1", "doc-1", "新しい本文"], ["remove", "k3"]])
+
+    assert _ids(index, "古い") == []
+    assert _ids(index, "本文", dataset_id="ds-1") == ["k1"]
+    assert _ids(index, "本文", dataset_id="ds-2") == ["k2"]
+    index.apply([["remove_dataset", "ds-2"]])
+    assert _ids(index, "本文") == ["k1"]
+
+
+def test_scores_are_stable_across_updates_and_deletes(index_dir):
+    index = KnowledgeIndex(index_dir)
+    _build(
+        index,
+        [
+            ("k1", "doc-1", "東京都の天気"),
+            ("k2", "doc-1", "京都の天気。京都は晴れ"),
+            ("k3", "doc-2", "大阪の天気"),
+        ],
+        documents=[("doc-1", "ds-1"), ("doc-2", "ds-1")],
+    )
+    before = dict(index.search("京都")[0])
+
+    # 同じ本文での更新は、セグメントの古い版とメモリ上の層で二重に数えない（N・avgdl・df が変わらない）
+    index.apply([["knowledge", "k1", "doc-1", "東京都の天気"], ["knowledge", "k3", "doc-2", "大阪の天気"]])
+    assert dict(index.search("京都")[0]) == pytest.approx(before)
+    index.flush()
+    assert dict(index.search("京都")[0]) == pytest.approx(before)
+
+    # 削除した文書は文書数・合計文書長・文書頻度のいずれからも除く（N=2・df=2・avgdl=(5+8)/2）
+    index.apply([["remove_document", "doc-2"]])
+    scores = dict(index.search("京都")[0])
+    term_idf = idf(2, 2)
+    assert scores["k2"] == pytest.approx(term_score(term_idf, 2, 8, 13 / 2))
+    assert scores["k1"] == pytest.approx(term_score(term_idf, 1, 5, 13 / 2))
+    index.apply([["remove", "k1"]])
+    assert dict(index.search("京都")[0]) == pytest.approx({"k2": term_score(idf(1, 1), 2, 8, 8)})
+
+
+def test_search_before_build_is_unavailable(index_dir):
+    with pytest.raises(SearchUnavailableError):
+        KnowledgeIndex(index_dir).search("本文")
+
+
+def test_writes_during_rebuild_are_not_overwritten_by_stale_rows(index_dir):
+    index = KnowledgeIndex(index_dir)
+
+    def load_knowledges():
+        # 読み取り中にコミットされた更新・削除（読み取り結果は古いまま）
+        index.apply([["knowledge", "k1", "doc-1", "新しい本文"], ["remove", "k2"]])
+        yield "k1", "doc-1", "古い本文"
+        yield "k2", "doc-1", "削除された本文"
+
+    index.rebuild(lambda: [("doc-1", "ds-1")], load_knowledges)
+
+    assert _ids(index, "本文") == ["k1"]
+    assert index.search("古い")[1] == 0
+
+
+def test_flush_persists_segments_shared_with_followers(index_dir):
+    leader = KnowledgeIndex(index_dir)
+    _build(leader, [("k1", "doc-1", "東京の天気"), ("k2", "doc-1", "大阪の天気")])
+    leader.apply([["knowledge", "k3", "doc-1", "京都の天気"], ["remove", "k2"]])
+    assert leader.flush()
+    assert leader.segment_count == 2
+    assert len(leader.memtable) == 0
+
+    # 同じディレクトリを開いた別プロセス相当の索引は、書き出しを行わずセグメントを読む
+    follower = KnowledgeIndex(index_dir)
+    follower.load_documents([("doc-1", "ds-1")])
+    assert not follower._acquire_leadership()
+    assert follower.open()
+    assert not follower.flush()
+    assert sorted(_ids(follower, "天気", dataset_id="ds-1")) == ["k1", "k3"]
+    assert follower.search("天気") == leader.search("天気")
+
+    leader.stop()
+    follower.stop()
+
+
+def test_merge_compacts_segments(monkeypatch, index_dir):
+    monkeypatch.setattr(search, "SEARCH_MAX_SEGMENTS", 2)
+    monkeypatch.setattr(search, "SEARCH_MERGE_FACTOR", 2)
+    index = KnowledgeIndex(index_dir)
+    _build(index, [("k1", "doc-1", "本文その1"), ("k4", "doc-1", "本文その4")])
+    for number in range(2, 4):
+        index.apply([["knowledge", f"k{number}", "doc-1", f"本文その{number}"]])
+        index.flush()
+    index.apply([["remove", "k1"]])
+    index.flush()
+    assert index.segment_count == 3
+
+    assert index.merge()
+    assert index.segment_count == 2
+    assert not index.merge()
+    assert sorted(_ids(index, "本文")) == ["k2", "k3", "k4"]
+    # 参照されなくなったセグメント・削除ファイルは消す
+    assert len([name for name in os.listdir(index_dir) if name.endswith((".kseg", ".del"))]) == 2
+    index.stop()
+
+
+def test_reopen_catches_up_rows_written_while_closed(monkeypatch, session_factory, index_dir):
+    monkeypatch.setattr(search, "SEARCH_SYNC_GRACE_SECONDS", 0)
+    with session_factory() as session:
+        dataset = DatasetRepositorySQLAlchemy(session).create(Dataset.create(name="Restart"))
+        document = DocumentRepositorySQLAlchemy(session).create(
+            Document.create(dataset_id=dataset.id, title="Doc", content="body")
+        )
+        first = KnowledgeRepositorySQLAlchemy(session).create(
+            Knowledge(document_id=document.id, knowledge_text="起動前の本文", meta_data={})
+        )
+
+    first_run = KnowledgeIndex(index_dir)
+    first_run.start(session_factory)
+    _wait_ready(first_run)
+    first_run.stop()
+
+    # 索引を閉じている間の更新は、次の起動時に watermark 以降の行として読み直す
+    time.sleep(0.01)
+    with session_factory() as session:
+        session.execute(
+            update(KnowledgeModel).where(KnowledgeModel.id == first.id).values(knowledge_text="更新後の本文")
+        )
+        session.commit()
+
+    second_run = KnowledgeIndex(index_dir)
+    second_run.start(session_factory)
+    _wait_ready(second_run)
+    assert _ids(second_run, "更新", dataset_id=dataset.id) == [first.id]
+    assert _ids(second_run, "起動") == []
+    second_run.stop()
+
+
+def _wait_ready(index, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not index.ready:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_committed_writes_are_indexed_and_published(monkeypatch, session_factory):
+    backend = InMemoryCacheBackend()
+    messages = []
+    backend.subscribe(f"{search.CACHE_KEY_PREFIX}:invalidate", messages.append)
+    monkeypatch.setattr(knowledge_index, "l2", backend)
+    rebuild_search_index(session_factory)
+
+    with session_factory() as session:
+        dataset = DatasetRepositorySQLAlchemy(session).create(Dataset.create(name="Search"))
+        document = DocumentRepositorySQLAlchemy(session).create(
+            Document.create(dataset_id=dataset.id, title="Doc", content="body")
+        )
+        repo = KnowledgeRepositorySQLAlchemy(session)
+        created = repo.create(
+            Knowledge(document_id=document.id, knowledge_text="全文検索のテスト", meta_data={})
+        )
+        assert _ids(knowledge_index, "検索", dataset_id=dataset.id) == [created.id]
+
+        created.is_active = False
+        repo.update(created)
+        assert _ids(knowledge_index, "検索") == []
+
+    published = [json.loads(message) for message in messages]
+    assert published[-1]["value"] == [["remove", created.id]]
+
+    # 他ノード発のメッセージとして受け取ると、自身の索引に反映される
+    handle_invalidation_message(
+        json.dumps(
+            {
+                "origin": "other",
+                "cache": "search:knowledges",
+                "op": "apply",
+                "value": [["knowledge", "remote", document.id, "他ノードの検索"]],
+            }
+        )
+    )
+    assert _ids(knowledge_index, "検索", dataset_id=dataset.id) == ["remote"]
+
+
+def test_rolled_back_writes_are_not_indexed(session_factory):
+    rebuild_search_index(session_factory)
+    with session_factory() as session:
+        dataset = DatasetRepositorySQLAlchemy(session).create(Dataset.create(name="Rollback"))
+        document = DocumentRepositorySQLAlchemy(session).create(
+            Document.create(dataset_id=dataset.id, title="Doc", content="body")
+        )
+        KnowledgeRepositorySQLAlchemy(session, auto_commit=False).create(
+            Knowledge(document_id=document.id, knowledge_text="取り消される本文", meta_data={})
+        )
+        session.rollback()
+
+    assert _ids(knowledge_index, "本文") == []
+
+
+def test_rebuild_reads_active_knowledges(session_factory):
+    with session_factory() as session:
+        dataset = DatasetRepositorySQLAlchemy(session).create(Dataset.create(name="Build"))
+        document = DocumentRepositorySQLAlchemy(session).create(
+            Document.create(dataset_id=dataset.id, title="Doc", content="body")
+        )
+        active, inactive = KnowledgeRepositorySQLAlchemy(session).create_many(
+            [
+                Knowledge(document_id=document.id, sequence=0, knowledge_text="有効な本文", meta_data={}),
+                Knowledge(
+                    document_id=document.id, sequence=1, knowledge_text="無効な本文", meta_data={}, is_active=False
+                ),
+            ]
+        )
+
+    rebuild_search_index(session_factory)
+
+    assert _ids(knowledge_index, "本文", dataset_id=dataset.id) == [active]
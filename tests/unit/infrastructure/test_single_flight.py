@@ -0,0 +1,159 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.infrastructure.cache.single_flight import SingleFlight
+
+SCOPE = ("knowledges", "doc-1")
+
+
+def _run_followers(flight, count, op="list"):
+    """リーダーの実行中に count 件の同一呼び出しを別スレッドで開始し、結果を返す"""
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do(SCOPE, op, lambda: ["follower"])))
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def _settle():
+    """開始したフォロワーがリーダーの完了待ちに入るまで少し待つ"""
+    threading.Event().wait(0.05)
+
+
+def test_do_coalesces_identical_concurrent_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return [{"id": "k1"}]
+
+    leader_result = []
+    leader = threading.Thread(target=lambda: leader_result.append(flight.do(SCOPE, "list", load)))
+    leader.start()
+    started.wait(5)
+    threads, results = _run_followers(flight, 3)
+    _settle()
+    release.set()
+    for thread in [leader, *threads]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [[{"id": "k1"}]] * 3
+    # フォロワーにはコピーを渡す
+    assert all(result is not leader_result[0] for result in results)
+    assert flight._calls == {}
+
+
+def test_do_shares_leader_error():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def load():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("db down")
+
+    errors = []
+
+    def call(fn):
+        try:
+            flight.do(SCOPE, "list", fn)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call, args=(load,))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call, args=(lambda: None,))
+    follower.start()
+    _settle()
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert errors == ["db down", "db down"]
+
+
+def test_forget_starts_new_flight_after_write():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def load():
+        started.set()
+        release.wait(5)
+        return "before write"
+
+    leader = threading.Thread(target=lambda: flight.do(SCOPE, "list", load))
+    leader.start()
+    started.wait(5)
+    flight.forget(SCOPE)
+    try:
+        assert flight.do(SCOPE, "list", lambda: "after write") == "after write"
+    finally:
+        release.set()
+        leader.join(5)
+
+
+@pytest.mark.asyncio
+async def test_do_runs_directly_inside_event_loop():
+    flight = SingleFlight()
+
+    # AsyncSession.run_sync の内側と同じく、イベントループのスレッドではまとめない
+    assert flight.do(SCOPE, "list", lambda: "direct") == "direct"
+    assert flight._calls == {}
+
+
+@pytest.mark.asyncio
+async def test_do_async_coalesces_identical_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    release = asyncio.Event()
+
+    async def load():
+        calls.append(1)
+        await release.wait()
+        return [{"id": "k1"}]
+
+    tasks = [asyncio.create_task(flight.do_async(SCOPE, "list", load)) for _ in range(4)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert len(calls) == 1
+    assert results == [[{"id": "k1"}]] * 4
+    assert flight._futures == {}
+
+
+@pytest.mark.asyncio
+async def test_do_async_follower_retries_when_leader_is_cancelled():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "leader"
+
+    async def fast():
+        return "follower"
+
+    leader = asyncio.create_task(flight.do_async(SCOPE, "get", slow))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do_async(SCOPE, "get", fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "follower"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
@@ -0,0 +1,132 @@
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.dialects import mssql
+from sqlalchemy.orm import sessionmaker
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.infrastructure.database.connection import Base
+from app.infrastructure.database.models.document import DocumentModel
+from app.infrastructure.database.models.stats import DatasetStatsModel
+from app.infrastructure.repositories.dataset_repository_impl import (
+    DatasetRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.document_repository_impl import (
+    DocumentRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.knowledge_repository_impl import (
+    KnowledgeRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.stats_repository_impl import (
+    StatsRepositorySQLAlchemy,
+    char_length,
+)
+
+
+@pytest.fixture(scope="function")
+def test_session():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _counts(stats):
+    return (
+        stats.document_count,
+        stats.knowledge_count,
+        stats.document_characters,
+        stats.knowledge_characters,
+    )
+
+
+def test_stats_follow_creates_updates_and_deletes(test_session):
+    datasets = DatasetRepositorySQLAlchemy(test_session)
+    documents = DocumentRepositorySQLAlchemy(test_session)
+    knowledges = KnowledgeRepositorySQLAlchemy(test_session)
+    stats = StatsRepositorySQLAlchemy(test_session)
+
+    dataset = datasets.create(Dataset.create(name="Stats"))
+    assert _counts(stats.get_dataset_stats(dataset.id)) == (0, 0, 0, 0)
+
+    doc1 = documents.create(Document.create(dataset_id=dataset.id, title="A", content="hello"))
+    doc2 = documents.create(Document.create(dataset_id=dataset.id, title="B", content="日本語"))
+    k1 = knowledges.create(Knowledge.create(document_id=doc1.id, sequence=0, knowledge_text="abc"))
+    knowledges.create_many(
+        [Knowledge.create(document_id=doc2.id, sequence=i, knowledge_text="xy") for i in range(3)]
+    )
+    assert _counts(stats.get_dataset_stats(dataset.id)) == (2, 4, 8, 9)
+    assert stats.get_document_stats(doc2.id).knowledge_count == 3
+
+    k1.knowledge_text = "abcdef"
+    knowledges.update(k1)
+    doc1.content = "hi"
+    documents.update(doc1)
+    assert _counts(stats.get_dataset_stats(dataset.id)) == (2, 4, 5, 12)
+    assert stats.get_document_stats(doc1.id).knowledge_characters == 6
+
+    assert knowledges.delete(k1.id) is True
+    assert _counts(stats.get_dataset_stats(dataset.id)) == (2, 3, 5, 6)
+    assert documents.delete(doc2.id) is True
+    assert _counts(stats.get_dataset_stats(dataset.id)) == (1, 0, 2, 0)
+    assert stats.get_document_stats(doc2.id) is None
+
+    # 存在しない行の更新・削除は集計値を変えない
+    assert knowledges.delete(k1.id) is False
+    assert documents.delete(doc2.id) is False
+    assert _counts(stats.get_dataset_stats(dataset.id)) == (1, 0, 2, 0)
+
+    assert datasets.delete(dataset.id) is True
+    assert stats.get_dataset_stats(dataset.id) is None
+
+
+def test_recompute_repairs_drifted_stats(test_session):
+    dataset = DatasetRepositorySQLAlchemy(test_session).create(Dataset.create(name="Drift"))
+    doc = DocumentRepositorySQLAlchemy(test_session).create(
+        Document.create(dataset_id=dataset.id, title="A", content="body")
+    )
+    KnowledgeRepositorySQLAlchemy(test_session).create_many(
+        [Knowledge.create(document_id=doc.id, sequence=i, knowledge_text="text") for i in range(2)]
+    )
+    stats = StatsRepositorySQLAlchemy(test_session)
+    expected = _counts(stats.get_dataset_stats(dataset.id))
+
+    test_session.execute(
+        update(DatasetStatsModel)
+        .where(DatasetStatsModel.dataset_id == dataset.id)
+        .values(document_count=99, knowledge_characters=-1)
+    )
+    test_session.commit()
+
+    assert stats.recompute() == 1
+    assert _counts(stats.get_dataset_stats(dataset.id)) == expected == (1, 2, 4, 8)
+    assert stats.get_document_stats(doc.id).knowledge_count == 2
+    assert stats.recompute("missing") == 0
+
+
+def test_character_counts_match_between_python_and_sql(test_session):
+    dataset = DatasetRepositorySQLAlchemy(test_session).create(Dataset.create(name="Chars"))
+    documents = DocumentRepositorySQLAlchemy(test_session)
+    stats = StatsRepositorySQLAlchemy(test_session)
+    # 末尾の空白と補助文字（サロゲートペア）も作成時と更新・削除・再集計で同じ数え方をする
+    doc = documents.create(Document.create(dataset_id=dataset.id, title="A", content="絵文字😀  "))
+    assert stats.get_dataset_stats(dataset.id).document_characters == 6
+
+    doc.content = "🎉"
+    documents.update(doc)
+    assert stats.get_dataset_stats(dataset.id).document_characters == 1
+    stats.recompute(dataset.id)
+    assert stats.get_dataset_stats(dataset.id).document_characters == 1
+    assert documents.delete(doc.id) is True
+    assert stats.get_dataset_stats(dataset.id).document_characters == 0
+
+
+def test_char_length_counts_code_points_on_sql_server():
+    statement = select(char_length(DocumentModel.content)).compile(dialect=mssql.dialect())
+
+    assert "(LEN((documents.content COLLATE Latin1_General_100_CI_AS_SC) + N'.') - 1" in str(statement)
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.infrastructure.database.connection import Base
+from app.infrastructure.repositories.dataset_repository_impl import (
+    DatasetRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.unit_of_work_impl import UnitOfWorkSQLAlchemy
+from app.usecases.documents.create_document import CreateDocumentUseCase
+
+
+@pytest.fixture(scope="function")
+def test_session():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_unit_of_work_rolls_back_without_commit(test_session):
+    with UnitOfWorkSQLAlchemy(test_session) as uow:
+        uow.datasets.create(Dataset.create(name="Not committed"))
+    assert DatasetRepositorySQLAlchemy(test_session).count_datasets() == 0
+
+    with pytest.raises(RuntimeError):
+        with UnitOfWorkSQLAlchemy(test_session) as uow:
+            uow.datasets.create(Dataset.create(name="Failed"))
+            raise RuntimeError("boom")
+    assert DatasetRepositorySQLAlchemy(test_session).count_datasets() == 0
+
+
+def test_create_document_commits_once(test_session):
+    commits = []
+    # セーブポイントの解放ではなく、DB への COMMIT の回数を数える
+    event.listen(test_session.get_bind(), "commit", lambda conn: commits.append(1))
+
+    usecase = CreateDocumentUseCase(UnitOfWorkSQLAlchemy(test_session))
+    document = usecase.execute(dataset_id=None, title="Manual", content="body")
+
+    assert len(commits) == 1
+    dataset = DatasetRepositorySQLAlchemy(test_session).get_by_id(document.dataset_id)
+    assert dataset.name == "Manual"
+
+
+def test_get_or_create_returns_existing_dataset(test_session):
+    repo = DatasetRepositorySQLAlchemy(test_session)
+    first = repo.get_or_create(Dataset.create_auto("Same title"))
+    # 同じIDでの INSERT は主キー重複となり、既存の行が返る
+    second = repo.get_or_create(Dataset.create_auto("Same title"))
+    assert first.id == second.id
+    assert first.created_at == second.created_at
+    assert repo.count_datasets() == 1
+
+    # セーブポイントのロールバック後も同じトランザクションで書き込みを続けられる
+    with UnitOfWorkSQLAlchemy(test_session) as uow:
+        dataset = uow.datasets.get_or_create(Dataset.create_auto("Same title"))
+        uow.documents.create(
+            Document.create(dataset_id=dataset.id, title="Same title", content="body")
+        )
+        uow.commit()
+    assert repo.count_datasets() == 1
@@ -0,0 +1,350 @@
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.util.concurrency import greenlet_spawn
+
+from app.domain.entities.dataset import Dataset
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.infrastructure.cache.backends import InMemoryCacheBackend
+from app.infrastructure.database.connection import Base
+from app.infrastructure.database.models import KnowledgeEmbeddingModel
+from app.infrastructure.embedding.hashing_embedder import HashingEmbedder
+from app.infrastructure.repositories.dataset_repository_impl import (
+    DatasetRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.document_repository_impl import (
+    DocumentRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.embedding_repository_impl import backfill_embeddings
+from app.infrastructure.repositories.knowledge_repository_impl import (
+    KnowledgeRepositorySQLAlchemy,
+)
+from app.infrastructure.repositories.knowledge_vector_search_repository_impl import (
+    KnowledgeVectorSearchRepositoryNumpy,
+)
+from app.infrastructure.search import vector_index as vectors
+from app.infrastructure.search.hnsw import HNSWIndex
+from app.infrastructure.search.vector_index import VectorIndex, encode_vector, vector_index
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False, connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _rows(matrix):
+    return [(f"k{i}", "doc-1", encode_vector(vector)) for i, vector in enumerate(matrix)]
+
+
+def _document(session, name="Vector"):
+    dataset = DatasetRepositorySQLAlchemy(session).create(Dataset.create(name=name))
+    return DocumentRepositorySQLAlchemy(session).create(
+        Document.create(dataset_id=dataset.id, title="Doc", content="body")
+    )
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(64)
+    first, second, empty = embedder.embed(["ベクトル検索のテスト", "ベクトル検索のテスト", ""])
+    assert first.dtype == np.float32
+    assert np.array_equal(first, second)
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert not empty.any()
+    # 語の重なりが多い本文ほど類似度が高い
+    near, far = embedder.embed(["ベクトル検索の実装", "今日の天気"])
+    assert first @ near > first @ far
+
+
+def test_search_batch_matches_brute_force(monkeypatch):
+    # 区間をまたいだ候補の絞り込みが、全件の並べ替えと一致すること
+    monkeypatch.setattr(vectors, "VECTOR_SEARCH_BATCH_ROWS", 7)
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((50, 8)).astype(np.float32)
+    queries = rng.standard_normal((3, 8)).astype(np.float32)
+    index = VectorIndex()
+
+    results = index.search_batch("ds-1", queries, 5, lambda since: _rows(matrix))
+
+    normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    for query, result in zip(queries, results):
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))), kind="stable")[:5]
+        assert [knowledge_id for knowledge_id, _ in result] == [f"k{i}" for i in expected]
+        assert [score for _, score in result] == sorted((score for _, score in result), reverse=True)
+
+
+def test_removed_rows_are_skipped_and_compacted():
+    matrix = np.eye(4, dtype=np.float32)
+    index = VectorIndex()
+    assert [kid for kid, _ in index.search("ds-1", matrix[0], 4, lambda since: _rows(matrix))][0] == "k0"
+
+    index.apply([["remove", "k0"], ["remove", "k1"]])
+    assert "k0" not in [kid for kid, _ in index.search("ds-1", matrix[0], 4, lambda since: [])]
+    assert index.size("ds-1") == 2
+
+    # 無効な行が半数を超えると詰めた行列に作り直す
+    index.apply([["remove", "k2"]])
+    assert index._matrices["ds-1"].size == 1
+    assert [kid for kid, _ in index.search("ds-1", matrix[3], 4, lambda since: [])] == ["k3"]
+
+    index.apply([["remove_document", "doc-1"]])
+    assert index.search("ds-1", matrix[3], 4, lambda since: []) == []
+
+
+def test_writes_during_load_are_not_overwritten_by_stale_rows():
+    index = VectorIndex()
+    fresh = np.array([0.0, 1.0], dtype=np.float32)
+
+    def load(since):
+        # 読み込み中に k0 が更新され、doc-2 が削除された
+        index.apply([vectors.vector_operation("k0", "doc-1", "ds-1", fresh), ["remove_document", "doc-2"]])
+        return [
+            ("k0", "doc-1", encode_vector(np.array([1.0, 0.0]))),
+            ("k1", "doc-2", encode_vector(np.array([1.0, 0.0]))),
+        ]
+
+    assert index.search("ds-1", np.array([0.0, 1.0]), 5, load) == [("k0", 1.0)]
+    assert index.is_loaded("ds-1")
+
+
+def _clustered(count, dimension, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, dimension))
+    return (centers[rng.integers(0, 20, count)] + 0.5 * rng.standard_normal((count, dimension))).astype(np.float32)
+
+
+def _recall(expected, actual):
+    return np.mean([len({k for k, _ in e} & {k for k, _ in a}) / len(e) for e, a in zip(expected, actual)])
+
+
+def test_hnsw_recall_against_exact_search():
+    data = _clustered(600, 16)
+    queries = _clustered(30, 16, seed=1)
+    exact = VectorIndex().search_batch("ds-1", queries, 10, lambda since: _rows(data))
+    graph = HNSWIndex(16, m=8, ef_construction=64, ef_search=32, seed=0)
+    graph.add_many([f"k{i}" for i in range(len(data))], ["doc-1"] * len(data), data)
+
+    normalized = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    approximate = graph.search_batch(normalized, 10)
+    assert _recall(exact, approximate) >= 0.9
+    # 類似度は正確な値で、降順に並ぶ
+    for result in approximate:
+        assert [score for _, score in result] == sorted((score for _, score in result), reverse=True)
+
+
+def test_hnsw_tombstones_are_excluded_and_compacted():
+    data = np.eye(8, dtype=np.float32)
+    graph = HNSWIndex(8, m=4, ef_construction=16, seed=0)
+    graph.add_many([f"k{i}" for i in range(8)], [f"doc-{i % 2}" for i in range(8)], data)
+
+    graph.remove("k0")
+    assert "k0" not in [kid for kid, _ in graph.search_batch(data[:1], 8)[0]]
+    # 同じ Knowledge の再追加は古い行を無効にしてから挿入する
+    graph.add_many(["k1"], ["doc-1"], data[2:3])
+    assert graph.search_batch(data[2:3], 2)[0][0][1] == pytest.approx(1.0)
+    assert len(graph) == 7 and graph.dead == 2
+
+    graph.remove_document("doc-0")
+    assert len(graph) == 4
+    assert graph.needs_compaction
+    assert sorted(kid for kid, _ in graph.search_batch(data[:1], 8)[0]) == ["k1", "k3", "k5", "k7"]
+
+
+def test_hnsw_save_and_load_round_trip(tmp_path):
+    data = _clustered(200, 8)
+    graph = HNSWIndex(8, m=6, ef_construction=32, seed=0)
+    graph.add_many([f"k{i}" for i in range(200)], [f"doc-{i % 3}" for i in range(200)], data)
+    graph.remove("k5")
+    graph.watermark = 123.0
+    path = str(tmp_path / "ds-1.hnsw.npz")
+    graph.save(path)
+    assert graph.changes == 0
+
+    loaded = HNSWIndex.load(path, 8)
+    assert loaded.watermark == 123.0 and (loaded.m, loaded.ef_construction) == (6, 32)
+    assert len(loaded) == 199 and loaded.knowledges_of_document == graph.knowledges_of_document
+    queries = data[:5] / np.linalg.norm(data[:5], axis=1, keepdims=True)
+    assert loaded.search_batch(queries, 5) == graph.search_batch(queries, 5)
+    # 次元数が異なる場合は読まずに作り直す
+    assert HNSWIndex.load(path, 16) is None
+
+
+def test_hnsw_index_reopens_and_catches_up_since_watermark(tmp_path):
+    data = np.eye(4, dtype=np.float32)
+    index = VectorIndex(kind="hnsw", directory=str(tmp_path))
+    index.search("ds-1", data[0], 4, lambda since: _rows(data[:3]))
+    assert index.flush() == 1
+    assert index.flush() == 0
+
+    # 停止中に k3 が作成され、k0 が削除された
+    requested = []
+
+    def load(since):
+        requested.append(since)
+        return [("k3", "doc-1", encode_vector(data[3]))]
+
+    reopened = VectorIndex(kind="hnsw", directory=str(tmp_path))
+    ranked = reopened.search("ds-1", data[3], 4, load, lambda: ["k1", "k2", "k3"])
+    assert [kid for kid, _ in ranked][0] == "k3"
+    assert sorted(kid for kid, _ in ranked) == ["k1", "k2", "k3"]
+    assert requested[0] is not None and requested[0].timestamp() < time.time()
+
+    reopened.apply([["remove_dataset", "ds-1"]])
+    assert not (tmp_path / "ds-1.hnsw.npz").exists()
+
+
+def test_hnsw_compaction_keeps_writes_made_while_rebuilding(tmp_path):
+    data = np.eye(8, dtype=np.float32)
+    index = VectorIndex(kind="hnsw", directory=str(tmp_path))
+    index.search("ds-1", data[0], 8, lambda since: _rows(data))
+    index.apply([["remove", f"k{i}"] for i in range(5)])
+    current = index._matrices["ds-1"]
+    assert current.needs_compaction
+
+    live_rows = current.live_rows
+
+    def live_rows_with_write():
+        # 作り直しの読み取り後に k5 が更新された
+        rows = live_rows()
+        index.apply([vectors.vector_operation("k5", "doc-1", "ds-1", data[0])])
+        return rows
+
+    current.live_rows = live_rows_with_write
+    assert index.compact("ds-1")
+    rebuilt = index._matrices["ds-1"]
+    assert rebuilt is not current and rebuilt.dead == 0
+    assert index.search("ds-1", data[0], 1, lambda since: []) == [("k5", pytest.approx(1.0))]
+    assert sorted(rebuilt.nodes) == ["k5", "k6", "k7"]
+    assert not index.compact("ds-1")
+
+
+def test_committed_writes_are_embedded_and_published(monkeypatch, session_factory):
+    backend = InMemoryCacheBackend()
+    messages = []
+    backend.subscribe(f"{vectors.CACHE_KEY_PREFIX}:invalidate", messages.append)
+    monkeypatch.setattr(vector_index, "l2", backend)
+    repository = KnowledgeVectorSearchRepositoryNumpy(session_factory=session_factory)
+
+    with session_factory() as session:
+        document = _document(session)
+        repo = KnowledgeRepositorySQLAlchemy(session)
+        first, second = repo.create_many(
+            [
+                Knowledge(document_id=document.id, sequence=0, knowledge_text="ベクトル検索の実装", meta_data={}),
+                Knowledge(document_id=document.id, sequence=1, knowledge_text="今日の天気は晴れ", meta_data={}),
+            ]
+        )
+        stored = session.scalars(select(KnowledgeEmbeddingModel).order_by(KnowledgeEmbeddingModel.knowledge_id)).all()
+        assert sorted(row.knowledge_id for row in stored) == sorted([first, second])
+        assert {row.dataset_id for row in stored} == {document.dataset_id}
+
+        hits = repository.search("ベクトル検索", document.dataset_id, limit=1)
+        assert [hit.knowledge_id for hit in hits] == [first]
+
+        # 読み込み済みの行列にはコミット後の更新・無効化が反映される
+        knowledge = repo.get_by_id(second)
+        knowledge.knowledge_text = "ベクトル検索の設計"
+        repo.update(knowledge)
+        assert {hit.knowledge_id for hit in repository.search("ベクトル検索", document.dataset_id)} == {first, second}
+
+        knowledge.is_active = False
+        repo.update(knowledge)
+        assert [hit.knowledge_id for hit in repository.search("ベクトル検索", document.dataset_id)] == [first]
+
+        repo.delete(first)
+        assert repository.search("ベクトル検索", document.dataset_id) == []
+        assert session.scalars(select(KnowledgeEmbeddingModel.knowledge_id)).all() == [second]
+
+    published = [json.loads(message) for message in messages]
+    assert published[-1]["cache"] == "vector:knowledges"
+    assert published[-1]["value"] == [["remove", first]]
+
+
+class _ThreadRecordingEmbedder(HashingEmbedder):
+    """埋め込みを計算したスレッドを記録する"""
+
+    def __init__(self):
+        super().__init__(32)
+        self.threads = []
+
+    def embed(self, texts):
+        self.threads.append(threading.get_ident())
+        return super().embed(texts)
+
+
+def test_vector_work_runs_off_the_event_loop_inside_run_sync(monkeypatch, session_factory):
+    embedder = _ThreadRecordingEmbedder()
+    monkeypatch.setattr("app.infrastructure.repositories.embedding_repository_impl.get_embedder", lambda: embedder)
+    repository = KnowledgeVectorSearchRepositoryNumpy(embedder=embedder, session_factory=session_factory)
+    apply = vector_index.apply
+    applied = []
+
+    def recording_apply(operations):
+        applied.append(threading.get_ident())
+        apply(operations)
+
+    monkeypatch.setattr(vector_index, "apply", recording_apply)
+
+    def in_run_sync():
+        # AsyncSession.run_sync と同じく greenlet 内の同期処理から書き込み・検索する
+        with session_factory() as session:
+            document = _document(session, "Offload")
+            knowledge = KnowledgeRepositorySQLAlchemy(session).create(
+                Knowledge(document_id=document.id, knowledge_text="ベクトル検索の実装", meta_data={})
+            )
+        return knowledge.id, repository.search("ベクトル検索", document.dataset_id, limit=1)
+
+    async def main():
+        return threading.get_ident(), await greenlet_spawn(in_run_sync)
+
+    loop_thread, (knowledge_id, hits) = asyncio.run(main())
+    assert [hit.knowledge_id for hit in hits] == [knowledge_id]
+    # 埋め込みの計算（書き込み・検索）と行列への反映はループのスレッドで行わない
+    assert len(embedder.threads) == 2 and loop_thread not in embedder.threads
+    assert applied and loop_thread not in applied
+
+
+def test_rolled_back_writes_are_not_applied(session_factory):
+    repository = KnowledgeVectorSearchRepositoryNumpy(session_factory=session_factory)
+    with session_factory() as session:
+        document = _document(session, "Rollback")
+        assert repository.search("本文", document.dataset_id) == []
+        KnowledgeRepositorySQLAlchemy(session, auto_commit=False).create(
+            Knowledge(document_id=document.id, knowledge_text="取り消される本文", meta_data={})
+        )
+        session.rollback()
+
+    assert repository.search("本文", document.dataset_id) == []
+
+
+def test_backfill_embeds_missing_and_outdated_knowledges(monkeypatch, session_factory):
+    monkeypatch.setattr(vectors, "VECTOR_SEARCH_ENABLED", False)
+    monkeypatch.setattr("app.infrastructure.repositories.embedding_repository_impl.VECTOR_SEARCH_ENABLED", False)
+    with session_factory() as session:
+        document = _document(session, "Backfill")
+        ids = KnowledgeRepositorySQLAlchemy(session).create_many(
+            [Knowledge(document_id=document.id, sequence=i, knowledge_text=f"本文{i}", meta_data={}) for i in range(3)]
+        )
+        assert session.scalars(select(KnowledgeEmbeddingModel)).all() == []
+
+    monkeypatch.setattr(vectors, "VECTOR_SEARCH_ENABLED", True)
+    monkeypatch.setattr("app.infrastructure.repositories.embedding_repository_impl.VECTOR_SEARCH_ENABLED", True)
+    with session_factory() as session:
+        assert backfill_embeddings(session, document.dataset_id, HashingEmbedder(32)) == 3
+        assert backfill_embeddings(session, document.dataset_id, HashingEmbedder(32)) == 0
+        # 埋め込みの種類を変えると計算し直す
+        assert backfill_embeddings(session, None, HashingEmbedder(16)) == 3
+        rows = session.scalars(select(KnowledgeEmbeddingModel)).all()
+        assert sorted(row.knowledge_id for row in rows) == sorted(ids)
+        assert {(row.model, row.dimension) for row in rows} == {("hashing-16", 16)}
@@ -0,0 +1,202 @@
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.infrastructure.database.connection import (
+    Base,
+    get_async_db,
+    get_async_read_db,
+)
+from app.infrastructure.database import models  # noqa: F401  テーブル定義の登録
+from app.infrastructure.search.knowledge_index import knowledge_index
+from app.interfaces.api.routing import with_async_routes
+from app.usecases.datasets.retrieve_knowledges import RetrieveKnowledgesUseCase
+from app.interfaces.api.v1 import (
+    async_datasets,
+    async_documents,
+    async_knowledges,
+    datasets,
+    documents,
+    knowledges,
+)
+
+
+@pytest.fixture
+def client():
+    """USE_ASYNC_DB=true 相当のルーター構成と aiosqlite のインメモリDBを持つクライアント"""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:", poolclass=StaticPool, echo=False
+    )
+    session_factory = async_sessionmaker(engine, autoflush=False)
+
+    async def override_get_async_db():
+        async with session_factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(
+        with_async_routes(datasets.router, async_datasets.router),
+        prefix="/api/v1/datasets",
+    )
+    app.include_router(
+        with_async_routes(documents.router, async_documents.router),
+        prefix="/api/v1/documents",
+    )
+    app.include_router(
+        with_async_routes(knowledges.router, async_knowledges.router),
+        prefix="/api/v1/knowledges",
+    )
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+
+    with TestClient(app) as test_client:
+        test_client.portal.call(_create_all, engine)
+        yield test_client
+        test_client.portal.call(engine.dispose)
+
+
+async def _create_all(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def test_with_async_routes_replaces_matching_routes_in_order():
+    merged = with_async_routes(knowledges.router, async_knowledges.router)
+    assert [route.path for route in merged.routes] == [
+        route.path for route in knowledges.router.routes
+    ]
+    async_endpoints = {route.endpoint for route in async_knowledges.router.routes}
+    assert all(route.endpoint in async_endpoints for route in merged.routes)
+
+
+def test_async_crud_flow(client):
+    # 空のDBから索引を構築した状態にする（以降の書き込みはコミット後に反映される）
+    knowledge_index.rebuild(lambda: [], lambda: [])
+    resp = client.post("/api/v1/datasets/", json={"name": "Async dataset"})
+    assert resp.status_code == 201
+    dataset_id = resp.json()["id"]
+
+    resp = client.post(
+        "/api/v1/documents/",
+        json={"dataset_id": dataset_id, "title": "Async doc", "content": "body"},
+    )
+    assert resp.status_code == 201
+    document_id = resp.json()["id"]
+
+    resp = client.post(
+        "/api/v1/knowledges/",
+        json={"document_id": document_id, "sequence": 0, "knowledge_text": "text"},
+    )
+    assert resp.status_code == 201
+    knowledge_id = resp.json()["id"]
+
+    resp = client.post(
+        "/api/v1/knowledges/bulk",
+        json={
+            "items": [
+                {"document_id": document_id, "sequence": i, "knowledge_text": f"bulk {i}"}
+                for i in range(1, 4)
+            ]
+        },
+    )
+    assert resp.status_code == 201
+    assert resp.json()["total"] == 3
+
+    resp = client.put(
+        f"/api/v1/knowledges/{knowledge_id}", json={"knowledge_text": "updated"}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["knowledgeText"] == "updated"
+
+    resp = client.get("/api/v1/knowledges/search", params={"q": "updated", "dataset_id": dataset_id})
+    assert resp.status_code == 200
+    assert [item["id"] for item in resp.json()["items"]] == [knowledge_id]
+
+    resp = client.get(f"/api/v1/knowledges/?document_id={document_id}")
+    assert resp.status_code == 200
+    assert resp.json()["total"] == 4
+
+    assert client.get(f"/api/v1/documents/{document_id}").status_code == 200
+    assert client.delete(f"/api/v1/knowledges/{knowledge_id}").status_code == 204
+    stats = client.get(f"/api/v1/datasets/{dataset_id}/stats").json()
+    assert (stats["documentCount"], stats["knowledgeCount"]) == (1, 3)
+    assert client.get(f"/api/v1/datasets/{dataset_id}?include_stats=true").json()["stats"] == stats
+    assert client.get(f"/api/v1/knowledges/{knowledge_id}").status_code == 404
+    assert client.put(
+        f"/api/v1/knowledges/{knowledge_id}", json={"knowledge_text": "x"}
+    ).status_code == 404
+    assert client.get("/api/v1/datasets/missing").status_code == 404
+
+
+def test_async_list_routes_filter_by_meta(client):
+    resp = client.post("/api/v1/datasets/", json={"name": "Async meta", "meta_data": {"team": "search"}})
+    dataset_id = resp.json()["id"]
+    client.post("/api/v1/datasets/", json={"name": "Async other", "meta_data": {"team": "billing"}})
+    resp = client.post(
+        "/api/v1/documents/",
+        json={"dataset_id": dataset_id, "title": "Doc", "content": "body", "meta_data": {"category": "faq"}},
+    )
+    document_id = resp.json()["id"]
+    for sequence, source in enumerate(["faq", "blog", "faq"]):
+        resp = client.post(
+            "/api/v1/knowledges/",
+            json={
+                "document_id": document_id,
+                "sequence": sequence,
+                "knowledge_text": f"text {sequence}",
+                "meta_data": {"source": source},
+            },
+        )
+        assert resp.status_code == 201
+
+    resp = client.get("/api/v1/datasets/", params={"meta.team": "search"})
+    assert [item["id"] for item in resp.json()["items"]] == [dataset_id]
+    assert resp.json()["total"] == 1
+    resp = client.get("/api/v1/documents/", params={"dataset_id": dataset_id, "meta.category": "manual"})
+    assert resp.json()["total"] == 0
+    resp = client.get("/api/v1/knowledges/", params={"document_id": document_id, "meta.source": "faq"})
+    assert [item["sequence"] for item in resp.json()["items"]] == [0, 2]
+    assert resp.json()["total"] == 2
+    assert client.get("/api/v1/knowledges/", params={"document_id": document_id, "meta.a b": "x"}).status_code == 400
+
+
+def test_async_retrieve_runs_searches_off_the_event_loop(client, monkeypatch):
+    knowledge_index.rebuild(lambda: [], lambda: [])
+    dataset_id = client.post("/api/v1/datasets/", json={"name": "Async retrieve"}).json()["id"]
+    document_id = client.post(
+        "/api/v1/documents/",
+        json={"dataset_id": dataset_id, "title": "天気のまとめ", "content": "body"},
+    ).json()["id"]
+    knowledge_id = client.post(
+        "/api/v1/knowledges/",
+        json={"document_id": document_id, "sequence": 0, "knowledge_text": "東京都の天気は晴れ"},
+    ).json()["id"]
+
+    threads = {}
+    for stage in ("search_lexical", "search_vector", "combine"):
+        original = getattr(RetrieveKnowledgesUseCase, stage)
+
+        def recording(self, *args, _stage=stage, _original=original, **kwargs):
+            threads[_stage] = threading.get_ident()
+            return _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(RetrieveKnowledgesUseCase, stage, recording)
+
+    resp = client.post(f"/api/v1/datasets/{dataset_id}/retrieve", json={"query": "東京 天気", "mode": "lexical"})
+    assert resp.status_code == 200
+    assert [item["id"] for item in resp.json()["items"]] == [knowledge_id]
+    assert resp.json()["items"][0]["documentTitle"] == "天気のまとめ"
+    assert "vector" not in threads
+
+    resp = client.post(f"/api/v1/datasets/{dataset_id}/retrieve", json={"query": "東京 天気"})
+    assert resp.status_code == 200
+    assert {"lexical", "vector", "fusion", "hydrate", "total"} <= set(resp.json()["timings"])
+    # DB を読む段階（combine）はループのスレッド、検索の段階はそれ以外のスレッドで実行する
+    loop_thread = threads["combine"]
+    assert threads["search_lexical"] != loop_thread and threads["search_vector"] != loop_thread
+
+    assert client.post("/api/v1/datasets/missing/retrieve", json={"query": "天気"}).status_code == 404
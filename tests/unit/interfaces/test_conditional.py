@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Response
+from starlette.requests import Request
+
+from app.interfaces.api.conditional import (
+    conditional_response,
+    entity_etag,
+    http_date,
+    is_not_modified,
+    list_etag,
+)
+
+UPDATED_AT = datetime(2024, 5, 1, 3, 4, 5, 123456, tzinfo=timezone.utc)
+
+
+def make_request(**headers) -> Request:
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+def test_entity_etag_is_strong_and_changes_with_updated_at():
+    etag = entity_etag("k1", UPDATED_AT)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == entity_etag("k1", UPDATED_AT)
+    assert etag != entity_etag("k1", UPDATED_AT + timedelta(microseconds=1))
+    assert etag != entity_etag("k2", UPDATED_AT)
+    assert entity_etag("k1", None) is None
+
+
+def test_list_etag_depends_on_count_last_update_and_params():
+    etag = list_etag(3, UPDATED_AT, 0, 100, None, "exact")
+    assert etag != list_etag(2, UPDATED_AT, 0, 100, None, "exact")
+    assert etag != list_etag(3, UPDATED_AT + timedelta(seconds=1), 0, 100, None, "exact")
+    assert etag != list_etag(3, UPDATED_AT, 0, 50, None, "exact")
+    assert list_etag(0, None) == list_etag(0, None)
+
+
+def test_http_date_uses_gmt():
+    assert http_date(UPDATED_AT) == "Wed, 01 May 2024 03:04:05 GMT"
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    etag = entity_etag("k1", UPDATED_AT)
+    assert is_not_modified(make_request(if_none_match=etag), etag, UPDATED_AT)
+    assert is_not_modified(make_request(if_none_match="*"), etag)
+    assert is_not_modified(make_request(if_none_match=f'"x", W/{etag}'), etag)
+    assert not is_not_modified(
+        make_request(if_none_match='"x"', if_modified_since=http_date(UPDATED_AT)), etag, UPDATED_AT
+    )
+
+
+def test_if_modified_since_compares_at_second_precision():
+    etag = entity_etag("k1", UPDATED_AT)
+    assert is_not_modified(make_request(if_modified_since=http_date(UPDATED_AT)), etag, UPDATED_AT)
+    earlier = http_date(UPDATED_AT - timedelta(seconds=1))
+    assert not is_not_modified(make_request(if_modified_since=earlier), etag, UPDATED_AT)
+    assert not is_not_modified(make_request(if_modified_since="not a date"), etag, UPDATED_AT)
+    # Last-Modified の無い一覧では If-Modified-Since を評価しない
+    assert not is_not_modified(make_request(if_modified_since=http_date(UPDATED_AT)), etag)
+
+
+def test_conditional_response_sets_validators():
+    etag = entity_etag("k1", UPDATED_AT)
+    response = Response()
+    assert conditional_response(make_request(), response, etag, UPDATED_AT) is None
+    assert response.headers["etag"] == etag
+    assert response.headers["last-modified"] == http_date(UPDATED_AT)
+
+    not_modified = conditional_response(make_request(if_none_match=etag), Response(), etag, UPDATED_AT)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
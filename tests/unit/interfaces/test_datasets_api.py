@@ -19,7 +19,7 @@ def client():
 @pytest.fixture
 def patch_create_dataset_usecase():
     with patch(
-        "app.interfaces.api.v1.datasets.CreateDatasetUseCase"
+        "app.interfaces.api.handlers.datasets.CreateDatasetUseCase"
     ) as mock_usecase_class:
         yield mock_usecase_class
 
@@ -28,7 +28,7 @@ def patch_create_dataset_usecase():
 @pytest.fixture
 def patch_dataset_repository():
     with patch(
-        "app.interfaces.api.v1.datasets.DatasetRepositorySQLAlchemy"
+        "app.interfaces.api.handlers.datasets.DatasetRepositorySQLAlchemy"
     ) as mock_repo_class:
         yield mock_repo_class
 
@@ -30,14 +30,12 @@ def test_create_document_api(client, dummy_document):
     """
     Document作成APIのテスト。
     実際のCreateDocumentUseCaseとリポジトリ生成をモック化することで、
-    dataset_repositoryの不足エラーなどを回避し、引数の検証を行う。
+    DB接続を伴うUnitOfWorkの生成を回避し、引数の検証を行う。
     """
     with patch(
-        "app.interfaces.api.v1.documents.DocumentRepositorySQLAlchemy"
-    ) as mock_document_repo, patch(
-        "app.interfaces.api.v1.documents.DatasetRepositorySQLAlchemy"
-    ) as mock_dataset_repo, patch(
-        "app.interfaces.api.v1.documents.CreateDocumentUseCase"
+        "app.interfaces.api.handlers.documents.UnitOfWorkSQLAlchemy"
+    ) as mock_unit_of_work, patch(
+        "app.interfaces.api.handlers.documents.CreateDocumentUseCase"
     ) as mock_create_doc:
 
         # UseCaseのインスタンスを取得し、そのexecuteメソッドの戻り値をモック化
@@ -58,11 +56,8 @@ def test_create_document_api(client, dummy_document):
         assert result["id"] == "doc-123"
         assert result["title"] == "Sample Document"
 
-        # CreateDocumentUseCase( document_repository=..., dataset_repository=... ) への引数を確認
-        mock_create_doc.assert_called_once_with(
-            document_repository=mock_document_repo.return_value,
-            dataset_repository=mock_dataset_repo.return_value,
-        )
+        # CreateDocumentUseCase( UnitOfWork ) への引数を確認
+        mock_create_doc.assert_called_once_with(mock_unit_of_work.return_value)
         # execute(...) 呼び出しの引数を確認
         instance.execute.assert_called_once_with(
             dataset_id="dataset-123",
@@ -75,7 +70,7 @@ def test_create_document_api(client, dummy_document):
 
 def test_get_document_api(client, dummy_document):
     with patch(
-        "app.interfaces.api.v1.documents.GetDocumentUseCase.execute"
+        "app.interfaces.api.handlers.documents.GetDocumentUseCase.execute"
     ) as mock_usecase:
         mock_usecase.return_value = dummy_document
         response = client.get("/api/v1/documents/doc-123")
@@ -88,7 +83,7 @@ def test_get_document_api(client, dummy_document):
 
 def test_get_document_api_not_found(client):
     with patch(
-        "app.interfaces.api.v1.documents.GetDocumentUseCase.execute"
+        "app.interfaces.api.handlers.documents.GetDocumentUseCase.execute"
     ) as mock_usecase:
         mock_usecase.side_effect = ValueError("Document not found")
         response = client.get("/api/v1/documents/nonexistent")
@@ -100,7 +95,7 @@ def test_get_document_api_not_found(client):
 
 def test_update_document_api(client, dummy_document):
     with patch(
-        "app.interfaces.api.v1.documents.UpdateDocumentUseCase.execute"
+        "app.interfaces.api.handlers.documents.UpdateDocumentUseCase.execute"
     ) as mock_usecase:
         mock_usecase.return_value = dummy_document
         payload = {
@@ -124,7 +119,7 @@ def test_update_document_api(client, dummy_document):
 
 def test_delete_document_api(client):
     with patch(
-        "app.interfaces.api.v1.documents.DeleteDocumentUseCase.execute"
+        "app.interfaces.api.handlers.documents.DeleteDocumentUseCase.execute"
     ) as mock_usecase:
         mock_usecase.return_value = True
         response = client.delete("/api/v1/documents/doc-123")
@@ -135,7 +130,7 @@ def test_delete_document_api(client):
 
 def test_delete_document_api_not_found(client):
     with patch(
-        "app.interfaces.api.v1.documents.DeleteDocumentUseCase.execute"
+        "app.interfaces.api.handlers.documents.DeleteDocumentUseCase.execute"
     ) as mock_usecase:
         mock_usecase.return_value = False
         response = client.delete("/api/v1/documents/nonexistent")
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.infrastructure.database.count_cache import count_cache
+from app.interfaces.api.pagination import (
+    CREATED_AT_CURSOR,
+    SEQUENCE_CURSOR,
+    CountMode,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+    parse_cursor,
+    resolve_total_async,
+)
+
+
+def test_cursor_round_trip():
+    naive = datetime(2024, 1, 2, 3, 4, 5, 678901)
+    aware = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor((naive, "id-1"))) == (naive, "id-1")
+    assert decode_cursor(encode_cursor((aware, "id-2"))) == (aware, "id-2")
+    assert decode_cursor(encode_cursor((42, "id-3"))) == (42, "id-3")
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "bm90LWpzb24", encode_cursor([1])])
+def test_parse_cursor_rejects_invalid(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        parse_cursor(cursor, CREATED_AT_CURSOR)
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "values, types",
+    [
+        ([[1, 2], "x"], CREATED_AT_CURSOR),
+        ([3, "id-1"], CREATED_AT_CURSOR),
+        ([datetime(2024, 1, 2), "id-1"], SEQUENCE_CURSOR),
+        ([True, "id-1"], SEQUENCE_CURSOR),
+        ([1, {"a": 1}], SEQUENCE_CURSOR),
+        ([1, None], SEQUENCE_CURSOR),
+    ],
+)
+def test_parse_cursor_rejects_mistyped_keys(values, types):
+    with pytest.raises(HTTPException) as exc_info:
+        parse_cursor(encode_cursor(values), types)
+    assert exc_info.value.status_code == 400
+
+
+def test_parse_cursor_accepts_matching_keys():
+    created_at = datetime(2024, 1, 2, 3, 4, 5)
+    assert parse_cursor(encode_cursor((created_at, "id-1")), CREATED_AT_CURSOR) == (created_at, "id-1")
+    assert parse_cursor(encode_cursor((3, "id-1")), SEQUENCE_CURSOR) == (3, "id-1")
+    assert parse_cursor(None, SEQUENCE_CURSOR) is None
+
+
+def test_paginate():
+    items = [(i, f"id-{i}") for i in range(4)]
+    page, next_cursor = paginate(items, 3, lambda item: item)
+    assert page == items[:3]
+    assert decode_cursor(next_cursor) == (2, "id-2")
+
+    page, next_cursor = paginate(items, 4, lambda item: item)
+    assert page == items
+    assert next_cursor is None
+
+
+def test_resolve_total_async_counts_only_when_needed():
+    count_cache.clear()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return 7
+
+    def resolve(mode, key):
+        return asyncio.run(resolve_total_async(mode, key, compute))
+
+    assert resolve(CountMode.none, ("test", "none")) is None
+    assert resolve(CountMode.estimated, ("test", "estimated")) == 7
+    # 件数キャッシュにあれば COUNT を発行しない
+    assert resolve(CountMode.estimated, ("test", "estimated")) == 7
+    assert calls == [1]
+    assert resolve(CountMode.exact, ("test", "estimated")) == 7
+    assert calls == [1, 1]
@@ -0,0 +1,82 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.infrastructure.database import query_tracker
+from app.interfaces.middleware import query_tracking
+from app.interfaces.middleware.query_tracking import QueryTrackingMiddleware
+
+
+@pytest.fixture
+def client():
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    query_tracker.install(engine)
+
+    app = FastAPI()
+    app.add_middleware(QueryTrackingMiddleware)
+
+    @app.get("/queries/{n}")
+    def run_queries(n: int):
+        with engine.connect() as conn:
+            for i in range(n):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return {"n": n}
+
+    @app.get("/distinct")
+    def run_distinct():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {}
+
+    return TestClient(app)
+
+
+def test_server_timing_header(client):
+    response = client.get("/distinct")
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+
+def test_no_queries_outside_request():
+    assert query_tracker.current_stats() is None
+
+
+def test_repeated_statements_flagged_as_n_plus_one(client, caplog, monkeypatch):
+    monkeypatch.setattr(query_tracking, "QUERY_N_PLUS_ONE_THRESHOLD", 3)
+    monkeypatch.setattr(query_tracking, "QUERY_BUDGET_COUNT", 100)
+    with caplog.at_level(logging.WARNING, logger=query_tracking.__name__):
+        client.get("/queries/3")
+        client.get("/distinct")
+    messages = [r.getMessage() for r in caplog.records]
+    assert len(messages) == 1
+    assert "Probable N+1 pattern: GET /queries/3 executed the same statement 3 times" in messages[0]
+
+
+def test_query_budget_exceeded_is_logged(client, caplog, monkeypatch):
+    monkeypatch.setattr(query_tracking, "QUERY_BUDGET_COUNT", 1)
+    monkeypatch.setattr(query_tracking, "QUERY_N_PLUS_ONE_THRESHOLD", 100)
+    with caplog.at_level(logging.WARNING, logger=query_tracking.__name__):
+        response = client.get("/distinct")
+    assert response.status_code == 200
+    assert any(
+        "Query budget exceeded: GET /distinct ran 2 queries" in r.getMessage()
+        for r in caplog.records
+    )
+
+
+def test_query_stats_tracks_slowest_statement():
+    stats = query_tracker.QueryStats()
+    stats.record("SELECT a", 0.001)
+    stats.record("SELECT b", 0.005)
+    stats.record("SELECT a", 0.002)
+    assert stats.count == 3
+    assert stats.slowest_statement == "SELECT b"
+    assert stats.repeated_statements(2) == [("SELECT a", 2)]
@@ -0,0 +1,113 @@
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.infrastructure.database import connection
+from app.infrastructure.database.connection import get_read_db, recently_wrote
+from app.interfaces.middleware.read_your_writes import (
+    READ_ONLY_ATTRIBUTE,
+    ReadYourWritesMiddleware,
+    read_only,
+)
+
+
+def _request(headers=None):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw})
+
+
+def test_recently_wrote_by_header_and_cookie():
+    now = 1_000_000.0
+    assert recently_wrote(_request(), now=now) is False
+    assert recently_wrote(_request({"X-Last-Write-At": str(now - 1)}), now=now) is True
+    assert recently_wrote(_request({"Cookie": f"last_write_at={now - 1}"}), now=now) is True
+    assert (
+        recently_wrote(_request({"X-Last-Write-At": str(now - 3600)}), now=now) is False
+    )
+    assert recently_wrote(_request({"X-Last-Write-At": "garbage"}), now=now) is False
+
+
+def test_recently_wrote_rejects_future_and_non_finite_values():
+    now = 1_000_000.0
+    # 時計のずれの範囲内は受け付ける
+    assert recently_wrote(_request({"X-Last-Write-At": str(now + 0.5)}), now=now) is True
+    assert recently_wrote(_request({"X-Last-Write-At": str(now + 3600)}), now=now) is False
+    for value in ["inf", "-inf", "nan", "1e999"]:
+        assert recently_wrote(_request({"X-Last-Write-At": value}), now=now) is False
+    assert recently_wrote(_request({"Cookie": "last_write_at=inf"}), now=now) is False
+
+
+def test_get_read_db_routes_to_replica_unless_recent_write(monkeypatch):
+    monkeypatch.setattr(connection, "SessionLocal", lambda: _Session("primary"))
+    monkeypatch.setattr(connection, "ReadSessionLocal", lambda: _Session("replica"))
+
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    @app.get("/read")
+    def read(session=Depends(get_read_db)):
+        return {"db": session.name}
+
+    @app.post("/write")
+    def write():
+        return {}
+
+    client = TestClient(app)
+    assert client.get("/read").json() == {"db": "replica"}
+
+    response = client.post("/write")
+    written_at = float(response.headers["x-last-write-at"])
+    assert abs(written_at - time.time()) < 5
+    # Set-Cookie により以降のリクエストはプライマリに固定される
+    assert client.get("/read").json() == {"db": "primary"}
+
+    client.cookies.clear()
+    assert client.get("/read").json() == {"db": "replica"}
+    assert (
+        client.get("/read", headers={"X-Last-Write-At": str(time.time())}).json()
+        == {"db": "primary"}
+    )
+
+
+def test_read_only_post_does_not_mark_write():
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    @app.post("/search")
+    @read_only
+    def search():
+        return {}
+
+    @app.post("/write")
+    def write():
+        return {}
+
+    client = TestClient(app)
+    response = client.post("/search")
+    assert response.status_code == 200
+    assert "x-last-write-at" not in response.headers
+    assert "last_write_at" not in client.cookies
+    assert "x-last-write-at" in client.post("/write").headers
+
+
+def test_read_only_routes_are_marked():
+    from app.interfaces.api.v1 import async_datasets, async_knowledges, datasets, knowledges
+
+    for module, path in [
+        (knowledges, "/vector-search"),
+        (async_knowledges, "/vector-search"),
+        (datasets, "/{dataset_id}/retrieve"),
+        (async_datasets, "/{dataset_id}/retrieve"),
+    ]:
+        endpoint = next(route.endpoint for route in module.router.routes if route.path == path)
+        assert getattr(endpoint, READ_ONLY_ATTRIBUTE, False), (module.__name__, path)
+
+
+class _Session:
+    def __init__(self, name):
+        self.name = name
+
+    def close(self):
+        pass
@@ -4,12 +4,19 @@ from unittest.mock import Mock
 import pytest
 
 from app.domain.entities.dataset import Dataset
+from app.domain.entities.dataset_stats import DatasetStats
+from app.domain.entities.document import Document
+from app.domain.entities.knowledge import Knowledge
+from app.domain.entities.knowledge_search import KnowledgeSearchHit
+from app.domain.repositories.knowledge_search_repository import SearchUnavailableError
 
 # CreateDatasetUseCase のテスト
 from app.usecases.datasets.create_dataset import CreateDatasetUseCase
 from app.usecases.datasets.delete_dataset import DeleteDatasetUseCase
 from app.usecases.datasets.get_dataset import GetDatasetUseCase
+from app.usecases.datasets.get_dataset_stats import GetDatasetStatsUseCase
 from app.usecases.datasets.list_datasets import ListDatasetsUseCase
+from app.usecases.datasets.retrieve_knowledges import RetrieveKnowledgesUseCase
 from app.usecases.datasets.update_dataset import UpdateDatasetUseCase
 
 
@@ -108,7 +115,7 @@ class TestListDatasetsUseCase:
 
         usecase = ListDatasetsUseCase(mock_repo)
         result = usecase.execute(skip=0, limit=10)
-        mock_repo.list_datasets.assert_called_once_with(skip=0, limit=10)
+        mock_repo.list_datasets.assert_called_once_with(skip=0, limit=10, after=None, meta=None)
         assert len(result) == 2
         ids = [d.id for d in result]
         assert "ds-1" in ids and "ds-2" in ids
@@ -138,3 +145,95 @@ class TestGetDatasetUseCase:
         usecase = GetDatasetUseCase(mock_repo)
         with pytest.raises(ValueError, match="Dataset not found"):
             usecase.execute("nonexistent-ds")
+
+
+class TestGetDatasetStatsUseCase:
+    def test_execute_returns_stats(self):
+        mock_repo = Mock()
+        stats = DatasetStats(dataset_id="dataset-123", document_count=2, knowledge_count=5)
+        mock_repo.get_dataset_stats.return_value = stats
+
+        usecase = GetDatasetStatsUseCase(mock_repo)
+        assert usecase.execute("dataset-123") is stats
+        mock_repo.get_dataset_stats.assert_called_once_with("dataset-123")
+
+    def test_execute_raises_when_not_found(self):
+        mock_repo = Mock()
+        mock_repo.get_dataset_stats.return_value = None
+
+        usecase = GetDatasetStatsUseCase(mock_repo)
+        with pytest.raises(ValueError):
+            usecase.execute("missing")
+
+
+class TestRetrieveKnowledgesUseCase:
+    def _usecase(self, lexical, vector):
+        mock_datasets = Mock()
+        mock_search = Mock()
+        mock_search.search.return_value = (
+            [KnowledgeSearchHit(knowledge_id=k, score=s) for k, s in lexical],
+            len(lexical),
+        )
+        mock_vector = Mock()
+        mock_vector.search.return_value = [KnowledgeSearchHit(knowledge_id=k, score=s) for k, s in vector]
+        mock_knowledges = Mock()
+        mock_knowledges.get_many.side_effect = lambda ids: [
+            Knowledge(id=k, document_id=f"doc-{k}", knowledge_text=k) for k in ids if k != "k-gone"
+        ]
+        mock_documents = Mock()
+        mock_documents.get_many.side_effect = lambda ids: [
+            Document(id=d, dataset_id="ds-1", title=f"title {d}", content="") for d in ids
+        ]
+        usecase = RetrieveKnowledgesUseCase(
+            mock_datasets, mock_search, mock_vector, mock_knowledges, mock_documents
+        )
+        return usecase, mock_search, mock_vector
+
+    def test_execute_fuses_ranks_with_rrf(self):
+        usecase, mock_search, mock_vector = self._usecase(
+            lexical=[("k-1", 8.0), ("k-2", 5.0)], vector=[("k-2", 0.9), ("k-3", 0.8)]
+        )
+        result = usecase.execute("ds-1", "query", top_k=2)
+
+        mock_search.search.assert_called_once_with("query", dataset_id="ds-1", limit=8)
+        mock_vector.search.assert_called_once_with("query", "ds-1", limit=8)
+        # 両方に現れた k-2 が最上位（全文検索2位・ベクトル検索1位）
+        assert [item.knowledge.id for item in result.items] == ["k-2", "k-1"]
+        first = result.items[0]
+        assert first.score == pytest.approx(0.5 * 61 / 62 + 0.5)
+        assert (first.lexical_score, first.vector_score) == (5.0, 0.9)
+        assert first.document_title == "title doc-k-2"
+        assert result.items[1].vector_score is None
+        assert set(result.timings) == {"lexical", "vector", "fusion", "hydrate", "total"}
+
+    def test_execute_weighted_fusion_and_threshold(self):
+        usecase, _, _ = self._usecase(
+            lexical=[("k-1", 9.0), ("k-2", 3.0), ("k-gone", 1.0)], vector=[("k-2", 0.8), ("k-1", 0.2)]
+        )
+        result = usecase.execute(
+            "ds-1", "query", top_k=5, fusion="weighted", vector_weight=0.75, score_threshold=0.5
+        )
+        # k-1: 0.25 * 1 + 0.75 * 0 / k-2: 0.25 * 0.25 + 0.75 * 1 / k-gone は閾値未満
+        assert [(item.knowledge.id, item.score) for item in result.items] == [
+            ("k-2", pytest.approx(0.8125)),
+        ]
+
+    def test_execute_single_mode_uses_raw_scores(self):
+        usecase, _, mock_vector = self._usecase(lexical=[("k-1", 7.5), ("k-gone", 2.0)], vector=[])
+        result = usecase.execute("ds-1", "query", mode="lexical")
+
+        mock_vector.search.assert_not_called()
+        # 取得前に削除されたKnowledgeは除く
+        assert [(item.knowledge.id, item.score) for item in result.items] == [("k-1", 7.5)]
+        assert "vector" not in result.timings
+
+    def test_execute_raises_when_dataset_missing_or_index_unavailable(self):
+        usecase, mock_search, _ = self._usecase(lexical=[], vector=[])
+        usecase.dataset_repository.get_by_id.return_value = None
+        with pytest.raises(ValueError):
+            usecase.execute("missing", "query")
+
+        usecase.dataset_repository.get_by_id.return_value = Dataset.create(name="ds")
+        mock_search.search.side_effect = SearchUnavailableError("building")
+        with pytest.raises(SearchUnavailableError):
+            usecase.execute("ds-1", "query")
@@ -1,8 +1,9 @@
 from datetime import datetime
-from unittest.mock import Mock
+from unittest.mock import MagicMock, Mock
 
 import pytest
 
+from app.domain.entities.dataset import Dataset
 from app.domain.entities.document import Document
 from app.usecases.documents.create_document import CreateDocumentUseCase
 from app.usecases.documents.delete_document import DeleteDocumentUseCase
@@ -13,9 +14,9 @@ from app.usecases.documents.update_document import UpdateDocumentUseCase
 
 class TestCreateDocumentUseCase:
     def test_execute_creates_document(self):
-        # モックの準備
-        mock_repo = Mock()
-        # dataset_repository も同じモックで簡略化
+        # モックの準備（UnitOfWork の各リポジトリもモック）
+        mock_uow = MagicMock()
+        mock_uow.__enter__.return_value = mock_uow
         dummy_doc = Document(
             id="doc-123",
             dataset_id="dataset-abc",
@@ -25,26 +26,38 @@ class TestCreateDocumentUseCase:
             created_at=datetime.now(),
             updated_at=datetime.now(),
         )
-        # repository.create() の戻り値を設定
-        mock_repo.create.return_value = dummy_doc
+        mock_uow.datasets.get_by_id.return_value = Dataset(id="dataset-abc", name="ds")
+        mock_uow.documents.create.return_value = dummy_doc
 
-        # ユースケースのインスタンスを、document_repository と dataset_repository に同じモックを渡す
-        usecase = CreateDocumentUseCase(
-            document_repository=mock_repo, dataset_repository=mock_repo
-        )
-        # dataset_id を指定している場合は、存在確認ロジックがあるとしても、
-        # モックにより dummy_doc が返る想定でテストを進めます。
+        usecase = CreateDocumentUseCase(mock_uow)
         result = usecase.execute(
             dataset_id="dataset-abc",
             title="Sample Document",
             content="This is a sample document.",
             meta_data={"key": "value"},
         )
-        mock_repo.create.assert_called_once()
+        mock_uow.datasets.get_or_create.assert_not_called()
+        mock_uow.documents.create.assert_called_once()
+        mock_uow.commit.assert_called_once()
         assert result.id == "doc-123"
         assert result.title == "Sample Document"
         assert result.dataset_id == "dataset-abc"
 
+    def test_execute_auto_creates_dataset_with_deterministic_id(self):
+        mock_uow = MagicMock()
+        mock_uow.__enter__.return_value = mock_uow
+        mock_uow.datasets.get_by_id.return_value = None
+        mock_uow.datasets.get_or_create.side_effect = lambda dataset: dataset
+        mock_uow.documents.create.side_effect = lambda document: document
+
+        usecase = CreateDocumentUseCase(mock_uow)
+        first = usecase.execute(dataset_id="missing", title="Manual", content="a")
+        second = usecase.execute(dataset_id=None, title="Manual", content="b")
+
+        assert first.dataset_id == second.dataset_id
+        assert first.dataset_id == Dataset.create_auto("Manual").id
+        assert mock_uow.commit.call_count == 2
+
 
 class TestUpdateDocumentUseCase:
     def test_execute_updates_document(self):
@@ -118,7 +131,7 @@ class TestListDocumentsUseCase:
         usecase = ListDocumentsUseCase(mock_repo)
         result = usecase.execute(dataset_id="dataset-xyz", skip=0, limit=10)
         mock_repo.list_documents.assert_called_once_with(
-            "dataset-xyz", skip=0, limit=10
+            "dataset-xyz", skip=0, limit=10, after=None, meta=None
         )
         assert len(result) == 2
         ids = [doc.id for doc in result]
@@ -4,11 +4,15 @@ from unittest.mock import Mock
 import pytest
 
 from app.domain.entities.knowledge import Knowledge
+from app.domain.entities.knowledge_search import KnowledgeSearchHit
+from app.usecases.knowledges.bulk_create_knowledges import BulkCreateKnowledgesUseCase
 from app.usecases.knowledges.create_knowledge import CreateKnowledgeUseCase
 from app.usecases.knowledges.delete_knowledge import DeleteKnowledgeUseCase
 from app.usecases.knowledges.get_knowledge import GetKnowledgeUseCase
 from app.usecases.knowledges.list_knowledges import ListKnowledgesUseCase
+from app.usecases.knowledges.search_knowledges import SearchKnowledgesUseCase
 from app.usecases.knowledges.update_knowledge import UpdateKnowledgeUseCase
+from app.usecases.knowledges.vector_search_knowledges import VectorSearchKnowledgesUseCase
 
 
 class TestCreateKnowledgeUseCase:
@@ -38,6 +42,32 @@ class TestCreateKnowledgeUseCase:
         assert result.sequence == 1
 
 
+class TestBulkCreateKnowledgesUseCase:
+    def test_execute_creates_knowledges_in_one_call(self):
+        mock_repo = Mock()
+        mock_repo.create_many.return_value = ["k-1", "k-2"]
+
+        usecase = BulkCreateKnowledgesUseCase(mock_repo)
+        result = usecase.execute(
+            [
+                {"document_id": "doc-abc", "sequence": 0, "knowledge_text": "first"},
+                {
+                    "document_id": "doc-xyz",
+                    "sequence": 1,
+                    "knowledge_text": "second",
+                    "meta_data": {"page": 2},
+                    "is_active": False,
+                },
+            ]
+        )
+        mock_repo.create_many.assert_called_once()
+        knowledges = mock_repo.create_many.call_args.args[0]
+        assert [k.document_id for k in knowledges] == ["doc-abc", "doc-xyz"]
+        assert knowledges[0].meta_data == {}
+        assert knowledges[1].is_active is False
+        assert result == ["k-1", "k-2"]
+
+
 class TestUpdateKnowledgeUseCase:
     def test_execute_updates_knowledge(self):
         mock_repo = Mock()
@@ -59,6 +89,15 @@ class TestUpdateKnowledgeUseCase:
         assert result.sequence == 2
         assert result.knowledge_text == "Updated text"
 
+    def test_execute_refreshes_updated_at(self):
+        mock_repo = Mock()
+        mock_repo.update.side_effect = lambda knowledge: knowledge
+        stale = datetime(2020, 1, 1)
+        knowledge = Knowledge(id="k-456", document_id="doc-abc", updated_at=stale)
+
+        result = UpdateKnowledgeUseCase(mock_repo).execute(knowledge)
+        assert result.updated_at > stale
+
 
 class TestDeleteKnowledgeUseCase:
     def test_execute_success(self):
@@ -104,7 +143,7 @@ class TestListKnowledgesUseCase:
         mock_repo.list_knowledges.return_value = [k1, k2]
         usecase = ListKnowledgesUseCase(mock_repo)
         result = usecase.execute(document_id="doc-xyz", skip=0, limit=10)
-        mock_repo.list_knowledges.assert_called_once_with("doc-xyz", 0, 10)
+        mock_repo.list_knowledges.assert_called_once_with("doc-xyz", 0, 10, after=None, meta=None)
         assert len(result) == 2
         ids = [k.id for k in result]
         assert "k-1" in ids and "k-2" in ids
@@ -136,3 +175,54 @@ class TestGetKnowledgeUseCase:
         result = usecase.execute("nonexistent-k")
         mock_repo.get_by_id.assert_called_once_with("nonexistent-k")
         assert result is None
+
+
+class TestSearchKnowledgesUseCase:
+    def test_execute_returns_knowledges_in_score_order(self):
+        mock_search = Mock()
+        mock_search.search.return_value = (
+            [
+                KnowledgeSearchHit(knowledge_id="k-2", score=3.0),
+                KnowledgeSearchHit(knowledge_id="k-gone", score=2.0),
+                KnowledgeSearchHit(knowledge_id="k-1", score=1.0),
+            ],
+            3,
+        )
+        mock_repo = Mock()
+        mock_repo.get_many.return_value = [
+            Knowledge(id="k-1", document_id="doc-abc", knowledge_text="first"),
+            Knowledge(id="k-2", document_id="doc-abc", knowledge_text="second"),
+        ]
+
+        usecase = SearchKnowledgesUseCase(mock_search, mock_repo)
+        results, total = usecase.execute("text", dataset_id="ds-1", limit=3, meta={"source": "faq"})
+
+        # meta の絞り込みは検索リポジトリに任せる（総件数も絞り込んだ後の件数）
+        mock_search.search.assert_called_once_with("text", dataset_id="ds-1", limit=3, meta={"source": "faq"})
+        mock_repo.get_many.assert_called_once_with(["k-2", "k-gone", "k-1"])
+        # 索引への反映前に削除されたKnowledgeは除く
+        assert [(r.knowledge.id, r.score) for r in results] == [("k-2", 3.0), ("k-1", 1.0)]
+        assert total == 3
+
+
+class TestVectorSearchKnowledgesUseCase:
+    def test_execute_returns_knowledges_in_similarity_order(self):
+        mock_search = Mock()
+        mock_search.search.return_value = [
+            KnowledgeSearchHit(knowledge_id="k-2", score=0.9),
+            KnowledgeSearchHit(knowledge_id="k-gone", score=0.5),
+            KnowledgeSearchHit(knowledge_id="k-1", score=0.1),
+        ]
+        mock_repo = Mock()
+        mock_repo.get_many.return_value = [
+            Knowledge(id="k-1", document_id="doc-abc", knowledge_text="first"),
+            Knowledge(id="k-2", document_id="doc-abc", knowledge_text="second"),
+        ]
+
+        usecase = VectorSearchKnowledgesUseCase(mock_search, mock_repo)
+        results = usecase.execute("text", "ds-1", limit=3)
+
+        mock_search.search.assert_called_once_with("text", "ds-1", limit=3)
+        mock_repo.get_many.assert_called_once_with(["k-2", "k-gone", "k-1"])
+        # 索引への反映前に削除されたKnowledgeは除く
+        assert [(r.knowledge.id, r.score) for r in results] == [("k-2", 0.9), ("k-1", 0.1)]